@@ -92,3 +92,24 @@ async function apiFetch(path, options) {
   if (lastError) throw lastError;
   return fetch(apiUrl(withSlash), options);
 }
+
+// Streams an application/x-ndjson response body, calling onEvent with each
+// parsed line as it arrives. Blank lines are skipped.
+async function readNdjson(response, onEvent) {
+  const handle = (line) => {
+    if (!line.trim()) return;
+    onEvent(JSON.parse(line));
+  };
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let pending = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    pending += decoder.decode(value, { stream: true });
+    const lines = pending.split("\n");
+    pending = lines.pop();
+    lines.forEach(handle);
+  }
+  handle(pending + decoder.decode());
+}
@@ -39,6 +39,35 @@ async function fetchCH(path) {
   });
 }
 
+// Batched Companies House fetch through the dev server's /ch/batch, which
+// dedupes against its cache and paces upstream calls to the CH quota.
+// requests: [{company, resource}] or [{officer, resource: "appointments"}].
+// Resolves to a Map keyed "company:resource" / "officer:resource" holding
+// {status, source, data}, or null when the endpoint is unavailable so
+// callers can fall back to individual fetchCH calls.
+async function fetchCHBatch(requests, onResult) {
+  let response;
+  try {
+    response = await fetch(apiUrl("/ch/batch"), {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "Accept": "application/x-ndjson" },
+      body: JSON.stringify({ requests })
+    });
+  } catch (_) {
+    return null;
+  }
+  if (!response.ok || !response.body) return null;
+
+  const results = new Map();
+  await readNdjson(response, (event) => {
+    if (event.type !== "result") return;
+    const key = event.company ? `${event.company}:${event.resource}` : `${event.officer}:${event.resource}`;
+    results.set(key, event);
+    if (onResult) onResult(event);
+  });
+  return results;
+}
+
 
 // ── API Client ──
 
@@ -80,12 +80,18 @@
           action: () => {
             const pc = document.getElementById("ch_postcode");
             if (pc) {
-              // Reverse geocode to postcode
-              fetch(`https://api.postcodes.io/postcodes?lon=${latlng.lng}&lat=${latlng.lat}&limit=1`)
+              // Reverse geocode to postcode: the dev server's ONSPD grid first,
+              // postcodes.io only when the local lookup is unavailable. Both
+              // stay within 100 m, so a click in open country finds nothing.
+              const postcodesIo = () => fetch(`https://api.postcodes.io/postcodes?lon=${latlng.lng}&lat=${latlng.lat}&radius=100&limit=1`)
                 .then(r => r.json())
-                .then(data => {
-                  if (data.result?.[0]?.postcode) {
-                    pc.value = data.result[0].postcode;
+                .then(data => data.result?.[0]?.postcode);
+              fetch(apiUrl(`/local/reverse?lat=${latlng.lat}&lon=${latlng.lng}&k=1&radius=100`))
+                .then(r => (r.ok ? r.json() : null), () => null)
+                .then(local => (local?.ok ? local.items?.[0]?.postcode : postcodesIo()))
+                .then(postcode => {
+                  if (postcode) {
+                    pc.value = postcode;
                     document.querySelector('[data-tab="search"]')?.click();
                     document.getElementById("ch_search")?.click();
                   }
@@ -346,15 +346,10 @@
     if (typeof setStatus === "function") setStatus("Geocoding addresses...");
     const geocoded = {};
     const postcodes = [...allAddresses.keys()];
-    for (let i = 0; i < postcodes.length; i += 3) {
-      const batch = postcodes.slice(i, i + 3);
-      const results = await Promise.all(batch.map(pc => {
-        const addr = allAddresses.get(pc);
-        return geocodePostcode(addr.postcode).then(c => ({ pc, coords: c }));
-      }));
-      for (const r of results) {
-        if (r.coords) geocoded[r.pc] = r.coords;
-      }
+    const located = await geocodePostcodesBulk(postcodes.map(pc => allAddresses.get(pc).postcode));
+    for (const pc of postcodes) {
+      const coords = located.get(normalizePostcodeKey(allAddresses.get(pc).postcode));
+      if (coords) geocoded[pc] = coords;
     }
 
     // ── Step 3: Place person entities ──
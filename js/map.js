@@ -120,6 +120,14 @@ let CRIME_SPATIAL_FILTER = {
 };
 let CRIME_LAST_RENDER_TOTAL = 0;
 let CRIME_LAST_RENDER_FILTERED = 0;
+// Viewport queries against the dev server's /crime/grid; the whole-file
+// GeoJSON download is only used when that endpoint is missing.
+const CRIME_GRID_SERVER = {
+  enabled: false,
+  totalCells: 0,
+  controller: null,
+  hooksBound: false
+};
 
 const CRIME_FILTER_UI = {
   initialized: false,
@@ -544,7 +552,12 @@ function summarizeFeatureForActiveRange(feature, monthStart) {
   };
   const timeline = props.timeline;
   const includeAll = !monthStart;
-  if (timeline) {
+  if (props.cluster) {
+    // /crime/grid bins are already summed over the active month window.
+    stats.incidents = Number(props.incidents || 0);
+    stats.stops = Number(props.stops || 0);
+    stats.outcomes = Number(props.outcomes || 0);
+  } else if (timeline) {
     if (!feature.__timelineEntries) {
       feature.__timelineEntries = Object.entries(timeline).sort((a, b) => a[0].localeCompare(b[0]));
     }
@@ -947,9 +960,75 @@ function initCrimeSpatialDrawHooks() {
   });
 }
 
-function renderCrimeLayerFiltered() {
+function crimeGridQueryUrl() {
+  let bounds = map.getBounds().pad(0.1);
+  const box = CRIME_SPATIAL_FILTER.bounds;
+  if (box) {
+    bounds = box.intersects(bounds)
+      ? L.latLngBounds(
+        [Math.max(box.getSouth(), bounds.getSouth()), Math.max(box.getWest(), bounds.getWest())],
+        [Math.min(box.getNorth(), bounds.getNorth()), Math.min(box.getEast(), bounds.getEast())]
+      )
+      : box;
+  }
+  const params = new URLSearchParams({
+    bbox: [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].map(v => v.toFixed(5)).join(","),
+    zoom: String(Math.round(map.getZoom()))
+  });
+  if (CRIME_FILTER_STATE.forces.size) params.set("force", [...CRIME_FILTER_STATE.forces].join(","));
+  if (CRIME_FILTER_STATE.types.size) params.set("type", [...CRIME_FILTER_STATE.types].join(","));
+  const monthStart = getActiveMonthStart();
+  if (monthStart) params.set("from", monthStart);
+  return apiUrl(`/crime/grid?${params}`);
+}
+
+async function fetchCrimeGridViewport() {
+  if (!CRIME_GRID_SERVER.enabled || !layers.crime) return;
+  CRIME_GRID_SERVER.controller?.abort();
+  const controller = new AbortController();
+  CRIME_GRID_SERVER.controller = controller;
+  try {
+    const r = await fetch(crimeGridQueryUrl(), { signal: controller.signal });
+    if (!r.ok) throw new Error(`Crime grid query failed (${r.status})`);
+    const data = await r.json();
+    if (controller !== CRIME_GRID_SERVER.controller) return;
+    CRIME_DATA = Array.isArray(data.features) ? data.features : [];
+    CRIME_GRID_SERVER.totalCells = Number(data?.meta?.total_cells || 0);
+    renderCrimeLayerFiltered({ fromServer: true });
+  } catch (err) {
+    if (err?.name !== "AbortError") console.warn("[Crime] viewport query failed", err);
+  } finally {
+    if (controller === CRIME_GRID_SERVER.controller) CRIME_GRID_SERVER.controller = null;
+  }
+}
+
+const scheduleCrimeGridFetch = debounce(fetchCrimeGridViewport, 250);
+
+function bindCrimeGridViewportHooks() {
+  if (CRIME_GRID_SERVER.hooksBound) return;
+  CRIME_GRID_SERVER.hooksBound = true;
+  map.on("moveend", () => {
+    if (CRIME_GRID_SERVER.enabled && map.hasLayer(layers.crime)) scheduleCrimeGridFetch();
+  });
+}
+
+function isSameCrimeFeature(a, b) {
+  if (a === b) return true;
+  if (!a || !b) return false;
+  const ca = a.geometry?.coordinates || [];
+  const cb = b.geometry?.coordinates || [];
+  return ca[0] === cb[0] && ca[1] === cb[1] && !!a.properties?.cluster === !!b.properties?.cluster;
+}
+
+function renderCrimeLayerFiltered(opts = {}) {
   if (!layers.crime) return;
 
+  // Filter changes become a new viewport query; the response re-enters here.
+  if (CRIME_GRID_SERVER.enabled && !opts.fromServer) {
+    scheduleCrimeGridFetch();
+    return;
+  }
+
   layers.crime.clearLayers();
 
   if (!CRIME_DATA || !CRIME_DATA.length) {
@@ -961,7 +1040,7 @@ function renderCrimeLayerFiltered() {
     return;
   }
 
-  const total = CRIME_DATA.length;
+  const total = CRIME_GRID_SERVER.enabled ? (CRIME_GRID_SERVER.totalCells || CRIME_DATA.length) : CRIME_DATA.length;
   const forceFilters = CRIME_FILTER_STATE.forces;
   const typeFilters = CRIME_FILTER_STATE.types;
   const spatialBounds = CRIME_SPATIAL_FILTER.bounds;
@@ -990,8 +1069,9 @@ function renderCrimeLayerFiltered() {
     summary.stops += stats.stops;
     summary.outcomes += stats.outcomes;
 
-    if (CRIME_INSPECTOR_STATE.feature === feature) {
+    if (isSameCrimeFeature(CRIME_INSPECTOR_STATE.feature, feature)) {
       selectedVisible = true;
+      CRIME_INSPECTOR_STATE.feature = feature;
       CRIME_INSPECTOR_STATE.marker = marker;
       CRIME_INSPECTOR_STATE.stats = stats;
     }
@@ -1042,27 +1122,63 @@ async function ensureCrimeLoaded() {
     throw lastErr || new Error("Crime data load failed");
   }
 
-  if (OVERLAY_LOAD_STATE.crimeLoaded)
+  // Months and per-force/type totals from the dev server; null when the
+  // endpoint is not there (static hosting) and the file has to be used.
+  async function fetchCrimeGridFacets() {
+    let r;
+    try {
+      r = await fetch(apiUrl("/crime/grid?zoom=0&limit=1&facets=1"), { cache: "no-store" });
+    } catch (err) {
+      console.warn("[Crime] /crime/grid unreachable, loading the grid file", err);
+      return null;
+    }
+    if (r.status === 404 || r.status === 503) return null;
+    if (!r.ok) throw new Error(`Crime grid query failed (${r.status})`);
+    const data = await r.json();
+    if (!data?.facets) return null;
+    return data;
+  }
+
+  function applyCrimeMonths(months) {
+    CRIME_MONTHS = Array.isArray(months) ? months.slice().sort() : [];
+    if (CRIME_MONTHS.length) {
+      setCrimeMonthWindow(Math.min(6, CRIME_MONTHS.length), { silent: true, asDefault: true });
+    } else {
+      CRIME_FILTER_STATE.monthStartIndex = 0;
+      CRIME_DEFAULT_MONTH_START = 0;
+      updateCrimeTimelineControls();
+    }
+  }
+
+  function loadFromServer(data) {
+    applyCrimeMonths(data?.meta?.months);
+    CRIME_FORCE_MAP = new Map(Object.entries(data.facets.forces || {}));
+    CRIME_TYPE_STATS = new Map(Object.entries(data.facets.types || {}));
+    CRIME_TYPES = new Set(CRIME_TYPE_STATS.keys());
+    CRIME_GRID_SERVER.enabled = true;
+    CRIME_GRID_SERVER.totalCells = Number(data?.meta?.total_cells || 0);
+    bindCrimeGridViewportHooks();
+    populateCrimeFilters();
+    OVERLAY_LOAD_STATE.crimeLoaded = true;
+    console.log("Crime grid served by /crime/grid:", CRIME_GRID_SERVER.totalCells, "cells");
+    return fetchCrimeGridViewport().then(() => true);
+  }
+
+  if (OVERLAY_LOAD_STATE.crimeLoaded) {
+    if (CRIME_GRID_SERVER.enabled) scheduleCrimeGridFetch();
     return true;
+  }
 
   if (OVERLAY_LOAD_STATE.crimeLoading)
     return OVERLAY_LOAD_STATE.crimeLoading;
 
   OVERLAY_LOAD_STATE.crimeLoading =
-    fetchCrimeGeoJson()
+    fetchCrimeGridFacets()
 
-      .then(data => {
+      .then(facets => facets ? loadFromServer(facets) : fetchCrimeGeoJson().then(data => {
 
         CRIME_DATA = data.features || [];
-        const metaMonths = Array.isArray(data?.meta?.months) ? data.meta.months.slice().sort() : [];
-        CRIME_MONTHS = metaMonths;
-        if (CRIME_MONTHS.length) {
-          setCrimeMonthWindow(Math.min(6, CRIME_MONTHS.length), { silent: true, asDefault: true });
-        } else {
-          CRIME_FILTER_STATE.monthStartIndex = 0;
-          CRIME_DEFAULT_MONTH_START = 0;
-          updateCrimeTimelineControls();
-        }
+        applyCrimeMonths(data?.meta?.months);
 
         CRIME_FORCE_MAP.clear();
         CRIME_TYPES.clear();
@@ -1105,7 +1221,7 @@ async function ensureCrimeLoaded() {
 
         return true;
 
-      })
+      }))
 
       .catch(err => {
 
@@ -1196,8 +1312,41 @@ function searchCached(criteria, limit) {
 
 let _searchAbort = false;
 
+// Ask the dev server's prebuilt index first (scripts/ch_index.py); null means
+// it is not available here and the shard download path should run instead.
+async function searchLocalIndex(criteria) {
+  const params = new URLSearchParams();
+  for (const key of ["name", "number", "postcode", "town"]) {
+    const value = String(criteria[key] || "").trim();
+    if (value) params.set(key, value);
+  }
+  if (!params.toString()) return null;
+  params.set("limit", "500");
+  try {
+    const r = await fetch(apiUrl(`/local/companies/search?${params}`));
+    if (!r.ok) return null;
+    const data = await r.json();
+    if (!data?.ok || !Array.isArray(data.results)) return null;
+    // Name-only searches with no exact hit get a typo-tolerant second pass.
+    const nameOnly = params.has("name") && [...params.keys()].length === 2;
+    if (!data.results.length && nameOnly) {
+      const fr = await fetch(apiUrl(`/local/companies/fuzzy?name=${encodeURIComponent(params.get("name"))}&k=50`));
+      const fuzzy = fr.ok ? await fr.json() : null;
+      if (fuzzy?.ok && Array.isArray(fuzzy.results)) return fuzzy.results;
+    }
+    return data.results;
+  } catch {
+    return null;
+  }
+}
+
 async function searchProgressive(criteria, onBatch) {
   _searchAbort = false;
+  const local = await searchLocalIndex(criteria);
+  if (local) {
+    if (onBatch) onBatch(local, 1, 1);
+    return local;
+  }
   let targetFiles = [];
   const numClean = (criteria.number || "").replace(/\D/g, "");
   if (numClean) {
@@ -1265,6 +1414,24 @@ function cachePostcode(pc, coords) {
   PC_CACHE[key] = { lat: Number(coords.lat), lon: Number(coords.lon) };
 }
 
+// ONSPD table on the dev server (scripts/onspd.py): one binary search, no
+// upstream call. Any non-200 (not built, not found, static hosting) falls through.
+async function geocodeViaLocalOnspd(rawPostcode) {
+  const pc = normalizePostcodeKey(rawPostcode);
+  if (!pc) return null;
+  try {
+    const resp = await fetch(apiUrl(`/local/postcode/${encodeURIComponent(pc)}`));
+    if (!resp.ok) return null;
+    const data = await resp.json();
+    const lat = Number(data?.result?.latitude);
+    const lon = Number(data?.result?.longitude);
+    if (data?.result?.latitude != null && Number.isFinite(lat) && Number.isFinite(lon)) return { lat, lon };
+  } catch (_) {
+    // ignore
+  }
+  return null;
+}
+
 async function geocodeViaPostcodesIo(rawPostcode) {
   const variants = postcodeVariants(rawPostcode);
   if (!variants.length) return null;
@@ -1535,6 +1702,60 @@ async function geocodeAddress(rawAddress, options = {}) {
   }
 }
 
+// Many postcodes in one POST to the dev server's /geo/postcodes/bulk (local
+// ONSPD table, then postcodes.io bulk), streamed back as NDJSON. Resolves to
+// a Map of normalised postcode key -> {lat, lon}; postcodes the endpoint
+// could not place (or everything, on static hosting) fall back to
+// geocodePostcode a few at a time.
+async function geocodePostcodesBulk(rawPostcodes) {
+  const out = new Map();
+  const wanted = new Map();
+  for (const raw of rawPostcodes || []) {
+    const key = normalizePostcodeKey(raw);
+    if (!key || wanted.has(key)) continue;
+    const cached = lookupPostcode(key);
+    if (cached) out.set(key, cached);
+    else wanted.set(key, raw);
+  }
+  if (!wanted.size) return out;
+
+  const settled = new Set();
+  try {
+    const response = await fetch(apiUrl("/geo/postcodes/bulk"), {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "Accept": "application/x-ndjson" },
+      body: JSON.stringify({ postcodes: [...wanted.values()] })
+    });
+    if (response.ok && response.body) {
+      await readNdjson(response, (event) => {
+        if (event.type !== "result") return;
+        const key = normalizePostcodeKey(event.postcode);
+        // A 404 is postcodes.io's definitive "no such postcode"; only upstream
+        // errors are worth retrying one at a time below.
+        if (event.status >= 500 || event.source === "error") return;
+        settled.add(key);
+        if (event.status !== 200) return;
+        const coords = { lat: Number(event.latitude), lon: Number(event.longitude) };
+        if (!Number.isFinite(coords.lat) || !Number.isFinite(coords.lon)) return;
+        cachePostcode(key, coords);
+        out.set(key, coords);
+      });
+    }
+  } catch (e) {
+    console.warn("bulk postcode geocoding failed:", e);
+  }
+
+  const rest = [...wanted.entries()].filter(([key]) => !settled.has(key));
+  for (let i = 0; i < rest.length; i += 3) {
+    const batch = rest.slice(i, i + 3);
+    const results = await Promise.all(batch.map(([key, raw]) => geocodePostcode(raw).then((c) => [key, c])));
+    for (const [key, coords] of results) {
+      if (coords) out.set(key, coords);
+    }
+  }
+  return out;
+}
+
 // API-only postcode geocoding with cache + multi-provider fallback.
 async function geocodePostcode(rawPostcode) {
   const pc = normalizePostcodeKey(rawPostcode);
@@ -1543,7 +1764,10 @@ async function geocodePostcode(rawPostcode) {
   if (cached) return cached;
 
   try {
-    let coords = await geocodeViaPostcodesIo(rawPostcode);
+    let coords = await geocodeViaLocalOnspd(rawPostcode);
+    if (!coords) {
+      coords = await geocodeViaPostcodesIo(rawPostcode);
+    }
     if (!coords) {
       coords = await geocodeViaOsPlaces(rawPostcode);
     }
@@ -8532,31 +8756,95 @@ function resolvePoliceForceCode(props = {}) {
   return "";
 }
 
+// Vector tiles from the dev server (/tiles/<layer>/{z}/{x}/{y}.pbf, see
+// scripts/vector_tiles.py). Zoom ranges mirror TILE_LAYERS: tiles below the
+// minimum are empty, above the maximum the last zoom is overzoomed. Overlays
+// use them when the server answers for that layer, and otherwise load their
+// GeoJSON file as before.
+const VECTOR_TILE_ZOOMS = {
+  police_force_areas: [4, 12],
+  service_stations: [8, 14],
+  airports: [2, 12],
+  sea_ports: [5, 12]
+};
+const VECTOR_TILE_PROBES = {};
+
+function vectorTilesAvailable(name) {
+  if (!L.vectorGrid?.protobuf || !VECTOR_TILE_ZOOMS[name]) return Promise.resolve(false);
+  if (!VECTOR_TILE_PROBES[name]) {
+    VECTOR_TILE_PROBES[name] = fetch(apiUrl(`/tiles/${name}/0/0/0.pbf`))
+      .then((r) => r.ok)
+      .catch(() => false);
+  }
+  return VECTOR_TILE_PROBES[name];
+}
+
+function createVectorTileLayer(name, style, opts = {}) {
+  const [minZoom, maxNativeZoom] = VECTOR_TILE_ZOOMS[name];
+  const layer = L.vectorGrid.protobuf(apiUrl(`/tiles/${name}/{z}/{x}/{y}.pbf`), {
+    rendererFactory: L.canvas.tile,
+    vectorTileLayerStyles: { [name]: style },
+    interactive: true,
+    minZoom,
+    maxNativeZoom,
+    maxZoom: 22
+  });
+  layer.on("click", (e) => {
+    const props = e.layer?.properties || {};
+    if (opts.popup) {
+      const html = opts.popup(props, e.latlng);
+      if (html) L.popup().setLatLng(e.latlng).setContent(html).openOn(map);
+    }
+    opts.onClick?.(props, e.latlng);
+  });
+  return layer;
+}
+
+function policeAreaPopupHtml(props = {}) {
+  const n = resolvePoliceForceName(props);
+  const code = resolvePoliceForceCode(props);
+  return (
+    `<strong>${escapeHtml(n)}</strong><br>` +
+    `<span class="popup-label">Police Force Area</span>` +
+    (code ? `<br><span class="popup-label">Force Code</span> ${escapeHtml(code)}` : "")
+  );
+}
+
+const POLICE_AREA_STYLE = { color: "#818cf8", weight: 2, fillColor: "#818cf8", fillOpacity: 0.06, dashArray: "6 4" };
+
 async function ensurePoliceAreasLoaded() {
   if (OVERLAY_LOAD_STATE.areasLoaded) return true;
   if (OVERLAY_LOAD_STATE.areasLoading) return OVERLAY_LOAD_STATE.areasLoading;
-  OVERLAY_LOAD_STATE.areasLoading = fetch("data/police_force_areas_wgs84.geojson")
-    .then((r) => r.json())
-    .then((data) => {
-      L.geoJSON(data, {
-        style: { color: "#818cf8", weight: 2, fillColor: "#818cf8", fillOpacity: 0.06, dashArray: "6 4" },
-        onEachFeature: (f, l) => {
-          const n = resolvePoliceForceName(f.properties || {});
-          const code = resolvePoliceForceCode(f.properties || {});
-          l.bindPopup(
-            `<strong>${escapeHtml(n)}</strong><br>` +
-            `<span class="popup-label">Police Force Area</span>` +
-            (code ? `<br><span class="popup-label">Force Code</span> ${escapeHtml(code)}` : "")
-          );
-          l.on("click", () => {
-            setActiveForce(n);
-            showToast?.(`${n} selected`, "info");
-          });
-        }
+  const selectForce = (props) => {
+    const n = resolvePoliceForceName(props || {});
+    setActiveForce(n);
+    showToast?.(`${n} selected`, "info");
+  };
+  OVERLAY_LOAD_STATE.areasLoading = vectorTilesAvailable("police_force_areas")
+    .then((tiles) => {
+      if (!tiles) return false;
+      createVectorTileLayer("police_force_areas", { ...POLICE_AREA_STYLE, fill: true }, {
+        popup: policeAreaPopupHtml,
+        onClick: selectForce
       }).addTo(layers.areas);
-      OVERLAY_LOAD_STATE.areasLoaded = true;
       return true;
     })
+    .then((tiled) => tiled || fetch("data/police_force_areas_wgs84.geojson")
+      .then((r) => r.json())
+      .then((data) => {
+        L.geoJSON(data, {
+          style: POLICE_AREA_STYLE,
+          onEachFeature: (f, l) => {
+            l.bindPopup(policeAreaPopupHtml(f.properties || {}));
+            l.on("click", () => selectForce(f.properties));
+          }
+        }).addTo(layers.areas);
+        return true;
+      }))
+    .then((ok) => {
+      OVERLAY_LOAD_STATE.areasLoaded = ok;
+      return ok;
+    })
     .catch((e) => {
       console.warn("Police areas:", e);
       setStatus("Police force area data unavailable");
@@ -8702,15 +8990,29 @@ function ensureAirportLayerVisible(airport) {
   if (layer && !map.hasLayer(layer)) layer.addTo(map);
 }
 
+function airportIntelPopupHtml(airport) {
+  if (typeof window.buildAirportIntelPopup === "function") {
+    try {
+      const html = window.buildAirportIntelPopup(airport);
+      if (html) return html;
+    } catch (_) {
+      // keep fallback popup
+    }
+  }
+  return airportPopupHtml(airport);
+}
+
 function focusAirportOnMap(airport) {
   if (!airport || !Number.isFinite(airport.lat) || !Number.isFinite(airport.lon)) return;
   ensureAirportLayerVisible(airport);
   map.flyTo([airport.lat, airport.lon], Math.max(map.getZoom(), 9), { duration: 0.6 });
-  if (airport.markerRef && typeof airport.markerRef.openPopup === "function") {
-    setTimeout(() => {
-      try { airport.markerRef.openPopup(); } catch (_) {}
-    }, 220);
-  }
+  setTimeout(() => {
+    try {
+      // Tiled global airports have no marker on the map; pop up at the point.
+      if (airport.markerRef && map.hasLayer(airport.markerRef)) airport.markerRef.openPopup();
+      else L.popup().setLatLng([airport.lat, airport.lon]).setContent(airportIntelPopupHtml(airport)).openOn(map);
+    } catch (_) {}
+  }, 220);
 }
 
 function renderAirportSearchResults(items) {
@@ -8748,11 +9050,29 @@ async function ensureAirportsLoaded() {
   window.AIRPORT_INDEX.uk = [];
   window.AIRPORT_INDEX.byIcao = {};
   window.AIRPORT_INDEX.byIata = {};
+  // The file is still loaded for the search/flight index; with vector tiles
+  // the ~4k global airports are drawn from tiles and only UK airports get
+  // markers.
   OVERLAY_LOAD_STATE.airportsLoading = Promise.all([
     fetch("data/airports.geojson").then((r) => r.json()),
-    airportLogoMapPromise
-  ]).then(([data, logoMap]) => {
+    airportLogoMapPromise,
+    vectorTilesAvailable("airports")
+  ]).then(([data, logoMap, tiles]) => {
     if (logoMap) setAirportLogoMap(logoMap);
+    if (tiles) {
+      const globalStyle = { radius: 3, color: "#0284c7", fillColor: "#0284c7", fill: true, fillOpacity: 0.5, weight: 1 };
+      createVectorTileLayer(
+        "airports",
+        (props) => (UK_COUNTRIES.includes(String(props?.country || "").toUpperCase()) ? [] : globalStyle),
+        {
+          popup: (props) => {
+            const airport = window.AIRPORT_INDEX.byIcao[String(props?.icao || "").toUpperCase()] ||
+              window.AIRPORT_INDEX.byIata[String(props?.iata || "").toUpperCase()];
+            return airport ? airportIntelPopupHtml(airport) : "";
+          }
+        }
+      ).addTo(layers.airports_global);
+    }
     L.geoJSON(data, {
       pointToLayer: (f, ll) => {
         const isUK = UK_COUNTRIES.includes((f.properties?.country || "").toUpperCase());
@@ -8791,17 +9111,9 @@ async function ensureAirportsLoaded() {
 
         l._airportMeta = airport;
         l.bindPopup(airportPopupHtml(airport));
-        l.on("popupopen", () => {
-          if (typeof window.buildAirportIntelPopup === "function") {
-            try {
-              const html = window.buildAirportIntelPopup(l._airportMeta);
-              if (html) l.setPopupContent(html);
-            } catch (_) {
-              // keep fallback popup
-            }
-          }
-        });
-        (isUK ? layers.airports_uk : layers.airports_global).addLayer(l);
+        l.on("popupopen", () => l.setPopupContent(airportIntelPopupHtml(l._airportMeta)));
+        if (isUK) layers.airports_uk.addLayer(l);
+        else if (!tiles) layers.airports_global.addLayer(l);
       }
     });
     OVERLAY_LOAD_STATE.airportsLoaded = true;
@@ -8819,16 +9131,24 @@ async function ensureAirportsLoaded() {
 async function ensureSeaportsLoaded() {
   if (OVERLAY_LOAD_STATE.seaportsLoaded) return true;
   if (OVERLAY_LOAD_STATE.seaportsLoading) return OVERLAY_LOAD_STATE.seaportsLoading;
-  OVERLAY_LOAD_STATE.seaportsLoading = fetch("data/sea_ports_simple.geojson")
-    .then((r) => r.json())
-    .then((data) => {
-      L.geoJSON(data, {
-        pointToLayer: (_, ll) => L.circleMarker(ll, {
-          radius: 5, color: "#2dd4bf", fillColor: "#2dd4bf", fillOpacity: 0.85, weight: 1.5
-        }),
-        onEachFeature: (f, l) =>
-          l.bindPopup(`<strong>${f.properties?.name || "Seaport"}</strong><br><span class="popup-label">Seaport</span>`)
-      }).addTo(layers.seaports);
+  const style = { radius: 5, color: "#2dd4bf", fillColor: "#2dd4bf", fillOpacity: 0.85, weight: 1.5 };
+  const popup = (props) => `<strong>${escapeHtml(props?.name || "Seaport")}</strong><br><span class="popup-label">Seaport</span>`;
+  OVERLAY_LOAD_STATE.seaportsLoading = vectorTilesAvailable("sea_ports")
+    .then((tiles) => {
+      if (!tiles) return false;
+      createVectorTileLayer("sea_ports", { ...style, fill: true }, { popup }).addTo(layers.seaports);
+      return true;
+    })
+    .then((tiled) => tiled || fetch("data/sea_ports_simple.geojson")
+      .then((r) => r.json())
+      .then((data) => {
+        L.geoJSON(data, {
+          pointToLayer: (_, ll) => L.circleMarker(ll, style),
+          onEachFeature: (f, l) => l.bindPopup(popup(f.properties))
+        }).addTo(layers.seaports);
+        return true;
+      }))
+    .then(() => {
       OVERLAY_LOAD_STATE.seaportsLoaded = true;
       return true;
     })
@@ -8860,6 +9180,15 @@ const SERVICE_STATION_FILTERS = {
   general: true
 };
 const SERVICE_STATION_MARKERS = []; // { marker, kind }
+// Same palette as the .service-station-* marker classes, for tile styles.
+const SERVICE_STATION_KIND_COLORS = {
+  fuel: "#f97316",
+  charging: "#10b981",
+  vehicle: "#3b82f6",
+  truck: "#8b5cf6",
+  general: "#334155"
+};
+let SERVICE_STATION_TILES = null;
 
 function serviceStationIcon(kind = "general") {
   const symbol = kind === "fuel" ? "F" :
@@ -8893,6 +9222,11 @@ function buildServiceStationPopupHtml(feature = {}) {
 }
 
 function applyServiceStationFilters() {
+  if (SERVICE_STATION_TILES) {
+    // Tile styles read SERVICE_STATION_FILTERS when tiles are drawn.
+    SERVICE_STATION_TILES.redraw();
+    return;
+  }
   if (!SERVICE_STATION_MARKERS.length) return;
   let visible = 0;
   for (const row of SERVICE_STATION_MARKERS) {
@@ -8933,33 +9267,51 @@ async function ensureServiceStationsLoaded() {
   if (OVERLAY_LOAD_STATE.serviceStationsLoaded) return true;
   if (OVERLAY_LOAD_STATE.serviceStationsLoading) return OVERLAY_LOAD_STATE.serviceStationsLoading;
 
-  OVERLAY_LOAD_STATE.serviceStationsLoading = fetch("data/geojson/service_stations.geojson")
-    .then((r) => r.json())
-    .then((data) => {
-      const features = Array.isArray(data?.features) ? data.features : [];
-
-      if (!features.length) {
-        setStatus("No service station features found.");
-        return false;
-      }
-
-      features.forEach((f) => {
-        const coords = f?.geometry?.coordinates;
-        if (!Array.isArray(coords) || coords.length < 2) return;
-        const lon = Number(coords[0]);
-        const lat = Number(coords[1]);
-        if (!Number.isFinite(lat) || !Number.isFinite(lon)) return;
-        const kind = getServiceStationKind(f);
-        const marker = L.marker([lat, lon], { icon: serviceStationIcon(kind) });
-        marker.bindPopup(buildServiceStationPopupHtml(f));
-        layers.service_stations.addLayer(marker);
-        SERVICE_STATION_MARKERS.push({ marker, kind });
-      });
+  OVERLAY_LOAD_STATE.serviceStationsLoading = vectorTilesAvailable("service_stations")
+    .then((tiles) => {
+      if (!tiles) return false;
+      SERVICE_STATION_TILES = createVectorTileLayer(
+        "service_stations",
+        (props) => {
+          const kind = getServiceStationKind({ properties: props });
+          if (!SERVICE_STATION_FILTERS[kind]) return [];
+          const color = SERVICE_STATION_KIND_COLORS[kind];
+          return { radius: 5, color, weight: 1.5, fill: true, fillColor: color, fillOpacity: 0.85 };
+        },
+        { popup: (props) => buildServiceStationPopupHtml({ properties: props }) }
+      );
+      layers.service_stations.addLayer(SERVICE_STATION_TILES);
       OVERLAY_LOAD_STATE.serviceStationsLoaded = true;
-      applyServiceStationFilters();
-      setStatus(`Service stations loaded (${features.length}).`);
+      setStatus("Service stations loaded as vector tiles (zoom 8+).");
       return true;
     })
+    .then((tiled) => tiled || fetch("data/geojson/service_stations.geojson")
+      .then((r) => r.json())
+      .then((data) => {
+        const features = Array.isArray(data?.features) ? data.features : [];
+
+        if (!features.length) {
+          setStatus("No service station features found.");
+          return false;
+        }
+
+        features.forEach((f) => {
+          const coords = f?.geometry?.coordinates;
+          if (!Array.isArray(coords) || coords.length < 2) return;
+          const lon = Number(coords[0]);
+          const lat = Number(coords[1]);
+          if (!Number.isFinite(lat) || !Number.isFinite(lon)) return;
+          const kind = getServiceStationKind(f);
+          const marker = L.marker([lat, lon], { icon: serviceStationIcon(kind) });
+          marker.bindPopup(buildServiceStationPopupHtml(f));
+          layers.service_stations.addLayer(marker);
+          SERVICE_STATION_MARKERS.push({ marker, kind });
+        });
+        OVERLAY_LOAD_STATE.serviceStationsLoaded = true;
+        applyServiceStationFilters();
+        setStatus(`Service stations loaded (${features.length}).`);
+        return true;
+      }))
     .catch((e) => {
       console.warn("Service stations:", e);
       return false;
@@ -928,31 +928,6 @@ async function runStationSearch() {
   }
 }
 
-function approxDistanceKm(a, b) {
-  const r = 6371;
-  const dLat = (b.lat - a.lat) * (Math.PI / 180);
-  const dLon = (b.lon - a.lon) * (Math.PI / 180);
-  const lat1 = a.lat * (Math.PI / 180);
-  const lat2 = b.lat * (Math.PI / 180);
-  const x = Math.sin(dLat / 2) ** 2 + Math.sin(dLon / 2) ** 2 * Math.cos(lat1) * Math.cos(lat2);
-  return 2 * r * Math.asin(Math.sqrt(x));
-}
-
-function findNearestStationToMapCenter() {
-  const center = map.getCenter();
-  const c = { lat: center.lat, lon: center.lng };
-  let best = null;
-  let bestDist = Infinity;
-  for (const station of NR.stationByCrs.values()) {
-    const d = approxDistanceKm(c, station);
-    if (d < bestDist) {
-      best = station;
-      bestDist = d;
-    }
-  }
-  return best;
-}
-
 async function runStationNearby() {
   const panel = getNrResultsPanel();
   if (panel) panel.innerHTML = '<div class="nr-empty">Finding nearby stations...</div>';
@@ -962,10 +937,8 @@ async function runStationNearby() {
     const ok = await ensureNationalRailLoaded();
     if (!ok) throw new Error("Stations unavailable");
 
-    const nearest = findNearestStationToMapCenter();
-    if (!nearest) throw new Error("No nearest station");
-
-    const data = await fetchNrJson(`/nre/stations?crs=${encodeURIComponent(nearest.crs)}&limit=20`);
+    const center = map.getCenter();
+    const data = await fetchNrJson(`/nre/stations?lat=${center.lat.toFixed(6)}&lon=${center.lng.toFixed(6)}&limit=20`);
     const list = normalizeStationList(data?.stations || []);
     if (data?.base) {
       const base = normalizeStationList([data.base])[0];
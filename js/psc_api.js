@@ -139,6 +139,34 @@ function showCompanyProfilePreview(pdfBlob, fileName, companyName, companyNumber
   panel.classList.add("open");
 }
 
+// Local PSC graph lookup; null means "not available here, ask the API"
+async function getPSCForCompanyLocal(companyNumber) {
+  try {
+    const r = await fetch(apiUrl(`/local/psc/company/${encodeURIComponent(companyNumber)}`));
+    if (!r.ok) return null;
+    const data = await r.json();
+    return Array.isArray(data.items) ? data.items : null;
+  } catch {
+    return null;
+  }
+}
+
+// Transform CH / local graph PSC items to standard format
+function normalizePSCItems(items) {
+  return (items || []).map(item => ({
+    name: item.name || item.name_elements?.forename + ' ' + item.name_elements?.surname || 'Unknown',
+    kind: item.kind || '',
+    nationality: item.nationality || '',
+    country_of_residence: item.country_of_residence || '',
+    natures_of_control: item.natures_of_control || [],
+    notified_on: item.notified_on || '',
+    ceased_on: item.ceased_on || null,
+    address: item.address || {},
+    date_of_birth: item.date_of_birth || null,
+    identification: item.identification || null
+  }));
+}
+
 // Get PSC for a company via API
 async function getPSCForCompanyAPI(companyNumber) {
   if (!companyNumber) return [];
@@ -151,33 +179,25 @@ async function getPSCForCompanyAPI(companyNumber) {
   }
   
   try {
-    const response = await fetchCH(`/company/${encodeURIComponent(companyNumber)}/persons-with-significant-control`);
-
-    if (!response.ok) {
-      if (response.status === 404) {
-        console.log(`No PSC data for company ${companyNumber}`);
+    // Prefer the local PSC graph (scripts/psc_graph.py) when the dev server has one
+    let items = await getPSCForCompanyLocal(companyNumber);
+    if (!items) {
+      const response = await fetchCH(`/company/${encodeURIComponent(companyNumber)}/persons-with-significant-control`);
+
+      if (!response.ok) {
+        if (response.status === 404) {
+          console.log(`No PSC data for company ${companyNumber}`);
+          return [];
+        }
+        console.error("PSC API failed:", response.status);
         return [];
       }
-      console.error("PSC API failed:", response.status);
-      return [];
+
+      const data = await response.json();
+      items = data.items || [];
     }
     
-    const data = await response.json();
-    const items = data.items || [];
-    
-    // Transform to standard format
-    const pscs = items.map(item => ({
-      name: item.name || item.name_elements?.forename + ' ' + item.name_elements?.surname || 'Unknown',
-      kind: item.kind || '',
-      nationality: item.nationality || '',
-      country_of_residence: item.country_of_residence || '',
-      natures_of_control: item.natures_of_control || [],
-      notified_on: item.notified_on || '',
-      ceased_on: item.ceased_on || null,
-      address: item.address || {},
-      date_of_birth: item.date_of_birth || null,
-      identification: item.identification || null
-    }));
+    const pscs = normalizePSCItems(items);
     
     // Cache results
     PSC_API.cache.set(cacheKey, {
@@ -198,7 +218,10 @@ async function getPSCForCompanyAPI(companyNumber) {
   }
 }
 
-// Search for companies by officer name via API
+// Search for companies by officer name via API. Stays on the live officer
+// search: the local PSC graph (/local/psc/search) only holds persons with
+// significant control, not officers, and has no officer ids for the
+// appointments drill-down.
 async function searchCompaniesByOfficerAPI(officerName, limit = 50) {
   if (!officerName || officerName.trim().length < 3) return [];
   
@@ -598,12 +621,36 @@ async function downloadCompanyProfile(companyNumber, companyName) {
   
   setStatus(`Fetching comprehensive company data for ${companyName}...`);
   
-  // Fetch all company data in parallel
-  const [profile, pscData, filingHistory] = await Promise.all([
-    getCompanyProfile(companyNumber),
-    getPSCForCompanyAPI(companyNumber),
-    getFilingHistoryAPI(companyNumber, 20)
-  ]);
+  // One rate-limited /ch/batch call when the dev server has it, otherwise
+  // fetch all company data in parallel
+  let profile, pscData, filingHistory;
+  const batch = await fetchCHBatch(["profile", "psc", "filing_history"].map(resource => ({ company: companyNumber, resource })));
+  const batchHit = (resource) => batch && [...batch.values()].find(r => r.resource === resource);
+  const batchResult = (resource) => {
+    const hit = batchHit(resource);
+    return hit && hit.status === 200 ? hit.data : null;
+  };
+  if (batch && batchResult("profile")) {
+    profile = batchResult("profile");
+    // Deferred (429) or failed entries are fetched directly rather than
+    // printed as empty sections; a 404 just means the company has no PSCs.
+    const pscHit = batchHit("psc");
+    const filingsHit = batchHit("filing_history");
+    [pscData, filingHistory] = await Promise.all([
+      pscHit?.status === 200 ? normalizePSCItems(pscHit.data?.items)
+        : pscHit?.status === 404 ? []
+        : getPSCForCompanyAPI(companyNumber),
+      filingsHit?.status === 200
+        ? (filingsHit.data?.items || []).slice(0, 20)
+        : getFilingHistoryAPI(companyNumber, 20)
+    ]);
+  } else {
+    [profile, pscData, filingHistory] = await Promise.all([
+      getCompanyProfile(companyNumber),
+      getPSCForCompanyAPI(companyNumber),
+      getFilingHistoryAPI(companyNumber, 20)
+    ]);
+  }
   
   if (!profile) {
     alert('Could not fetch company profile');
@@ -0,0 +1,246 @@
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from psc_graph import COMPANY_NUMBER_RE, normalize_company_number
+
+
+# Companies House allows 600 requests per key in any 5 minute window.
+CH_RATE_LIMIT = 600
+CH_RATE_WINDOW = 300.0
+CH_RATE_BURST = 60
+# Upstream 429s mean another client shares the key (or the window is off):
+# stop issuing requests for this long.
+CH_RATE_PENALTY = 30.0
+
+BATCH_MAX_ITEMS = 2000
+BATCH_WORKERS = 4
+BATCH_DEFAULT_WAIT = 120.0
+BATCH_MAX_WAIT = 900.0
+
+COMPANY_RESOURCES = {
+    "profile": "/company/{n}",
+    "officers": "/company/{n}/officers?items_per_page=100",
+    "psc": "/company/{n}/persons-with-significant-control?items_per_page=100",
+    "filing_history": "/company/{n}/filing-history?items_per_page=100",
+    "charges": "/company/{n}/charges",
+    "insolvency": "/company/{n}/insolvency",
+    "registered_office": "/company/{n}/registered-office-address",
+    "uk_establishments": "/company/{n}/uk-establishments",
+}
+OFFICER_RESOURCES = {
+    "appointments": "/officers/{n}/appointments?items_per_page=100",
+}
+DEFAULT_RESOURCES = ("profile",)
+OFFICER_ID_RE = re.compile(r"^[A-Za-z0-9_-]{6,64}$")
+
+
+def parse_rate_limit(text: str) -> Tuple[int, float]:
+    # "600/300" -> (600 requests, 300 seconds); a bare number keeps the window.
+    limit, _, window = str(text or "").partition("/")
+    return max(1, int(limit)), max(1.0, float(window or CH_RATE_WINDOW))
+
+
+class TokenBucket:
+    # Refills at (limit - burst) / window, so even a full bucket spent at once
+    # followed by steady refill cannot exceed `limit` in any `window`.
+    # acquire() blocks for a token (batch work); debit() takes one without
+    # waiting and may drive the balance negative (interactive proxy misses),
+    # which pushes queued batch work back instead of failing the page.
+    def __init__(self, limit: int = CH_RATE_LIMIT, window: float = CH_RATE_WINDOW, burst: int = CH_RATE_BURST):
+        self._lock = threading.Lock()
+        self.stats = {"granted": 0, "debited": 0, "timeouts": 0, "penalties": 0}
+        self.configure(limit, window, burst)
+
+    def configure(self, limit: int, window: float, burst: Optional[int] = None):
+        with self._lock:
+            self.limit = max(1, int(limit))
+            self.window = max(1.0, float(window))
+            self.burst = max(1, min(self.limit // 2 or 1, int(burst if burst is not None else CH_RATE_BURST)))
+            self.rate = (self.limit - self.burst) / self.window if self.limit > self.burst else self.limit / self.window
+            self._tokens = float(self.burst)
+            self._stamp = time.monotonic()
+
+    def _refill(self, now: float):
+        self._tokens = min(float(self.burst), self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, timeout: Optional[float] = None, cancel: Optional[threading.Event] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + max(0.0, timeout)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.stats["granted"] += 1
+                    return True
+                delay = (1 - self._tokens) / self.rate
+                if deadline is not None and now + delay > deadline:
+                    self.stats["timeouts"] += 1
+                    return False
+            # Sleep outside the lock, in short steps so cancellation is prompt.
+            step = min(delay, 0.5)
+            if cancel is not None:
+                if cancel.wait(step):
+                    return False
+            else:
+                time.sleep(step)
+
+    def debit(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            self.stats["debited"] += 1
+
+    def penalize(self, seconds: float = CH_RATE_PENALTY):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self.stats["penalties"] += 1
+
+    def eta(self, count: int) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = count - self._tokens
+        return max(0.0, missing / self.rate)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            out = dict(self.stats)
+            out.update({"limit": self.limit, "window_s": self.window, "burst": self.burst, "tokens": round(self._tokens, 2)})
+        return out
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    subject: str
+    ident: str
+    resource: str
+    path: str
+
+    def describe(self) -> dict:
+        return {self.subject: self.ident, "resource": self.resource}
+
+
+def _item(subject: str, ident: str, resource: str) -> Optional[BatchItem]:
+    if subject == "company":
+        ident = normalize_company_number(ident)
+        template = COMPANY_RESOURCES.get(resource)
+        if not COMPANY_NUMBER_RE.match(ident) or template is None:
+            return None
+    else:
+        ident = str(ident or "").strip()
+        template = OFFICER_RESOURCES.get(resource)
+        if not OFFICER_ID_RE.match(ident) or template is None:
+            return None
+    return BatchItem(subject, ident, resource, template.format(n=ident))
+
+
+def plan_batch(body: dict) -> Tuple[List[BatchItem], int, List[dict]]:
+    # Accepts {"companies": [...], "resources": [...], "officers": [...]} for a
+    # cross product and/or explicit {"requests": [{"company"|"officer", "resource"}]}.
+    # Returns the de-duplicated items in request order, the number requested
+    # and any entries that were rejected.
+    requested: List[Tuple[str, str, str]] = []
+    resources = body.get("resources") or list(DEFAULT_RESOURCES)
+    if isinstance(resources, str):
+        resources = [r.strip() for r in resources.split(",") if r.strip()]
+    company_resources = [r for r in resources if r in COMPANY_RESOURCES]
+    for number in body.get("companies") or []:
+        requested.extend(("company", str(number), r) for r in company_resources)
+    for officer in body.get("officers") or []:
+        requested.append(("officer", str(officer), "appointments"))
+    for req in body.get("requests") or []:
+        if not isinstance(req, dict):
+            continue
+        if req.get("officer"):
+            requested.append(("officer", str(req["officer"]), str(req.get("resource") or "appointments")))
+        else:
+            requested.append(("company", str(req.get("company") or ""), str(req.get("resource") or "profile")))
+
+    items: List[BatchItem] = []
+    rejected: List[dict] = []
+    seen = set()
+    for subject, ident, resource in requested:
+        item = _item(subject, ident, resource)
+        if item is None:
+            rejected.append({subject: ident, "resource": resource})
+            continue
+        if item.path not in seen:
+            seen.add(item.path)
+            items.append(item)
+    unknown = [r for r in resources if r not in COMPANY_RESOURCES and r not in OFFICER_RESOURCES]
+    rejected.extend({"resource": r} for r in unknown)
+    return items, len(requested), rejected
+
+
+def run_batch(
+    items: List[BatchItem],
+    cached: Callable[[str], Optional[Tuple[int, object]]],
+    fetch: Callable[[str], Tuple[int, object]],
+    limiter: TokenBucket,
+    wait_s: float = BATCH_DEFAULT_WAIT,
+    workers: int = BATCH_WORKERS,
+) -> Iterator[dict]:
+    # Cache hits are answered first; misses queue on the token bucket and are
+    # fetched by a small pool, streamed back in completion order. Items that
+    # cannot get a token within wait_s come back as "deferred" so the caller
+    # can resubmit them later instead of the whole batch tripping 429s.
+    # Closing the generator (client gone) cancels everything still queued.
+    started = time.perf_counter()
+    deadline = time.monotonic() + wait_s
+    cancel = threading.Event()
+    counts = {"cache": 0, "upstream": 0, "deferred": 0, "errors": 0}
+    misses: List[BatchItem] = []
+    hits: List[Tuple[BatchItem, Tuple[int, object]]] = []
+    for item in items:
+        hit = cached(item.path)
+        if hit is None:
+            misses.append(item)
+        else:
+            hits.append((item, hit))
+
+    yield {"type": "meta", "unique": len(items), "cached": len(hits), "scheduled": len(misses), "eta_s": round(limiter.eta(len(misses)), 1)}
+    for item, (status, data) in hits:
+        counts["cache"] += 1
+        yield {"type": "result", **item.describe(), "status": status, "source": "cache", "data": data}
+
+    def one(item: BatchItem) -> dict:
+        for _ in range(2):
+            if not limiter.acquire(timeout=deadline - time.monotonic(), cancel=cancel):
+                return {"status": 429, "source": "deferred"}
+            status, data = fetch(item.path)
+            if status != 429:
+                return {"status": status, "source": "upstream", "data": data}
+            limiter.penalize()
+        return {"status": 429, "source": "deferred"}
+
+    if misses:
+        pool = ThreadPoolExecutor(max_workers=min(workers, len(misses)), thread_name_prefix="cr-ch-batch")
+        try:
+            pending = {pool.submit(one, item): item for item in misses}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        out = future.result()
+                    except Exception as e:
+                        out = {"status": 502, "source": "error", "error": str(e)}
+                    if out["source"] == "deferred":
+                        counts["deferred"] += 1
+                    elif out["source"] == "error":
+                        counts["errors"] += 1
+                    else:
+                        counts["upstream"] += 1
+                    yield {"type": "result", **item.describe(), **out}
+        finally:
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    yield {"type": "done", **counts, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
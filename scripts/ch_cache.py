@@ -0,0 +1,180 @@
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional, Tuple
+
+DEFAULT_CH_DISK_CACHE = Path("data/cache/companies_house.sqlite3")
+
+# (fresh seconds, extra stale-while-revalidate seconds) by Companies House API
+# path. Rows outlive stale_until by RETAIN_S so an expired entry can still be
+# revalidated with If-None-Match / If-Modified-Since instead of refetched.
+CH_RESOURCE_TTLS = (
+    (re.compile(r"^/company/[^/?]+/filing-history"), "filing_history", (6 * 3600, 7 * 86400)),
+    (re.compile(r"^/company/[^/?]+/officers"), "officers", (86400, 6 * 86400)),
+    (re.compile(r"^/company/[^/?]+/persons-with-significant-control"), "psc", (86400, 6 * 86400)),
+    (re.compile(r"^/company/[^/?]+/(?:charges|insolvency|registered-office-address|uk-establishments|exemptions)"), "company_detail", (86400, 6 * 86400)),
+    (re.compile(r"^/company/[^/?]+(?:\?|$)"), "profile", (86400, 6 * 86400)),
+    (re.compile(r"^/officers/[^/?]+/appointments"), "appointments", (86400, 6 * 86400)),
+    (re.compile(r"^/disqualified-officers/"), "disqualified", (86400, 6 * 86400)),
+    (re.compile(r"^/(?:advanced-search|alphabetical-search|dissolved-search|search)(?:/|\?|$)"), "search", (3600, 86400)),
+)
+DEFAULT_RESOURCE_TTL = ("other", (300, 3600))
+RETAIN_S = 30 * 86400
+PRUNE_EVERY = 256
+
+
+def ch_resource(path: str) -> Tuple[str, Tuple[int, int]]:
+    for pattern, name, ttl in CH_RESOURCE_TTLS:
+        if pattern.match(path):
+            return name, ttl
+    return DEFAULT_RESOURCE_TTL
+
+
+class CHDiskCache:
+    # Companies House responses in one SQLite file, keyed by API path (the API
+    # key is not part of the key: the data is the same for every key, and a
+    # rotated key should not throw the cache away). Bodies are zlib-compressed.
+    # One connection behind a lock; WAL keeps readers cheap while a write
+    # commits, and every statement is a primary-key lookup or upsert.
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._puts = 0
+        self.stats = {"hits": 0, "stale": 0, "expired": 0, "misses": 0, "writes": 0, "revalidated": 0, "pruned": 0, "errors": 0}
+
+    def configure(self, path: Optional[Path], max_bytes: int):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self.path = path
+            self.max_bytes = max(0, int(max_bytes))
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None and self.max_bytes > 0
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " path TEXT PRIMARY KEY, resource TEXT, status INTEGER, content_type TEXT, body BLOB,"
+                " etag TEXT, last_modified TEXT, stored REAL, expires REAL, stale_until REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_stored ON responses(stored)")
+            self._db = db
+        return self._db
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, path: str) -> Optional[dict]:
+        # Returns the entry with a "state" of HIT, STALE (inside the
+        # stale-while-revalidate window) or EXPIRED (only good as validators).
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                row = self._conn().execute(
+                    "SELECT status, content_type, body, etag, last_modified, stored, expires, stale_until FROM responses WHERE path = ?",
+                    (path,),
+                ).fetchone()
+        except sqlite3.Error:
+            self._count("errors")
+            return None
+        if row is None:
+            self._count("misses")
+            return None
+        try:
+            body = zlib.decompress(row[2])
+        except zlib.error:
+            # A damaged row reads as a miss; the next 200 overwrites it.
+            self._count("errors")
+            return None
+        now = time.time()
+        state = "HIT" if now < row[6] else "STALE" if now < row[7] else "EXPIRED"
+        self._count({"HIT": "hits", "STALE": "stale", "EXPIRED": "expired"}[state])
+        return {
+            "status": row[0],
+            "type": row[1],
+            "body": body,
+            "etag": row[3],
+            "last_modified": row[4],
+            "stored": row[5],
+            "expires": row[6],
+            "stale_until": row[7],
+            "state": state,
+        }
+
+    def put(self, path: str, status: int, content_type: str, body: bytes, etag: str = "", last_modified: str = ""):
+        if not self.enabled:
+            return
+        resource, (fresh_s, stale_s) = ch_resource(path)
+        now = time.time()
+        packed = zlib.compress(body, 6)
+        if len(packed) > self.max_bytes // 16:
+            return
+        try:
+            with self._lock:
+                self._conn().execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, resource, status, content_type, packed, etag or "", last_modified or "", now, now + fresh_s, now + fresh_s + stale_s),
+                )
+                self.stats["writes"] += 1
+                self._puts += 1
+                if self._puts % PRUNE_EVERY == 0:
+                    self._prune(now)
+        except sqlite3.Error:
+            self._count("errors")
+
+    def revalidated(self, path: str) -> Optional[dict]:
+        # Upstream answered 304: the stored body is current again.
+        if not self.enabled:
+            return None
+        _, (fresh_s, stale_s) = ch_resource(path)
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn().execute(
+                    "UPDATE responses SET stored = ?, expires = ?, stale_until = ? WHERE path = ?",
+                    (now, now + fresh_s, now + fresh_s + stale_s, path),
+                )
+                self.stats["revalidated"] += 1
+        except sqlite3.Error:
+            self._count("errors")
+        return self.get(path)
+
+    def _prune(self, now: float):
+        db = self._conn()
+        dropped = db.execute("DELETE FROM responses WHERE stale_until < ?", (now - RETAIN_S,)).rowcount
+        total = db.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()[0]
+        # Over budget: drop least recently stored rows, a batch at a time.
+        while total > self.max_bytes:
+            rows = db.execute("SELECT path, LENGTH(body) FROM responses ORDER BY stored LIMIT 256").fetchall()
+            if not rows:
+                break
+            db.executemany("DELETE FROM responses WHERE path = ?", [(r[0],) for r in rows])
+            total -= sum(r[1] for r in rows)
+            dropped += len(rows)
+        self.stats["pruned"] += dropped
+
+    def snapshot(self) -> dict:
+        out = dict(self.stats)
+        out.update({"path": str(self.path) if self.path else None, "max_bytes": self.max_bytes})
+        if self.enabled:
+            try:
+                with self._lock:
+                    out["entries"] = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return out
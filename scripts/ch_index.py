@@ -0,0 +1,677 @@
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ch_store import ColumnStore, ColumnStoreWriter, iter_company_rows, shard_sources
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SHARD_INDEX = Path("data/companies_house_index.json")
+DEFAULT_INDEX_DIR = Path("data/ch_index")
+INDEX_FORMAT = 3
+
+# Too common to narrow anything down; kept out of the postings and only used
+# when scoring whole-name matches.
+NAME_STOPWORDS = frozenset({"LIMITED", "LTD", "PLC", "LLP", "THE", "AND", "OF", "CO", "COMPANY", "UK"})
+
+TERM_ENTRY = struct.Struct("<QIQI")  # term offset, term length, postings offset, postings count
+RUN_FLUSH_IDS = 8_000_000
+PREFIX_TERM_LIMIT = 64
+# Prefix expansion looks at no more than this many matching terms, so a one-
+# or two-letter prefix stays cheap; the result is then flagged as truncated.
+PREFIX_SCAN_LIMIT = 4096
+SCORE_CANDIDATE_LIMIT = 20_000
+FUZZY_THRESHOLD = 0.35
+FUZZY_TOKEN_LIMIT = 12
+FUZZY_CANDIDATE_LIMIT = 50_000
+FUZZY_RERANK_LIMIT = 400
+POSTCODE_RE = re.compile(r"^[A-Z]{1,2}[0-9][A-Z0-9]?[0-9][A-Z]{2}$")
+
+
+# --- normalisation --------------------------------------------------------
+
+def name_tokens(name: str) -> List[str]:
+    cleaned = re.sub(r"['’]", "", str(name or "").upper())
+    return re.findall(r"[A-Z0-9]+", cleaned)
+
+
+def trigrams(token: str) -> set:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def content_tokens(name: str) -> List[str]:
+    tokens = name_tokens(name)
+    return [t for t in tokens if t not in NAME_STOPWORDS] or tokens
+
+
+def jaccard(a: set, b: set) -> float:
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+def name_similarity(query_grams: List[set], name: str) -> float:
+    # Mean best per-token trigram similarity, docked a little for extra words
+    # in the candidate so "BARCLAYS" outranks "BARCLAYS PROPERTY HOLDINGS".
+    record_grams = [trigrams(t) for t in content_tokens(name)]
+    if not query_grams or not record_grams:
+        return 0.0
+    total, used = 0.0, set()
+    for grams in query_grams:
+        best, best_i = 0.0, -1
+        for i, other in enumerate(record_grams):
+            sim = jaccard(grams, other)
+            if sim > best:
+                best, best_i = sim, i
+        total += best
+        if best_i >= 0:
+            used.add(best_i)
+    return total / len(query_grams) * (0.85 + 0.15 * len(used) / len(record_grams))
+
+
+def normalize_number(number: str) -> str:
+    value = re.sub(r"\s+", "", str(number or "")).upper()
+    return value.zfill(8) if value.isdigit() else value
+
+
+def normalize_postcode(postcode: str) -> str:
+    return re.sub(r"[^A-Z0-9]", "", str(postcode or "").upper())
+
+
+def outward_code(postcode: str) -> str:
+    pc = normalize_postcode(postcode)
+    return pc[:-3] if POSTCODE_RE.match(pc) else ""
+
+
+def normalize_town(town: str) -> str:
+    return " ".join(re.findall(r"[A-Z0-9]+", str(town or "").upper()))
+
+
+def record_terms(record: dict) -> Iterator[str]:
+    for token in set(name_tokens(record["CompanyName"])):
+        if token not in NAME_STOPWORDS:
+            yield "n:" + token
+    number = normalize_number(record["CompanyNumber"])
+    if number:
+        yield "u:" + number
+    pc = normalize_postcode(record["RegAddress.PostCode"])
+    if pc:
+        yield "p:" + pc
+        outward = outward_code(pc)
+        if outward:
+            yield "o:" + outward
+    town = normalize_town(record["RegAddress.PostTown"])
+    if town:
+        yield "t:" + town
+
+
+# --- builder ---------------------------------------------------------------
+
+def _write_run(postings: Dict[str, array], tmp_dir: Path, run_no: int) -> Path:
+    path = tmp_dir / f"run-{run_no:04d}.txt"
+    with path.open("w", encoding="utf-8") as f:
+        for term in sorted(postings):
+            f.write(term)
+            f.write("\t")
+            f.write(",".join(map(str, postings[term])))
+            f.write("\n")
+    return path
+
+
+def _read_run(path: Path) -> Iterator[Tuple[str, str]]:
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            term, _, ids = line.rstrip("\n").partition("\t")
+            yield term, ids
+
+
+def _previous_rows(out_dir: Path) -> Tuple[Optional[ColumnStore], Dict[str, Tuple[int, int, int, int]]]:
+    # Maps each source file of the current generation to (size, mtime_ns,
+    # first row, rows) so an unchanged shard can be copied from the old
+    # memory-mapped store instead of being parsed again.
+    try:
+        with (out_dir / "manifest.json").open("r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != INDEX_FORMAT:
+            return None, {}
+        store = ColumnStore(out_dir / manifest["generation"] / "store")
+    except (OSError, ValueError, KeyError):
+        return None, {}
+    ranges = {}
+    row = 0
+    for source in manifest.get("sources") or []:
+        ranges[source["file"]] = (source["size"], source["mtime_ns"], row, source["rows"])
+        row += source["rows"]
+    return store, ranges
+
+
+def build_index(sources: Iterable[Path], out_dir: Path, keep_old: int = 1, reuse: bool = True, log=print) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    previous, previous_ranges = _previous_rows(out_dir) if reuse else (None, {})
+    generation = "gen-" + time.strftime("%Y%m%dT%H%M%S")
+    gen_dir = out_dir / generation
+    suffix = 1
+    while gen_dir.exists():
+        suffix += 1
+        gen_dir = out_dir / f"{generation}-{suffix}"
+    gen_dir.mkdir()
+    tmp_dir = Path(tempfile.mkdtemp(prefix="ch-index-", dir=out_dir))
+
+    source_meta = []
+    runs: List[Path] = []
+    postings: Dict[str, array] = {}
+    pending = 0
+    row = 0
+    store = ColumnStoreWriter(gen_dir / "store")
+    try:
+        for path in sources:
+            if not path.is_file():
+                log(f"skip {path}: not found")
+                continue
+            stat = path.stat()
+            start_row = row
+            reused = previous_ranges.get(str(path))
+            if reused and reused[:2] == (stat.st_size, stat.st_mtime_ns):
+                records = (previous.row(r) for r in range(reused[2], reused[2] + reused[3]))
+            else:
+                reused = None
+                records = iter_company_rows(path)
+            for record in records:
+                store.append(record)
+                for term in record_terms(record):
+                    ids = postings.get(term)
+                    if ids is None:
+                        ids = postings[term] = array("I")
+                    ids.append(row)
+                    pending += 1
+                row += 1
+                if pending >= RUN_FLUSH_IDS:
+                    runs.append(_write_run(postings, tmp_dir, len(runs)))
+                    postings, pending = {}, 0
+            source_meta.append({
+                "file": str(path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "rows": row - start_row,
+            })
+            log(f"{'reused' if reused else 'indexed'} {path.name}: {row - start_row:,} rows ({row:,} total)")
+        if postings:
+            runs.append(_write_run(postings, tmp_dir, len(runs)))
+            postings = {}
+        store.close({"sources": source_meta})
+
+        # Row ids grow with run number and heapq.merge is stable, so joining
+        # each term's id lists in merge order keeps postings sorted.
+        table = TermTableWriter(gen_dir, "terms")
+        try:
+            current, ids = None, array("I")
+            for term, id_text in heapq.merge(*(_read_run(r) for r in runs), key=lambda item: item[0]):
+                if term != current:
+                    if current is not None:
+                        table.add(current, ids)
+                    current, ids = term, array("I")
+                ids.extend(int(v) for v in id_text.split(","))
+            if current is not None:
+                table.add(current, ids)
+        finally:
+            table.close()
+        terms = table.count
+        grams = _write_gram_table(gen_dir)
+    except BaseException:
+        shutil.rmtree(gen_dir, ignore_errors=True)
+        raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if previous is not None:
+            previous.close()
+
+    manifest = {
+        "format": INDEX_FORMAT,
+        "generation": gen_dir.name,
+        "rows": row,
+        "terms": terms,
+        "grams": grams,
+        "built": int(time.time()),
+        "sources": source_meta,
+    }
+    with (gen_dir / "meta.json").open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    write_manifest(out_dir, manifest)
+    prune_generations(out_dir, keep_old)
+    log(f"built {gen_dir.name}: {row:,} rows, {terms:,} terms, {grams:,} name trigrams")
+    return gen_dir
+
+
+class TermTableWriter:
+    # Terms must be added in sorted (UTF-8 byte) order.
+    def __init__(self, directory: Path, stem: str):
+        self._dat = (directory / f"{stem}.dat").open("wb")
+        self._idx = (directory / f"{stem}.idx").open("wb")
+        self._post = (directory / f"{stem}.post").open("wb")
+        self.count = 0
+
+    def add(self, term: str, ids: array):
+        encoded = term.encode("utf-8")
+        self._idx.write(TERM_ENTRY.pack(self._dat.tell(), len(encoded), self._post.tell(), len(ids)))
+        self._dat.write(encoded)
+        if sys.byteorder != "little":
+            ids = array("I", ids)
+            ids.byteswap()
+        ids.tofile(self._post)
+        self.count += 1
+
+    def close(self):
+        for f in (self._dat, self._idx, self._post):
+            f.close()
+
+
+def _write_gram_table(gen_dir: Path) -> int:
+    # Trigrams are taken over the distinct name tokens rather than over every
+    # company, which keeps the table small; postings hold ordinals into the
+    # terms table, and the token's own postings lead on to companies.
+    terms = TermTable(gen_dir, "terms")
+    grams: Dict[str, array] = {}
+    try:
+        lo, hi = terms.lower_bound(b"n:"), terms.lower_bound(b"n;")
+        for ordinal in range(lo, hi):
+            for gram in trigrams(terms.term(ordinal)[2:]):
+                ids = grams.get(gram)
+                if ids is None:
+                    ids = grams[gram] = array("I")
+                ids.append(ordinal)
+    finally:
+        terms.close()
+    table = TermTableWriter(gen_dir, "grams")
+    try:
+        for gram in sorted(grams):
+            table.add(gram, grams[gram])
+    finally:
+        table.close()
+    return table.count
+
+
+def write_manifest(out_dir: Path, manifest: dict):
+    tmp = out_dir / f"manifest.json.{os.getpid()}.tmp"
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, out_dir / "manifest.json")
+
+
+def prune_generations(out_dir: Path, keep_old: int):
+    try:
+        with (out_dir / "manifest.json").open("r", encoding="utf-8") as f:
+            current = json.load(f).get("generation")
+    except (OSError, ValueError):
+        return
+    gens = sorted(p for p in out_dir.iterdir() if p.is_dir() and p.name.startswith("gen-") and p.name != current)
+    # Readers that opened an older generation keep their mmaps; on POSIX the
+    # files stay readable after unlinking, so pruning never breaks a query.
+    for old in gens[: max(0, len(gens) - max(0, keep_old))]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+# --- reader ------------------------------------------------------------------
+
+def _intersect(base: List[int], other) -> List[int]:
+    out = []
+    lo, hi = 0, len(other)
+    for value in base:
+        lo = bisect_left(other, value, lo, hi)
+        if lo >= hi:
+            break
+        if other[lo] == value:
+            out.append(value)
+    return out
+
+
+class TermTable:
+    def __init__(self, directory: Path, stem: str):
+        self._files = []
+        self._maps = []
+        self._terms = self._map(directory / f"{stem}.dat")
+        self._index = self._map(directory / f"{stem}.idx")
+        self._postings = self._map(directory / f"{stem}.post")
+        self.count = len(self._index) // TERM_ENTRY.size
+
+    def _map(self, path: Path):
+        f = path.open("rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def close(self):
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                pass
+        for f in self._files:
+            f.close()
+
+    def entry(self, i: int) -> Tuple[bytes, int, int]:
+        term_off, term_len, post_off, count = TERM_ENTRY.unpack_from(self._index, i * TERM_ENTRY.size)
+        return self._terms[term_off:term_off + term_len], post_off, count
+
+    def term(self, i: int) -> str:
+        return self.entry(i)[0].decode("utf-8")
+
+    def lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def postings_at(self, post_off: int, count: int):
+        view = memoryview(self._postings)[post_off:post_off + count * 4]
+        if sys.byteorder == "little":
+            return view.cast("I")
+        ids = array("I", view.tobytes())
+        ids.byteswap()
+        return ids
+
+    def ordinal_postings(self, i: int):
+        _, post_off, count = self.entry(i)
+        return self.postings_at(post_off, count)
+
+    def postings(self, term: str):
+        key = term.encode("utf-8")
+        i = self.lower_bound(key)
+        if i < self.count:
+            found, post_off, count = self.entry(i)
+            if found == key:
+                return self.postings_at(post_off, count)
+        return []
+
+    def prefix_terms(self, prefix: str, limit: int = PREFIX_TERM_LIMIT) -> Tuple[List[Tuple[str, int, int]], bool]:
+        # The `limit` terms under the prefix with the longest postings, so
+        # "ba" reaches BANK rather than BAA, BAAB, ...; the flag is False when
+        # other matching terms were left out.
+        key = prefix.encode("utf-8")
+        out = []
+        complete = True
+        i = self.lower_bound(key)
+        while i < self.count:
+            term, post_off, count = self.entry(i)
+            if not term.startswith(key):
+                break
+            if len(out) >= PREFIX_SCAN_LIMIT:
+                complete = False
+                break
+            out.append((term.decode("utf-8"), post_off, count))
+            i += 1
+        if len(out) > limit:
+            complete = False
+            out = heapq.nlargest(limit, out, key=lambda item: item[2])
+        return out, complete
+
+    def prefix_postings(self, prefix: str, limit: int = PREFIX_TERM_LIMIT) -> Tuple[List[int], bool]:
+        terms, complete = self.prefix_terms(prefix, limit)
+        lists = [self.postings_at(off, count) for _, off, count in terms]
+        if len(lists) == 1:
+            return list(lists[0]), complete
+        return sorted(set().union(*lists)), complete
+
+
+class CompanyIndex:
+    def __init__(self, gen_dir: Path, manifest: dict):
+        self.path = gen_dir
+        self.manifest = manifest
+        self.rows = int(manifest.get("rows") or 0)
+        self.store = ColumnStore(gen_dir / "store")
+        self.terms = TermTable(gen_dir, "terms")
+        self.grams = TermTable(gen_dir, "grams")
+
+    def close(self):
+        self.store.close()
+        self.terms.close()
+        self.grams.close()
+
+    def record(self, row: int) -> dict:
+        return self.store.row(row)
+
+    def by_number(self, number: str) -> Optional[dict]:
+        rows = self.terms.postings("u:" + normalize_number(number))
+        return self.store.row(rows[0]) if len(rows) else None
+
+    def search(
+        self,
+        name: str = "",
+        number: str = "",
+        postcode: str = "",
+        town: str = "",
+        status: str = "",
+        limit: int = 50,
+    ) -> dict:
+        lists = []
+        exact_tokens = []
+        prefix_truncated = False
+        tokens = name_tokens(name)
+        query_tokens = [t for t in tokens if t not in NAME_STOPWORDS] or tokens
+        for i, token in enumerate(query_tokens):
+            ids = self.terms.postings("n:" + token)
+            # The last token is still being typed; widen it to a prefix.
+            if i == len(query_tokens) - 1 and not name.endswith(" ") and len(token) >= 2:
+                widened, complete = self.terms.prefix_postings("n:" + token)
+                ids = widened or ids
+                prefix_truncated = prefix_truncated or not complete
+            else:
+                exact_tokens.append(token)
+            lists.append(ids)
+        if number:
+            lists.append(self.terms.postings("u:" + normalize_number(number)))
+        if postcode:
+            pc = normalize_postcode(postcode)
+            if POSTCODE_RE.match(pc):
+                lists.append(self.terms.postings("p:" + pc))
+            else:
+                ids = self.terms.postings("o:" + pc)
+                if not len(ids):
+                    ids, complete = self.terms.prefix_postings("p:" + pc)
+                    prefix_truncated = prefix_truncated or not complete
+                lists.append(ids)
+        if town:
+            lists.append(self.terms.postings("t:" + normalize_town(town)))
+        if not lists:
+            return {"results": [], "matched": 0, "truncated": False}
+
+        lists.sort(key=len)
+        candidates = list(lists[0])
+        for other in lists[1:]:
+            if not candidates:
+                break
+            candidates = _intersect(candidates, other)
+
+        status_l = status.strip().lower()
+        if not tokens:
+            # Nothing to rank by: return rows in index order and stop early.
+            results = []
+            for row in candidates:
+                record = self.record(row)
+                if status_l and record["CompanyStatus"].lower() != status_l:
+                    continue
+                results.append(record)
+                if len(results) >= limit:
+                    break
+            return {
+                "results": results,
+                "matched": len(candidates) if not status_l else len(results),
+                "truncated": (bool(status_l) and len(results) >= limit) or prefix_truncated,
+            }
+
+        name_norm = " ".join(tokens)
+        scored = []
+        truncated = len(candidates) > SCORE_CANDIDATE_LIMIT or prefix_truncated
+        for row in candidates[:SCORE_CANDIDATE_LIMIT]:
+            record = self.record(row)
+            if status_l and record["CompanyStatus"].lower() != status_l:
+                continue
+            rec_tokens = name_tokens(record["CompanyName"])
+            rec_norm = " ".join(rec_tokens)
+            score = 0.0
+            if rec_norm == name_norm:
+                score += 100
+            elif rec_norm.startswith(name_norm):
+                score += 50
+            score += 10 * sum(1 for t in exact_tokens if t in rec_tokens)
+            score -= len(rec_tokens)
+            if record["CompanyStatus"].lower() == "active":
+                score += 5
+            scored.append((score, row, record))
+        scored.sort(key=lambda item: (-item[0], item[2]["CompanyName"], item[1]))
+        results = []
+        for score, _, record in scored[: max(1, limit)]:
+            record["score"] = score
+            results.append(record)
+        return {"results": results, "matched": len(scored), "truncated": truncated}
+
+    def similar_tokens(self, token: str, threshold: float = FUZZY_THRESHOLD) -> List[Tuple[float, int]]:
+        grams = trigrams(token)
+        lists = sorted((self.grams.postings(g) for g in grams), key=len)
+        # Jaccard >= t needs at least ceil(t * |grams|) shared grams, so any
+        # match must hit one of the rarest |grams| - need + 1 lists.
+        need = max(1, math.ceil(threshold * len(grams)))
+        candidates = set()
+        for ids in lists[: len(grams) - need + 1]:
+            candidates.update(ids)
+        scored = []
+        for ordinal in candidates:
+            sim = jaccard(grams, trigrams(self.terms.term(ordinal)[2:]))
+            if sim >= threshold:
+                scored.append((sim, ordinal))
+        return heapq.nlargest(FUZZY_TOKEN_LIMIT, scored)
+
+    def fuzzy(self, name: str, k: int = 20, status: str = "", threshold: float = FUZZY_THRESHOLD) -> dict:
+        tokens = content_tokens(name)
+        expansions = []
+        for token in dict.fromkeys(tokens):
+            matches = [(sim, self.terms.ordinal_postings(ordinal)) for sim, ordinal in self.similar_tokens(token, threshold)]
+            if matches:
+                expansions.append((sum(len(ids) for _, ids in matches), matches))
+        if not expansions:
+            return {"results": [], "matched": 0, "truncated": False}
+
+        # Drive from the most selective token and score every other token by
+        # membership, so a common word never materialises its whole posting.
+        expansions.sort(key=lambda item: item[0])
+        estimate: Dict[int, float] = {}
+        for sim, ids in expansions[0][1]:
+            for row in ids:
+                if sim > estimate.get(row, 0.0):
+                    estimate[row] = sim
+        truncated = len(estimate) > FUZZY_CANDIDATE_LIMIT
+        rows = sorted(estimate)[:FUZZY_CANDIDATE_LIMIT]
+        for _, matches in expansions[1:]:
+            for row in rows:
+                best = 0.0
+                for sim, ids in matches:
+                    if sim <= best:
+                        continue
+                    pos = bisect_left(ids, row)
+                    if pos < len(ids) and ids[pos] == row:
+                        best = sim
+                estimate[row] += best
+
+        query_grams = [trigrams(t) for t in tokens]
+        status_l = status.strip().lower()
+        scored = []
+        for row in heapq.nlargest(FUZZY_RERANK_LIMIT, rows, key=estimate.__getitem__):
+            record = self.record(row)
+            if status_l and record["CompanyStatus"].lower() != status_l:
+                continue
+            sim = name_similarity(query_grams, record["CompanyName"])
+            scored.append((sim, record["CompanyStatus"].lower() == "active", row, record))
+        scored.sort(key=lambda item: (-item[0], not item[1], item[3]["CompanyName"], item[2]))
+        results = []
+        for sim, _, _, record in scored[: max(1, k)]:
+            record["similarity"] = round(sim, 4)
+            results.append(record)
+        return {"results": results, "matched": len(rows), "truncated": truncated}
+
+
+# Opens the generation named by data/ch_index/manifest.json and reopens it when
+# a rebuild swaps the manifest. Queries in flight keep the old mapping, so a
+# replaced generation is only closed on a later swap, once it has been out of
+# use for RETIRED_GRACE seconds.
+class CompanyIndexCache:
+    RETIRED_GRACE = 60.0
+
+    def __init__(self, index_dir: Path = DEFAULT_INDEX_DIR):
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._current: Dict[str, Tuple[Tuple[int, int], CompanyIndex]] = {}
+        self._retired: List[Tuple[float, CompanyIndex]] = []
+
+    def _retire(self, index: CompanyIndex):
+        now = time.monotonic()
+        keep = []
+        for retired_at, old in self._retired:
+            if now - retired_at >= self.RETIRED_GRACE:
+                old.close()
+            else:
+                keep.append((retired_at, old))
+        keep.append((now, index))
+        self._retired = keep
+
+    def get(self, root: Path) -> Optional[CompanyIndex]:
+        manifest_path = root / self.index_dir / "manifest.json"
+        try:
+            stat = manifest_path.stat()
+        except OSError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = str(root)
+        current = self._current.get(key)
+        if current is not None and current[0] == version:
+            return current[1]
+        with self._lock:
+            current = self._current.get(key)
+            if current is not None and current[0] == version:
+                return current[1]
+            with manifest_path.open("r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("format") != INDEX_FORMAT:
+                raise ValueError(f"unsupported company index format {manifest.get('format')!r}")
+            index = CompanyIndex(root / self.index_dir / manifest["generation"], manifest)
+            if current is not None:
+                self._retire(current[1])
+            self._current[key] = (version, index)
+        return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the on-disk Companies House search index used by /local/companies/search.")
+    parser.add_argument("sources", nargs="*", type=Path, help="Shard JSON or BasicCompanyData CSV files (default: every shard in --shard-index)")
+    parser.add_argument("--root", type=Path, default=ROOT, help="Repository root (default: %(default)s)")
+    parser.add_argument("--shard-index", type=Path, default=DEFAULT_SHARD_INDEX, help="Shard list used when no sources are given (default: %(default)s)")
+    parser.add_argument("--out", type=Path, default=DEFAULT_INDEX_DIR, help="Index directory, relative to --root (default: %(default)s)")
+    parser.add_argument("--keep", type=int, default=1, help="Older generations to keep besides the new one (default: %(default)s)")
+    parser.add_argument("--full", action="store_true", help="Re-read every source instead of reusing rows of unchanged shards from the current generation")
+    args = parser.parse_args()
+    root = args.root.resolve()
+    sources = [p if p.is_absolute() else Path.cwd() / p for p in args.sources] or shard_sources(root, args.shard_index)
+    build_index(sources, root / args.out, keep_old=args.keep, reuse=not args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+import argparse
+import csv
+import io
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+import zipfile
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SHARD_INDEX = Path("data/companies_house_index.json")
+DEFAULT_STORE_DIR = Path("data/ch_store")
+STORE_FORMAT = 1
+
+# The seven fields js/map.js loadSubset keeps from each shard row.
+RECORD_FIELDS = (
+    "CompanyName",
+    "CompanyNumber",
+    "RegAddress.PostCode",
+    "RegAddress.PostTown",
+    "RegAddress.AddressLine1",
+    "CompanyStatus",
+    "SICCode.SicText_1",
+)
+
+# Column layout. "fixed" columns are NUL-padded ASCII of a set width, "dict"
+# columns hold integer codes into a value list kept in meta.json, and "heap"
+# columns are UTF-8 strings addressed by an offsets array.
+COLUMNS = (
+    ("CompanyName", "heap"),
+    ("CompanyNumber", "fixed"),
+    ("RegAddress.PostCode", "heap"),
+    ("RegAddress.PostTown", "dict"),
+    ("RegAddress.AddressLine1", "heap"),
+    ("CompanyStatus", "dict"),
+    ("SICCode.SicText_1", "dict"),
+)
+NUMBER_WIDTH = 8
+
+
+# --- source rows ------------------------------------------------------------
+
+def trim_record(raw: dict) -> dict:
+    out = {}
+    for field in RECORD_FIELDS:
+        value = raw.get(field)
+        if value is None:
+            value = raw.get(" " + field)
+        out[field] = str(value or "").strip()
+    return out
+
+
+def iter_raw_company_rows(path: Path) -> Iterator[dict]:
+    # Rows exactly as they appear in the source, header keys included, so
+    # they can be written back into shards unchanged.
+    suffix = path.suffix.lower()
+    if suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            for name in sorted(archive.namelist()):
+                if name.lower().endswith(".csv"):
+                    with archive.open(name) as raw_file:
+                        yield from csv.DictReader(io.TextIOWrapper(raw_file, encoding="utf-8-sig", newline=""))
+        return
+    if suffix == ".csv":
+        with path.open("r", encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f)
+        return
+    with path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    for raw in data if isinstance(data, list) else []:
+        if isinstance(raw, dict):
+            yield raw
+
+
+def iter_company_rows(path: Path) -> Iterator[dict]:
+    for raw in iter_raw_company_rows(path):
+        yield trim_record({(k or "").strip(): v for k, v in raw.items()})
+
+
+def shard_sources(root: Path, shard_index: Path) -> List[Path]:
+    with (root / shard_index).open("r", encoding="utf-8") as f:
+        entries = json.load(f)
+    return [root / entry["file"] for entry in entries if entry.get("file")]
+
+
+# --- writer ---------------------------------------------------------------
+
+def _file_name(column: str, ext: str) -> str:
+    return column.replace(".", "_") + ext
+
+
+def _tofile(values: array, f):
+    if sys.byteorder != "little" and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    values.tofile(f)
+
+
+class ColumnStoreWriter:
+    def __init__(self, out_dir: Path):
+        self.out_dir = out_dir
+        out_dir.mkdir(parents=True, exist_ok=True)
+        self.rows = 0
+        self._files = {}
+        self._offsets: Dict[str, array] = {}
+        self._codes: Dict[str, array] = {}
+        self._dicts: Dict[str, Dict[str, int]] = {}
+        for column, kind in COLUMNS:
+            if kind == "heap":
+                self._files[column] = (out_dir / _file_name(column, ".heap")).open("wb")
+                self._offsets[column] = array("Q", [0])
+            elif kind == "fixed":
+                self._files[column] = (out_dir / _file_name(column, ".fixed")).open("wb")
+            else:
+                self._codes[column] = array("I")
+                self._dicts[column] = {}
+
+    def append(self, record: dict):
+        for column, kind in COLUMNS:
+            value = record.get(column) or ""
+            if kind == "heap":
+                f = self._files[column]
+                f.write(value.encode("utf-8"))
+                self._offsets[column].append(f.tell())
+            elif kind == "fixed":
+                encoded = value.encode("ascii", "replace")[:NUMBER_WIDTH]
+                self._files[column].write(encoded.ljust(NUMBER_WIDTH, b"\0"))
+            else:
+                values = self._dicts[column]
+                code = values.get(value)
+                if code is None:
+                    code = values[value] = len(values)
+                self._codes[column].append(code)
+        self.rows += 1
+
+    def close(self, extra_meta: Optional[dict] = None) -> dict:
+        columns = {}
+        for column, kind in COLUMNS:
+            spec = {"kind": kind}
+            if kind == "heap":
+                self._files[column].close()
+                offsets = self._offsets[column]
+                # Narrow offsets to uint32 whenever the heap fits.
+                if offsets[-1] < 2 ** 32:
+                    offsets = array("I", offsets)
+                spec["offsets"] = offsets.typecode
+                with (self.out_dir / _file_name(column, ".off")).open("wb") as f:
+                    _tofile(offsets, f)
+            elif kind == "fixed":
+                self._files[column].close()
+                spec["width"] = NUMBER_WIDTH
+            else:
+                values = self._dicts[column]
+                codes = self._codes[column]
+                typecode = "B" if len(values) <= 0xFF else "H" if len(values) <= 0xFFFF else "I"
+                spec["codes"] = typecode
+                spec["values"] = sorted(values, key=values.get)
+                with (self.out_dir / _file_name(column, ".codes")).open("wb") as f:
+                    _tofile(array(typecode, codes), f)
+            columns[column] = spec
+        meta = {"format": STORE_FORMAT, "rows": self.rows, "built": int(time.time()), "columns": columns}
+        meta.update(extra_meta or {})
+        with (self.out_dir / "meta.json").open("w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=1)
+        return meta
+
+
+# --- reader ------------------------------------------------------------------
+
+def _typed_view(buf, typecode: str):
+    if not len(buf):
+        return array(typecode)
+    if sys.byteorder == "little" or typecode == "B":
+        return memoryview(buf).cast(typecode)
+    values = array(typecode, bytes(buf))
+    values.byteswap()
+    return values
+
+
+class ColumnStore:
+    def __init__(self, path: Path):
+        self.path = path
+        with (path / "meta.json").open("r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != STORE_FORMAT:
+            raise ValueError(f"unsupported company store format {self.meta.get('format')!r}")
+        self.rows = int(self.meta["rows"])
+        self._files = []
+        self._maps = []
+        self._heaps = {}
+        self._offsets = {}
+        self._fixed = {}
+        self._codes = {}
+        self._values: Dict[str, List[str]] = {}
+        self._lookup: Dict[str, Dict[str, int]] = {}
+        for column, spec in self.meta["columns"].items():
+            kind = spec["kind"]
+            if kind == "heap":
+                self._heaps[column] = self._map(_file_name(column, ".heap"))
+                self._offsets[column] = _typed_view(self._map(_file_name(column, ".off")), spec["offsets"])
+            elif kind == "fixed":
+                self._fixed[column] = (self._map(_file_name(column, ".fixed")), int(spec["width"]))
+            else:
+                self._codes[column] = _typed_view(self._map(_file_name(column, ".codes")), spec["codes"])
+                self._values[column] = list(spec["values"])
+                self._lookup[column] = {v: i for i, v in enumerate(spec["values"])}
+
+    def _map(self, name: str):
+        f = (self.path / name).open("rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def close(self):
+        self._offsets.clear()
+        self._codes.clear()
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller still holds a view; the mapping goes with it.
+                pass
+        for f in self._files:
+            f.close()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def value(self, column: str, row: int) -> str:
+        if column in self._heaps:
+            offsets = self._offsets[column]
+            return self._heaps[column][offsets[row]:offsets[row + 1]].decode("utf-8")
+        if column in self._fixed:
+            buf, width = self._fixed[column]
+            return buf[row * width:(row + 1) * width].rstrip(b"\0").decode("ascii")
+        return self._values[column][self._codes[column][row]]
+
+    def row(self, row: int) -> dict:
+        return {column: self.value(column, row) for column in RECORD_FIELDS}
+
+    def dictionary(self, column: str) -> List[str]:
+        return self._values[column]
+
+    def codes(self, column: str):
+        return self._codes[column]
+
+    def rows_where(self, column: str, value: str) -> Iterator[int]:
+        code = self._lookup[column].get(value)
+        if code is None:
+            return
+        codes = self._codes[column]
+        if isinstance(codes, memoryview) and codes.format == "B":
+            raw, needle = codes.obj, bytes([code])
+            pos = raw.find(needle)
+            while pos >= 0:
+                yield pos
+                pos = raw.find(needle, pos + 1)
+            return
+        for row, c in enumerate(codes):
+            if c == code:
+                yield row
+
+    def scan(self, columns: Iterable[str] = RECORD_FIELDS, where: Optional[Dict[str, str]] = None) -> Iterator[dict]:
+        columns = list(columns)
+        rows: Iterable[int] = range(self.rows)
+        if where:
+            # Drive the scan from one dictionary column, then check the rest.
+            (first_col, first_val), *rest = where.items()
+            rows = self.rows_where(first_col, first_val)
+            codes = [(self._codes[c], self._lookup[c].get(v, -1)) for c, v in rest]
+        else:
+            codes = []
+        for row in rows:
+            if all(col[row] == code for col, code in codes):
+                yield {column: self.value(column, row) for column in columns}
+
+
+def write_store(sources: Iterable[Path], out_dir: Path, log=print) -> dict:
+    tmp_dir = out_dir.with_name(out_dir.name + f".tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    writer = ColumnStoreWriter(tmp_dir)
+    source_meta = []
+    try:
+        for path in sources:
+            if not path.is_file():
+                log(f"skip {path}: not found")
+                continue
+            start = writer.rows
+            for record in iter_company_rows(path):
+                writer.append(record)
+            stat = path.stat()
+            source_meta.append({"file": str(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rows": writer.rows - start})
+            log(f"converted {path.name}: {writer.rows - start:,} rows ({writer.rows:,} total)")
+        meta = writer.close({"sources": source_meta})
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    old_dir = out_dir.with_name(out_dir.name + f".old-{os.getpid()}")
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert Companies House shards or BasicCompanyData CSV into a memory-mappable columnar store.")
+    parser.add_argument("sources", nargs="*", type=Path, help="Shard JSON or BasicCompanyData CSV files (default: every shard in --shard-index)")
+    parser.add_argument("--root", type=Path, default=ROOT, help="Repository root (default: %(default)s)")
+    parser.add_argument("--shard-index", type=Path, default=DEFAULT_SHARD_INDEX, help="Shard list used when no sources are given (default: %(default)s)")
+    parser.add_argument("--out", type=Path, default=DEFAULT_STORE_DIR, help="Store directory, relative to --root (default: %(default)s)")
+    args = parser.parse_args()
+    root = args.root.resolve()
+    sources = [p if p.is_absolute() else Path.cwd() / p for p in args.sources] or shard_sources(root, args.shard_index)
+    meta = write_store(sources, root / args.out)
+    sizes = sum(p.stat().st_size for p in (root / args.out).iterdir())
+    print(f"Done: {meta['rows']:,} rows, {sizes:,} bytes in {root / args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+import argparse
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ch_index import DEFAULT_INDEX_DIR, build_index
+from ch_store import DEFAULT_SHARD_INDEX, iter_raw_company_rows
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DIGESTS = Path("data/companies_house_digests.bin")
+DEFAULT_SHARD_ROWS = 100_000
+
+# Digest table: a header naming the shard files it describes, then one entry
+# per company sorted by number so it can be merge-joined against a sorted
+# snapshot without holding either side in memory.
+DIGEST_MAGIC = b"CHDIGST1"
+DIGEST_HEADER = struct.Struct("<8s32sQ")  # magic, sha256 of shard file list, entries
+DIGEST_ENTRY = struct.Struct("<8s8sI")  # company number, row digest, shard ordinal
+RUN_ENTRY = struct.Struct("<8s8sI")  # company number, row digest, snapshot ordinal
+RUN_ENTRIES = 1_000_000
+NEW_ROW = 0xFFFFFFFF
+
+
+def raw_number(raw: dict) -> str:
+    value = raw.get("CompanyNumber")
+    if value is None:
+        value = raw.get(" CompanyNumber")
+    value = re.sub(r"\s+", "", str(value or "")).upper()
+    return value.zfill(8) if value.isdigit() else value
+
+
+def row_digest(raw: dict) -> bytes:
+    # Header whitespace and value padding differ between CSV exports and the
+    # shards, so they are normalised away before hashing.
+    normal = sorted(((k or "").strip(), str(v or "").strip()) for k, v in raw.items())
+    return hashlib.blake2b(json.dumps(normal, ensure_ascii=False).encode("utf-8"), digest_size=8).digest()
+
+
+def _number_key(number: str) -> bytes:
+    return number.encode("ascii", "replace")[:8].ljust(8, b"\0")
+
+
+def _shard_list_hash(entries: List[dict]) -> bytes:
+    return hashlib.sha256(json.dumps([e.get("file") for e in entries]).encode("utf-8")).digest()
+
+
+# --- sorted runs -------------------------------------------------------------
+
+def _sorted_entries(entries: Iterable[bytes], size: int, tmp_dir: Path, prefix: str) -> Iterator[bytes]:
+    runs: List[Path] = []
+    buf: List[bytes] = []
+
+    def flush():
+        buf.sort()
+        path = tmp_dir / f"{prefix}-{len(runs):04d}.bin"
+        with path.open("wb") as f:
+            f.write(b"".join(buf))
+        runs.append(path)
+        buf.clear()
+
+    for entry in entries:
+        buf.append(entry)
+        if len(buf) >= RUN_ENTRIES:
+            flush()
+    if buf:
+        flush()
+
+    def read(path: Path) -> Iterator[bytes]:
+        with path.open("rb") as f:
+            while True:
+                chunk = f.read(size * 65536)
+                if not chunk:
+                    return
+                for i in range(0, len(chunk), size):
+                    yield chunk[i:i + size]
+
+    return heapq.merge(*(read(r) for r in runs))
+
+
+# --- digest table ------------------------------------------------------------
+
+class DigestTable:
+    def __init__(self, path: Path):
+        self._file = path.open("rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.shards_hash, self.entries = DIGEST_HEADER.unpack_from(self._map, 0)
+        if magic != DIGEST_MAGIC:
+            raise ValueError(f"{path} is not a company digest table")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __iter__(self) -> Iterator[Tuple[bytes, bytes, int]]:
+        for i in range(self.entries):
+            yield DIGEST_ENTRY.unpack_from(self._map, DIGEST_HEADER.size + i * DIGEST_ENTRY.size)
+
+
+def write_digests(entries: Iterable[Tuple[bytes, bytes, int]], path: Path, shards_hash: bytes) -> int:
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    count = 0
+    with tmp.open("wb") as f:
+        f.write(DIGEST_HEADER.pack(DIGEST_MAGIC, shards_hash, 0))
+        for number, digest, shard in entries:
+            f.write(DIGEST_ENTRY.pack(number, digest, shard))
+            count += 1
+        f.seek(0)
+        f.write(DIGEST_HEADER.pack(DIGEST_MAGIC, shards_hash, count))
+    os.replace(tmp, path)
+    return count
+
+
+def build_digests(root: Path, shards: List[dict], path: Path, log=print) -> int:
+    def entries() -> Iterator[bytes]:
+        for ordinal, shard in enumerate(shards):
+            rows = 0
+            for raw in iter_raw_company_rows(root / shard["file"]):
+                yield DIGEST_ENTRY.pack(_number_key(raw_number(raw)), row_digest(raw), ordinal)
+                rows += 1
+            log(f"digested {shard['file']}: {rows:,} rows")
+
+    with tempfile.TemporaryDirectory(prefix="ch-digest-", dir=path.parent) as tmp:
+        merged = _sorted_entries(entries(), DIGEST_ENTRY.size, Path(tmp), "digest")
+        return write_digests((DIGEST_ENTRY.unpack(e) for e in merged), path, _shard_list_hash(shards))
+
+
+def load_digests(root: Path, shards: List[dict], path: Path, log=print) -> DigestTable:
+    try:
+        table = DigestTable(path)
+        if table.shards_hash == _shard_list_hash(shards):
+            return table
+        table.close()
+        log(f"{path.name} describes a different shard list; rebuilding it")
+    except (OSError, ValueError):
+        log(f"{path.name} missing; digesting current shards once")
+    build_digests(root, shards, path, log=log)
+    return DigestTable(path)
+
+
+# --- diff --------------------------------------------------------------------
+
+class SnapshotDiff:
+    def __init__(self):
+        self.unchanged = 0
+        self.changed = 0
+        self.added = 0
+        self.removed: Dict[int, Set[str]] = {}
+        # Per snapshot row: 0 = leave alone, shard ordinal + 1 = replace in
+        # that shard, NEW_ROW = append at the tail.
+        self.targets = array("I")
+        self.merged: Optional[Path] = None
+
+    @property
+    def removed_count(self) -> int:
+        return sum(len(v) for v in self.removed.values())
+
+
+def diff_snapshot(snapshot: List[Path], old: DigestTable, tmp_dir: Path, log=print) -> SnapshotDiff:
+    diff = SnapshotDiff()
+
+    def entries() -> Iterator[bytes]:
+        ordinal = 0
+        for path in snapshot:
+            for raw in iter_raw_company_rows(path):
+                number = raw_number(raw)
+                if number:
+                    yield RUN_ENTRY.pack(_number_key(number), row_digest(raw), ordinal)
+                diff.targets.append(0)
+                ordinal += 1
+            log(f"scanned {path.name}: {ordinal:,} rows")
+
+    # Merged entries carry (number, digest, old shard or NEW_ROW, snapshot
+    # ordinal) so the next digest table can be written once shards are placed.
+    diff.merged = tmp_dir / "merged.bin"
+    old_iter = iter(old)
+    old_entry = next(old_iter, None)
+    last_number = None
+    matched = None
+
+    def drop(entry):
+        # Repeats of a number already matched are the same company, not a removal.
+        if entry[0] != matched:
+            diff.removed.setdefault(entry[2], set()).add(entry[0].rstrip(b"\0").decode("ascii"))
+
+    with diff.merged.open("wb") as out:
+        for entry in _sorted_entries(entries(), RUN_ENTRY.size, tmp_dir, "snapshot"):
+            number, digest, ordinal = RUN_ENTRY.unpack(entry)
+            if number == last_number:
+                continue  # a repeated company number keeps its first row
+            last_number = number
+            while old_entry is not None and old_entry[0] < number:
+                drop(old_entry)
+                old_entry = next(old_iter, None)
+            if old_entry is not None and old_entry[0] == number:
+                matched = number
+                shard = old_entry[2]
+                if old_entry[1] == digest:
+                    diff.unchanged += 1
+                else:
+                    diff.changed += 1
+                    diff.targets[ordinal] = shard + 1
+                old_entry = next(old_iter, None)
+            else:
+                shard = NEW_ROW
+                diff.added += 1
+                diff.targets[ordinal] = NEW_ROW
+            out.write(number + digest + struct.pack("<II", shard, ordinal))
+        while old_entry is not None:
+            drop(old_entry)
+            old_entry = next(old_iter, None)
+    return diff
+
+
+# --- shard rewrite -----------------------------------------------------------
+
+def _write_json_atomic(path: Path, data):
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _versioned_name(file: str, stamp: str) -> str:
+    path = Path(file)
+    stem = re.sub(r"\.\d{8}T\d{6}$", "", path.stem)
+    return (path.parent / f"{stem}.{stamp}{path.suffix}").as_posix()
+
+
+def apply_snapshot(
+    snapshot: List[Path],
+    root: Path,
+    shard_index: Path = DEFAULT_SHARD_INDEX,
+    digests: Path = DEFAULT_DIGESTS,
+    shard_rows: int = 0,
+    dry_run: bool = False,
+    log=print,
+) -> dict:
+    index_path = root / shard_index
+    with index_path.open("r", encoding="utf-8") as f:
+        shards: List[dict] = json.load(f)
+    shard_rows = shard_rows or max((int(s.get("rows") or 0) for s in shards), default=0) or DEFAULT_SHARD_ROWS
+    started = time.time()
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    digest_path = root / digests
+
+    old = load_digests(root, shards, digest_path, log=log)
+    with tempfile.TemporaryDirectory(prefix="ch-update-", dir=digest_path.parent) as tmp:
+        tmp_dir = Path(tmp)
+        try:
+            diff = diff_snapshot(snapshot, old, tmp_dir, log=log)
+        finally:
+            old.close()
+        summary = {
+            "unchanged": diff.unchanged,
+            "changed": diff.changed,
+            "added": diff.added,
+            "removed": diff.removed_count,
+        }
+        log(f"diff: {diff.changed:,} changed, {diff.added:,} added, {diff.removed_count:,} removed, {diff.unchanged:,} unchanged")
+        if dry_run or not (diff.changed or diff.added or diff.removed):
+            summary.update({"rewritten": [], "appended": [], "seconds": round(time.time() - started, 1)})
+            return summary
+
+        # Second pass: park replacement rows per shard and new rows for the
+        # tail in NDJSON patch files, so memory stays bounded by one shard.
+        patches: Dict[int, Path] = {}
+        new_rows = tmp_dir / "new.ndjson"
+        handles = {}
+        ordinal = 0
+        try:
+            for path in snapshot:
+                for raw in iter_raw_company_rows(path):
+                    target = diff.targets[ordinal]
+                    ordinal += 1
+                    if not target:
+                        continue
+                    if target == NEW_ROW:
+                        key, patch = -1, new_rows
+                    else:
+                        key = target - 1
+                        patch = patches.setdefault(key, tmp_dir / f"patch-{key:05d}.ndjson")
+                    handle = handles.get(key)
+                    if handle is None:
+                        handle = handles[key] = patch.open("w", encoding="utf-8")
+                    handle.write(json.dumps(raw, ensure_ascii=False) + "\n")
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        entries = [dict(s) for s in shards]
+        rewritten: List[int] = []
+        replaced_files: List[Path] = []
+        for ordinal in sorted(set(patches) | set(diff.removed)):
+            shard = entries[ordinal]
+            updates = {}
+            if ordinal in patches:
+                with patches[ordinal].open("r", encoding="utf-8") as f:
+                    for line in f:
+                        raw = json.loads(line)
+                        updates[raw_number(raw)] = raw
+            removed = diff.removed.get(ordinal, set())
+            rows = []
+            for raw in iter_raw_company_rows(root / shard["file"]):
+                number = raw_number(raw)
+                if number in removed:
+                    continue
+                rows.append(updates.pop(number, raw))
+            new_file = _versioned_name(shard["file"], stamp)
+            _write_json_atomic(root / new_file, rows)
+            replaced_files.append(root / shard["file"])
+            shard["file"], shard["rows"] = new_file, len(rows)
+            rewritten.append(ordinal)
+            log(f"rewrote {new_file}: {len(rows):,} rows")
+
+        # New companies fill the last shard up to shard_rows, then open new
+        # shards, in snapshot order.
+        appended: List[int] = []
+        tail_starts: List[int] = []  # new-row rank at which each tail shard begins
+        tail_shards: List[int] = []
+        if diff.added:
+            subsets_dir = Path(entries[-1]["file"]).parent if entries else Path("data/companies_house_subsets")
+            pending: List[dict] = []
+            if entries and int(entries[-1].get("rows") or 0) < shard_rows:
+                last = entries[-1]
+                pending = list(iter_raw_company_rows(root / last["file"]))
+                replaced_files.append(root / last["file"])
+                target_ordinal = len(entries) - 1
+            else:
+                target_ordinal = len(entries)
+                entries.append({"file": "", "rows": 0})
+            rank = 0
+
+            def flush_tail():
+                shard = entries[target_ordinal]
+                new_file = _versioned_name(shard["file"], stamp) if shard["file"] else (
+                    subsets_dir / f"companies_tail_{target_ordinal:05d}.{stamp}.json"
+                ).as_posix()
+                _write_json_atomic(root / new_file, pending)
+                shard["file"], shard["rows"] = new_file, len(pending)
+                appended.append(target_ordinal)
+                log(f"appended to {new_file}: {len(pending):,} rows")
+
+            tail_starts.append(0)
+            tail_shards.append(target_ordinal)
+            with new_rows.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if len(pending) >= shard_rows:
+                        flush_tail()
+                        target_ordinal = len(entries)
+                        entries.append({"file": "", "rows": 0})
+                        pending = []
+                        tail_starts.append(rank)
+                        tail_shards.append(target_ordinal)
+                    pending.append(json.loads(line))
+                    rank += 1
+            flush_tail()
+
+        # Row ranges stay contiguous, as js/map.js expects.
+        start = 0
+        for shard in entries:
+            shard["start"], shard["end"] = start, start + int(shard["rows"]) - 1
+            start += int(shard["rows"])
+        entries = [{"start": s["start"], "end": s["end"], "file": s["file"], "rows": s["rows"]} for s in entries]
+
+        # New digest table first, then the shard index; each swap is atomic
+        # and the digest header names the shard list it belongs to.
+        new_ordinals = array("I", (i for i, t in enumerate(diff.targets) if t == NEW_ROW))
+
+        def merged_entries() -> Iterator[Tuple[bytes, bytes, int]]:
+            with diff.merged.open("rb") as f:
+                while True:
+                    chunk = f.read(24 * 65536)
+                    if not chunk:
+                        return
+                    for i in range(0, len(chunk), 24):
+                        number, digest = chunk[i:i + 8], chunk[i + 8:i + 16]
+                        shard, ordinal = struct.unpack_from("<II", chunk, i + 16)
+                        if shard == NEW_ROW:
+                            rank = bisect_left(new_ordinals, ordinal)
+                            shard = tail_shards[bisect_right(tail_starts, rank) - 1]
+                        yield number, digest, shard
+
+        write_digests(merged_entries(), digest_path, _shard_list_hash(entries))
+        _write_json_atomic(index_path, entries)
+        live = {(root / s["file"]).resolve() for s in entries}
+        for path in replaced_files:
+            if path.resolve() not in live:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    summary.update({
+        "rewritten": [entries[i]["file"] for i in rewritten],
+        "appended": [entries[i]["file"] for i in sorted(set(appended))],
+        "shards": len(entries),
+        "seconds": round(time.time() - started, 1),
+    })
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply a new Companies House snapshot to the local shards, rewriting only shards whose companies changed.")
+    parser.add_argument("snapshot", nargs="+", type=Path, help="BasicCompanyData CSV, its zip, or the part files of a split snapshot")
+    parser.add_argument("--root", type=Path, default=ROOT, help="Repository root (default: %(default)s)")
+    parser.add_argument("--shard-index", type=Path, default=DEFAULT_SHARD_INDEX, help="Shard list to update (default: %(default)s)")
+    parser.add_argument("--digests", type=Path, default=DEFAULT_DIGESTS, help="Per-company digest table, relative to --root (default: %(default)s)")
+    parser.add_argument("--shard-rows", type=int, default=0, help="Rows per shard for new companies (default: the largest existing shard)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the diff without writing anything")
+    parser.add_argument("--no-reindex", action="store_true", help="Skip refreshing data/ch_index after the shards change")
+    args = parser.parse_args()
+    root = args.root.resolve()
+    snapshot = [p if p.is_absolute() else Path.cwd() / p for p in args.snapshot]
+    summary = apply_snapshot(snapshot, root, args.shard_index, args.digests, args.shard_rows, args.dry_run)
+    print(json.dumps(summary, indent=2))
+    if args.dry_run or args.no_reindex or not (summary["rewritten"] or summary["appended"]):
+        return
+    # Shards that were not rewritten keep their size and mtime, so the index
+    # build copies their rows from the current generation's store.
+    with (root / args.shard_index).open("r", encoding="utf-8") as f:
+        sources = [root / e["file"] for e in json.load(f) if e.get("file")]
+    build_index(sources, root / DEFAULT_INDEX_DIR)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,51 @@
 import argparse
+import asyncio
 import base64
 import gzip
+import hashlib
+import http.client
+import io
 import json
+import math
 import os
 import re
+import select
+import socket
+import ssl
 import sys
 import threading
 import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 import urllib.error
 import urllib.request
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Tuple, Any, List
-from urllib.parse import urlsplit, parse_qs, urlencode, quote_plus, quote
+from typing import Optional, Dict, Tuple, Any, Iterable, List
+from urllib.parse import urlsplit, urljoin, parse_qs, urlencode, quote_plus, quote, unquote
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from ch_batch import BATCH_DEFAULT_WAIT, BATCH_MAX_ITEMS, BATCH_MAX_WAIT, OFFICER_ID_RE, TokenBucket, parse_rate_limit, plan_batch, run_batch
+from ch_cache import DEFAULT_CH_DISK_CACHE, CHDiskCache, ch_resource
+from ch_index import CompanyIndexCache
+from person_index import PersonIndexCache
+from onspd import ONSPDTableCache
+from postcode_bulk import BULK_MAX_POSTCODES, plan_postcodes, run_bulk
+from postcode_index import PostcodeIndexCache, format_key, postcode_key
+from graph_expand import MAX_DEPTH, MAX_FANOUT, MAX_NODES, CompaniesHouseNeighbours, ExpandLimits, LocalPSCNeighbours, combine, company_node, expand
+from psc_graph import COMPANY_NUMBER_RE, PSCGraphCache, normalize_company_number
+from search_index import PlaceIndexCache, station_index
+from spatial_index import PointGrid, valid_point
+from vector_tiles import MAX_TILE_ZOOM, TILE_LAYERS, TileCache
 
 ThreadingHTTPServer.allow_reuse_address = True
 
@@ -52,7 +83,14 @@ DEFAULT_PORT = int(os.environ.get("CR_DEV_PORT", "8000") or 8000)
 _station_catalog_cache = {
     "loaded": False,
     "items": [],
+    "by_crs": {},
+    "grid": None,
+    "search": None,
 }
+# Nearby-station defaults and caps for /nre/stations and its batch form.
+STATION_NEARBY_RADIUS_KM = 45.0
+STATION_NEARBY_MAX_RADIUS_KM = 500.0
+STATION_NEARBY_MAX_POINTS = 20000
 
 _raildata_auth_cache = {
     "token": "",
@@ -85,13 +123,944 @@ STATIC_ACCELERATED_FILES = {
     "/data/police_force_areas_wgs84.geojson": ("data/police_force_areas_wgs84.geojson", "application/geo+json"),
 }
 
-_STATIC_FILE_CACHE: Dict[str, dict] = {}
+STATIC_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/geo+json",
+    "application/javascript",
+    "application/xml",
+    "application/manifest+json",
+    "image/svg+xml",
+    "model/gltf+json",
+    "application/vnd.mapbox-vector-tile",
+)
+STATIC_COMPRESS_MIN_BYTES = 1024
+# Larger files are never compressed on the fly; ship .gz/.br siblings instead
+# (scripts/precompress_static.py) or they are streamed uncompressed.
+STATIC_STREAM_THRESHOLD = 64 * 1024 * 1024
+STATIC_CHUNK_BYTES = 1024 * 1024
+# Uncompressed bodies at least this large go out via sendfile(2) so the kernel
+# copies straight from page cache to the socket (CR_STATIC_SENDFILE=0 disables).
+STATIC_SENDFILE_ENABLED = os.environ.get("CR_STATIC_SENDFILE", "1").strip().lower() not in {"0", "false", "no", "off"}
+STATIC_SENDFILE_MIN_BYTES = 256 * 1024
+STATIC_GZIP_LEVEL = 6
+DEFAULT_STATIC_CACHE_MB = float(os.environ.get("CR_STATIC_CACHE_MB", "128") or 0)
+STATIC_BROTLI_QUALITY = 5
+
+DEFAULT_UPSTREAM_POOL_SIZE = int(os.environ.get("CR_UPSTREAM_POOL_SIZE", "8") or 8)
+DEFAULT_UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get("CR_UPSTREAM_CONNECT_TIMEOUT", "10") or 10)
+DEFAULT_UPSTREAM_READ_TIMEOUT = float(os.environ.get("CR_UPSTREAM_READ_TIMEOUT", "0") or 0)
+DEFAULT_UPSTREAM_IDLE_TIMEOUT = float(os.environ.get("CR_UPSTREAM_IDLE_TIMEOUT", "30") or 30)
+
+
+class UpstreamResponse:
+    def __init__(self, url: str, status: int, reason: str, headers, body: bytes):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._body = body
+
+    def read(self) -> bytes:
+        return self._body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+# Keep-alive connections are pooled per (scheme, host, port); at most
+# max_per_host idle sockets are retained per host, extras close on release.
+class UpstreamPool:
+    REDIRECT_CODES = {301, 302, 303, 307, 308}
+    # Only these are replayed after a reset on a reused socket; a POST
+    # (DVLA lookups, RailData token requests) may already have been acted on.
+    REPLAY_METHODS = {"GET", "HEAD"}
+
+    def __init__(
+        self,
+        max_per_host: int = DEFAULT_UPSTREAM_POOL_SIZE,
+        connect_timeout: float = DEFAULT_UPSTREAM_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_UPSTREAM_READ_TIMEOUT,
+        idle_timeout: float = DEFAULT_UPSTREAM_IDLE_TIMEOUT,
+    ):
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[str, str, int], List[Tuple[http.client.HTTPConnection, float]]] = {}
+        self._ssl_context = ssl.create_default_context()
+        self.stats = {"new": 0, "reused": 0, "retried": 0, "discarded": 0, "requests": 0, "errors": 0}
+        self.configure(max_per_host, connect_timeout, read_timeout, idle_timeout)
+
+    def configure(
+        self,
+        max_per_host: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+    ):
+        if max_per_host is not None:
+            self.max_per_host = max(0, int(max_per_host))
+        if connect_timeout is not None:
+            self.connect_timeout = max(0.5, float(connect_timeout))
+        if read_timeout is not None:
+            # 0 keeps each caller's own timeout; anything else overrides it.
+            self.read_timeout = max(0.0, float(read_timeout))
+        if idle_timeout is not None:
+            self.idle_timeout = max(1.0, float(idle_timeout))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            idle = sum(len(v) for v in self._idle.values())
+            hosts = len(self._idle)
+            out = dict(self.stats)
+        out.update(
+            {
+                "idle": idle,
+                "hosts": hosts,
+                "max_per_host": self.max_per_host,
+                "connect_timeout": self.connect_timeout,
+                "read_timeout": self.read_timeout,
+                "idle_timeout": self.idle_timeout,
+            }
+        )
+        return out
+
+    def close_all(self):
+        with self._lock:
+            pools = list(self._idle.values())
+            self._idle.clear()
+        for entries in pools:
+            for conn, _ in entries:
+                conn.close()
+
+    def _bump(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _is_stale(self, conn: http.client.HTTPConnection, last_used: float) -> bool:
+        if time.monotonic() - last_used > self.idle_timeout:
+            return True
+        sock = conn.sock
+        if sock is None:
+            return True
+        try:
+            # An idle keep-alive socket should have nothing to read; readable
+            # means the peer closed it (EOF) or sent junk we cannot use.
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def _acquire(self, key: Tuple[str, str, int]) -> Tuple[http.client.HTTPConnection, bool]:
+        while True:
+            with self._lock:
+                entries = self._idle.get(key)
+                entry = entries.pop() if entries else None
+            if entry is None:
+                break
+            conn, last_used = entry
+            if self._is_stale(conn, last_used):
+                conn.close()
+                self._bump("discarded")
+                continue
+            self._bump("reused")
+            return conn, True
+
+        scheme, host, port = key
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=self.connect_timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.connect_timeout)
+        conn.connect()
+        self._bump("new")
+        return conn, False
+
+    def _release(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection):
+        with self._lock:
+            entries = self._idle.setdefault(key, [])
+            if len(entries) < self.max_per_host:
+                entries.append((conn, time.monotonic()))
+                return
+        conn.close()
+        self._bump("discarded")
+
+    def _send_once(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes], timeout: float):
+        parts = urlsplit(url)
+        scheme = (parts.scheme or "http").lower()
+        if scheme not in {"http", "https"}:
+            raise urllib.error.URLError(f"unsupported scheme: {scheme}")
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+
+        for attempt in range(2):
+            try:
+                conn, reused = self._acquire(key)
+            except OSError as e:
+                raise urllib.error.URLError(e)
+            try:
+                conn.sock.settimeout(timeout)
+                conn.request(method, target, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                # A reused socket may have been closed by the server between
+                # our liveness check and the write. Idempotent methods get a
+                # single replay on a fresh socket; anything else surfaces the
+                # error rather than risk sending it twice.
+                if reused and attempt == 0 and method.upper() in self.REPLAY_METHODS:
+                    self._bump("retried")
+                    continue
+                raise urllib.error.URLError(e)
+            except Exception:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return resp.status, resp.reason, resp.headers, data
+        raise urllib.error.URLError("upstream connection failed")
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[bytes] = None,
+        timeout: float = 30,
+    ) -> UpstreamResponse:
+        effective_timeout = self.read_timeout or float(timeout)
+        send_headers = {"User-Agent": "ControlRoom/1.0 (+https://localhost)"}
+        for key, value in (headers or {}).items():
+            for existing in [k for k in send_headers if k.lower() == key.lower()]:
+                del send_headers[existing]
+            send_headers[key] = value
+        self._bump("requests")
+        try:
+            for _ in range(6):
+                status, reason, resp_headers, data = self._send_once(method, url, send_headers, body, effective_timeout)
+                location = resp_headers.get("Location")
+                if status in self.REDIRECT_CODES and location:
+                    url = urljoin(url, location)
+                    if status == 303 or (status in {301, 302} and method == "POST"):
+                        method, body = "GET", None
+                        for existing in [k for k in send_headers if k.lower() == "content-type"]:
+                            del send_headers[existing]
+                    continue
+                break
+        except Exception:
+            self._bump("errors")
+            raise
+        if status >= 400:
+            raise urllib.error.HTTPError(url, status, reason, resp_headers, io.BytesIO(data))
+        return UpstreamResponse(url, status, reason, resp_headers, data)
+
+    def urlopen(self, req: urllib.request.Request, timeout: float = 30) -> UpstreamResponse:
+        # Honour HTTP(S)_PROXY the same way urllib does; proxied traffic
+        # keeps the stock opener rather than a direct pooled connection.
+        host = urlsplit(req.full_url).hostname or ""
+        scheme = urlsplit(req.full_url).scheme.lower()
+        if scheme in urllib.request.getproxies() and not urllib.request.proxy_bypass(host):
+            return urllib.request.urlopen(req, timeout=timeout)
+        return self.request(req.get_method(), req.full_url, dict(req.header_items()), req.data, timeout)
+
+
+UPSTREAM_POOL = UpstreamPool()
+
+DEFAULT_ENGINE = os.environ.get("CR_DEV_ENGINE", "threading").strip().lower() or "threading"
+DEFAULT_ASYNC_WORKERS = int(os.environ.get("CR_ASYNC_WORKERS", "32") or 32)
+DEFAULT_ASYNC_SLOW_WORKERS = int(os.environ.get("CR_ASYNC_SLOW_WORKERS", "16") or 16)
+# Routes that wait on upstream APIs with 20-40 s timeouts (or stream long
+# batches). The asyncio engine runs them on their own pool so a stalled
+# upstream can only exhaust --async-slow-workers, never the threads that
+# serve local routes.
+ASYNC_SLOW_ROUTES = (
+    "/raildata/",
+    "/nre/",
+    "/api/flightradar/",
+    "/flight/",
+    "/dvla/",
+    "/osplaces/",
+    "/streetview/",
+    "/graph/",
+    "/ch/batch",
+    "/geo/postcodes/bulk",
+)
+ASYNC_KEEPALIVE_TIMEOUT = 75.0
+ASYNC_MAX_HEADER_BYTES = 64 * 1024
+
+DEFAULT_PROXY_CACHE_MB = float(os.environ.get("CR_PROXY_CACHE_MB", "64") or 0)
+DEFAULT_CH_DISK_CACHE_MB = float(os.environ.get("CR_CH_DISK_CACHE_MB", "512") or 0)
+DEFAULT_CH_RATE_LIMIT = os.environ.get("CR_CH_RATE_LIMIT", "600/300").strip() or "600/300"
+# Server-side Companies House calls (graph expansion) wait this long for a
+# rate-limit token before giving up on that call.
+CH_INTERACTIVE_WAIT = 10.0
+
+# (fresh seconds, extra stale-while-revalidate seconds) per proxied route.
+PROXY_CACHE_TTLS = {
+    "/ch/": (300, 3600),
+    "/tfl/": (20, 60),
+    "/postcodes/": (86400, 7 * 86400),
+    "/webtris/": (300, 1800),
+    "/geo/search": (86400, 7 * 86400),
+    "/osplaces/": (86400, 7 * 86400),
+}
+
+PROXY_CACHE_KEY_HEADERS = ("accept", "authorization")
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._refreshing = set()
+        self._bytes = 0
+        self.max_bytes = max(0, int(max_bytes))
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "refreshes": 0}
+
+    @staticmethod
+    def make_key(url: str, headers: Optional[Dict[str, str]] = None) -> str:
+        parts = [url]
+        for key, value in sorted((headers or {}).items(), key=lambda kv: kv[0].lower()):
+            if key.lower() in PROXY_CACHE_KEY_HEADERS:
+                parts.append(f"{key.lower()}={value}")
+        # Hash so credentials in Authorization never sit in the key in clear.
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> Tuple[Optional[dict], str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None, "MISS"
+            if now >= entry["stale_until"]:
+                self._drop(key)
+                self.stats["misses"] += 1
+                return None, "MISS"
+            self._entries.move_to_end(key)
+            if now < entry["expires"]:
+                self.stats["hits"] += 1
+                return entry, "HIT"
+            self.stats["stale"] += 1
+            return entry, "STALE"
+
+    def store(self, key: str, status: int, content_type: str, body: bytes, ttl: Tuple[int, int]):
+        size = len(body) + len(key) + len(content_type)
+        if self.max_bytes <= 0 or size > self.max_bytes // 4:
+            return
+        fresh_s, stale_s = ttl
+        now = time.time()
+        entry = {
+            "status": status,
+            "type": content_type,
+            "body": body,
+            "stored": now,
+            "expires": now + fresh_s,
+            "stale_until": now + fresh_s + stale_s,
+            "size": size,
+        }
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.stats["evictions"] += 1
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry["size"]
+
+    def begin_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.stats["refreshes"] += 1
+            return True
+
+    def end_refresh(self, key: str):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+            out.update({"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes})
+        return out
+
+
+PROXY_CACHE = ResponseCache(int(DEFAULT_PROXY_CACHE_MB * 1024 * 1024))
+
+
+# Concurrent callers asking for the same key share one in-flight fetch: the
+# first caller runs it, the rest block until it finishes and get its result
+# (or its exception).
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, dict] = {}
+        self.stats = {"leaders": 0, "shared": 0}
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                self.stats["leaders"] += 1
+            else:
+                self.stats["shared"] += 1
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = fn()
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["done"].set()
+        return call["result"]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+            out["in_flight"] = len(self._calls)
+        return out
+
+
+UPSTREAM_FLIGHTS = SingleFlight()
+
+# Shared Companies House quota: every upstream /ch/ request from either engine
+# is metered here, so /ch/batch paces itself around interactive traffic.
+CH_RATE_LIMITER = TokenBucket(*parse_rate_limit(DEFAULT_CH_RATE_LIMIT))
+
+
+def ch_metered(url: str) -> bool:
+    return url.startswith(CH_API_BASE)
+
+
+# /ch/ responses sit in two tiers: PROXY_CACHE in memory, and CH_DISK_CACHE
+# (SQLite) which survives restarts and keeps validators for conditional
+# revalidation once an entry has expired. Both engines run the same
+# plan -> upstream fetch -> complete sequence and only differ in how they fetch.
+CH_DISK_CACHE = CHDiskCache()
+
+
+def ch_cache_promote(cache_key: str, entry: dict):
+    if PROXY_CACHE.max_bytes <= 0:
+        return
+    now = time.time()
+    fresh_s = max(0.0, entry["expires"] - now)
+    stale_s = max(0.0, entry["stale_until"] - max(now, entry["expires"]))
+    PROXY_CACHE.store(cache_key, entry["status"], entry["type"], entry["body"], (fresh_s, stale_s))
+
+
+def ch_cache_plan(url: str, headers: Dict[str, str], bypass: bool = False, disk: bool = True) -> dict:
+    path = url[len(CH_API_BASE):]
+    plan = {
+        "path": path,
+        "key": ResponseCache.make_key(url, headers),
+        "ttl": ch_resource(path)[1],
+        "serve": None,
+        "state": "MISS",
+        "validators": None,
+        "headers": dict(headers),
+    }
+    if not bypass and PROXY_CACHE.max_bytes > 0:
+        entry, state = PROXY_CACHE.lookup(plan["key"])
+        if entry is not None:
+            plan.update(serve=entry, state=state)
+            return plan
+    return ch_cache_plan_disk(plan, bypass) if disk else plan
+
+
+def ch_cache_plan_disk(plan: dict, bypass: bool = False) -> dict:
+    # The SQLite half of ch_cache_plan, for a plan the memory tier missed.
+    disk = CH_DISK_CACHE.get(plan["path"])
+    if disk is None:
+        return plan
+    if not bypass and disk["state"] != "EXPIRED":
+        ch_cache_promote(plan["key"], disk)
+        plan.update(serve=disk, state="DISK" if disk["state"] == "HIT" else "STALE")
+    plan["validators"] = disk
+    if disk["etag"]:
+        plan["headers"]["If-None-Match"] = disk["etag"]
+    if disk["last_modified"]:
+        plan["headers"]["If-Modified-Since"] = disk["last_modified"]
+    return plan
+
+
+def ch_cache_complete(plan: dict, status: int, content_type: str, body: bytes, resp_headers) -> Tuple[int, str, bytes, str]:
+    validators = plan["validators"]
+    if status == 304 and validators is not None:
+        entry = CH_DISK_CACHE.revalidated(plan["path"]) or validators
+        ch_cache_promote(plan["key"], entry)
+        return entry["status"], entry["type"], entry["body"], "REVALIDATED"
+    if status == 200:
+        if PROXY_CACHE.max_bytes > 0:
+            PROXY_CACHE.store(plan["key"], status, content_type, body, plan["ttl"])
+        resp_headers = resp_headers or {}
+        CH_DISK_CACHE.put(plan["path"], status, content_type, body, resp_headers.get("ETag") or "", resp_headers.get("Last-Modified") or "")
+        return status, content_type, body, "MISS"
+    # Out of quota or upstream down: an expired copy beats an error.
+    if validators is not None and (status == 429 or status >= 500):
+        return validators["status"], validators["type"], validators["body"], "STALE-IF-ERROR"
+    return status, content_type, body, "MISS"
+
+
+# On-the-fly compressed static bodies, keyed by path+encoding and tagged with
+# the (mtime_ns, size) of the source they were built from. Builds for one key
+# are serialised, so a cold file is compressed once however many threads ask.
+class StaticFileCache:
+    ENTRY_OVERHEAD = 256
+
+    def __init__(self, max_bytes: int):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._building: Dict[str, list] = {}
+        self._bytes = 0
+        self.max_bytes = max(0, int(max_bytes))
+        self.stats = {"hits": 0, "misses": 0, "builds": 0, "waits": 0, "evictions": 0, "oversize": 0}
+
+    def _lookup(self, key: str, version: Tuple[int, int]) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["version"] != version:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def peek(self, key: str, version: Tuple[int, int]) -> Tuple[bool, Optional[bytes]]:
+        # (found, body) without building; body is None for files that did
+        # not compress.
+        with self._lock:
+            entry = self._lookup(key, version)
+            if entry is None:
+                return False, None
+            self.stats["hits"] += 1
+            return True, entry["body"]
+
+    def get_or_build(self, key: str, version: Tuple[int, int], build) -> Optional[bytes]:
+        with self._lock:
+            entry = self._lookup(key, version)
+            if entry is not None:
+                self.stats["hits"] += 1
+                return entry["body"]
+            self.stats["misses"] += 1
+            slot = self._building.get(key)
+            if slot is None:
+                slot = self._building[key] = [threading.Lock(), 0]
+            else:
+                self.stats["waits"] += 1
+            slot[1] += 1
+        try:
+            with slot[0]:
+                with self._lock:
+                    entry = self._lookup(key, version)
+                if entry is not None:
+                    return entry["body"]
+                body = build()
+                self._store(key, version, body)
+                return body
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if slot[1] == 0 and self._building.get(key) is slot:
+                    del self._building[key]
+
+    def _store(self, key: str, version: Tuple[int, int], body: Optional[bytes]):
+        size = len(body or b"") + len(key) + self.ENTRY_OVERHEAD
+        with self._lock:
+            self.stats["builds"] += 1
+            self._drop(key)
+            # Anything over half the budget would flush the rest of the cache
+            # on every build. The caller still gets the body for this request;
+            # later ones find a bodyless marker and serve the file as-is, so
+            # the file is not compressed again until it changes.
+            if size > self.max_bytes // 2:
+                self.stats["oversize"] += 1
+                body = None
+                size = len(key) + self.ENTRY_OVERHEAD
+            self._entries[key] = {"version": version, "body": body, "size": size}
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry["size"]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+            out.update({
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "building": len(self._building),
+            })
+        return out
+
+
+STATIC_CACHE = StaticFileCache(int(DEFAULT_STATIC_CACHE_MB * 1024 * 1024))
+
+
+def static_cache_key(fs_path: Path, encoding: str) -> str:
+    return f"{fs_path}|{encoding}"
+
+
+CRIME_GRID_SOURCES = (
+    "data/processed/crime_grid.geojson",
+    "data/Processed/crime_grid.geojson",
+    "data/processed/crime_grid_lite.geojson",
+    "data/Processed/crime_grid_lite.geojson",
+)
+# Below this zoom cells are merged into bins of 1/CRIME_GRID_BINS_PER_TILE of a
+# slippy-map tile; at or above it every matching cell is returned as-is.
+CRIME_GRID_DETAIL_ZOOM = 12
+CRIME_GRID_BINS_PER_TILE = 4
+CRIME_GRID_BUCKET_DEG = 0.25
+CRIME_GRID_MAX_FEATURES = 50000
+
+
+# The crime grid held in memory once per file version. Cells are bucketed on a
+# fixed lat/lon grid for bbox queries, and each cell keeps running totals over
+# the global month list so any month window sums in O(1) per cell.
+class CrimeGridIndex:
+    def __init__(self, sources=CRIME_GRID_SOURCES):
+        self._lock = threading.Lock()
+        self.sources = tuple(sources)
+        self._state: Optional[dict] = None
+
+    def _find_source(self, root: Path) -> Optional[Path]:
+        for rel in self.sources:
+            path = root / rel
+            if path.is_file():
+                return path
+        return None
+
+    def load(self, root: Path) -> Optional[dict]:
+        path = self._find_source(root)
+        if path is None:
+            return None
+        stat = path.stat()
+        version = (str(path), stat.st_mtime_ns, stat.st_size)
+        state = self._state
+        if state is not None and state["version"] == version:
+            return state
+        with self._lock:
+            state = self._state
+            if state is None or state["version"] != version:
+                state = self._build(path, version)
+                self._state = state
+        return state
+
+    @staticmethod
+    def _build(path: Path, version) -> dict:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        meta = data.get("meta") if isinstance(data.get("meta"), dict) else {}
+        features = [ft for ft in (data.get("features") or []) if isinstance(ft, dict)]
+
+        month_set = set(str(m) for m in (meta.get("months") or []))
+        for ft in features:
+            timeline = (ft.get("properties") or {}).get("timeline")
+            if isinstance(timeline, dict):
+                month_set.update(str(m) for m in timeline)
+        months = sorted(month_set)
+        month_pos = {m: i for i, m in enumerate(months)}
+        stride = len(months) + 1
+
+        cells = []
+        crime_cum = array("q")
+        stop_cum = array("q")
+        outcome_cum = array("q")
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        force_stats: Dict[str, dict] = {}
+        type_stats: Dict[str, dict] = {}
+        for ft in features:
+            coords = (ft.get("geometry") or {}).get("coordinates")
+            try:
+                lon = float(coords[0])
+                lat = float(coords[1])
+            except (TypeError, ValueError, IndexError):
+                continue
+            props = ft.get("properties") or {}
+            forces = []
+            if props.get("reported_by"):
+                forces.append(str(props["reported_by"]).strip())
+            if isinstance(props.get("forces"), list):
+                forces.extend(str(f or "").strip() for f in props["forces"])
+            forces = tuple(dict.fromkeys(f for f in forces if f)) or ("Unknown Force",)
+            ctype = str(props.get("dominant_type") or "Crime Hotspot")
+
+            per_month = [[0, 0, 0] for _ in months]
+            timeline = props.get("timeline")
+            has_timeline = isinstance(timeline, dict)
+            if has_timeline:
+                for month, bucket in timeline.items():
+                    if not isinstance(bucket, dict):
+                        continue
+                    slot = per_month[month_pos[str(month)]]
+                    slot[0] += _as_int(bucket.get("crime"))
+                    slot[1] += _as_int(bucket.get("stop"))
+                    slot[2] += _as_int(bucket.get("outcome"))
+            for cum, k in ((crime_cum, 0), (stop_cum, 1), (outcome_cum, 2)):
+                running = 0
+                cum.append(0)
+                for slot in per_month:
+                    running += slot[k]
+                    cum.append(running)
+
+            idx = len(cells)
+            totals = (
+                _as_int(props.get("count")),
+                _as_int(props.get("stop_search_total")),
+                _as_int(props.get("outcome_total")),
+            )
+            cells.append({
+                "lon": lon,
+                "lat": lat,
+                "forces": forces,
+                "forces_l": frozenset(f.lower() for f in forces),
+                "type": ctype,
+                "type_l": ctype.lower(),
+                "timeline": has_timeline,
+                "totals": totals,
+                "props": props,
+            })
+            key = (int(lon // CRIME_GRID_BUCKET_DEG), int(lat // CRIME_GRID_BUCKET_DEG))
+            buckets.setdefault(key, []).append(idx)
+
+            for name in forces:
+                fs = force_stats.setdefault(name, {"crimes": 0, "stops": 0, "cells": 0})
+                fs["crimes"] += totals[0]
+                fs["stops"] += totals[1]
+                fs["cells"] += 1
+            ts = type_stats.setdefault(ctype, {"crimes": 0, "cells": 0})
+            ts["crimes"] += totals[0]
+            ts["cells"] += 1
+
+        return {
+            "version": version,
+            "path": path,
+            "lite": bool(meta.get("lite")),
+            "months": months,
+            "month_pos": month_pos,
+            "stride": stride,
+            "cells": cells,
+            "cum": (crime_cum, stop_cum, outcome_cum),
+            "buckets": buckets,
+            "facets": {"forces": force_stats, "types": type_stats},
+        }
+
+    @staticmethod
+    def _candidates(state: dict, bbox: Optional[Tuple[float, float, float, float]]):
+        if bbox is None:
+            return range(len(state["cells"]))
+        west, south, east, north = bbox
+        out = []
+        buckets = state["buckets"]
+        bx0, bx1 = int(west // CRIME_GRID_BUCKET_DEG), int(east // CRIME_GRID_BUCKET_DEG)
+        by0, by1 = int(south // CRIME_GRID_BUCKET_DEG), int(north // CRIME_GRID_BUCKET_DEG)
+        if (bx1 - bx0 + 1) * (by1 - by0 + 1) > len(buckets):
+            # Wide boxes: walk the occupied buckets instead of the empty range.
+            for (bx, by), members in buckets.items():
+                if bx0 <= bx <= bx1 and by0 <= by <= by1:
+                    out.extend(members)
+        else:
+            for bx in range(bx0, bx1 + 1):
+                for by in range(by0, by1 + 1):
+                    out.extend(buckets.get((bx, by), ()))
+        out.sort()
+        return out
+
+    def query(
+        self,
+        state: dict,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        zoom: Optional[int] = None,
+        forces=None,
+        types=None,
+        month_from: Optional[str] = None,
+        month_to: Optional[str] = None,
+        limit: int = CRIME_GRID_MAX_FEATURES,
+    ) -> dict:
+        months = state["months"]
+        stride = state["stride"]
+        crime_cum, stop_cum, outcome_cum = state["cum"]
+        windowed = bool(month_from or month_to) and bool(months)
+        # Convert the window to [lo, hi) positions in the global month list.
+        lo = sum(1 for m in months if month_from and m < month_from)
+        hi = len(months) - sum(1 for m in months if month_to and m > month_to)
+        window = set(months[lo:hi])
+        detail = zoom is None or zoom >= CRIME_GRID_DETAIL_ZOOM
+        bin_deg = None if detail else 360.0 / (2 ** max(0, zoom)) / CRIME_GRID_BINS_PER_TILE
+        force_l = {f.lower() for f in forces or ()}
+        type_l = {t.lower() for t in types or ()}
+
+        summary = {"incidents": 0, "stops": 0, "outcomes": 0, "cells": 0}
+        features = []
+        bins: Dict[Tuple[int, int], dict] = {}
+        truncated = False
+        for idx in self._candidates(state, bbox):
+            cell = state["cells"][idx]
+            if bbox is not None:
+                west, south, east, north = bbox
+                if not (west <= cell["lon"] <= east and south <= cell["lat"] <= north):
+                    continue
+            if force_l and force_l.isdisjoint(cell["forces_l"]):
+                continue
+            if type_l and cell["type_l"] not in type_l:
+                continue
+            if windowed:
+                if not cell["timeline"]:
+                    continue
+                base = idx * stride
+                incidents = crime_cum[base + hi] - crime_cum[base + lo]
+                stops = stop_cum[base + hi] - stop_cum[base + lo]
+                outcomes = outcome_cum[base + hi] - outcome_cum[base + lo]
+            else:
+                incidents, stops, outcomes = cell["totals"]
+            if incidents + stops + outcomes <= 0:
+                continue
+            summary["incidents"] += incidents
+            summary["stops"] += stops
+            summary["outcomes"] += outcomes
+            summary["cells"] += 1
+
+            if detail:
+                if len(features) >= limit:
+                    truncated = True
+                    continue
+                props = dict(cell["props"])
+                if windowed:
+                    props["timeline"] = {m: b for m, b in (props.get("timeline") or {}).items() if m in window}
+                props.update({"incidents": incidents, "stops": stops, "outcomes": outcomes})
+                features.append({
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [cell["lon"], cell["lat"]]},
+                    "properties": props,
+                })
+                continue
+
+            key = (int(cell["lon"] // bin_deg), int(cell["lat"] // bin_deg))
+            agg = bins.get(key)
+            if agg is None:
+                agg = bins[key] = {"cells": 0, "incidents": 0, "stops": 0, "outcomes": 0,
+                                   "wx": 0.0, "wy": 0.0, "w": 0, "types": {}, "forces": set()}
+            weight = incidents + stops + outcomes
+            agg["cells"] += 1
+            agg["incidents"] += incidents
+            agg["stops"] += stops
+            agg["outcomes"] += outcomes
+            agg["wx"] += cell["lon"] * weight
+            agg["wy"] += cell["lat"] * weight
+            agg["w"] += weight
+            agg["types"][cell["type"]] = agg["types"].get(cell["type"], 0) + incidents
+            agg["forces"].update(cell["forces"])
+
+        if not detail:
+            for agg in sorted(bins.values(), key=lambda a: -(a["incidents"] + a["stops"] + a["outcomes"])):
+                if len(features) >= limit:
+                    truncated = True
+                    break
+                features.append({
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [round(agg["wx"] / agg["w"], 6), round(agg["wy"] / agg["w"], 6)]},
+                    "properties": {
+                        "cluster": True,
+                        "cells": agg["cells"],
+                        "incidents": agg["incidents"],
+                        "stops": agg["stops"],
+                        "outcomes": agg["outcomes"],
+                        "count": agg["incidents"],
+                        "stop_search_total": agg["stops"],
+                        "outcome_total": agg["outcomes"],
+                        "dominant_type": max(agg["types"].items(), key=lambda kv: (kv[1], kv[0]))[0],
+                        "forces": sorted(agg["forces"]),
+                    },
+                })
+
+        return {
+            "type": "FeatureCollection",
+            "features": features,
+            "summary": summary,
+            "meta": {
+                "months": months,
+                "from": months[lo] if windowed and lo < hi else None,
+                "to": months[hi - 1] if windowed and lo < hi else None,
+                "zoom": zoom,
+                "aggregated": not detail,
+                "bin_deg": bin_deg,
+                "lite": state["lite"],
+                "total_cells": len(state["cells"]),
+                "truncated": truncated,
+            },
+        }
+
+
+def _as_int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return 0
+
+
+CRIME_GRID = CrimeGridIndex()
+
+TILE_PATH_RE = re.compile(r"^/tiles/([A-Za-z0-9_-]+)/(\d+)/(\d+)/(\d+)\.(?:pbf|mvt)$")
+TILE_CACHE = TileCache()
+
+CH_LOCAL_INDEX = CompanyIndexCache()
+POSTCODE_INDEX = PostcodeIndexCache()
+PSC_GRAPH = PSCGraphCache()
+PERSON_INDEX = PersonIndexCache()
+ONSPD_TABLE = ONSPDTableCache()
+PLACE_INDEX = PlaceIndexCache()
+NDJSON_FLUSH_BYTES = 16 * 1024
+
 
 @dataclass
 class DevServerConfig:
     host: str = DEFAULT_HOST
     port: int = DEFAULT_PORT
     root: Path = PROJECT_ROOT
+    upstream_pool_size: int = DEFAULT_UPSTREAM_POOL_SIZE
+    upstream_connect_timeout: float = DEFAULT_UPSTREAM_CONNECT_TIMEOUT
+    upstream_read_timeout: float = DEFAULT_UPSTREAM_READ_TIMEOUT
+    upstream_idle_timeout: float = DEFAULT_UPSTREAM_IDLE_TIMEOUT
+    proxy_cache_mb: float = DEFAULT_PROXY_CACHE_MB
+    static_cache_mb: float = DEFAULT_STATIC_CACHE_MB
+    engine: str = DEFAULT_ENGINE
+    async_workers: int = DEFAULT_ASYNC_WORKERS
+    async_slow_workers: int = DEFAULT_ASYNC_SLOW_WORKERS
+    ch_rate_limit: str = DEFAULT_CH_RATE_LIMIT
+    ch_disk_cache: Path = DEFAULT_CH_DISK_CACHE
+    ch_disk_cache_mb: float = DEFAULT_CH_DISK_CACHE_MB
 
 
 def parse_server_config(argv: Optional[list] = None) -> DevServerConfig:
@@ -107,12 +1076,99 @@ def parse_server_config(argv: Optional[list] = None) -> DevServerConfig:
         default=PROJECT_ROOT,
         help="Root directory to serve static assets from",
     )
+    parser.add_argument(
+        "--upstream-pool-size",
+        type=int,
+        default=DEFAULT_UPSTREAM_POOL_SIZE,
+        help="Idle keep-alive connections kept per upstream host (default: %(default)s or CR_UPSTREAM_POOL_SIZE)",
+    )
+    parser.add_argument(
+        "--upstream-connect-timeout",
+        type=float,
+        default=DEFAULT_UPSTREAM_CONNECT_TIMEOUT,
+        help="Seconds allowed for upstream TCP+TLS connect (default: %(default)s or CR_UPSTREAM_CONNECT_TIMEOUT)",
+    )
+    parser.add_argument(
+        "--upstream-read-timeout",
+        type=float,
+        default=DEFAULT_UPSTREAM_READ_TIMEOUT,
+        help="Override every per-route upstream read timeout; 0 keeps route defaults (default: %(default)s or CR_UPSTREAM_READ_TIMEOUT)",
+    )
+    parser.add_argument(
+        "--upstream-idle-timeout",
+        type=float,
+        default=DEFAULT_UPSTREAM_IDLE_TIMEOUT,
+        help="Seconds an idle upstream connection may be reused (default: %(default)s or CR_UPSTREAM_IDLE_TIMEOUT)",
+    )
+    parser.add_argument(
+        "--proxy-cache-mb",
+        type=float,
+        default=DEFAULT_PROXY_CACHE_MB,
+        help="Memory budget for cached proxy GET responses, 0 disables (default: %(default)s or CR_PROXY_CACHE_MB)",
+    )
+    parser.add_argument(
+        "--static-cache-mb",
+        type=float,
+        default=DEFAULT_STATIC_CACHE_MB,
+        help="Memory budget for on-the-fly compressed static files, 0 disables (default: %(default)s or CR_STATIC_CACHE_MB)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("threading", "asyncio"),
+        default=DEFAULT_ENGINE if DEFAULT_ENGINE in ("threading", "asyncio") else "threading",
+        help="Server engine: one thread per connection, or an asyncio event loop (default: %(default)s or CR_DEV_ENGINE)",
+    )
+    parser.add_argument(
+        "--async-workers",
+        type=int,
+        default=DEFAULT_ASYNC_WORKERS,
+        help="Worker threads the asyncio engine uses for local routes (default: %(default)s or CR_ASYNC_WORKERS)",
+    )
+    parser.add_argument(
+        "--async-slow-workers",
+        type=int,
+        default=DEFAULT_ASYNC_SLOW_WORKERS,
+        help="Worker threads the asyncio engine reserves for slow upstream routes such as RailData, NRE and FR24 (default: %(default)s or CR_ASYNC_SLOW_WORKERS)",
+    )
+    parser.add_argument(
+        "--ch-rate-limit",
+        default=DEFAULT_CH_RATE_LIMIT,
+        help="Companies House quota as requests/seconds, shared by /ch/* and /ch/batch (default: %(default)s or CR_CH_RATE_LIMIT)",
+    )
+    parser.add_argument(
+        "--ch-disk-cache",
+        type=Path,
+        default=Path(os.environ.get("CR_CH_DISK_CACHE", "") or DEFAULT_CH_DISK_CACHE),
+        help="SQLite file for persistent /ch/* responses, relative to --root (default: %(default)s or CR_CH_DISK_CACHE)",
+    )
+    parser.add_argument(
+        "--ch-disk-cache-mb",
+        type=float,
+        default=DEFAULT_CH_DISK_CACHE_MB,
+        help="Size budget for the persistent /ch/* cache, 0 disables (default: %(default)s or CR_CH_DISK_CACHE_MB)",
+    )
     args = parser.parse_args(argv)
     host = args.host or DEFAULT_HOST
     positional_port = getattr(args, "port", None)
     port = args.override_port or positional_port or DEFAULT_PORT
     root = args.root.resolve()
-    return DevServerConfig(host=host, port=port, root=root)
+    return DevServerConfig(
+        host=host,
+        port=port,
+        root=root,
+        upstream_pool_size=args.upstream_pool_size,
+        upstream_connect_timeout=args.upstream_connect_timeout,
+        upstream_read_timeout=args.upstream_read_timeout,
+        upstream_idle_timeout=args.upstream_idle_timeout,
+        proxy_cache_mb=args.proxy_cache_mb,
+        static_cache_mb=args.static_cache_mb,
+        engine=args.engine,
+        async_workers=args.async_workers,
+        async_slow_workers=args.async_slow_workers,
+        ch_rate_limit=args.ch_rate_limit,
+        ch_disk_cache=args.ch_disk_cache if args.ch_disk_cache.is_absolute() else root / args.ch_disk_cache,
+        ch_disk_cache_mb=args.ch_disk_cache_mb,
+    )
 
 
 def b64(s: str) -> str:
@@ -142,86 +1198,297 @@ def load_env_file():
         print("Set CH_API_KEY environment variable or create .env file")
 
 
+def passthrough_proxy_target(path: str) -> Optional[dict]:
+    # Plain GET pass-through routes shared by both server engines: returns the
+    # upstream URL/headers/cache route, an error to relay, or None if the
+    # path is not a pass-through proxy.
+    if path.startswith("/ch/"):
+        api_key = os.environ.get("CH_API_KEY", "").strip()
+        if not api_key:
+            return {"status": 500, "error": b'{"error":"CH_API_KEY env var not set"}'}
+        return {
+            "url": CH_API_BASE + path.replace("/ch", "", 1),
+            "headers": {
+                "Authorization": "Basic " + b64(f"{api_key}:"),
+                "Accept": "application/json",
+            },
+            "cache_route": "/ch/",
+        }
+
+    if path.startswith("/tfl/"):
+        return {"url": TFL_API_BASE + path.replace("/tfl", "", 1), "headers": {"Accept": "application/json"}, "cache_route": "/tfl/"}
+
+    if path.startswith("/postcodes/"):
+        return {"url": POSTCODES_API_BASE + path.replace("/postcodes", "", 1), "headers": {"Accept": "application/json"}, "cache_route": "/postcodes/"}
+
+    if path.startswith("/webtris/"):
+        return {"url": WEBTRIS_API_BASE + "/" + path.replace("/webtris/", "", 1), "headers": {"Accept": "application/json"}, "cache_route": "/webtris/"}
+
+    if path.startswith("/geo/search"):
+        params = parse_qs(urlsplit(path).query or "")
+        q = ((params.get("q") or [""])[0]).strip()
+        limit = ((params.get("limit") or ["1"])[0]).strip()
+        if not q:
+            return {"status": 400, "error": json.dumps({"error": "q query parameter required"}).encode("utf-8")}
+        return {
+            "url": f"{NOMINATIM_BASE}?q={quote_plus(q)}&format=jsonv2&limit={quote_plus(limit)}",
+            "headers": {
+                "Accept": "application/json",
+                "User-Agent": "ControlRoom/1.0 (+https://localhost)",
+            },
+            "cache_route": "/geo/search",
+        }
+
+    return None
+
+
 class Handler(SimpleHTTPRequestHandler):
+    extensions_map = {
+        **SimpleHTTPRequestHandler.extensions_map,
+        ".geojson": "application/geo+json",
+        ".glb": "model/gltf-binary",
+        ".pbf": "application/vnd.mapbox-vector-tile",
+        ".js": "text/javascript",
+        ".mjs": "text/javascript",
+    }
+
     def end_headers(self):
-        # Dev UX: always disable browser caching for HTML/CSS/JS so UI changes are immediate.
+        # Dev UX: make browsers revalidate HTML/CSS/JS on every load so UI changes
+        # are immediate; the ETag check turns unchanged files into cheap 304s.
         path = urlsplit(getattr(self, "path", "")).path.lower()
         if path == "/" or path.endswith(".html") or path.endswith(".css") or path.endswith(".js"):
-            self.send_header("Cache-Control", "no-store, no-cache, must-revalidate, max-age=0")
+            self.send_header("Cache-Control", "no-cache, must-revalidate, max-age=0")
             self.send_header("Pragma", "no-cache")
             self.send_header("Expires", "0")
         super().end_headers()
 
-    def _serve_accelerated_static(self, route_path: str) -> bool:
+    def _static_target(self, route_path: str):
         mapping = STATIC_ACCELERATED_FILES.get(route_path)
-        if not mapping:
+        if mapping:
+            rel_path, mime = mapping
+            try:
+                fs_path = (PROJECT_ROOT / rel_path).resolve(strict=True)
+            except (FileNotFoundError, OSError):
+                return None
+            if not str(fs_path).startswith(str(PROJECT_ROOT)):
+                return None
+            return fs_path, mime, "public, max-age=60"
+
+        fs_path = Path(self.translate_path(route_path))
+        if fs_path.is_dir():
+            # Let SimpleHTTPRequestHandler issue the trailing-slash redirect or listing.
+            if not route_path.endswith("/"):
+                return None
+            for index in ("index.html", "index.htm"):
+                if (fs_path / index).is_file():
+                    fs_path = fs_path / index
+                    break
+            else:
+                return None
+        if not fs_path.is_file():
+            return None
+        lower = route_path.lower()
+        dev_no_cache = lower.endswith("/") or lower.endswith(".html") or lower.endswith(".css") or lower.endswith(".js")
+        return fs_path, self.guess_type(str(fs_path)), None if dev_no_cache else "no-cache"
+
+    def _accepted_encodings(self) -> Dict[str, float]:
+        accepted = {}
+        for part in (self.headers.get("Accept-Encoding") or "").split(","):
+            name, _, params = part.strip().partition(";")
+            name = name.strip().lower()
+            if not name:
+                continue
+            q = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            accepted[name] = q
+        return accepted
+
+    def _compressed_static(self, fs_path: Path, stat, encoding: str) -> Optional[bytes]:
+        def build() -> Optional[bytes]:
+            data = fs_path.read_bytes()
+            if encoding == "br":
+                body = brotli.compress(data, quality=STATIC_BROTLI_QUALITY)
+            else:
+                body = gzip.compress(data, compresslevel=STATIC_GZIP_LEVEL)
+            return body if len(body) < len(data) else None
+
+        return STATIC_CACHE.get_or_build(static_cache_key(fs_path, encoding), (stat.st_mtime_ns, stat.st_size), build)
+
+    def _negotiate_static_encoding(self, fs_path: Path, stat, mime: str):
+        accepted = self._accepted_encodings()
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if accepted.get(encoding, accepted.get("*", 0.0)) <= 0:
+                continue
+            sibling = fs_path.with_name(fs_path.name + suffix)
+            try:
+                sibling_stat = sibling.stat()
+            except OSError:
+                sibling_stat = None
+            if sibling_stat is not None and sibling_stat.st_mtime >= stat.st_mtime:
+                return encoding, None, sibling
+            if encoding == "br" and brotli is None:
+                continue
+            if STATIC_CACHE.max_bytes > 0 and STATIC_COMPRESS_MIN_BYTES <= stat.st_size < STATIC_STREAM_THRESHOLD:
+                body = self._compressed_static(fs_path, stat, encoding)
+                if body is not None:
+                    return encoding, body, None
+        return "identity", None, fs_path
+
+    def _static_not_modified(self, etag: str, mtime: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            tags = [t.strip() for t in if_none_match.split(",")]
+            return "*" in tags or any((t[2:] if t.startswith("W/") else t) == etag for t in tags)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def _static_range(self, header: str, size: int, etag: str, mtime: float):
+        if_range = (self.headers.get("If-Range") or "").strip()
+        if if_range:
+            if if_range.startswith('"') or if_range.startswith("W/"):
+                if if_range != etag:
+                    return None
+            else:
+                try:
+                    if int(mtime) > parsedate_to_datetime(if_range).timestamp():
+                        return None
+                except (TypeError, ValueError, IndexError, OverflowError):
+                    return None
+        # Only single ranges are honoured; multi-range requests get the full body.
+        m = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+        if not m or not (m.group(1) or m.group(2)):
+            return None
+        if m.group(1):
+            start = int(m.group(1))
+            end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+            if start >= size or start > end:
+                return "unsatisfiable"
+            return start, end
+        suffix = int(m.group(2))
+        if suffix == 0 or size == 0:
+            return "unsatisfiable"
+        return max(0, size - suffix), size - 1
+
+    def _sendfile_static(self, f, start: int, length: int) -> bool:
+        if not STATIC_SENDFILE_ENABLED or length < STATIC_SENDFILE_MIN_BYTES:
             return False
-        rel_path, mime = mapping
-        try:
-            fs_path = (PROJECT_ROOT / rel_path).resolve(strict=True)
-        except FileNotFoundError:
+        bridged = getattr(self.wfile, "sendfile", None)
+        if bridged is not None:
+            bridged(f, start, length)
+            return True
+        sock = self.connection
+        # Kernel zero-copy needs a plain socket; TLS has to go through userland.
+        if not isinstance(sock, socket.socket) or isinstance(sock, ssl.SSLSocket):
+            return False
+        self.wfile.flush()
+        sock.sendfile(f, offset=start, count=length)
+        return True
+
+    def _copy_static_range(self, fs_path: Path, start: int, length: int):
+        with fs_path.open("rb") as f:
+            if self._sendfile_static(f, start, length):
+                return
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(STATIC_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def _serve_static(self, route_path: str, head_only: bool = False) -> bool:
+        target = self._static_target(route_path)
+        if target is None:
             return False
-        if not str(fs_path).startswith(str(PROJECT_ROOT)):
+        fs_path, mime, cache_control = target
+        try:
+            stat = fs_path.stat()
+        except OSError:
             return False
-        stat = fs_path.stat()
-        # For very large files, stream directly to avoid huge in-memory payloads
-        # and single-write truncation risk on buffered sockets.
-        if stat.st_size >= 64 * 1024 * 1024:
-            self.send_response(200)
-            self.send_header("Content-Type", mime)
-            self.send_header("Cache-Control", "public, max-age=60")
-            self.send_header("Content-Length", str(stat.st_size))
+
+        compressible = any(mime.startswith(prefix) for prefix in STATIC_COMPRESSIBLE_TYPES)
+        range_header = self.headers.get("Range")
+        encoding, body, body_path = "identity", None, fs_path
+        # Ranges are only served against the identity representation.
+        if compressible and not range_header:
+            encoding, body, body_path = self._negotiate_static_encoding(fs_path, stat, mime)
+
+        base_tag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+        etag = f'"{base_tag}"' if encoding == "identity" else f'"{base_tag}-{encoding}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        def common_headers():
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            if compressible:
+                self.send_header("Vary", "Accept-Encoding")
+            if cache_control:
+                self.send_header("Cache-Control", cache_control)
+
+        if self._static_not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            common_headers()
             self.end_headers()
-            with fs_path.open("rb") as f:
-                while True:
-                    chunk = f.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    self.wfile.write(chunk)
             return True
 
-        cached = _STATIC_FILE_CACHE.get(route_path)
-        mtime = stat.st_mtime
-        if not cached or cached.get("mtime") != mtime:
-            data = fs_path.read_bytes()
-            gz = gzip.compress(data)
-            cached = {
-                "mtime": mtime,
-                "raw": data,
-                "gzip": gz,
-                "type": mime,
-            }
-            _STATIC_FILE_CACHE[route_path] = cached
-        accepts_gzip = "gzip" in (self.headers.get("Accept-Encoding") or "")
-        payload = cached["gzip"] if accepts_gzip else cached["raw"]
-        self.send_response(200)
-        self.send_header("Content-Type", cached["type"])
-        if accepts_gzip:
-            self.send_header("Content-Encoding", "gzip")
-        self.send_header("Cache-Control", "public, max-age=60")
-        self.send_header("Content-Length", str(len(payload)))
+        size = len(body) if body is not None else body_path.stat().st_size
+        start, end, status = 0, size - 1, 200
+        if range_header and encoding == "identity":
+            rng = self._static_range(range_header, size, etag, stat.st_mtime)
+            if rng == "unsatisfiable":
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                common_headers()
+                self.end_headers()
+                return True
+            if rng:
+                start, end = rng
+                status = 206
+
+        length = max(0, end - start + 1)
+        self.send_response(status)
+        self.send_header("Content-Type", mime)
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(length))
+        common_headers()
         self.end_headers()
-        self.wfile.write(payload)
+        if head_only or length == 0:
+            return True
+        if body is not None:
+            self.wfile.write(body[start:end + 1])
+        else:
+            self._copy_static_range(body_path, start, length)
         return True
 
-    def _haversine_km(self, lat1, lon1, lat2, lon2):
-        import math
-        r = 6371.0
-        d_lat = math.radians(lat2 - lat1)
-        d_lon = math.radians(lon2 - lon1)
-        a = (
-            math.sin(d_lat / 2) ** 2
-            + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lon / 2) ** 2
-        )
-        return 2 * r * math.asin(math.sqrt(a))
-
     def _load_station_catalog(self):
+        if _station_catalog_cache["loaded"]:
+            return _station_catalog_cache["items"]
+        return UPSTREAM_FLIGHTS.do("station-catalog", self._fetch_station_catalog)
+
+    def _fetch_station_catalog(self):
         if _station_catalog_cache["loaded"]:
             return _station_catalog_cache["items"]
         req = urllib.request.Request(UK_RAIL_STATIONS_URL)
         req.add_header("Accept", "application/json")
         req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
-        with urllib.request.urlopen(req, timeout=25) as resp:
+        with UPSTREAM_POOL.urlopen(req, timeout=25) as resp:
             raw = json.loads(resp.read().decode("utf-8", errors="replace"))
         items = []
         if isinstance(raw, list):
@@ -238,36 +1505,127 @@ class Handler(SimpleHTTPRequestHandler):
                             "lon": r.get("long"),
                         }
                     )
-        _station_catalog_cache["loaded"] = True
+        # Indexes are built once here, before "loaded" flips, so readers never
+        # see a catalog without them.
+        _station_catalog_cache["by_crs"] = {st["crs"]: st for st in items}
+        _station_catalog_cache["grid"] = PointGrid(items, lambda st: (st["lat"], st["lon"]))
+        _station_catalog_cache["search"] = station_index(items)
         _station_catalog_cache["items"] = items
+        _station_catalog_cache["loaded"] = True
         return items
 
     def _send_json_error(self, status: int, payload: bytes):
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Content-Length", str(len(payload)))
         self.end_headers()
         self.wfile.write(payload)
 
-    def _proxy_get(self, upstream_url: str, headers: Optional[Dict[str, str]] = None):
-        req = urllib.request.Request(upstream_url)
-        req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
-        if headers:
-            for key, value in headers.items():
-                req.add_header(key, value)
+    def _fetch_upstream_get(self, upstream_url: str, headers: Optional[Dict[str, str]] = None, metered: bool = True, with_headers: bool = False):
+        # metered=False when the caller already holds a CH_RATE_LIMITER token;
+        # with_headers=True adds the upstream response headers to the result.
+        def fetch():
+            req = urllib.request.Request(upstream_url)
+            req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
+            if headers:
+                for key, value in headers.items():
+                    req.add_header(key, value)
+            if metered and ch_metered(upstream_url):
+                CH_RATE_LIMITER.debit()
+            try:
+                with UPSTREAM_POOL.urlopen(req, timeout=30) as resp:
+                    return resp.status, resp.headers.get("Content-Type", "application/json"), resp.read(), resp.headers
+            except urllib.error.HTTPError as e:
+                if e.code == 429 and ch_metered(upstream_url):
+                    CH_RATE_LIMITER.penalize()
+                # Materialise the error body so every coalesced waiter can relay it.
+                return e.code, "application/json", (e.read() if hasattr(e, "read") else b"{}"), (e.headers or {})
 
+        result = UPSTREAM_FLIGHTS.do("get:" + ResponseCache.make_key(upstream_url, headers), fetch)
+        return result if with_headers else result[:3]
+
+    def _refresh_cached_get(self, cache_key: str, upstream_url: str, headers: Optional[Dict[str, str]], ttl: Tuple[int, int]):
         try:
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                body = resp.read()
-                self.send_response(resp.status)
-                self.send_header("Content-Type", resp.headers.get("Content-Type", "application/json"))
-                self.send_header("Access-Control-Allow-Origin", "*")
-                self.end_headers()
-                self.wfile.write(body)
+            status, content_type, body = self._fetch_upstream_get(upstream_url, headers)
+            if status == 200:
+                PROXY_CACHE.store(cache_key, status, content_type, body, ttl)
+        except Exception:
+            pass
+        finally:
+            PROXY_CACHE.end_refresh(cache_key)
+
+    def _send_proxied(self, status: int, content_type: str, body: bytes, cache_state: str = "", age: Optional[float] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if cache_state:
+            self.send_header("X-Cache", cache_state)
+        if age is not None:
+            self.send_header("Age", str(max(0, int(age))))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _ch_get(self, url: str, headers: Dict[str, str], bypass: bool = False, metered: bool = True) -> Tuple[int, str, bytes, str, Optional[float]]:
+        plan = ch_cache_plan(url, headers, bypass)
+        entry = plan["serve"]
+        if entry is not None:
+            if plan["state"] == "STALE" and PROXY_CACHE.begin_refresh(plan["key"]):
+                threading.Thread(target=self._refresh_ch, args=(url, headers, plan["key"]), daemon=True).start()
+            return entry["status"], entry["type"], entry["body"], plan["state"], time.time() - entry["stored"]
+        try:
+            status, content_type, body, resp_headers = self._fetch_upstream_get(url, plan["headers"], metered=metered, with_headers=True)
+        except Exception:
+            if plan["validators"] is None:
+                raise
+            status, content_type, body, resp_headers = 502, "application/json", b"", {}
+        status, content_type, body, state = ch_cache_complete(plan, status, content_type, body, resp_headers)
+        return status, content_type, body, state, None
+
+    def _refresh_ch(self, url: str, headers: Dict[str, str], cache_key: str):
+        try:
+            plan = ch_cache_plan(url, headers, bypass=True)
+            status, content_type, body, resp_headers = self._fetch_upstream_get(url, plan["headers"], with_headers=True)
+            ch_cache_complete(plan, status, content_type, body, resp_headers)
+        except Exception:
+            pass
+        finally:
+            PROXY_CACHE.end_refresh(cache_key)
+
+    def _proxy_get(self, upstream_url: str, headers: Optional[Dict[str, str]] = None, cache_route: Optional[str] = None):
+        if cache_route == "/ch/":
+            bypass = "no-cache" in (self.headers.get("Cache-Control") or "").lower()
+            try:
+                status, content_type, body, state, age = self._ch_get(upstream_url, headers or {}, bypass)
+            except Exception as e:
+                payload = ("{\"error\":\"Upstream failed\",\"detail\":\"%s\"}" % str(e)).encode("utf-8")
+                self._send_json_error(502, payload)
                 return True
-        except urllib.error.HTTPError as e:
-            body = e.read() if hasattr(e, "read") else b"{}"
-            self._send_json_error(e.code, body)
+            self._send_proxied(status, content_type, body, state, age)
+            return True
+
+        ttl = PROXY_CACHE_TTLS.get(cache_route) if cache_route else None
+        cache_key = ""
+        if ttl and PROXY_CACHE.max_bytes > 0:
+            cache_key = ResponseCache.make_key(upstream_url, headers)
+            bypass = "no-cache" in (self.headers.get("Cache-Control") or "").lower()
+            entry, state = (None, "MISS") if bypass else PROXY_CACHE.lookup(cache_key)
+            if entry is not None:
+                if state == "STALE" and PROXY_CACHE.begin_refresh(cache_key):
+                    threading.Thread(
+                        target=self._refresh_cached_get,
+                        args=(cache_key, upstream_url, headers, ttl),
+                        daemon=True,
+                    ).start()
+                self._send_proxied(entry["status"], entry["type"], entry["body"], state, time.time() - entry["stored"])
+                return True
+
+        try:
+            status, content_type, body = self._fetch_upstream_get(upstream_url, headers)
+            if cache_key and status == 200:
+                PROXY_CACHE.store(cache_key, status, content_type, body, ttl)
+            self._send_proxied(status, content_type, body, "MISS" if cache_key else "")
             return True
         except Exception as e:
             payload = ("{\"error\":\"Upstream failed\",\"detail\":\"%s\"}" % str(e)).encode("utf-8")
@@ -279,9 +1637,129 @@ class Handler(SimpleHTTPRequestHandler):
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_ndjson(self, items: Iterable[dict], flush_types: Tuple[str, ...] = ()):
+        # Streams one JSON object per line. HTTP/1.1 clients get chunked
+        # framing; lines are batched up to NDJSON_FLUSH_BYTES, and items whose
+        # "type" is in flush_types push everything buffered so far.
+        chunked = self.request_version != "HTTP/1.0"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-store")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        buf: List[bytes] = []
+        size = 0
+
+        def flush():
+            nonlocal size
+            if not buf:
+                return
+            data = b"".join(buf)
+            buf.clear()
+            size = 0
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+
+        try:
+            try:
+                for item in items:
+                    line = json.dumps(item).encode("utf-8") + b"\n"
+                    buf.append(line)
+                    size += len(line)
+                    if size >= NDJSON_FLUSH_BYTES or item.get("type") in flush_types:
+                        flush()
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                buf.append(json.dumps({"type": "error", "error": str(e)}).encode("utf-8") + b"\n")
+            flush()
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            # Run the generator's cleanup now so a client that went away stops
+            # any work still queued behind it.
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    def _ch_cached(self, path: str) -> Optional[Tuple[int, Any]]:
+        target = passthrough_proxy_target("/ch" + path)
+        if target.get("error"):
+            return None
+        entry = ch_cache_plan(target["url"], target["headers"])["serve"]
+        if entry is None or entry["status"] != 200:
+            return None
+        return entry["status"], json.loads(entry["body"])
+
+    def _ch_fetch(self, path: str) -> Tuple[int, Any]:
+        # Upstream Companies House GET (conditional when an expired copy is on
+        # disk) for a caller that already holds a rate limit token; 200s land
+        # in both /ch/ cache tiers.
+        target = passthrough_proxy_target("/ch" + path)
+        if target.get("error"):
+            return target["status"], json.loads(target["error"])
+        status, _, body, _, _ = self._ch_get(target["url"], target["headers"], bypass=True, metered=False)
+        try:
+            return status, json.loads(body)
+        except ValueError:
+            return status, None
+
+    def _ch_api_json(self, path: str) -> Optional[dict]:
+        # Server-side Companies House GET that shares the /ch/ proxy cache, so
+        # graph expansion and the browser reuse each other's responses.
+        hit = self._ch_cached(path)
+        if hit is not None:
+            return hit[1]
+        if not CH_RATE_LIMITER.acquire(timeout=CH_INTERACTIVE_WAIT):
+            return None
+        status, data = self._ch_fetch(path)
+        return data if status == 200 else None
+
+    def _postcode_cache_key(self, postcode: str) -> str:
+        # Same key as GET /postcodes/postcodes/<canonical postcode>, so bulk
+        # results and single proxied lookups share one cache entry.
+        return ResponseCache.make_key(f"{POSTCODES_API_BASE}/postcodes/{quote(postcode)}", {"Accept": "application/json"})
+
+    def _postcode_cached(self, postcode: str) -> Optional[dict]:
+        if PROXY_CACHE.max_bytes <= 0:
+            return None
+        entry, _ = PROXY_CACHE.lookup(self._postcode_cache_key(postcode))
+        if entry is None or entry["status"] != 200:
+            return None
+        try:
+            return json.loads(entry["body"]).get("result")
+        except (ValueError, AttributeError):
+            return None
+
+    def _postcodes_fetch_bulk(self, postcodes: List[str]) -> Dict[str, Optional[dict]]:
+        req = urllib.request.Request(f"{POSTCODES_API_BASE}/postcodes", data=json.dumps({"postcodes": postcodes}).encode("utf-8"), method="POST")
+        req.add_header("Content-Type", "application/json")
+        req.add_header("Accept", "application/json")
+        req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
+        with UPSTREAM_POOL.urlopen(req, timeout=30) as resp:
+            data = json.loads(resp.read().decode("utf-8", errors="replace"))
+        found: Dict[str, Optional[dict]] = {}
+        for item in data.get("result") or []:
+            key = postcode_key(item.get("query") or "")
+            if key is None:
+                continue
+            postcode = format_key(key)
+            found[postcode] = item.get("result")
+            if item.get("result") and PROXY_CACHE.max_bytes > 0:
+                body = json.dumps({"status": 200, "result": item["result"]}).encode("utf-8")
+                PROXY_CACHE.store(self._postcode_cache_key(postcode), 200, "application/json", body, PROXY_CACHE_TTLS["/postcodes/"])
+        return found
+
     def _read_json_response(self, resp) -> Optional[dict]:
         try:
             raw = resp.read().decode("utf-8", errors="replace")
@@ -349,11 +1827,12 @@ class Handler(SimpleHTTPRequestHandler):
             req.add_header("Authorization", f"Basic {b64(f'{username}:{password}')}")
 
         try:
-            with urllib.request.urlopen(req, timeout=40) as resp:
+            with UPSTREAM_POOL.urlopen(req, timeout=40) as resp:
                 body = resp.read()
                 self.send_response(resp.status)
                 self.send_header("Content-Type", resp.headers.get("Content-Type", "application/octet-stream"))
                 self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Content-Length", str(len(body)))
                 self.end_headers()
                 self.wfile.write(body)
                 return True
@@ -393,7 +1872,7 @@ class Handler(SimpleHTTPRequestHandler):
                 req.add_header("Accept", "application/json")
                 req.add_header("Content-Type", "application/json")
                 req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
-                with urllib.request.urlopen(req, timeout=20) as resp:
+                with UPSTREAM_POOL.urlopen(req, timeout=20) as resp:
                     data = self._read_json_response(resp) or {}
                     token = str(
                         data.get("token")
@@ -528,7 +2007,7 @@ class Handler(SimpleHTTPRequestHandler):
             req.add_header("Accept", "application/json")
             req.add_header("x-apikey", api_key)
             req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
-            with urllib.request.urlopen(req, timeout=30) as resp:
+            with UPSTREAM_POOL.urlopen(req, timeout=30) as resp:
                 text = resp.read().decode("utf-8", errors="replace")
                 parsed = json.loads(text)
                 return self._normalize_raildata_board(parsed, board_type, crs), None
@@ -557,7 +2036,7 @@ class Handler(SimpleHTTPRequestHandler):
             req.add_header("Accept", "application/json")
             req.add_header("x-apikey", api_key)
             req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
-            with urllib.request.urlopen(req, timeout=30) as resp:
+            with UPSTREAM_POOL.urlopen(req, timeout=30) as resp:
                 text = resp.read().decode("utf-8", errors="replace")
                 parsed = json.loads(text)
                 def stop_obj(x):
@@ -640,25 +2119,28 @@ class Handler(SimpleHTTPRequestHandler):
         return envelope.encode("utf-8")
 
     def _http_get_json_gzip(self, url: str, timeout_s: int = 15):
-        try:
-            req = urllib.request.Request(
-                url,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0 Safari/537.36",
-                    "Accept": "application/json, text/plain, */*",
-                    "Accept-Encoding": "gzip",
-                    "Referer": "https://www.flightradar24.com/",
-                    "Origin": "https://www.flightradar24.com",
-                },
-            )
-            with urllib.request.urlopen(req, timeout=timeout_s) as resp:
-                raw = resp.read()
-                enc = (resp.headers.get("Content-Encoding") or "").strip().lower()
-                if enc == "gzip":
-                    raw = gzip.decompress(raw)
-            return json.loads(raw.decode("utf-8", errors="replace"))
-        except Exception:
-            return None
+        def fetch():
+            try:
+                req = urllib.request.Request(
+                    url,
+                    headers={
+                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0 Safari/537.36",
+                        "Accept": "application/json, text/plain, */*",
+                        "Accept-Encoding": "gzip",
+                        "Referer": "https://www.flightradar24.com/",
+                        "Origin": "https://www.flightradar24.com",
+                    },
+                )
+                with UPSTREAM_POOL.urlopen(req, timeout=timeout_s) as resp:
+                    raw = resp.read()
+                    enc = (resp.headers.get("Content-Encoding") or "").strip().lower()
+                    if enc == "gzip":
+                        raw = gzip.decompress(raw)
+                return json.loads(raw.decode("utf-8", errors="replace"))
+            except Exception:
+                return None
+
+        return UPSTREAM_FLIGHTS.do("json-gzip:" + url, fetch)
 
     def _fr24_fetch_feed(self, bounds):
         try:
@@ -744,30 +2226,34 @@ class Handler(SimpleHTTPRequestHandler):
 
         endpoint = os.environ.get("NRE_LDBWS_URL", NRE_LDBWS_URL).strip() or NRE_LDBWS_URL
         payload = self._build_ldbws_envelope(token, method, body_xml)
-        req = urllib.request.Request(endpoint, data=payload, method="POST")
-        req.add_header("Content-Type", "text/xml; charset=utf-8")
-        req.add_header("Accept", "text/xml")
-        req.add_header("SOAPAction", f"http://thalesgroup.com/RTTI/2017-10-01/ldb/{method}")
-        req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
 
-        try:
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                xml_body = resp.read()
-                root = ET.fromstring(xml_body)
-                for el in root.iter():
-                    if self._xml_local_name(el.tag) == "Fault":
-                        fault_string = self._find_first_text(el, "faultstring", "SOAP Fault")
-                        return None, {"error": "LDBWS SOAP fault", "detail": fault_string}
-                return root, None
-        except urllib.error.HTTPError as e:
-            detail = ""
+        def fetch():
+            req = urllib.request.Request(endpoint, data=payload, method="POST")
+            req.add_header("Content-Type", "text/xml; charset=utf-8")
+            req.add_header("Accept", "text/xml")
+            req.add_header("SOAPAction", f"http://thalesgroup.com/RTTI/2017-10-01/ldb/{method}")
+            req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
+
             try:
-                detail = e.read().decode("utf-8", errors="replace")[:500]
-            except Exception:
-                detail = str(e)
-            return None, {"error": f"HTTP {e.code}", "detail": detail}
-        except Exception as e:
-            return None, {"error": "LDBWS request failed", "detail": str(e)}
+                with UPSTREAM_POOL.urlopen(req, timeout=30) as resp:
+                    xml_body = resp.read()
+                    root = ET.fromstring(xml_body)
+                    for el in root.iter():
+                        if self._xml_local_name(el.tag) == "Fault":
+                            fault_string = self._find_first_text(el, "faultstring", "SOAP Fault")
+                            return None, {"error": "LDBWS SOAP fault", "detail": fault_string}
+                    return root, None
+            except urllib.error.HTTPError as e:
+                detail = ""
+                try:
+                    detail = e.read().decode("utf-8", errors="replace")[:500]
+                except Exception:
+                    detail = str(e)
+                return None, {"error": f"HTTP {e.code}", "detail": detail}
+            except Exception as e:
+                return None, {"error": "LDBWS request failed", "detail": str(e)}
+
+        return UPSTREAM_FLIGHTS.do(f"ldbws:{endpoint}:{method}:{body_xml}", fetch)
 
     def _parse_station_board(self, root):
         board = None
@@ -832,774 +2318,1966 @@ class Handler(SimpleHTTPRequestHandler):
         }
 
     def do_GET(self):
-        clean_path = self.path.split("?", 1)[0]
-        if clean_path in STATIC_ACCELERATED_FILES and self._serve_accelerated_static(clean_path):
+        clean_path, _, query = self.path.partition("?")
+        route = GET_ROUTES.match(clean_path)
+        if route is not None:
+            return route(self, parse_qs(query))
+        if self._serve_static(clean_path):
             return
+        return super().do_GET()
 
-        if self.path.startswith("/__control_room_health"):
-            self._send_json(
-                {
-                    "ok": True,
-                    "service": "control-room-dev-server",
-                    "ts": int(time.time()),
-                }
+    def do_HEAD(self):
+        clean_path = self.path.partition("?")[0]
+        if GET_ROUTES.match(clean_path) is None and self._serve_static(clean_path, head_only=True):
+            return
+        return super().do_HEAD()
+
+    def _get_health(self, params: Dict[str, List[str]]):
+        self._send_json(
+            {
+                "ok": True,
+                "service": "control-room-dev-server",
+                "ts": int(time.time()),
+                "upstream": UPSTREAM_POOL.snapshot(),
+                "proxy_cache": PROXY_CACHE.snapshot(),
+                "static_cache": STATIC_CACHE.snapshot(),
+                "tiles": TILE_CACHE.snapshot(),
+                "single_flight": UPSTREAM_FLIGHTS.snapshot(),
+                "ch_rate_limit": CH_RATE_LIMITER.snapshot(),
+                "ch_disk_cache": CH_DISK_CACHE.snapshot(),
+                "engine": self.server.snapshot() if isinstance(self.server, AsyncDevServer) else {"name": "threading"},
+            }
+        )
+
+    def _get_passthrough(self, params: Dict[str, List[str]]):
+        target = passthrough_proxy_target(self.path)
+        if target.get("error"):
+            self._send_json_error(target["status"], target["error"])
+            return
+        self._proxy_get(target["url"], headers=target["headers"], cache_route=target["cache_route"])
+
+    def _get_crime_grid(self, params: Dict[str, List[str]]):
+        def values(name: str) -> List[str]:
+            out = []
+            for raw in params.get(name) or []:
+                out.extend(v.strip() for v in raw.split(",") if v.strip())
+            return out
+
+        bbox = None
+        bbox_s = ((params.get("bbox") or [""])[0]).strip()
+        if bbox_s:
+            try:
+                west, south, east, north = (float(v) for v in bbox_s.split(","))
+            except ValueError:
+                self._send_json({"ok": False, "error": "bbox must be west,south,east,north"}, status=400)
+                return
+            if not all(math.isfinite(v) for v in (west, south, east, north)):
+                self._send_json({"ok": False, "error": "bbox values must be finite numbers"}, status=400)
+                return
+            # Clamp to the globe so the bucket ranges stay bounded.
+            west, east = (max(-180.0, min(180.0, v)) for v in (west, east))
+            south, north = (max(-90.0, min(90.0, v)) for v in (south, north))
+            bbox = (min(west, east), min(south, north), max(west, east), max(south, north))
+        try:
+            zoom_s = ((params.get("zoom") or params.get("z") or [""])[0]).strip()
+            zoom = max(0, min(22, int(zoom_s))) if zoom_s else None
+            limit = max(1, min(CRIME_GRID_MAX_FEATURES, int(((params.get("limit") or [str(CRIME_GRID_MAX_FEATURES)])[0]).strip())))
+            last_n = int(((params.get("months") or ["0"])[0]).strip() or 0)
+        except ValueError:
+            self._send_json({"ok": False, "error": "zoom, limit and months must be integers"}, status=400)
+            return
+
+        try:
+            state = CRIME_GRID.load(Path(self.directory))
+        except Exception as e:
+            self._send_json({"ok": False, "error": "crime grid unreadable", "detail": str(e)}, status=500)
+            return
+        if state is None:
+            self._send_json({"ok": False, "error": "crime grid not found", "searched": list(CRIME_GRID.sources)}, status=404)
+            return
+
+        month_from = ((params.get("from") or [""])[0]).strip() or None
+        month_to = ((params.get("to") or [""])[0]).strip() or None
+        if last_n > 0 and state["months"] and not month_from:
+            month_from = state["months"][max(0, len(state["months"]) - last_n)]
+        result = CRIME_GRID.query(
+            state,
+            bbox=bbox,
+            zoom=zoom,
+            forces=values("force"),
+            types=values("type"),
+            month_from=month_from,
+            month_to=month_to,
+            limit=limit,
+        )
+        result["ok"] = True
+        if ((params.get("facets") or [""])[0]).strip().lower() in {"1", "true", "yes"}:
+            result["facets"] = state["facets"]
+        self._send_json(result)
+
+    def _get_tile(self, params: Dict[str, List[str]]):
+        match = TILE_PATH_RE.match(self.path.partition("?")[0])
+        if not match:
+            self._send_json({"ok": False, "error": "expected /tiles/<layer>/<z>/<x>/<y>.pbf"}, status=404)
+            return
+        layer = match.group(1)
+        z, x, y = (int(v) for v in match.group(2, 3, 4))
+        if layer not in TILE_LAYERS:
+            self._send_json({"ok": False, "error": "unknown tile layer", "layers": sorted(TILE_LAYERS)}, status=404)
+            return
+        if z > MAX_TILE_ZOOM or x >= (1 << z) or y >= (1 << z):
+            self._send_json({"ok": False, "error": "tile out of range"}, status=400)
+            return
+        try:
+            rel = TILE_CACHE.tile_path(Path(self.directory), layer, z, x, y)
+        except FileNotFoundError as e:
+            self._send_json({"ok": False, "error": str(e)}, status=404)
+            return
+        except Exception as e:
+            self._send_json({"ok": False, "error": "tile render failed", "detail": str(e)}, status=500)
+            return
+        if not self._serve_static("/" + rel.as_posix()):
+            self._send_json({"ok": False, "error": "tile missing from cache"}, status=500)
+
+    def _get_local_companies_search(self, params: Dict[str, List[str]]):
+        def param(name: str) -> str:
+            return ((params.get(name) or [""])[0]).strip()
+
+        criteria = {
+            "name": (params.get("name") or params.get("q") or [""])[0],
+            "number": param("number"),
+            "postcode": param("postcode"),
+            "town": param("town"),
+            "status": param("status"),
+        }
+        if not any(v.strip() for v in criteria.values()):
+            self._send_json({"ok": False, "error": "name, number, postcode or town required"}, status=400)
+            return
+        try:
+            limit = max(1, min(500, int(param("limit") or 50)))
+        except ValueError:
+            limit = 50
+        try:
+            index = CH_LOCAL_INDEX.get(Path(self.directory))
+        except Exception as e:
+            self._send_json({"ok": False, "error": "company index unreadable", "detail": str(e)}, status=500)
+            return
+        if index is None:
+            self._send_json(
+                {"ok": False, "error": "company index not built", "hint": "python scripts/ch_index.py"},
+                status=503,
             )
             return
+        started = time.perf_counter()
+        found = index.search(limit=limit, **criteria)
+        self._send_json(
+            {
+                "ok": True,
+                "results": found["results"],
+                "matched": found["matched"],
+                "truncated": found["truncated"],
+                "rows": index.rows,
+                "generation": index.manifest.get("generation"),
+                "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        )
 
-        if self.path.startswith("/ch/"):
-            api_key = os.environ.get("CH_API_KEY", "").strip()
-            if not api_key:
-                self._send_json_error(500, b'{"error":"CH_API_KEY env var not set"}')
+    def _get_local_companies_fuzzy(self, params: Dict[str, List[str]]):
+        name = ((params.get("name") or params.get("q") or [""])[0]).strip()
+        if not name:
+            self._send_json({"ok": False, "error": "name required"}, status=400)
+            return
+        try:
+            k = max(1, min(200, int(((params.get("k") or params.get("limit") or ["20"])[0]).strip())))
+        except ValueError:
+            k = 20
+        status = ((params.get("status") or [""])[0]).strip()
+        try:
+            index = CH_LOCAL_INDEX.get(Path(self.directory))
+        except Exception as e:
+            self._send_json({"ok": False, "error": "company index unreadable", "detail": str(e)}, status=500)
+            return
+        if index is None:
+            self._send_json(
+                {"ok": False, "error": "company index not built", "hint": "python scripts/ch_index.py"},
+                status=503,
+            )
+            return
+        started = time.perf_counter()
+        found = index.fuzzy(name, k=k, status=status)
+        self._send_json(
+            {
+                "ok": True,
+                "results": found["results"],
+                "matched": found["matched"],
+                "truncated": found["truncated"],
+                "generation": index.manifest.get("generation"),
+                "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        )
+
+    def _get_local_companies_by_postcode(self, params: Dict[str, List[str]]):
+        query = ((params.get("postcode") or params.get("pc") or [""])[0]).strip()
+        if not query:
+            self._send_json({"ok": False, "error": "postcode required"}, status=400)
+            return
+        try:
+            limit = max(1, min(5000, int(((params.get("limit") or ["500"])[0]).strip())))
+        except ValueError:
+            limit = 500
+        try:
+            index = POSTCODE_INDEX.get(Path(self.directory))
+        except Exception as e:
+            self._send_json({"ok": False, "error": "postcode index unreadable", "detail": str(e)}, status=500)
+            return
+        if index is None:
+            self._send_json(
+                {"ok": False, "error": "postcode index not built", "hint": "python scripts/postcode_index.py"},
+                status=503,
+            )
+            return
+        started = time.perf_counter()
+        found = index.lookup(query, limit=limit)
+        if found["kind"] == "invalid":
+            self._send_json({"ok": False, "error": "unrecognised postcode or prefix", "postcode": query}, status=400)
+            return
+        # Attach names from the local company index when it is built; the
+        # postcode table itself only carries numbers.
+        try:
+            companies = CH_LOCAL_INDEX.get(Path(self.directory))
+        except Exception:
+            companies = None
+        if companies is not None and (params.get("records") or ["1"])[0] not in ("0", "false"):
+            for item in found["results"]:
+                record = companies.by_number(item["company_number"])
+                if record:
+                    item["record"] = record
+        self._send_json(
+            {
+                "ok": True,
+                "query": query,
+                "kind": found["kind"],
+                "results": found["results"],
+                "matched": found["total"],
+                "postcodes": found["postcodes"],
+                "truncated": found["total"] > len(found["results"]),
+                "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        )
+
+    def _load_psc_graph(self):
+        try:
+            graph = PSC_GRAPH.get(Path(self.directory))
+        except Exception as e:
+            self._send_json({"ok": False, "error": "PSC graph unreadable", "detail": str(e)}, status=500)
+            return None
+        if graph is None:
+            self._send_json(
+                {"ok": False, "error": "PSC graph not built", "hint": "python scripts/psc_graph.py"},
+                status=503,
+            )
+        return graph
+
+    def _get_local_psc(self, params: Dict[str, List[str]]):
+        parts = [unquote(p) for p in self.path.partition("?")[0].split("/")[3:] if p]
+        if not parts or parts[0] not in ("company", "person", "search"):
+            self._send_json(
+                {"ok": False, "error": "expected /local/psc/company/<number>, /local/psc/person/<id> or /local/psc/search?name=.."},
+                status=404,
+            )
+            return
+        graph = self._load_psc_graph()
+        if graph is None:
+            return
+        started = time.perf_counter()
+        kind = parts[0]
+        if kind == "company":
+            number = parts[1] if len(parts) > 1 else ""
+            items = graph.company_persons(number) if number else None
+            if items is None:
+                self._send_json({"ok": False, "error": "company not in PSC graph", "company_number": number}, status=404)
+                return
+            body = {"company_number": number, "items": items, "total": len(items)}
+        elif kind == "person":
+            try:
+                pid = int(parts[1]) if len(parts) > 1 else -1
+            except ValueError:
+                pid = -1
+            if not 0 <= pid < graph.persons:
+                self._send_json({"ok": False, "error": "unknown person id"}, status=404)
+                return
+            companies = graph.person_companies(pid)
+            body = {"person": graph.person(pid), "companies": companies, "total": len(companies)}
+        else:
+            name = ((params.get("name") or params.get("q") or [""])[0]).strip()
+            if len(name) < 3:
+                self._send_json({"ok": False, "error": "name of at least 3 characters required"}, status=400)
+                return
+            try:
+                limit = max(1, min(500, int(((params.get("limit") or ["50"])[0]).strip())))
+            except ValueError:
+                limit = 50
+            items, truncated = graph.find_persons(name, limit=limit)
+            body = {"items": items, "total": len(items), "truncated": truncated}
+        body.update({"ok": True, "took_ms": round((time.perf_counter() - started) * 1000, 2)})
+        self._send_json(body)
+
+    def _get_local_people(self, params: Dict[str, List[str]]):
+        parts = [unquote(p) for p in self.path.partition("?")[0].split("/")[3:] if p]
+        if not parts or parts[0] not in ("resolve", "cluster"):
+            self._send_json({"ok": False, "error": "expected /local/people/resolve?name=.. or /local/people/cluster/<id>"}, status=404)
+            return
+        try:
+            index = PERSON_INDEX.get(Path(self.directory))
+        except Exception as e:
+            self._send_json({"ok": False, "error": "person index unreadable", "detail": str(e)}, status=500)
+            return
+        if index is None:
+            self._send_json({"ok": False, "error": "person index not built", "hint": "python scripts/person_index.py"}, status=503)
+            return
+        started = time.perf_counter()
+        if parts[0] == "cluster":
+            try:
+                cid = int(parts[1]) if len(parts) > 1 else -1
+            except ValueError:
+                cid = -1
+            if not 0 <= cid < index.clusters:
+                self._send_json({"ok": False, "error": "unknown cluster id"}, status=404)
+                return
+            records = index.cluster_records(cid)
+            body = {"cluster": index.cluster(cid, records), "items": records}
+        else:
+            name = ((params.get("name") or params.get("q") or [""])[0]).strip()
+            born = ((params.get("born") or params.get("dob") or [""])[0]).strip()
+            if len(name) < 3:
+                self._send_json({"ok": False, "error": "name of at least 3 characters required"}, status=400)
+                return
+            if born and not re.match(r"^\d{4}-\d{2}$", born):
+                self._send_json({"ok": False, "error": "born must be YYYY-MM"}, status=400)
+                return
+            try:
+                limit = max(1, min(100, int(((params.get("limit") or ["20"])[0]).strip())))
+            except ValueError:
+                limit = 20
+            items, truncated = index.resolve(name, born, limit=limit)
+            body = {"items": items, "total": len(items), "truncated": truncated}
+        body.update({"ok": True, "took_ms": round((time.perf_counter() - started) * 1000, 2)})
+        self._send_json(body)
+
+    def _get_local_postcode(self, params: Dict[str, List[str]]):
+        postcode = unquote(self.path.partition("?")[0][len("/local/postcode/"):]).strip()
+        if not postcode:
+            self._send_json({"ok": False, "error": "expected /local/postcode/<postcode>"}, status=400)
+            return
+        try:
+            table = ONSPD_TABLE.get(Path(self.directory))
+        except Exception as e:
+            self._send_json({"ok": False, "error": "ONSPD table unreadable", "detail": str(e)}, status=500)
+            return
+        if table is None:
+            self._send_json({"ok": False, "error": "ONSPD table not built", "hint": "python scripts/onspd.py"}, status=503)
+            return
+        started = time.perf_counter()
+        result = table.lookup(postcode)
+        took_ms = round((time.perf_counter() - started) * 1000, 3)
+        if result is None:
+            self._send_json({"ok": False, "error": "postcode not found", "postcode": postcode, "took_ms": took_ms}, status=404)
+            return
+        self._send_json({"ok": True, "result": result, "took_ms": took_ms})
+
+    def _get_local_reverse(self, params: Dict[str, List[str]]):
+        try:
+            lat = float(((params.get("lat") or [""])[0]).strip())
+            lon = float(((params.get("lon") or params.get("lng") or [""])[0]).strip())
+        except ValueError:
+            self._send_json({"ok": False, "error": "lat and lon required"}, status=400)
+            return
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            self._send_json({"ok": False, "error": "lat/lon out of range"}, status=400)
+            return
+        try:
+            k = int(((params.get("k") or params.get("limit") or ["1"])[0]).strip())
+            radius = ((params.get("radius") or [""])[0]).strip()
+            radius_m = float(radius) if radius else None
+        except ValueError:
+            self._send_json({"ok": False, "error": "k and radius must be numbers"}, status=400)
+            return
+        terminated = ((params.get("terminated") or ["0"])[0]).strip().lower() in ("1", "true", "yes")
+        try:
+            table = ONSPD_TABLE.get(Path(self.directory))
+        except Exception as e:
+            self._send_json({"ok": False, "error": "ONSPD table unreadable", "detail": str(e)}, status=500)
+            return
+        if table is None or not table.has_grid:
+            self._send_json({"ok": False, "error": "ONSPD table not built", "hint": "python scripts/onspd.py"}, status=503)
+            return
+        started = time.perf_counter()
+        items = table.nearest(lat, lon, k=k, radius_m=radius_m, terminated=terminated)
+        took_us = round((time.perf_counter() - started) * 1e6)
+        self._send_json({"ok": True, "items": items, "total": len(items), "took_us": took_us})
+
+    def _get_graph_expand(self, params: Dict[str, List[str]]):
+        def values(name: str) -> List[str]:
+            out = []
+            for raw in params.get(name) or []:
+                out.extend(v.strip() for v in raw.split(",") if v.strip())
+            return out
+
+        def bounded(name: str, default: int, upper: int) -> int:
+            try:
+                return max(1, min(upper, int(((params.get(name) or [str(default)])[0]).strip())))
+            except ValueError:
+                return default
+
+        limits = ExpandLimits(
+            depth=bounded("depth", 2, MAX_DEPTH),
+            fanout=bounded("fanout", 25, MAX_FANOUT),
+            max_nodes=bounded("max_nodes", 500, MAX_NODES),
+        )
+        edge_kinds = set(values("edges") or ["psc"])
+        unknown = edge_kinds - {"psc", "officer"}
+        if unknown:
+            self._send_json({"ok": False, "error": "edges must be psc and/or officer", "unknown": sorted(unknown)}, status=400)
+            return
+        # Seeds become Companies House API paths; reject them up front, as
+        # /ch/batch does, rather than spending rate-limit tokens on garbage.
+        company_seeds = [normalize_company_number(n) for n in values("company")]
+        officer_seeds = values("officer")
+        bad = [n for n in company_seeds if not COMPANY_NUMBER_RE.match(n)]
+        if bad:
+            self._send_json({"ok": False, "error": "invalid company number", "invalid": bad[:20]}, status=400)
+            return
+        bad = [o for o in officer_seeds if not OFFICER_ID_RE.match(o)]
+        if bad:
+            self._send_json({"ok": False, "error": "invalid officer id", "invalid": bad[:20]}, status=400)
+            return
+
+        try:
+            graph = PSC_GRAPH.get(Path(self.directory))
+        except Exception:
+            graph = None
+        try:
+            companies = CH_LOCAL_INDEX.get(Path(self.directory))
+        except Exception:
+            companies = None
+
+        def company_label(number: str) -> str:
+            record = companies.by_number(number) if companies is not None else None
+            return record["CompanyName"] if record else ""
+
+        providers = []
+        local = None
+        if "psc" in edge_kinds and graph is not None:
+            local = LocalPSCNeighbours(graph, company_label)
+            providers.append(local)
+        api_psc = "psc" in edge_kinds and graph is None
+        api = None
+        if "officer" in edge_kinds or api_psc:
+            if not os.environ.get("CH_API_KEY", "").strip():
+                self._send_json(
+                    {"ok": False, "error": "CH_API_KEY needed for officer edges or when the PSC graph is not built", "hint": "python scripts/psc_graph.py"},
+                    status=503,
+                )
+                return
+            api = CompaniesHouseNeighbours(
+                self._ch_api_json,
+                officers="officer" in edge_kinds,
+                psc=api_psc,
+                max_calls=bounded("max_calls", 200, 1000),
+            )
+            providers.append(api)
+
+        seeds = [company_node(n, company_label(n)) for n in company_seeds]
+        for pid in values("person"):
+            if local is None or not pid.isdigit() or int(pid) >= graph.persons:
+                self._send_json({"ok": False, "error": f"unknown PSC person id {pid!r}"}, status=400)
+                return
+            seeds.append(local.person_node(int(pid)))
+        seeds.extend({"id": f"officer:{o}", "kind": "officer", "label": o} for o in officer_seeds)
+        if not seeds:
+            self._send_json({"ok": False, "error": "company, person or officer required"}, status=400)
+            return
+
+        def stream():
+            yield {
+                "type": "meta",
+                "depth": limits.depth,
+                "fanout": limits.fanout,
+                "max_nodes": limits.max_nodes,
+                "edges": sorted(edge_kinds),
+                "sources": (["psc_graph"] if local else []) + (["companies_house_api"] if api else []),
+            }
+            for item in expand(seeds, combine(providers), limits):
+                if item["type"] == "done" and api is not None:
+                    item["api_calls"] = api.calls
+                    item["api_skipped"] = api.skipped
+                yield item
+
+        self._send_ndjson(stream(), flush_types=("meta", "level", "done"))
+
+    def _get_dvla_health(self, params: Dict[str, List[str]]):
+        key = os.environ.get("DVLA_API_KEY", "").strip()
+        self._send_json({"ok": True, "configured": bool(key), "endpoint": f"{DVLA_VES_API_BASE}/vehicle-enquiry/v1/vehicles"})
+
+    def _get_osplaces_postcode(self, params: Dict[str, List[str]]):
+        os_key = os.environ.get("OS_PLACES_API_KEY", "").strip()
+        if not os_key:
+            self._send_json_error(500, b'{"error":"OS_PLACES_API_KEY env var not set"}')
+            return
+
+        postcode = (params.get("postcode") or [""])[0].strip()
+        if not postcode:
+            self._send_json_error(400, b'{"error":"postcode query parameter required"}')
+            return
+
+        query = urlencode(
+            {
+                "postcode": postcode,
+                "key": os_key,
+                "maxresults": "1",
+                "output_srs": "EPSG:4326",
+            }
+        )
+        upstream_url = f"{OS_PLACES_API_BASE}/postcode?{query}"
+        self._proxy_get(upstream_url, headers={"Accept": "application/json"}, cache_route="/osplaces/")
+
+    def _get_osplaces_find(self, params: Dict[str, List[str]]):
+        os_key = os.environ.get("OS_PLACES_API_KEY", "").strip()
+        if not os_key:
+            self._send_json_error(500, b'{"error":"OS_PLACES_API_KEY env var not set"}')
+            return
+
+        raw_query = (params.get("query") or [""])[0].strip()
+        if not raw_query:
+            self._send_json_error(400, b'{"error":"query parameter required"}')
+            return
+
+        query = urlencode(
+            {
+                "query": raw_query,
+                "key": os_key,
+                "dataset": "DPA,LPI",
+                "maxresults": "20",
+                "output_srs": "EPSG:4326",
+            }
+        )
+        upstream_url = f"{OS_PLACES_API_BASE}/find?{query}"
+        self._proxy_get(upstream_url, headers={"Accept": "application/json"}, cache_route="/osplaces/")
+
+    def _get_streetview_static(self, params: Dict[str, List[str]]):
+        location = (params.get("location") or [""])[0].strip()
+        size = (params.get("size") or ["400x250"])[0].strip()
+        fov = (params.get("fov") or ["90"])[0].strip()
+        heading = (params.get("heading") or ["0"])[0].strip()
+        pitch = (params.get("pitch") or ["0"])[0].strip()
+        key = (params.get("key") or [""])[0].strip() or os.environ.get("GOOGLE_STREETVIEW_API_KEY", "").strip()
+        if not key:
+            self._send_json_error(500, b'{"error":"GOOGLE_STREETVIEW_API_KEY missing"}')
+            return
+        if not location:
+            self._send_json_error(400, b'{"error":"location query parameter required"}')
+            return
+
+        upstream_qs = urlencode(
+            {
+                "size": size,
+                "location": location,
+                "fov": fov,
+                "heading": heading,
+                "pitch": pitch,
+                "key": key,
+            }
+        )
+        upstream_url = f"https://maps.googleapis.com/maps/api/streetview?{upstream_qs}"
+        req = urllib.request.Request(upstream_url)
+        req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
+        try:
+            with UPSTREAM_POOL.urlopen(req, timeout=30) as resp:
+                body = resp.read()
+                self.send_response(resp.status)
+                self.send_header("Content-Type", resp.headers.get("Content-Type", "image/jpeg"))
+                self.send_header("Cache-Control", "no-store")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+        except urllib.error.HTTPError as e:
+            err_body = e.read() if hasattr(e, "read") else b"{}"
+            self._send_json_error(e.code, err_body)
+            return
+        except Exception as e:
+            self._send_json({"error": "Street View upstream failed", "detail": str(e)}, status=502)
+            return
+
+    def _get_nre_health(self, params: Dict[str, List[str]]):
+        token = os.environ.get("NRE_LDBWS_TOKEN", "").strip()
+        live_dep_url = os.environ.get("RAILDATA_LIVE_DEPARTURE_URL", "").strip()
+        live_dep_key = os.environ.get("RAILDATA_LIVE_DEPARTURE_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()
+        live_board_url = os.environ.get("RAILDATA_LIVE_BOARD_URL", "").strip()
+        live_board_key = os.environ.get("RAILDATA_LIVE_BOARD_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()
+
+        raildata_departures_ready = bool(live_dep_url and live_dep_key)
+        raildata_arrivals_ready = bool(live_board_url and live_board_key)
+        configured = bool(token or raildata_departures_ready or raildata_arrivals_ready)
+
+        provider = "darwin" if token else ("raildata" if (raildata_departures_ready or raildata_arrivals_ready) else "none")
+        self._send_json(
+            {
+                "ok": True,
+                "configured": configured,
+                "provider": provider,
+                "endpoint": os.environ.get("NRE_LDBWS_URL", NRE_LDBWS_URL),
+                "fallback": {
+                    "raildata_departures_ready": raildata_departures_ready,
+                    "raildata_arrivals_ready": raildata_arrivals_ready,
+                },
+            }
+        )
+
+    def _get_raildata_health(self, params: Dict[str, List[str]]):
+        has_direct_token = bool(os.environ.get("RAILDATA_AUTH_TOKEN", "").strip())
+        has_credentials = bool(os.environ.get("RAILDATA_USERNAME", "").strip() and os.environ.get("RAILDATA_PASSWORD", "").strip())
+        self._send_json(
+            {
+                "ok": True,
+                "configured": bool(has_direct_token or has_credentials),
+                "auth_mode": "token" if has_direct_token else ("username_password" if has_credentials else ("apikey" if os.environ.get("RAILDATA_API_KEY", "").strip() else "none")),
+                "kb_feeds": sorted(RAILDATA_KB_FEEDS.keys()),
+                "helpers": [
+                    "/raildata/feeds",
+                    "/raildata/feeds/available",
+                    "/raildata/disruptions",
+                    "/raildata/performance",
+                    "/raildata/performance/reference",
+                    "/raildata/reference",
+                    "/raildata/naptan",
+                    "/raildata/nptg",
+                    "/raildata/proxy?url=<full-feed-url>",
+                ],
+                "endpoint": RAILDATA_API_BASE,
+            }
+        )
+
+    def _get_raildata_feeds_available(self, params: Dict[str, List[str]]):
+        return self._proxy_raildata_url(f"{RAILDATA_API_BASE}/api/feeds/available", auth_mode="token")
+
+    def _get_raildata_feeds(self, params: Dict[str, List[str]]):
+        return self._proxy_raildata_url(f"{RAILDATA_API_BASE}/api/feeds", auth_mode="token")
+
+    def _get_raildata_user(self, params: Dict[str, List[str]]):
+        return self._proxy_raildata_url(f"{RAILDATA_API_BASE}/api/user", auth_mode="token")
+
+    def _get_raildata_kb(self, params: Dict[str, List[str]]):
+        parsed = urlsplit(self.path)
+        feed = parsed.path.replace("/raildata/kb/", "", 1).strip().lower()
+        env_url_map = {
+            "tocs": os.environ.get("RAILDATA_TOC_URL", "").strip(),
+            "stations": os.environ.get("RAILDATA_KB_STATIONS_URL", "").strip(),
+        }
+        env_key_map = {
+            "tocs": "RAILDATA_TOC_API_KEY",
+            "stations": "RAILDATA_KB_STATIONS_API_KEY",
+        }
+        explicit_url = env_url_map.get(feed, "")
+        query = f"?{parsed.query}" if parsed.query else ""
+        if explicit_url:
+            return self._proxy_raildata_url(f"{explicit_url}{query}", auth_mode="apikey", apikey_env=env_key_map.get(feed, "RAILDATA_API_KEY"))
+
+        upstream_path = RAILDATA_KB_FEEDS.get(feed)
+        if not upstream_path:
+            self._send_json(
+                {
+                    "error": "Unknown KB feed",
+                    "feed": feed,
+                    "supported_feeds": sorted(RAILDATA_KB_FEEDS.keys()),
+                },
+                status=400,
+            )
+            return
+        upstream_url = f"{RAILDATA_API_BASE}{upstream_path}{query}"
+        mode = "apikey" if (os.environ.get("RAILDATA_TOC_API_KEY", "").strip() or os.environ.get("RAILDATA_KB_STATIONS_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
+        return self._proxy_raildata_url(upstream_url, auth_mode=mode)
+
+    def _get_raildata_disruptions(self, params: Dict[str, List[str]]):
+        configured = os.environ.get("RAILDATA_DISRUPTIONS_URL", "").strip()
+        upstream_url = configured or f"{RAILDATA_API_BASE}{RAILDATA_KB_FEEDS['incidents']}"
+        mode = "apikey" if (os.environ.get("RAILDATA_DISRUPTIONS_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
+        return self._proxy_raildata_url(upstream_url, auth_mode=mode, apikey_env="RAILDATA_DISRUPTIONS_API_KEY")
+
+    def _get_raildata_performance_reference(self, params: Dict[str, List[str]]):
+        configured = os.environ.get("RAILDATA_NWR_PERFORMANCE_REFERENCE_URL", "").strip()
+        if not configured:
+            self._send_json(
+                {
+                    "error": "RAILDATA_NWR_PERFORMANCE_REFERENCE_URL not set",
+                    "hint": "Paste the exact subscribed endpoint URL from Rail Data My Feeds.",
+                },
+                status=400,
+            )
+            return
+        mode = "apikey" if (os.environ.get("RAILDATA_NWR_PERFORMANCE_REFERENCE_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
+        return self._proxy_raildata_url(configured, auth_mode=mode, apikey_env="RAILDATA_NWR_PERFORMANCE_REFERENCE_API_KEY")
+
+    def _get_raildata_performance(self, params: Dict[str, List[str]]):
+        configured = os.environ.get("RAILDATA_NWR_PERFORMANCE_URL", "").strip()
+        if not configured:
+            self._send_json(
+                {
+                    "error": "RAILDATA_NWR_PERFORMANCE_URL not set",
+                    "hint": "Paste the exact subscribed endpoint URL from Rail Data My Feeds.",
+                },
+                status=400,
+            )
+            return
+        rendered, missing = self._render_url_template(
+            configured,
+            {"stanoxGroup": (params.get("stanoxGroup") or [""])[0]},
+        )
+        if missing:
+            self._send_json({"error": "Missing required query parameter(s)", "missing": missing}, status=400)
+            return
+        mode = "apikey" if (os.environ.get("RAILDATA_NWR_PERFORMANCE_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
+        return self._proxy_raildata_url(rendered, auth_mode=mode, apikey_env="RAILDATA_NWR_PERFORMANCE_API_KEY")
+
+    def _get_raildata_reference(self, params: Dict[str, List[str]]):
+        configured = os.environ.get("RAILDATA_REFERENCE_DATA_URL", "").strip()
+        if not configured:
+            self._send_json(
+                {
+                    "error": "RAILDATA_REFERENCE_DATA_URL not set",
+                    "hint": "Paste the exact subscribed endpoint URL from Rail Data My Feeds.",
+                },
+                status=400,
+            )
+            return
+        rendered, missing = self._render_url_template(
+            configured,
+            {"currentVersion": (params.get("currentVersion") or [""])[0]},
+        )
+        if missing:
+            self._send_json({"error": "Missing required query parameter(s)", "missing": missing}, status=400)
+            return
+        mode = "apikey" if (os.environ.get("RAILDATA_REFERENCE_DATA_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
+        return self._proxy_raildata_url(rendered, auth_mode=mode, apikey_env="RAILDATA_REFERENCE_DATA_API_KEY")
+
+    def _get_raildata_naptan(self, params: Dict[str, List[str]]):
+        configured = os.environ.get("RAILDATA_NAPTAN_URL", "").strip()
+        if not configured:
+            self._send_json(
+                {
+                    "error": "RAILDATA_NAPTAN_URL not set",
+                    "hint": "Paste NaPTAN endpoint URL from Rail Data My Feeds.",
+                },
+                status=400,
+            )
+            return
+        mode = "apikey" if (os.environ.get("RAILDATA_NAPTAN_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
+        return self._proxy_raildata_url(configured, auth_mode=mode, apikey_env="RAILDATA_NAPTAN_API_KEY")
+
+    def _get_raildata_nptg(self, params: Dict[str, List[str]]):
+        configured = os.environ.get("RAILDATA_NPTG_URL", "").strip()
+        if not configured:
+            self._send_json(
+                {
+                    "error": "RAILDATA_NPTG_URL not set",
+                    "hint": "Paste NPTG endpoint URL from Rail Data My Feeds.",
+                },
+                status=400,
+            )
+            return
+        mode = "apikey" if (os.environ.get("RAILDATA_NPTG_API_KEY", "").strip() or os.environ.get("RAILDATA_NAPTAN_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
+        apikey_env = "RAILDATA_NPTG_API_KEY"
+        if not os.environ.get(apikey_env, "").strip() and os.environ.get("RAILDATA_NAPTAN_API_KEY", "").strip():
+            apikey_env = "RAILDATA_NAPTAN_API_KEY"
+        return self._proxy_raildata_url(configured, auth_mode=mode, apikey_env=apikey_env)
+
+    def _get_raildata_service_details(self, params: Dict[str, List[str]]):
+        configured = os.environ.get("RAILDATA_SERVICE_DETAILS_URL", "").strip()
+        if not configured:
+            self._send_json(
+                {
+                    "error": "RAILDATA_SERVICE_DETAILS_URL not set",
+                    "hint": "Paste Service Details endpoint URL from Rail Data My Feeds.",
+                },
+                status=400,
+            )
+            return
+        rendered, missing = self._render_url_template(
+            configured,
+            {"serviceid": (params.get("serviceid") or [""])[0]},
+        )
+        if missing:
+            self._send_json({"error": "Missing required query parameter(s)", "missing": missing}, status=400)
+            return
+        mode = "apikey" if (os.environ.get("RAILDATA_SERVICE_DETAILS_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
+        return self._proxy_raildata_url(rendered, auth_mode=mode, apikey_env="RAILDATA_SERVICE_DETAILS_API_KEY")
+
+    def _get_raildata_live_board(self, params: Dict[str, List[str]]):
+        configured = os.environ.get("RAILDATA_LIVE_BOARD_URL", "").strip()
+        if not configured:
+            self._send_json(
+                {
+                    "error": "RAILDATA_LIVE_BOARD_URL not set",
+                    "hint": "Paste Live Arrival and Departure Boards endpoint URL from Rail Data My Feeds.",
+                },
+                status=400,
+            )
+            return
+        rendered, missing = self._render_url_template(
+            configured,
+            {"crs": (params.get("crs") or [""])[0]},
+        )
+        if missing:
+            self._send_json({"error": "Missing required query parameter(s)", "missing": missing}, status=400)
+            return
+        mode = "apikey" if (os.environ.get("RAILDATA_LIVE_BOARD_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
+        return self._proxy_raildata_url(rendered, auth_mode=mode, apikey_env="RAILDATA_LIVE_BOARD_API_KEY")
+
+    def _get_raildata_proxy(self, params: Dict[str, List[str]]):
+        url = ((params.get("url") or [""])[0]).strip()
+        auth_mode = ((params.get("auth") or ["token"])[0]).strip().lower()
+        if not url:
+            self._send_json({"error": "url query parameter required"}, status=400)
+            return
+        if auth_mode not in {"token", "basic", "apikey", "none"}:
+            self._send_json({"error": "auth must be token|basic|apikey|none"}, status=400)
+            return
+        return self._proxy_raildata_url(url, auth_mode=auth_mode if auth_mode != "none" else "")
+
+    def _get_nre_board(self, params: Dict[str, List[str]]):
+        crs = ((params.get("crs") or [""])[0]).strip().upper()
+        rows = ((params.get("rows") or ["10"])[0]).strip()
+        if not crs or len(crs) != 3:
+            self._send_json({"error": "crs query parameter required (3-letter station code)"}, status=400)
+            return
+        method = "GetDepartureBoard" if self.path.startswith("/nre/departures") else "GetArrivalBoard"
+        body = f"<ldb:numRows>{rows or '10'}</ldb:numRows><ldb:crs>{crs}</ldb:crs>"
+        root, err = self._call_ldbws(method, body)
+        if err:
+            board_type = "departures" if method == "GetDepartureBoard" else "arrivals"
+            fallback_board, fb_err = self._fetch_raildata_board_fallback(crs, board_type)
+            if fallback_board:
+                self._send_json({"ok": True, "type": board_type, "provider": "raildata", "board": fallback_board})
+                return
+            self._send_json({"error": err.get("error", "NRE failed"), "detail": err.get("detail", ""), "fallback": fb_err or {}}, status=502)
+            return
+        board = self._parse_station_board(root)
+        self._send_json({"ok": True, "type": "departures" if method == "GetDepartureBoard" else "arrivals", "board": board})
+
+    def _get_nre_stations(self, params: Dict[str, List[str]]):
+        q = ((params.get("q") or [""])[0]).strip().lower()
+        crs = ((params.get("crs") or [""])[0]).strip().upper()
+        limit_s = ((params.get("limit") or ["20"])[0]).strip()
+        try:
+            limit = max(1, min(5000, int(limit_s)))
+        except Exception:
+            limit = 20
+        try:
+            items = self._load_station_catalog()
+        except Exception as e:
+            self._send_json({"ok": False, "error": "station catalog unavailable", "detail": str(e), "stations": []}, status=502)
+            return
+
+        lat_s = ((params.get("lat") or [""])[0]).strip()
+        lon_s = ((params.get("lon") or params.get("lng") or [""])[0]).strip()
+        if (crs and len(crs) == 3) or (lat_s and lon_s):
+            try:
+                radius_km = float(((params.get("radius") or [str(STATION_NEARBY_RADIUS_KM)])[0]).strip())
+            except ValueError:
+                radius_km = STATION_NEARBY_RADIUS_KM
+            if not math.isfinite(radius_km) or radius_km <= 0:
+                radius_km = STATION_NEARBY_RADIUS_KM
+            radius_km = min(radius_km, STATION_NEARBY_MAX_RADIUS_KM)
+            base = None
+            if crs and len(crs) == 3:
+                base = _station_catalog_cache["by_crs"].get(crs)
+                if not base:
+                    self._send_json({"ok": True, "base": None, "stations": []})
+                    return
+                lat_s, lon_s = base.get("lat"), base.get("lon")
+            try:
+                lat1 = float(lat_s)
+                lon1 = float(lon_s)
+            except Exception:
+                lat1 = lon1 = math.nan
+            if not valid_point(lat1, lon1):
+                if base is not None:
+                    self._send_json({"ok": True, "base": base, "stations": []})
+                else:
+                    self._send_json({"ok": False, "error": "lat/lon must be finite, -90..90 and -180..180", "stations": []}, status=400)
                 return
+            grid = _station_catalog_cache["grid"]
+            nearby = grid.nearest(lat1, lon1, k=limit, radius_km=radius_km, skip=lambda st: st is base)
+            out = []
+            for d, st in nearby:
+                cp = dict(st)
+                cp["distanceKm"] = round(d, 2)
+                out.append(cp)
+            self._send_json({"ok": True, "base": base, "stations": out})
+            return
 
-            upstream_url = CH_API_BASE + self.path.replace("/ch", "", 1)
-            self._proxy_get(
-                upstream_url,
-                headers={
-                    "Authorization": "Basic " + b64(f"{api_key}:"),
-                    "Accept": "application/json",
+        if not q:
+            top = items[:limit]
+            self._send_json({"ok": True, "stations": top})
+            return
+
+        out = [st for _, _, st in _station_catalog_cache["search"].search(q, limit)]
+        self._send_json({"ok": True, "stations": out})
+
+    def _get_places_search(self, params: Dict[str, List[str]]):
+        # One ranked autocomplete over every place catalog: rail stations
+        # (fetched catalog) plus the local airport and port GeoJSON.
+        q = ((params.get("q") or [""])[0]).strip()
+        requested = {k.strip() for k in ((params.get("kinds") or params.get("kind") or [""])[0]).split(",") if k.strip()}
+        # Unknown kinds are dropped; a filter of only unknown kinds matches nothing.
+        kinds = requested & ({"station"} | PLACE_INDEX.kinds)
+        place_kinds = kinds - {"station"}
+        try:
+            limit = max(1, min(100, int(((params.get("limit") or ["20"])[0]).strip())))
+        except ValueError:
+            limit = 20
+        if not q:
+            self._send_json({"ok": False, "error": "q required"}, status=400)
+            return
+        started = time.perf_counter()
+        ranked = []
+        errors = {}
+        if not requested or "station" in kinds:
+            try:
+                self._load_station_catalog()
+                ranked.extend(_station_catalog_cache["search"].search(q, limit))
+            except Exception as e:
+                errors["station"] = str(e)
+        if not requested or place_kinds:
+            ranked.extend(PLACE_INDEX.get(Path(self.directory)).search(q, limit, kinds=place_kinds))
+        ranked.sort(key=lambda hit: (-hit[0], str(hit[2].get("name") or "").lower()))
+        items = [{**item, "kind": kind, "score": score} for score, kind, item in ranked[:limit]]
+        body = {"ok": True, "items": items, "total": len(items), "took_ms": round((time.perf_counter() - started) * 1000, 3)}
+        if errors:
+            body["errors"] = errors
+        self._send_json(body)
+
+    def _get_nre_service(self, params: Dict[str, List[str]]):
+        service_id = ((params.get("service_id") or [""])[0]).strip()
+        if not service_id:
+            self._send_json({"error": "service_id query parameter required"}, status=400)
+            return
+        body = f"<ldb:serviceID>{service_id}</ldb:serviceID>"
+        root, err = self._call_ldbws("GetServiceDetails", body)
+        if err:
+            fallback_service, fb_err = self._fetch_raildata_service_details_fallback(service_id)
+            if fallback_service:
+                self._send_json({"ok": True, "provider": "raildata", "service": fallback_service})
+                return
+            self._send_json({"error": err.get("error", "NRE failed"), "detail": err.get("detail", ""), "fallback": fb_err or {}}, status=502)
+            return
+        self._send_json({"ok": True, "service": self._parse_service_details(root)})
+
+    def _get_api_flightradar_flights(self, params: Dict[str, List[str]]):
+
+        uk_only_raw = ((params.get("ukOnly") or ["0"])[0]).strip().lower()
+        uk_only = uk_only_raw in {"1", "true", "yes", "on"}
+
+        def as_float(value, fallback):
+            try:
+                return float(str(value).strip())
+            except Exception:
+                return fallback
+
+        n = as_float((params.get("n") or [None])[0], FR24_DEFAULT_BOUNDS[0])
+        s = as_float((params.get("s") or [None])[0], FR24_DEFAULT_BOUNDS[1])
+        w = as_float((params.get("w") or [None])[0], FR24_DEFAULT_BOUNDS[2])
+        e = as_float((params.get("e") or [None])[0], FR24_DEFAULT_BOUNDS[3])
+
+        n = max(-90.0, min(90.0, n))
+        s = max(-90.0, min(90.0, s))
+        w = max(-180.0, min(180.0, w))
+        e = max(-180.0, min(180.0, e))
+
+        data = self._fr24_fetch_feed((n, s, w, e))
+        if not data:
+            self._send_json({"ok": False, "error": "FlightRadar24 fetch failed"}, status=502)
+            return
+
+        flights = self._fr24_extract_flights(data)
+        if uk_only:
+            def in_uk_airspace(f):
+                try:
+                    lat = float(f.get("lat"))
+                    lon = float(f.get("lon"))
+                except Exception:
+                    return False
+                return (
+                    UK_AIRSPACE_BOUNDS["south"] <= lat <= UK_AIRSPACE_BOUNDS["north"]
+                    and UK_AIRSPACE_BOUNDS["west"] <= lon <= UK_AIRSPACE_BOUNDS["east"]
+                )
+            flights = [
+                f for f in flights
+                if in_uk_airspace(f)
+                or (
+                    (not isinstance(f.get("lat"), (int, float)) or not isinstance(f.get("lon"), (int, float)))
+                    and (
+                        str(f.get("origin") or "").strip().upper() in UK_AIRPORT_IATA
+                        or str(f.get("destination") or "").strip().upper() in UK_AIRPORT_IATA
+                    )
+                )
+            ]
+
+        self._send_json(
+            {
+                "ok": True,
+                "bounds": {"n": n, "s": s, "w": w, "e": e},
+                "ukOnly": uk_only,
+                "count": len(flights),
+                "flights": flights,
+                "generatedAt": time.time(),
+            }
+        )
+
+    def _get_api_flightradar_flight(self, params: Dict[str, List[str]]):
+        fid = str((params.get("id") or [""])[0] or "").strip()
+        if not fid:
+            self._send_json({"ok": False, "error": "Missing id"}, status=400)
+            return
+        include_trail = str((params.get("trail") or ["1"])[0]).strip().lower() not in {"0", "false", "no", "off"}
+        details = self._fr24_fetch_details(fid)
+        if not details:
+            self._send_json({"ok": False, "error": "FlightRadar24 details fetch failed"}, status=502)
+            return
+
+        out = {
+            "identification": details.get("identification") or {},
+            "status": details.get("status") or {},
+            "aircraft": details.get("aircraft") or {},
+            "airline": details.get("airline") or {},
+            "airport": details.get("airport") or {},
+            "time": details.get("time") or {},
+            "trail": [],
+        }
+        if include_trail:
+            trail = details.get("trail")
+            if isinstance(trail, list):
+                out["trail"] = trail[-600:]
+        self._send_json({"ok": True, "id": fid, "details": out, "generatedAt": time.time()})
+
+    def _get_flight_schedule(self, params: Dict[str, List[str]]):
+        callsign = ((params.get("callsign") or [""])[0]).strip().upper()
+        icao24 = ((params.get("icao24") or [""])[0]).strip().lower()
+        key = os.environ.get("AVIATIONSTACK_API_KEY", "").strip()
+        if not key:
+            self._send_json(
+                {
+                    "ok": False,
+                    "reason": "AVIATIONSTACK_API_KEY env var not set",
+                    "flight": None,
                 },
+                status=200,
             )
             return
-
-        if self.path.startswith("/tfl/"):
-            upstream_url = TFL_API_BASE + self.path.replace("/tfl", "", 1)
-            self._proxy_get(upstream_url, headers={"Accept": "application/json"})
+        if not callsign and not icao24:
+            self._send_json({"ok": False, "reason": "callsign or icao24 required", "flight": None}, status=400)
+            return
+
+        upstream_params = {"access_key": key, "limit": "12"}
+        if callsign:
+            upstream_params["flight_iata"] = callsign
+        upstream_url = f"{AVIATIONSTACK_BASE}/flights?{urlencode(upstream_params)}"
+        req = urllib.request.Request(upstream_url)
+        req.add_header("Accept", "application/json")
+        req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
+        try:
+            with UPSTREAM_POOL.urlopen(req, timeout=25) as resp:
+                body = json.loads(resp.read().decode("utf-8", errors="replace"))
+        except urllib.error.HTTPError as e:
+            detail = ""
+            try:
+                detail = e.read().decode("utf-8", errors="replace")[:500]
+            except Exception:
+                detail = str(e)
+            self._send_json({"ok": False, "reason": f"aviationstack HTTP {e.code}", "detail": detail}, status=502)
+            return
+        except Exception as e:
+            self._send_json({"ok": False, "reason": "aviationstack request failed", "detail": str(e)}, status=502)
+            return
+
+        items = body.get("data") if isinstance(body, dict) else []
+        if not isinstance(items, list):
+            items = []
+
+        def score(item):
+            val = 0
+            cs = str(item.get("flight", {}).get("iata", "")).upper()
+            if callsign and cs == callsign:
+                val += 50
+            if item.get("live"):
+                val += 20
+            if item.get("flight_status"):
+                val += 10
+            return val
+
+        items.sort(key=score, reverse=True)
+        top = items[0] if items else None
+        if not top:
+            self._send_json({"ok": True, "reason": "no schedule match", "flight": None}, status=200)
+            return
+
+        dep = top.get("departure") or {}
+        arr = top.get("arrival") or {}
+        flight_obj = top.get("flight") or {}
+        airline = top.get("airline") or {}
+        out = {
+            "ok": True,
+            "flight": {
+                "flight_code": flight_obj.get("iata") or flight_obj.get("icao") or callsign,
+                "status": top.get("flight_status") or "unknown",
+                "airline": airline.get("name") or "",
+                "departure": {
+                    "airport": dep.get("airport") or dep.get("iata") or dep.get("icao"),
+                    "scheduled": dep.get("scheduled"),
+                    "estimated": dep.get("estimated"),
+                    "actual": dep.get("actual"),
+                    "delay": dep.get("delay"),
+                },
+                "arrival": {
+                    "airport": arr.get("airport") or arr.get("iata") or arr.get("icao"),
+                    "scheduled": arr.get("scheduled"),
+                    "estimated": arr.get("estimated"),
+                    "actual": arr.get("actual"),
+                    "delay": arr.get("delay"),
+                },
+            },
+        }
+        self._send_json(out, status=200)
+
+    def do_POST(self):
+        clean_path, _, query = self.path.partition("?")
+        route = POST_ROUTES.match(clean_path)
+        if route is None:
+            self._send_json({"error": "Not found"}, status=404)
+            return
+        return route(self, parse_qs(query))
+
+    def _post_ch_batch(self, params: Dict[str, List[str]]):
+        if not os.environ.get("CH_API_KEY", "").strip():
+            self._send_json({"error": "CH_API_KEY env var not set"}, status=500)
+            return
+        length = 0
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except Exception:
+            length = 0
+        raw = self.rfile.read(length) if length > 0 else b"{}"
+        try:
+            body = json.loads(raw.decode("utf-8", errors="replace"))
+        except Exception:
+            self._send_json({"error": "Invalid JSON body"}, status=400)
+            return
+        if not isinstance(body, dict):
+            self._send_json({"error": "JSON object body required"}, status=400)
+            return
+        items, requested, rejected = plan_batch(body)
+        if not items:
+            self._send_json({"error": "companies/resources, officers or requests required", "rejected": rejected[:50]}, status=400)
+            return
+        if len(items) > BATCH_MAX_ITEMS:
+            self._send_json({"error": f"at most {BATCH_MAX_ITEMS} unique requests per batch", "unique": len(items)}, status=413)
+            return
+        try:
+            wait_s = max(0.0, min(BATCH_MAX_WAIT, float(body.get("wait", BATCH_DEFAULT_WAIT))))
+        except (TypeError, ValueError):
+            wait_s = BATCH_DEFAULT_WAIT
+
+        def stream():
+            for item in run_batch(items, self._ch_cached, self._ch_fetch, CH_RATE_LIMITER, wait_s=wait_s):
+                if item["type"] == "meta":
+                    item.update({"requested": requested, "rejected": rejected, "wait_s": wait_s})
+                yield item
+
+        self._send_ndjson(stream(), flush_types=("meta", "result", "done"))
+
+    def _post_nre_stations_nearby(self, params: Dict[str, List[str]]):
+        length = 0
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except Exception:
+            length = 0
+        raw = self.rfile.read(length) if length > 0 else b"{}"
+        try:
+            body = json.loads(raw.decode("utf-8", errors="replace"))
+        except Exception:
+            self._send_json({"error": "Invalid JSON body"}, status=400)
+            return
+        points = body.get("points") if isinstance(body, dict) else None
+        if not isinstance(points, list) or not points:
+            self._send_json({"error": "points array of {id, lat, lon} required"}, status=400)
+            return
+        if len(points) > STATION_NEARBY_MAX_POINTS:
+            self._send_json({"error": f"at most {STATION_NEARBY_MAX_POINTS} points per request"}, status=413)
+            return
+        try:
+            k = max(1, min(50, int(body.get("k") or 3)))
+            radius_km = float(body.get("radius_km") or STATION_NEARBY_RADIUS_KM)
+        except (TypeError, ValueError, OverflowError):
+            self._send_json({"error": "k and radius_km must be numbers"}, status=400)
+            return
+        if not math.isfinite(radius_km) or radius_km <= 0:
+            self._send_json({"error": "radius_km must be a positive number"}, status=400)
             return
-
-        if self.path.startswith("/postcodes/"):
-            upstream_url = POSTCODES_API_BASE + self.path.replace("/postcodes", "", 1)
-            self._proxy_get(upstream_url, headers={"Accept": "application/json"})
+        radius_km = min(radius_km, STATION_NEARBY_MAX_RADIUS_KM)
+        try:
+            self._load_station_catalog()
+        except Exception as e:
+            self._send_json({"ok": False, "error": "station catalog unavailable", "detail": str(e)}, status=502)
             return
-
-        if self.path.startswith("/webtris/"):
-            upstream_url = WEBTRIS_API_BASE + "/" + self.path.replace("/webtris/", "", 1)
-            self._proxy_get(upstream_url, headers={"Accept": "application/json"})
+        grid = _station_catalog_cache["grid"]
+        started = time.perf_counter()
+        results = {}
+        invalid = []
+        for i, point in enumerate(points):
+            if not isinstance(point, dict):
+                invalid.append(str(i))
+                continue
+            key = str(point.get("id", i))
+            try:
+                lat, lon = float(point.get("lat")), float(point.get("lon", point.get("lng")))
+            except (TypeError, ValueError, OverflowError):
+                lat = lon = math.nan
+            # One bad point (NaN is valid JSON) gets an empty list, not a 500.
+            if not valid_point(lat, lon):
+                invalid.append(key)
+                results[key] = []
+                continue
+            results[key] = [
+                {"crs": st["crs"], "name": st["name"], "lat": st["lat"], "lon": st["lon"], "distanceKm": round(d, 2)}
+                for d, st in grid.nearest(lat, lon, k=k, radius_km=radius_km)
+            ]
+        self._send_json({"ok": True, "k": k, "radius_km": radius_km, "results": results, "invalid": invalid[:200], "took_ms": round((time.perf_counter() - started) * 1000, 2)})
+
+    def _post_geo_postcodes_bulk(self, params: Dict[str, List[str]]):
+        length = 0
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except Exception:
+            length = 0
+        raw = self.rfile.read(length) if length > 0 else b"{}"
+        try:
+            body = json.loads(raw.decode("utf-8", errors="replace"))
+        except Exception:
+            self._send_json({"error": "Invalid JSON body"}, status=400)
             return
-
-        if self.path.startswith("/dvla/health"):
-            key = os.environ.get("DVLA_API_KEY", "").strip()
-            self._send_json({"ok": True, "configured": bool(key), "endpoint": f"{DVLA_VES_API_BASE}/vehicle-enquiry/v1/vehicles"})
+        # {"postcodes": [...]} or a bare JSON array.
+        values = body.get("postcodes") if isinstance(body, dict) else body
+        if not isinstance(values, list) or not values:
+            self._send_json({"error": "postcodes array required"}, status=400)
             return
+        postcodes, inputs, invalid = plan_postcodes(values)
+        if len(postcodes) > BULK_MAX_POSTCODES:
+            self._send_json({"error": f"at most {BULK_MAX_POSTCODES} unique postcodes per request", "unique": len(postcodes)}, status=413)
+            return
+        try:
+            table = ONSPD_TABLE.get(Path(self.directory))
+        except Exception:
+            table = None
 
-        if self.path.startswith("/osplaces/postcode"):
-            os_key = os.environ.get("OS_PLACES_API_KEY", "").strip()
-            if not os_key:
-                self._send_json_error(500, b'{"error":"OS_PLACES_API_KEY env var not set"}')
-                return
+        def local(postcode: str) -> Optional[dict]:
+            return table.lookup(postcode) if table is not None else None
 
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            postcode = (params.get("postcode") or [""])[0].strip()
-            if not postcode:
-                self._send_json_error(400, b'{"error":"postcode query parameter required"}')
-                return
+        def stream():
+            for item in run_bulk(postcodes, inputs, local, self._postcode_cached, self._postcodes_fetch_bulk):
+                if item["type"] == "meta":
+                    item.update({"requested": len(values), "invalid": invalid[:200], "local_table": table is not None})
+                yield item
 
-            query = urlencode(
-                {
-                    "postcode": postcode,
-                    "key": os_key,
-                    "maxresults": "1",
-                    "output_srs": "EPSG:4326",
-                }
-            )
-            upstream_url = f"{OS_PLACES_API_BASE}/postcode?{query}"
-            self._proxy_get(upstream_url, headers={"Accept": "application/json"})
+        self._send_ndjson(stream(), flush_types=("meta", "done"))
+
+    def _post_dvla_vehicle(self, params: Dict[str, List[str]]):
+        api_key = os.environ.get("DVLA_API_KEY", "").strip()
+        if not api_key:
+            self._send_json({"error": "DVLA_API_KEY env var not set"}, status=500)
+            return
+        length = 0
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except Exception:
+            length = 0
+        raw = self.rfile.read(length) if length > 0 else b"{}"
+        try:
+            body = json.loads(raw.decode("utf-8", errors="replace"))
+        except Exception:
+            self._send_json({"error": "Invalid JSON body"}, status=400)
+            return
+        registration = str(body.get("registrationNumber") or "").upper().replace(" ", "").strip()
+        if not registration:
+            self._send_json({"error": "registrationNumber is required"}, status=400)
             return
 
-        if self.path.startswith("/osplaces/find"):
-            os_key = os.environ.get("OS_PLACES_API_KEY", "").strip()
-            if not os_key:
-                self._send_json_error(500, b'{"error":"OS_PLACES_API_KEY env var not set"}')
+        upstream_url = f"{DVLA_VES_API_BASE}/vehicle-enquiry/v1/vehicles"
+        payload = json.dumps({"registrationNumber": registration}).encode("utf-8")
+        req = urllib.request.Request(upstream_url, data=payload, method="POST")
+        req.add_header("Accept", "application/json")
+        req.add_header("Content-Type", "application/json")
+        req.add_header("x-api-key", api_key)
+        req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
+        try:
+            with UPSTREAM_POOL.urlopen(req, timeout=25) as resp:
+                body = resp.read()
+                self.send_response(resp.status)
+                self.send_header("Content-Type", resp.headers.get("Content-Type", "application/json"))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
                 return
+        except urllib.error.HTTPError as e:
+            err_body = e.read() if hasattr(e, "read") else b"{}"
+            self._send_json_error(e.code, err_body)
+            return
+        except Exception as e:
+            self._send_json({"error": "DVLA upstream failed", "detail": str(e)}, status=502)
+            return
 
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            raw_query = (params.get("query") or [""])[0].strip()
-            if not raw_query:
-                self._send_json_error(400, b'{"error":"query parameter required"}')
-                return
+class RouteTable:
+    # Routes are bucketed by first path segment, longest prefix first, so a
+    # lookup is one dict hit plus a few startswith checks within the bucket;
+    # static asset paths miss the dict and skip route matching entirely.
+    def __init__(self, routes: List[Tuple[str, Any]]):
+        self._buckets: Dict[str, List[Tuple[str, Any]]] = {}
+        for prefix, handler in routes:
+            self.add(prefix, handler)
+
+    @staticmethod
+    def _segment(path: str) -> str:
+        return path[1:].split("/", 1)[0]
+
+    def add(self, prefix: str, handler):
+        bucket = self._buckets.setdefault(self._segment(prefix), [])
+        bucket.append((prefix, handler))
+        bucket.sort(key=lambda item: -len(item[0]))
+
+    def match(self, path: str):
+        for prefix, handler in self._buckets.get(self._segment(path), ()):
+            if path.startswith(prefix):
+                return handler
+        return None
+
+
+GET_ROUTES = RouteTable(
+    [
+        ("/__control_room_health", Handler._get_health),
+        ("/ch/", Handler._get_passthrough),
+        ("/tfl/", Handler._get_passthrough),
+        ("/postcodes/", Handler._get_passthrough),
+        ("/webtris/", Handler._get_passthrough),
+        ("/geo/search", Handler._get_passthrough),
+        ("/crime/grid", Handler._get_crime_grid),
+        ("/tiles/", Handler._get_tile),
+        ("/local/companies/search", Handler._get_local_companies_search),
+        ("/local/companies/fuzzy", Handler._get_local_companies_fuzzy),
+        ("/local/companies/by-postcode", Handler._get_local_companies_by_postcode),
+        ("/local/psc/", Handler._get_local_psc),
+        ("/local/people/", Handler._get_local_people),
+        ("/local/postcode/", Handler._get_local_postcode),
+        ("/local/reverse", Handler._get_local_reverse),
+        ("/graph/expand", Handler._get_graph_expand),
+        ("/dvla/health", Handler._get_dvla_health),
+        ("/osplaces/postcode", Handler._get_osplaces_postcode),
+        ("/osplaces/find", Handler._get_osplaces_find),
+        ("/streetview/static", Handler._get_streetview_static),
+        ("/nre/health", Handler._get_nre_health),
+        ("/raildata/health", Handler._get_raildata_health),
+        ("/raildata/feeds/available", Handler._get_raildata_feeds_available),
+        ("/raildata/feeds", Handler._get_raildata_feeds),
+        ("/raildata/user", Handler._get_raildata_user),
+        ("/raildata/kb/", Handler._get_raildata_kb),
+        ("/raildata/disruptions", Handler._get_raildata_disruptions),
+        ("/raildata/performance/reference", Handler._get_raildata_performance_reference),
+        ("/raildata/performance", Handler._get_raildata_performance),
+        ("/raildata/reference", Handler._get_raildata_reference),
+        ("/raildata/naptan", Handler._get_raildata_naptan),
+        ("/raildata/nptg", Handler._get_raildata_nptg),
+        ("/raildata/service-details", Handler._get_raildata_service_details),
+        ("/raildata/live-board", Handler._get_raildata_live_board),
+        ("/raildata/proxy", Handler._get_raildata_proxy),
+        ("/nre/departures", Handler._get_nre_board),
+        ("/nre/arrivals", Handler._get_nre_board),
+        ("/nre/stations", Handler._get_nre_stations),
+        ("/places/search", Handler._get_places_search),
+        ("/nre/service", Handler._get_nre_service),
+        ("/api/flightradar/flights", Handler._get_api_flightradar_flights),
+        ("/api/flightradar/flight", Handler._get_api_flightradar_flight),
+        ("/flight/schedule", Handler._get_flight_schedule),
+    ]
+)
+
+POST_ROUTES = RouteTable(
+    [
+        ("/dvla/vehicle", Handler._post_dvla_vehicle),
+        ("/ch/batch", Handler._post_ch_batch),
+        ("/geo/postcodes/bulk", Handler._post_geo_postcodes_bulk),
+        ("/nre/stations/nearby", Handler._post_nre_stations_nearby),
+    ]
+)
+
+
+class AsyncUpstreamClient:
+    # Non-blocking counterpart of UpstreamPool for the asyncio engine; shares
+    # its size/timeout settings and keeps its own keep-alive streams per host.
+    def __init__(self, pool: UpstreamPool):
+        self.pool = pool
+        self._idle: Dict[Tuple[str, str, int], List[Tuple[asyncio.StreamReader, asyncio.StreamWriter, float]]] = {}
+        self.stats = {"new": 0, "reused": 0, "retried": 0, "discarded": 0, "requests": 0, "errors": 0}
+
+    def snapshot(self) -> dict:
+        out = dict(self.stats)
+        out["idle"] = sum(len(v) for v in self._idle.values())
+        out["hosts"] = len(self._idle)
+        return out
 
-            query = urlencode(
-                {
-                    "query": raw_query,
-                    "key": os_key,
-                    "dataset": "DPA,LPI",
-                    "maxresults": "20",
-                    "output_srs": "EPSG:4326",
-                }
-            )
-            upstream_url = f"{OS_PLACES_API_BASE}/find?{query}"
-            self._proxy_get(upstream_url, headers={"Accept": "application/json"})
-            return
-
-        if self.path.startswith("/streetview/static"):
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            location = (params.get("location") or [""])[0].strip()
-            size = (params.get("size") or ["400x250"])[0].strip()
-            fov = (params.get("fov") or ["90"])[0].strip()
-            heading = (params.get("heading") or ["0"])[0].strip()
-            pitch = (params.get("pitch") or ["0"])[0].strip()
-            key = (params.get("key") or [""])[0].strip() or os.environ.get("GOOGLE_STREETVIEW_API_KEY", "").strip()
-            if not key:
-                self._send_json_error(500, b'{"error":"GOOGLE_STREETVIEW_API_KEY missing"}')
-                return
-            if not location:
-                self._send_json_error(400, b'{"error":"location query parameter required"}')
-                return
+    async def close_all(self):
+        pools = list(self._idle.values())
+        self._idle.clear()
+        for entries in pools:
+            for _, writer, _ in entries:
+                writer.close()
+
+    async def _acquire(self, key: Tuple[str, str, int]):
+        entries = self._idle.get(key) or []
+        while entries:
+            reader, writer, last_used = entries.pop()
+            if time.monotonic() - last_used > self.pool.idle_timeout or reader.at_eof() or writer.is_closing():
+                writer.close()
+                self.stats["discarded"] += 1
+                continue
+            self.stats["reused"] += 1
+            return reader, writer, True
+        scheme, host, port = key
+        ssl_ctx = self.pool._ssl_context if scheme == "https" else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ssl_ctx, server_hostname=host if ssl_ctx else None),
+            timeout=self.pool.connect_timeout,
+        )
+        self.stats["new"] += 1
+        return reader, writer, False
 
-            upstream_qs = urlencode(
-                {
-                    "size": size,
-                    "location": location,
-                    "fov": fov,
-                    "heading": heading,
-                    "pitch": pitch,
-                    "key": key,
-                }
-            )
-            upstream_url = f"https://maps.googleapis.com/maps/api/streetview?{upstream_qs}"
-            req = urllib.request.Request(upstream_url)
-            req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
+    def _release(self, key: Tuple[str, str, int], reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        entries = self._idle.setdefault(key, [])
+        if len(entries) < self.pool.max_per_host:
+            entries.append((reader, writer, time.monotonic()))
+            return
+        writer.close()
+        self.stats["discarded"] += 1
+
+    async def _read_response(self, reader: asyncio.StreamReader, method: str):
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError("upstream closed connection")
+            parts = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+            if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+                raise http.client.BadStatusLine(status_line)
+            version, status = parts[0], int(parts[1])
+            reason = parts[2] if len(parts) > 2 else ""
+            raw_headers = []
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                raw_headers.append(line)
+            headers = http.client.parse_headers(io.BytesIO(b"".join(raw_headers) + b"\r\n"))
+            if 100 <= status < 200:
+                continue
+            break
+
+        conn_hdr = (headers.get("Connection") or "").lower()
+        will_close = "close" in conn_hdr or (version == "HTTP/1.0" and "keep-alive" not in conn_hdr)
+        if method == "HEAD" or status in (204, 304):
+            return status, reason, headers, b"", will_close
+        if "chunked" in (headers.get("Transfer-Encoding") or "").lower():
+            chunks = []
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            return status, reason, headers, b"".join(chunks), will_close
+        length = headers.get("Content-Length")
+        if length is not None:
+            return status, reason, headers, await reader.readexactly(int(length)), will_close
+        return status, reason, headers, await reader.read(), True
+
+    async def _send_once(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes], timeout: float):
+        parts = urlsplit(url)
+        scheme = (parts.scheme or "http").lower()
+        if scheme not in {"http", "https"}:
+            raise urllib.error.URLError(f"unsupported scheme: {scheme}")
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        host_header = host if parts.port is None else f"{host}:{port}"
+
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host_header}"]
+        lines += [f"{k}: {v}" for k, v in headers.items() if k.lower() not in {"host", "content-length", "connection"}]
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        for attempt in range(2):
+            reader, writer, reused = await self._acquire(key)
             try:
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    body = resp.read()
-                    self.send_response(resp.status)
-                    self.send_header("Content-Type", resp.headers.get("Content-Type", "image/jpeg"))
-                    self.send_header("Cache-Control", "no-store")
-                    self.send_header("Access-Control-Allow-Origin", "*")
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
+                writer.write(head + (body or b""))
+                await writer.drain()
+                status, reason, resp_headers, data, will_close = await asyncio.wait_for(
+                    self._read_response(reader, method), timeout=timeout
+                )
+            except (ConnectionError, asyncio.IncompleteReadError, http.client.BadStatusLine) as e:
+                writer.close()
+                # Same replay rule as UpstreamPool: idempotent methods only.
+                if reused and attempt == 0 and method.upper() in UpstreamPool.REPLAY_METHODS:
+                    self.stats["retried"] += 1
+                    continue
+                raise urllib.error.URLError(e)
+            except BaseException:
+                writer.close()
+                raise
+            if will_close:
+                writer.close()
+            else:
+                self._release(key, reader, writer)
+            return status, reason, resp_headers, data
+        raise urllib.error.URLError("upstream connection failed")
+
+    async def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, body: Optional[bytes] = None, timeout: float = 30):
+        scheme = urlsplit(url).scheme.lower()
+        if scheme in urllib.request.getproxies() and not urllib.request.proxy_bypass(urlsplit(url).hostname or ""):
+            loop = asyncio.get_running_loop()
+            try:
+                resp = await loop.run_in_executor(None, lambda: self.pool.request(method, url, headers, body, timeout))
+                return resp.status, resp.reason, resp.headers, resp.read()
             except urllib.error.HTTPError as e:
-                err_body = e.read() if hasattr(e, "read") else b"{}"
-                self._send_json_error(e.code, err_body)
-                return
-            except Exception as e:
-                self._send_json({"error": "Street View upstream failed", "detail": str(e)}, status=502)
-                return
-
-        if self.path.startswith("/nre/health"):
-            token = os.environ.get("NRE_LDBWS_TOKEN", "").strip()
-            live_dep_url = os.environ.get("RAILDATA_LIVE_DEPARTURE_URL", "").strip()
-            live_dep_key = os.environ.get("RAILDATA_LIVE_DEPARTURE_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()
-            live_board_url = os.environ.get("RAILDATA_LIVE_BOARD_URL", "").strip()
-            live_board_key = os.environ.get("RAILDATA_LIVE_BOARD_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()
-
-            raildata_departures_ready = bool(live_dep_url and live_dep_key)
-            raildata_arrivals_ready = bool(live_board_url and live_board_key)
-            configured = bool(token or raildata_departures_ready or raildata_arrivals_ready)
-
-            provider = "darwin" if token else ("raildata" if (raildata_departures_ready or raildata_arrivals_ready) else "none")
-            self._send_json(
-                {
-                    "ok": True,
-                    "configured": configured,
-                    "provider": provider,
-                    "endpoint": os.environ.get("NRE_LDBWS_URL", NRE_LDBWS_URL),
-                    "fallback": {
-                        "raildata_departures_ready": raildata_departures_ready,
-                        "raildata_arrivals_ready": raildata_arrivals_ready,
-                    },
-                }
-            )
-            return
-
-        if self.path.startswith("/raildata/health"):
-            has_direct_token = bool(os.environ.get("RAILDATA_AUTH_TOKEN", "").strip())
-            has_credentials = bool(os.environ.get("RAILDATA_USERNAME", "").strip() and os.environ.get("RAILDATA_PASSWORD", "").strip())
-            self._send_json(
-                {
-                    "ok": True,
-                    "configured": bool(has_direct_token or has_credentials),
-                    "auth_mode": "token" if has_direct_token else ("username_password" if has_credentials else ("apikey" if os.environ.get("RAILDATA_API_KEY", "").strip() else "none")),
-                    "kb_feeds": sorted(RAILDATA_KB_FEEDS.keys()),
-                    "helpers": [
-                        "/raildata/feeds",
-                        "/raildata/feeds/available",
-                        "/raildata/disruptions",
-                        "/raildata/performance",
-                        "/raildata/performance/reference",
-                        "/raildata/reference",
-                        "/raildata/naptan",
-                        "/raildata/nptg",
-                        "/raildata/proxy?url=<full-feed-url>",
-                    ],
-                    "endpoint": RAILDATA_API_BASE,
-                }
-            )
+                return e.code, e.reason, e.headers, e.read()
+
+        effective_timeout = self.pool.read_timeout or float(timeout)
+        send_headers = {"User-Agent": "ControlRoom/1.0 (+https://localhost)"}
+        for key, value in (headers or {}).items():
+            for existing in [k for k in send_headers if k.lower() == key.lower()]:
+                del send_headers[existing]
+            send_headers[key] = value
+        self.stats["requests"] += 1
+        try:
+            for _ in range(6):
+                status, reason, resp_headers, data = await self._send_once(method, url, send_headers, body, effective_timeout)
+                location = resp_headers.get("Location")
+                if status in UpstreamPool.REDIRECT_CODES and location:
+                    url = urljoin(url, location)
+                    if status == 303 or (status in {301, 302} and method == "POST"):
+                        method, body = "GET", None
+                    continue
+                break
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        return status, reason, resp_headers, data
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.stats = {"leaders": 0, "shared": 0}
+
+    async def do(self, key: str, factory):
+        fut = self._calls.get(key)
+        if fut is not None:
+            self.stats["shared"] += 1
+            return await asyncio.shield(fut)
+        self.stats["leaders"] += 1
+        fut = asyncio.ensure_future(factory())
+        self._calls[key] = fut
+        fut.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(fut)
+
+
+class _BridgeWriter:
+    # wfile for a Handler running on a worker thread: every write is handed
+    # to the event loop and waits for drain, so large bodies stream with
+    # backpressure instead of buffering in memory.
+    def __init__(self, loop: asyncio.AbstractEventLoop, writer: asyncio.StreamWriter):
+        self.loop = loop
+        self.writer = writer
+        self.head = b""
+        self.head_done = False
+        self.framed = False
+        self.close_requested = False
+
+    def _sniff_head(self, data: bytes):
+        self.head += data
+        end = self.head.find(b"\r\n\r\n")
+        if end < 0:
             return
+        self.head_done = True
+        head = self.head[:end].lower()
+        status = head.split(b" ", 2)[1] if head.count(b" ") >= 1 else b""
+        self.framed = (
+            b"\r\ncontent-length:" in head
+            or b"\r\ntransfer-encoding: chunked" in head
+            or status in (b"204", b"304")
+        )
+        self.close_requested = b"\r\nconnection: close" in head
+        self.head = b""
 
-        if self.path.startswith("/raildata/feeds/available"):
-            return self._proxy_raildata_url(f"{RAILDATA_API_BASE}/api/feeds/available", auth_mode="token")
-
-        if self.path.startswith("/raildata/feeds"):
-            return self._proxy_raildata_url(f"{RAILDATA_API_BASE}/api/feeds", auth_mode="token")
-
-        if self.path.startswith("/raildata/user"):
-            return self._proxy_raildata_url(f"{RAILDATA_API_BASE}/api/user", auth_mode="token")
+    async def _send(self, data: bytes):
+        self.writer.write(data)
+        await self.writer.drain()
 
-        if self.path.startswith("/raildata/kb/"):
-            parsed = urlsplit(self.path)
-            feed = parsed.path.replace("/raildata/kb/", "", 1).strip().lower()
-            env_url_map = {
-                "tocs": os.environ.get("RAILDATA_TOC_URL", "").strip(),
-                "stations": os.environ.get("RAILDATA_KB_STATIONS_URL", "").strip(),
-            }
-            env_key_map = {
-                "tocs": "RAILDATA_TOC_API_KEY",
-                "stations": "RAILDATA_KB_STATIONS_API_KEY",
-            }
-            explicit_url = env_url_map.get(feed, "")
-            query = f"?{parsed.query}" if parsed.query else ""
-            if explicit_url:
-                return self._proxy_raildata_url(f"{explicit_url}{query}", auth_mode="apikey", apikey_env=env_key_map.get(feed, "RAILDATA_API_KEY"))
+    def write(self, data) -> int:
+        data = bytes(data)
+        if not data:
+            return 0
+        if not self.head_done:
+            self._sniff_head(data)
+        asyncio.run_coroutine_threadsafe(self._send(data), self.loop).result()
+        return len(data)
 
-            upstream_path = RAILDATA_KB_FEEDS.get(feed)
-            if not upstream_path:
-                self._send_json(
-                    {
-                        "error": "Unknown KB feed",
-                        "feed": feed,
-                        "supported_feeds": sorted(RAILDATA_KB_FEEDS.keys()),
-                    },
-                    status=400,
-                )
-                return
-            upstream_url = f"{RAILDATA_API_BASE}{upstream_path}{query}"
-            mode = "apikey" if (os.environ.get("RAILDATA_TOC_API_KEY", "").strip() or os.environ.get("RAILDATA_KB_STATIONS_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
-            return self._proxy_raildata_url(upstream_url, auth_mode=mode)
-
-        if self.path.startswith("/raildata/disruptions"):
-            configured = os.environ.get("RAILDATA_DISRUPTIONS_URL", "").strip()
-            upstream_url = configured or f"{RAILDATA_API_BASE}{RAILDATA_KB_FEEDS['incidents']}"
-            mode = "apikey" if (os.environ.get("RAILDATA_DISRUPTIONS_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
-            return self._proxy_raildata_url(upstream_url, auth_mode=mode, apikey_env="RAILDATA_DISRUPTIONS_API_KEY")
-
-        if self.path.startswith("/raildata/performance/reference"):
-            configured = os.environ.get("RAILDATA_NWR_PERFORMANCE_REFERENCE_URL", "").strip()
-            if not configured:
-                self._send_json(
-                    {
-                        "error": "RAILDATA_NWR_PERFORMANCE_REFERENCE_URL not set",
-                        "hint": "Paste the exact subscribed endpoint URL from Rail Data My Feeds.",
-                    },
-                    status=400,
-                )
-                return
-            mode = "apikey" if (os.environ.get("RAILDATA_NWR_PERFORMANCE_REFERENCE_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
-            return self._proxy_raildata_url(configured, auth_mode=mode, apikey_env="RAILDATA_NWR_PERFORMANCE_REFERENCE_API_KEY")
+    async def _sendfile(self, f, offset: int, count: int):
+        await self.writer.drain()
+        await self.loop.sendfile(self.writer.transport, f, offset, count)
 
-        if self.path.startswith("/raildata/performance"):
-            configured = os.environ.get("RAILDATA_NWR_PERFORMANCE_URL", "").strip()
-            if not configured:
-                self._send_json(
-                    {
-                        "error": "RAILDATA_NWR_PERFORMANCE_URL not set",
-                        "hint": "Paste the exact subscribed endpoint URL from Rail Data My Feeds.",
-                    },
-                    status=400,
-                )
-                return
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            rendered, missing = self._render_url_template(
-                configured,
-                {"stanoxGroup": (params.get("stanoxGroup") or [""])[0]},
-            )
-            if missing:
-                self._send_json({"error": "Missing required query parameter(s)", "missing": missing}, status=400)
-                return
-            mode = "apikey" if (os.environ.get("RAILDATA_NWR_PERFORMANCE_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
-            return self._proxy_raildata_url(rendered, auth_mode=mode, apikey_env="RAILDATA_NWR_PERFORMANCE_API_KEY")
+    def sendfile(self, f, offset: int, count: int):
+        asyncio.run_coroutine_threadsafe(self._sendfile(f, offset, count), self.loop).result()
 
-        if self.path.startswith("/raildata/reference"):
-            configured = os.environ.get("RAILDATA_REFERENCE_DATA_URL", "").strip()
-            if not configured:
-                self._send_json(
-                    {
-                        "error": "RAILDATA_REFERENCE_DATA_URL not set",
-                        "hint": "Paste the exact subscribed endpoint URL from Rail Data My Feeds.",
-                    },
-                    status=400,
-                )
-                return
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            rendered, missing = self._render_url_template(
-                configured,
-                {"currentVersion": (params.get("currentVersion") or [""])[0]},
-            )
-            if missing:
-                self._send_json({"error": "Missing required query parameter(s)", "missing": missing}, status=400)
-                return
-            mode = "apikey" if (os.environ.get("RAILDATA_REFERENCE_DATA_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
-            return self._proxy_raildata_url(rendered, auth_mode=mode, apikey_env="RAILDATA_REFERENCE_DATA_API_KEY")
+    def flush(self):
+        pass
 
-        if self.path.startswith("/raildata/naptan"):
-            configured = os.environ.get("RAILDATA_NAPTAN_URL", "").strip()
-            if not configured:
-                self._send_json(
-                    {
-                        "error": "RAILDATA_NAPTAN_URL not set",
-                        "hint": "Paste NaPTAN endpoint URL from Rail Data My Feeds.",
-                    },
-                    status=400,
-                )
-                return
-            mode = "apikey" if (os.environ.get("RAILDATA_NAPTAN_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
-            return self._proxy_raildata_url(configured, auth_mode=mode, apikey_env="RAILDATA_NAPTAN_API_KEY")
 
-        if self.path.startswith("/raildata/nptg"):
-            configured = os.environ.get("RAILDATA_NPTG_URL", "").strip()
-            if not configured:
-                self._send_json(
-                    {
-                        "error": "RAILDATA_NPTG_URL not set",
-                        "hint": "Paste NPTG endpoint URL from Rail Data My Feeds.",
-                    },
-                    status=400,
-                )
-                return
-            mode = "apikey" if (os.environ.get("RAILDATA_NPTG_API_KEY", "").strip() or os.environ.get("RAILDATA_NAPTAN_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
-            apikey_env = "RAILDATA_NPTG_API_KEY"
-            if not os.environ.get(apikey_env, "").strip() and os.environ.get("RAILDATA_NAPTAN_API_KEY", "").strip():
-                apikey_env = "RAILDATA_NAPTAN_API_KEY"
-            return self._proxy_raildata_url(configured, auth_mode=mode, apikey_env=apikey_env)
-
-        if self.path.startswith("/raildata/service-details"):
-            configured = os.environ.get("RAILDATA_SERVICE_DETAILS_URL", "").strip()
-            if not configured:
-                self._send_json(
-                    {
-                        "error": "RAILDATA_SERVICE_DETAILS_URL not set",
-                        "hint": "Paste Service Details endpoint URL from Rail Data My Feeds.",
-                    },
-                    status=400,
-                )
-                return
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            rendered, missing = self._render_url_template(
-                configured,
-                {"serviceid": (params.get("serviceid") or [""])[0]},
-            )
-            if missing:
-                self._send_json({"error": "Missing required query parameter(s)", "missing": missing}, status=400)
-                return
-            mode = "apikey" if (os.environ.get("RAILDATA_SERVICE_DETAILS_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
-            return self._proxy_raildata_url(rendered, auth_mode=mode, apikey_env="RAILDATA_SERVICE_DETAILS_API_KEY")
+class _BridgedHandler(Handler):
+    def __init__(self, raw_request: bytes, wfile: _BridgeWriter, client_address, server):
+        self._raw_request = raw_request
+        self._bridge_wfile = wfile
+        super().__init__(None, client_address, server)
 
-        if self.path.startswith("/raildata/live-board"):
-            configured = os.environ.get("RAILDATA_LIVE_BOARD_URL", "").strip()
-            if not configured:
-                self._send_json(
-                    {
-                        "error": "RAILDATA_LIVE_BOARD_URL not set",
-                        "hint": "Paste Live Arrival and Departure Boards endpoint URL from Rail Data My Feeds.",
-                    },
-                    status=400,
-                )
-                return
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            rendered, missing = self._render_url_template(
-                configured,
-                {"crs": (params.get("crs") or [""])[0]},
-            )
-            if missing:
-                self._send_json({"error": "Missing required query parameter(s)", "missing": missing}, status=400)
-                return
-            mode = "apikey" if (os.environ.get("RAILDATA_LIVE_BOARD_API_KEY", "").strip() or os.environ.get("RAILDATA_API_KEY", "").strip()) else "token"
-            return self._proxy_raildata_url(rendered, auth_mode=mode, apikey_env="RAILDATA_LIVE_BOARD_API_KEY")
-
-        if self.path.startswith("/raildata/proxy"):
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            url = ((params.get("url") or [""])[0]).strip()
-            auth_mode = ((params.get("auth") or ["token"])[0]).strip().lower()
-            if not url:
-                self._send_json({"error": "url query parameter required"}, status=400)
-                return
-            if auth_mode not in {"token", "basic", "apikey", "none"}:
-                self._send_json({"error": "auth must be token|basic|apikey|none"}, status=400)
-                return
-            return self._proxy_raildata_url(url, auth_mode=auth_mode if auth_mode != "none" else "")
-
-        if self.path.startswith("/nre/departures") or self.path.startswith("/nre/arrivals"):
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            crs = ((params.get("crs") or [""])[0]).strip().upper()
-            rows = ((params.get("rows") or ["10"])[0]).strip()
-            if not crs or len(crs) != 3:
-                self._send_json({"error": "crs query parameter required (3-letter station code)"}, status=400)
-                return
-            method = "GetDepartureBoard" if self.path.startswith("/nre/departures") else "GetArrivalBoard"
-            body = f"<ldb:numRows>{rows or '10'}</ldb:numRows><ldb:crs>{crs}</ldb:crs>"
-            root, err = self._call_ldbws(method, body)
-            if err:
-                board_type = "departures" if method == "GetDepartureBoard" else "arrivals"
-                fallback_board, fb_err = self._fetch_raildata_board_fallback(crs, board_type)
-                if fallback_board:
-                    self._send_json({"ok": True, "type": board_type, "provider": "raildata", "board": fallback_board})
-                    return
-                self._send_json({"error": err.get("error", "NRE failed"), "detail": err.get("detail", ""), "fallback": fb_err or {}}, status=502)
-                return
-            board = self._parse_station_board(root)
-            self._send_json({"ok": True, "type": "departures" if method == "GetDepartureBoard" else "arrivals", "board": board})
-            return
+    def setup(self):
+        self.rfile = io.BytesIO(self._raw_request)
+        self.wfile = self._bridge_wfile
 
-        if self.path.startswith("/nre/stations"):
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            q = ((params.get("q") or [""])[0]).strip().lower()
-            crs = ((params.get("crs") or [""])[0]).strip().upper()
-            limit_s = ((params.get("limit") or ["20"])[0]).strip()
-            try:
-                limit = max(1, min(5000, int(limit_s)))
-            except Exception:
-                limit = 20
-            try:
-                items = self._load_station_catalog()
-            except Exception as e:
-                self._send_json({"ok": False, "error": "station catalog unavailable", "detail": str(e), "stations": []}, status=502)
-                return
+    def handle(self):
+        # Exactly one request per call; keep-alive is owned by the event loop,
+        # and an unread request body must not be parsed as a second request.
+        self.handle_one_request()
 
-            if crs and len(crs) == 3:
-                base = None
-                for st in items:
-                    if st["crs"] == crs:
-                        base = st
-                        break
-                if not base:
-                    self._send_json({"ok": True, "base": None, "stations": []})
-                    return
-                try:
-                    lat1 = float(base.get("lat"))
-                    lon1 = float(base.get("lon"))
-                except Exception:
-                    self._send_json({"ok": True, "base": base, "stations": []})
-                    return
-                nearby = []
-                for st in items:
-                    if st["crs"] == crs:
-                        continue
-                    try:
-                        lat2 = float(st.get("lat"))
-                        lon2 = float(st.get("lon"))
-                    except Exception:
-                        continue
-                    d = self._haversine_km(lat1, lon1, lat2, lon2)
-                    if d <= 45:
-                        nearby.append((d, st))
-                nearby.sort(key=lambda x: x[0])
-                out = []
-                for d, st in nearby[:limit]:
-                    cp = dict(st)
-                    cp["distanceKm"] = round(d, 2)
-                    out.append(cp)
-                self._send_json({"ok": True, "base": base, "stations": out})
-                return
+    def finish(self):
+        pass
 
-            if not q:
-                top = items[:limit]
-                self._send_json({"ok": True, "stations": top})
-                return
 
-            q_upper = q.upper()
-            scored = []
-            for st in items:
-                name_l = st["name"].lower()
-                crs = st["crs"]
-                score = 0
-                if crs == q_upper:
-                    score += 200
-                elif crs.startswith(q_upper):
-                    score += 120
-                if name_l.startswith(q):
-                    score += 80
-                if q in name_l:
-                    score += 40
-                if score > 0:
-                    scored.append((score, st))
-
-            scored.sort(key=lambda pair: (-pair[0], pair[1]["name"]))
-            out = [s for _, s in scored[:limit]]
-            self._send_json({"ok": True, "stations": out})
-            return
-
-        if self.path.startswith("/nre/service"):
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            service_id = ((params.get("service_id") or [""])[0]).strip()
-            if not service_id:
-                self._send_json({"error": "service_id query parameter required"}, status=400)
-                return
-            body = f"<ldb:serviceID>{service_id}</ldb:serviceID>"
-            root, err = self._call_ldbws("GetServiceDetails", body)
-            if err:
-                fallback_service, fb_err = self._fetch_raildata_service_details_fallback(service_id)
-                if fallback_service:
-                    self._send_json({"ok": True, "provider": "raildata", "service": fallback_service})
-                    return
-                self._send_json({"error": err.get("error", "NRE failed"), "detail": err.get("detail", ""), "fallback": fb_err or {}}, status=502)
-                return
-            self._send_json({"ok": True, "service": self._parse_service_details(root)})
-            return
+class _StaticBuffer:
+    # wfile for static responses answered on the event loop: headers and
+    # cached bodies are collected in memory, file ranges are kept as
+    # duplicated descriptors and sent afterwards with loop.sendfile.
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.files: List[tuple] = []
 
-        if self.path.startswith("/geo/search"):
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            q = ((params.get("q") or [""])[0]).strip()
-            limit = ((params.get("limit") or ["1"])[0]).strip()
-            if not q:
-                self._send_json({"error": "q query parameter required"}, status=400)
-                return
-            upstream = f"{NOMINATIM_BASE}?q={quote_plus(q)}&format=jsonv2&limit={quote_plus(limit)}"
-            self._proxy_get(
-                upstream,
-                headers={
-                    "Accept": "application/json",
-                    "User-Agent": "ControlRoom/1.0 (+https://localhost)",
-                },
-            )
-            return
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
 
-        if self.path.startswith("/api/flightradar/flights"):
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
+    def sendfile(self, f, offset: int, count: int):
+        self.files.append((os.fdopen(os.dup(f.fileno()), "rb"), offset, count))
 
-            uk_only_raw = ((params.get("ukOnly") or ["0"])[0]).strip().lower()
-            uk_only = uk_only_raw in {"1", "true", "yes", "on"}
+    def flush(self):
+        pass
 
-            def as_float(value, fallback):
-                try:
-                    return float(str(value).strip())
-                except Exception:
-                    return fallback
 
-            n = as_float((params.get("n") or [None])[0], FR24_DEFAULT_BOUNDS[0])
-            s = as_float((params.get("s") or [None])[0], FR24_DEFAULT_BOUNDS[1])
-            w = as_float((params.get("w") or [None])[0], FR24_DEFAULT_BOUNDS[2])
-            e = as_float((params.get("e") or [None])[0], FR24_DEFAULT_BOUNDS[3])
+class _NativeStaticHandler(_BridgedHandler):
+    # Runs only the static-file path of Handler, synchronously on the event
+    # loop thread. Anything it does not serve (directories, 404s) is left
+    # unwritten so the caller can delegate the request instead.
+    served = False
 
-            n = max(-90.0, min(90.0, n))
-            s = max(-90.0, min(90.0, s))
-            w = max(-180.0, min(180.0, w))
-            e = max(-180.0, min(180.0, e))
+    def handle(self):
+        self.raw_requestline = self.rfile.readline(65537)
+        if not self.parse_request():
+            self.served = True
+            return
+        self.served = self._serve_static(self.path.partition("?")[0], head_only=self.command == "HEAD")
+
+    def _compressed_static(self, fs_path: Path, stat, encoding: str) -> Optional[bytes]:
+        # Never compress on the loop: until a worker has built the cached
+        # body, this request gets the identity file.
+        key = static_cache_key(fs_path, encoding)
+        found, body = STATIC_CACHE.peek(key, (stat.st_mtime_ns, stat.st_size))
+        if not found:
+            self.server.warm_static(key, lambda: Handler._compressed_static(self, fs_path, stat, encoding))
+        return body
+
+    def _sendfile_static(self, f, start: int, length: int) -> bool:
+        self.wfile.sendfile(f, start, length)
+        return True
 
-            data = self._fr24_fetch_feed((n, s, w, e))
-            if not data:
-                self._send_json({"ok": False, "error": "FlightRadar24 fetch failed"}, status=502)
-                return
 
-            flights = self._fr24_extract_flights(data)
-            if uk_only:
-                def in_uk_airspace(f):
-                    try:
-                        lat = float(f.get("lat"))
-                        lon = float(f.get("lon"))
-                    except Exception:
-                        return False
-                    return (
-                        UK_AIRSPACE_BOUNDS["south"] <= lat <= UK_AIRSPACE_BOUNDS["north"]
-                        and UK_AIRSPACE_BOUNDS["west"] <= lon <= UK_AIRSPACE_BOUNDS["east"]
-                    )
-                flights = [
-                    f for f in flights
-                    if in_uk_airspace(f)
-                    or (
-                        (not isinstance(f.get("lat"), (int, float)) or not isinstance(f.get("lon"), (int, float)))
-                        and (
-                            str(f.get("origin") or "").strip().upper() in UK_AIRPORT_IATA
-                            or str(f.get("destination") or "").strip().upper() in UK_AIRPORT_IATA
-                        )
-                    )
-                ]
+class AsyncDevServer:
+    # Event-loop engine: connections, static files and pass-through proxy GETs
+    # never hold a thread. Other routes run the regular Handler against the
+    # buffered request on one of two bounded pools: ASYNC_SLOW_ROUTES (upstream
+    # calls with long timeouts) on their own, everything else on the main
+    # pool, so both engines serve identical routes and a slow upstream cannot
+    # starve local ones.
+    def __init__(self, config: "DevServerConfig"):
+        self.config = config
+        self.client = AsyncUpstreamClient(UPSTREAM_POOL)
+        self.flights = AsyncSingleFlight()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, config.async_workers), thread_name_prefix="cr-async")
+        self.slow_executor = ThreadPoolExecutor(max_workers=max(1, config.async_slow_workers), thread_name_prefix="cr-async-slow")
+        self.server_address = (config.host, config.port)
+        self.stats = {"connections": 0, "requests": 0, "native": 0, "static": 0, "delegated": 0, "delegated_slow": 0}
+        self._static_builds: set = set()
+
+    def snapshot(self) -> dict:
+        out = dict(self.stats)
+        out["upstream"] = self.client.snapshot()
+        out["single_flight"] = dict(self.flights.stats)
+        out["workers"] = self.config.async_workers
+        out["slow_workers"] = self.config.async_slow_workers
+        out["static_builds"] = len(self._static_builds)
+        return out
 
-            self._send_json(
-                {
-                    "ok": True,
-                    "bounds": {"n": n, "s": s, "w": w, "e": e},
-                    "ukOnly": uk_only,
-                    "count": len(flights),
-                    "flights": flights,
-                    "generatedAt": time.time(),
-                }
-            )
+    def warm_static(self, key: str, build):
+        if key in self._static_builds:
             return
+        self._static_builds.add(key)
+        self.executor.submit(build).add_done_callback(lambda _: self._static_builds.discard(key))
 
-        if self.path.startswith("/api/flightradar/flight"):
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            fid = str((params.get("id") or [""])[0] or "").strip()
-            if not fid:
-                self._send_json({"ok": False, "error": "Missing id"}, status=400)
-                return
-            include_trail = str((params.get("trail") or ["1"])[0]).strip().lower() not in {"0", "false", "no", "off"}
-            details = self._fr24_fetch_details(fid)
-            if not details:
-                self._send_json({"ok": False, "error": "FlightRadar24 details fetch failed"}, status=502)
-                return
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._serve_client, self.config.host, self.config.port, limit=ASYNC_MAX_HEADER_BYTES)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.client.close_all()
+            self.executor.shutdown(wait=False)
+            self.slow_executor.shutdown(wait=False)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        peer = writer.get_extra_info("peername") or ("", 0)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=ASYNC_KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, _, header_bytes = head.partition(b"\r\n")
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    await self._write_simple(writer, 400, b'{"error":"Bad request"}', close=True)
+                    break
+                method, target, version = parts
+                headers = http.client.parse_headers(io.BytesIO(header_bytes))
+                conn_hdr = (headers.get("Connection") or "").lower()
+                keep_alive = "close" not in conn_hdr if version == "HTTP/1.1" else "keep-alive" in conn_hdr
+
+                body = b""
+                if "chunked" in (headers.get("Transfer-Encoding") or "").lower():
+                    await self._write_simple(writer, 411, b'{"error":"Content-Length required"}', close=True)
+                    break
+                length = int(headers.get("Content-Length") or 0)
+                if length:
+                    if "100-continue" in (headers.get("Expect") or "").lower():
+                        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    body = await reader.readexactly(length)
+
+                self.stats["requests"] += 1
+                path = target.partition("?")[0]
+                static_close = None
+                if method in ("GET", "HEAD") and GET_ROUTES.match(path) is None:
+                    static_close = await self._serve_static(head, peer, writer)
+                if static_close is not None:
+                    self.stats["static"] += 1
+                    if static_close:
+                        keep_alive = False
+                elif method == "GET" and await self._serve_native(target, headers, writer, keep_alive):
+                    self.stats["native"] += 1
+                else:
+                    slow = path.startswith(ASYNC_SLOW_ROUTES)
+                    self.stats["delegated_slow" if slow else "delegated"] += 1
+                    if await self._serve_delegated(head + body, peer, writer, slow):
+                        keep_alive = False
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write_simple(self, writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str = "application/json", extra: Optional[List[Tuple[str, str]]] = None, close: bool = False):
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = ""
+        lines = [
+            f"HTTP/1.1 {status} {reason}",
+            f"Server: {Handler.server_version} (asyncio)",
+            f"Date: {formatdate(usegmt=True)}",
+            f"Content-Type: {content_type}",
+            "Access-Control-Allow-Origin: *",
+        ]
+        lines += [f"{k}: {v}" for k, v in (extra or [])]
+        lines.append(f"Content-Length: {len(body)}")
+        lines.append("Connection: close" if close else "Connection: keep-alive")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _fetch_get(self, url: str, headers: Dict[str, str], with_headers: bool = False):
+        async def fetch():
+            if ch_metered(url):
+                CH_RATE_LIMITER.debit()
+            status, _, resp_headers, body = await self.client.request("GET", url, headers, timeout=30)
+            if status == 429 and ch_metered(url):
+                CH_RATE_LIMITER.penalize()
+            content_type = resp_headers.get("Content-Type", "application/json") if status < 400 else "application/json"
+            return status, content_type, body, resp_headers
+
+        result = await self.flights.do("get:" + ResponseCache.make_key(url, headers), fetch)
+        return result if with_headers else result[:3]
+
+    async def _refresh_ch(self, url: str, headers: Dict[str, str], cache_key: str):
+        try:
+            loop = asyncio.get_running_loop()
+            plan = await loop.run_in_executor(self.executor, ch_cache_plan, url, headers, True)
+            status, content_type, body, resp_headers = await self._fetch_get(url, plan["headers"], with_headers=True)
+            await loop.run_in_executor(self.executor, ch_cache_complete, plan, status, content_type, body, resp_headers)
+        except Exception:
+            pass
+        finally:
+            PROXY_CACHE.end_refresh(cache_key)
+
+    async def _serve_ch(self, url: str, headers: Dict[str, str], request_headers, writer: asyncio.StreamWriter, keep_alive: bool) -> bool:
+        bypass = "no-cache" in (request_headers.get("Cache-Control") or "").lower()
+        # The memory tier is answered on the loop; SQLite reads and writes
+        # (and the occasional prune) run on the executor.
+        loop = asyncio.get_running_loop()
+        plan = ch_cache_plan(url, headers, bypass, disk=False)
+        if plan["serve"] is None and CH_DISK_CACHE.enabled:
+            plan = await loop.run_in_executor(self.executor, ch_cache_plan_disk, plan, bypass)
+        entry = plan["serve"]
+        if entry is not None:
+            if plan["state"] == "STALE" and PROXY_CACHE.begin_refresh(plan["key"]):
+                asyncio.ensure_future(self._refresh_ch(url, headers, plan["key"]))
+            extra = [("X-Cache", plan["state"]), ("Age", str(max(0, int(time.time() - entry["stored"]))))]
+            await self._write_simple(writer, entry["status"], entry["body"], entry["type"], extra, close=not keep_alive)
+            return True
+        try:
+            status, content_type, body, resp_headers = await self._fetch_get(url, plan["headers"], with_headers=True)
+        except Exception as e:
+            if plan["validators"] is None:
+                payload = json.dumps({"error": "Upstream failed", "detail": str(e)}).encode("utf-8")
+                await self._write_simple(writer, 502, payload, close=not keep_alive)
+                return True
+            status, content_type, body, resp_headers = 502, "application/json", b"", {}
+        status, content_type, body, state = await loop.run_in_executor(
+            self.executor, ch_cache_complete, plan, status, content_type, body, resp_headers
+        )
+        await self._write_simple(writer, status, body, content_type, [("X-Cache", state)], close=not keep_alive)
+        return True
 
-            out = {
-                "identification": details.get("identification") or {},
-                "status": details.get("status") or {},
-                "aircraft": details.get("aircraft") or {},
-                "airline": details.get("airline") or {},
-                "airport": details.get("airport") or {},
-                "time": details.get("time") or {},
-                "trail": [],
-            }
-            if include_trail:
-                trail = details.get("trail")
-                if isinstance(trail, list):
-                    out["trail"] = trail[-600:]
-            self._send_json({"ok": True, "id": fid, "details": out, "generatedAt": time.time()})
-            return
-
-        if self.path.startswith("/flight/schedule"):
-            parsed = urlsplit(self.path)
-            params = parse_qs(parsed.query or "")
-            callsign = ((params.get("callsign") or [""])[0]).strip().upper()
-            icao24 = ((params.get("icao24") or [""])[0]).strip().lower()
-            key = os.environ.get("AVIATIONSTACK_API_KEY", "").strip()
-            if not key:
-                self._send_json(
-                    {
-                        "ok": False,
-                        "reason": "AVIATIONSTACK_API_KEY env var not set",
-                        "flight": None,
-                    },
-                    status=200,
-                )
-                return
-            if not callsign and not icao24:
-                self._send_json({"ok": False, "reason": "callsign or icao24 required", "flight": None}, status=400)
-                return
+    async def _refresh(self, cache_key: str, url: str, headers: Dict[str, str], ttl: Tuple[int, int]):
+        try:
+            status, content_type, body = await self._fetch_get(url, headers)
+            if status == 200:
+                PROXY_CACHE.store(cache_key, status, content_type, body, ttl)
+        except Exception:
+            pass
+        finally:
+            PROXY_CACHE.end_refresh(cache_key)
 
-            upstream_params = {"access_key": key, "limit": "12"}
-            if callsign:
-                upstream_params["flight_iata"] = callsign
-            upstream_url = f"{AVIATIONSTACK_BASE}/flights?{urlencode(upstream_params)}"
-            req = urllib.request.Request(upstream_url)
-            req.add_header("Accept", "application/json")
-            req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
-            try:
-                with urllib.request.urlopen(req, timeout=25) as resp:
-                    body = json.loads(resp.read().decode("utf-8", errors="replace"))
-            except urllib.error.HTTPError as e:
-                detail = ""
-                try:
-                    detail = e.read().decode("utf-8", errors="replace")[:500]
-                except Exception:
-                    detail = str(e)
-                self._send_json({"ok": False, "reason": f"aviationstack HTTP {e.code}", "detail": detail}, status=502)
-                return
-            except Exception as e:
-                self._send_json({"ok": False, "reason": "aviationstack request failed", "detail": str(e)}, status=502)
-                return
+    async def _serve_native(self, path: str, request_headers, writer: asyncio.StreamWriter, keep_alive: bool) -> bool:
+        if GET_ROUTES.match(path.partition("?")[0]) is not Handler._get_passthrough:
+            return False
+        target = passthrough_proxy_target(path)
+        if target.get("error"):
+            await self._write_simple(writer, target["status"], target["error"], close=not keep_alive)
+            return True
 
-            items = body.get("data") if isinstance(body, dict) else []
-            if not isinstance(items, list):
-                items = []
-
-            def score(item):
-                val = 0
-                cs = str(item.get("flight", {}).get("iata", "")).upper()
-                if callsign and cs == callsign:
-                    val += 50
-                if item.get("live"):
-                    val += 20
-                if item.get("flight_status"):
-                    val += 10
-                return val
-
-            items.sort(key=score, reverse=True)
-            top = items[0] if items else None
-            if not top:
-                self._send_json({"ok": True, "reason": "no schedule match", "flight": None}, status=200)
-                return
+        url, headers = target["url"], target["headers"]
+        if target["cache_route"] == "/ch/":
+            return await self._serve_ch(url, headers, request_headers, writer, keep_alive)
+        ttl = PROXY_CACHE_TTLS.get(target["cache_route"])
+        cache_key = ""
+        if ttl and PROXY_CACHE.max_bytes > 0:
+            cache_key = ResponseCache.make_key(url, headers)
+            bypass = "no-cache" in (request_headers.get("Cache-Control") or "").lower()
+            entry, state = (None, "MISS") if bypass else PROXY_CACHE.lookup(cache_key)
+            if entry is not None:
+                if state == "STALE" and PROXY_CACHE.begin_refresh(cache_key):
+                    asyncio.ensure_future(self._refresh(cache_key, url, headers, ttl))
+                extra = [("X-Cache", state), ("Age", str(max(0, int(time.time() - entry["stored"]))))]
+                await self._write_simple(writer, entry["status"], entry["body"], entry["type"], extra, close=not keep_alive)
+                return True
 
-            dep = top.get("departure") or {}
-            arr = top.get("arrival") or {}
-            flight_obj = top.get("flight") or {}
-            airline = top.get("airline") or {}
-            out = {
-                "ok": True,
-                "flight": {
-                    "flight_code": flight_obj.get("iata") or flight_obj.get("icao") or callsign,
-                    "status": top.get("flight_status") or "unknown",
-                    "airline": airline.get("name") or "",
-                    "departure": {
-                        "airport": dep.get("airport") or dep.get("iata") or dep.get("icao"),
-                        "scheduled": dep.get("scheduled"),
-                        "estimated": dep.get("estimated"),
-                        "actual": dep.get("actual"),
-                        "delay": dep.get("delay"),
-                    },
-                    "arrival": {
-                        "airport": arr.get("airport") or arr.get("iata") or arr.get("icao"),
-                        "scheduled": arr.get("scheduled"),
-                        "estimated": arr.get("estimated"),
-                        "actual": arr.get("actual"),
-                        "delay": arr.get("delay"),
-                    },
-                },
-            }
-            self._send_json(out, status=200)
-            return
+        try:
+            status, content_type, body = await self._fetch_get(url, headers)
+        except Exception as e:
+            payload = json.dumps({"error": "Upstream failed", "detail": str(e)}).encode("utf-8")
+            await self._write_simple(writer, 502, payload, close=not keep_alive)
+            return True
+        if cache_key and status == 200:
+            PROXY_CACHE.store(cache_key, status, content_type, body, ttl)
+        extra = [("X-Cache", "MISS")] if cache_key and status < 400 else []
+        await self._write_simple(writer, status, body, content_type, extra, close=not keep_alive)
+        return True
 
-        return super().do_GET()
+    async def _serve_static(self, raw_request: bytes, peer, writer: asyncio.StreamWriter) -> Optional[bool]:
+        # None when the path is not a static file (the caller delegates it),
+        # otherwise whether the connection must close.
+        buffer = _StaticBuffer()
+        try:
+            handler = _NativeStaticHandler(raw_request, buffer, peer, self)
+        except Exception:
+            for f, _, _ in buffer.files:
+                f.close()
+            return None if not buffer.chunks else True
+        if not handler.served:
+            return None
+        writer.write(b"".join(buffer.chunks))
+        loop = asyncio.get_running_loop()
+        for f, offset, count in buffer.files:
+            with f:
+                await writer.drain()
+                if STATIC_SENDFILE_ENABLED and count >= STATIC_SENDFILE_MIN_BYTES:
+                    await loop.sendfile(writer.transport, f, offset, count)
+                    continue
+                f.seek(offset)
+                remaining = count
+                while remaining > 0:
+                    chunk = f.read(min(STATIC_CHUNK_BYTES, remaining))
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+                    await writer.drain()
+                    remaining -= len(chunk)
+        await writer.drain()
+        return handler.close_connection
 
-    def do_POST(self):
-        if self.path.startswith("/dvla/vehicle"):
-            api_key = os.environ.get("DVLA_API_KEY", "").strip()
-            if not api_key:
-                self._send_json({"error": "DVLA_API_KEY env var not set"}, status=500)
-                return
-            length = 0
-            try:
-                length = int(self.headers.get("Content-Length", "0"))
-            except Exception:
-                length = 0
-            raw = self.rfile.read(length) if length > 0 else b"{}"
-            try:
-                body = json.loads(raw.decode("utf-8", errors="replace"))
-            except Exception:
-                self._send_json({"error": "Invalid JSON body"}, status=400)
-                return
-            registration = str(body.get("registrationNumber") or "").upper().replace(" ", "").strip()
-            if not registration:
-                self._send_json({"error": "registrationNumber is required"}, status=400)
-                return
+    async def _serve_delegated(self, raw_request: bytes, peer, writer: asyncio.StreamWriter, slow: bool = False) -> bool:
+        loop = asyncio.get_running_loop()
+        bridge = _BridgeWriter(loop, writer)
 
-            upstream_url = f"{DVLA_VES_API_BASE}/vehicle-enquiry/v1/vehicles"
-            payload = json.dumps({"registrationNumber": registration}).encode("utf-8")
-            req = urllib.request.Request(upstream_url, data=payload, method="POST")
-            req.add_header("Accept", "application/json")
-            req.add_header("Content-Type", "application/json")
-            req.add_header("x-api-key", api_key)
-            req.add_header("User-Agent", "ControlRoom/1.0 (+https://localhost)")
-            try:
-                with urllib.request.urlopen(req, timeout=25) as resp:
-                    body = resp.read()
-                    self.send_response(resp.status)
-                    self.send_header("Content-Type", resp.headers.get("Content-Type", "application/json"))
-                    self.send_header("Access-Control-Allow-Origin", "*")
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-            except urllib.error.HTTPError as e:
-                err_body = e.read() if hasattr(e, "read") else b"{}"
-                self._send_json_error(e.code, err_body)
-                return
-            except Exception as e:
-                self._send_json({"error": "DVLA upstream failed", "detail": str(e)}, status=502)
-                return
+        def run():
+            _BridgedHandler(raw_request, bridge, peer, self)
 
-        self._send_json({"error": "Not found"}, status=404)
+        try:
+            await loop.run_in_executor(self.slow_executor if slow else self.executor, run)
+        except Exception:
+            return True
+        await writer.drain()
+        # Handler responses without a length are delimited by closing.
+        return (not bridge.framed) or bridge.close_requested
 
 
 def main(argv: Optional[list] = None):
@@ -1612,14 +4290,46 @@ def main(argv: Optional[list] = None):
         print(f"!! Static root {config.root} does not exist", file=sys.stderr)
         sys.exit(2)
 
+    UPSTREAM_POOL.configure(
+        max_per_host=config.upstream_pool_size,
+        connect_timeout=config.upstream_connect_timeout,
+        read_timeout=config.upstream_read_timeout,
+        idle_timeout=config.upstream_idle_timeout,
+    )
+    PROXY_CACHE.max_bytes = max(0, int(config.proxy_cache_mb * 1024 * 1024))
+    STATIC_CACHE.max_bytes = max(0, int(config.static_cache_mb * 1024 * 1024))
+    CH_RATE_LIMITER.configure(*parse_rate_limit(config.ch_rate_limit))
+    CH_DISK_CACHE.configure(config.ch_disk_cache, int(config.ch_disk_cache_mb * 1024 * 1024))
+
     Handler.protocol_version = "HTTP/1.1"
-    server = ThreadingHTTPServer((config.host, config.port), Handler)
+    if config.engine == "asyncio":
+        server = AsyncDevServer(config)
+    else:
+        server = ThreadingHTTPServer((config.host, config.port), Handler)
     print(f"\n{'=' * 72}")
     print("Control Room Server Running")
     print(f"{'=' * 72}")
     print(f"Host:   http://{config.host}:{config.port}")
+    print(f"Engine: {config.engine}" + (f" ({config.async_workers} workers for local routes, {config.async_slow_workers} for slow upstream routes)" if config.engine == "asyncio" else ""))
     print(f"Root:   {config.root}")
+    print(f"Pool:   {config.upstream_pool_size} keep-alive conns/host, connect timeout {config.upstream_connect_timeout:g}s")
+    print(f"Cache:  {config.proxy_cache_mb:g} MB proxy response cache (X-Cache: HIT/MISS/STALE)")
+    print(f"Static: {config.static_cache_mb:g} MB compressed static cache")
+    print(f"CH:     {config.ch_disk_cache_mb:g} MB persistent /ch/* cache at {config.ch_disk_cache} (X-Cache: DISK/REVALIDATED)")
+    print(f"Quota:  Companies House {CH_RATE_LIMITER.limit} requests / {CH_RATE_LIMITER.window:g}s (token bucket, burst {CH_RATE_LIMITER.burst})")
+    print("Local:  /crime/grid?bbox=w,s,e,n&zoom=..&force=..&type=..&from=YYYY-MM&to=YYYY-MM")
+    print(f"Local:  /tiles/<layer>/<z>/<x>/<y>.pbf ({', '.join(TILE_LAYERS)})")
+    print("Local:  /local/companies/search?name=..&number=..&postcode=..&town=.. (build: scripts/ch_index.py)")
+    print("Local:  /local/companies/fuzzy?name=..&k=20")
+    print("Local:  /local/companies/by-postcode?postcode=EC1A|M1 1|SW1A1AA (build: scripts/postcode_index.py)")
+    print("Local:  /local/psc/company/<number>, /local/psc/person/<id>, /local/psc/search?name=.. (build: scripts/psc_graph.py)")
+    print("Local:  /local/people/resolve?name=..&born=YYYY-MM, /local/people/cluster/<id> (build: scripts/person_index.py)")
+    print("Local:  /local/postcode/<postcode>, /local/reverse?lat=..&lon=..&k=1 (build: scripts/onspd.py)")
+    print("Local:  /places/search?q=..&kinds=station,airport,port&limit=20 (ranked prefix autocomplete)")
+    print("Local:  /graph/expand?company=..|person=..|officer=..&depth=2&fanout=25&edges=psc,officer (NDJSON)")
     print(f"Proxy:  /ch/* -> {CH_API_BASE}")
+    print("Proxy:  /ch/batch [POST] {companies:[..], resources:[profile,officers,psc,..], officers:[..]} (NDJSON)")
+    print("Proxy:  /geo/postcodes/bulk [POST] {postcodes:[..]} -> ONSPD table, then postcodes.io bulk (NDJSON)")
     print(f"Proxy:  /tfl/* -> {TFL_API_BASE}")
     print(f"Proxy:  /postcodes/* -> {POSTCODES_API_BASE}")
     print(f"Proxy:  /webtris/* -> {WEBTRIS_API_BASE}")
@@ -1631,6 +4341,7 @@ def main(argv: Optional[list] = None):
     print(f"Proxy:  /nre/departures|arrivals?crs=KGX&rows=10 -> {NRE_LDBWS_URL}")
     print(f"Proxy:  /nre/service?service_id=... -> {NRE_LDBWS_URL}")
     print(f"Proxy:  /nre/stations?q=king&limit=20 -> {UK_RAIL_STATIONS_URL}")
+    print("Proxy:  /nre/stations?crs=KGX|lat=..&lon=..&radius=45&limit=20, /nre/stations/nearby [POST] {points:[{id,lat,lon}], k, radius_km}")
     print(f"Proxy:  /geo/search?q=... -> {NOMINATIM_BASE}")
     print(f"Proxy:  /flight/schedule?callsign=BAW130&icao24=... -> {AVIATIONSTACK_BASE}/flights")
     print(f"Proxy:  /dvla/vehicle [POST] -> {DVLA_VES_API_BASE}/vehicle-enquiry/v1/vehicles")
@@ -1642,11 +4353,16 @@ def main(argv: Optional[list] = None):
     print("Proxy:  /raildata/proxy?url=<full-feed-url>&auth=token|apikey|basic")
     print(f"{'=' * 72}\n")
     try:
-        server.serve_forever()
+        if isinstance(server, AsyncDevServer):
+            asyncio.run(server.serve_forever())
+        else:
+            server.serve_forever()
     except KeyboardInterrupt:
         print("Stopping Control Room server...")
     finally:
-        server.server_close()
+        if not isinstance(server, AsyncDevServer):
+            server.server_close()
+        UPSTREAM_POOL.close_all()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from psc_graph import COMPANY_NUMBER_RE, PSCGraph, normalize_company_number, person_key
+
+
+MAX_DEPTH = 4
+MAX_FANOUT = 200
+MAX_NODES = 5000
+API_WORKERS = 4
+OFFICER_ID_RE = re.compile(r"/officers/([^/]+)/appointments")
+
+# A neighbour is (edge, node): the edge dict carries "from"/"to"/"kind" plus
+# attributes, the node dict an "id", "kind" and "label".
+Neighbour = Tuple[dict, dict]
+
+
+@dataclass
+class ExpandLimits:
+    depth: int = 2
+    fanout: int = 25
+    max_nodes: int = 500
+
+
+def company_node(number: str, label: str = "", **data) -> dict:
+    number = normalize_company_number(number)
+    return {"id": f"company:{number}", "kind": "company", "label": label or number, "company_number": number, **data}
+
+
+def _active_first(neighbours: List[Neighbour]) -> List[Neighbour]:
+    # Fan-out caps keep the head of the list, so current relationships win
+    # over ceased or resigned ones.
+    return sorted(neighbours, key=lambda n: bool(n[0].get("ceased_on") or n[0].get("resigned_on")))
+
+
+class LocalPSCNeighbours:
+    # PSC edges from the memory-mapped graph. Corporate PSCs registered as UK
+    # companies are folded into their company node so chains continue.
+    def __init__(self, graph: PSCGraph, company_label: Callable[[str], str] = lambda n: ""):
+        self.graph = graph
+        self.company_label = company_label
+
+    def person_node(self, pid: int) -> dict:
+        person = self.graph.person(pid)
+        ident = person.get("identification") or {}
+        reg = normalize_company_number(ident.get("registration_number") or "")
+        if str(person.get("kind") or "").startswith("corporate") and COMPANY_NUMBER_RE.match(reg):
+            return company_node(reg, person.get("name") or "")
+        return {
+            "id": f"person:{pid}",
+            "kind": "person",
+            "label": person.get("name") or "",
+            "psc_kind": person.get("kind"),
+            "date_of_birth": person.get("date_of_birth"),
+            "companies": self.graph.person_degree(pid),
+        }
+
+    def __call__(self, node_ids: List[str]) -> Dict[str, List[Neighbour]]:
+        out: Dict[str, List[Neighbour]] = {}
+        for node_id in node_ids:
+            kind, _, ident = node_id.partition(":")
+            found: List[Neighbour] = []
+            if kind == "company":
+                cid = self.graph.company_id(ident)
+                if cid is not None:
+                    for pid, eid in self.graph.company_edges(cid):
+                        owner = self.person_node(pid)
+                        found.append(({"from": owner["id"], "to": node_id, "kind": "psc", **self.graph.edge(eid)}, owner))
+                # Companies this company controls as a corporate PSC.
+                for pid in self.graph.corporate_persons(ident):
+                    for cid, eid in self.graph.person_edges(pid):
+                        number = self.graph.company_number(cid)
+                        target = company_node(number, self.company_label(number))
+                        found.append(({"from": node_id, "to": target["id"], "kind": "psc", **self.graph.edge(eid)}, target))
+            elif kind == "person" and ident.isdigit() and int(ident) < self.graph.persons:
+                for cid, eid in self.graph.person_edges(int(ident)):
+                    number = self.graph.company_number(cid)
+                    target = company_node(number, self.company_label(number))
+                    found.append(({"from": node_id, "to": target["id"], "kind": "psc", **self.graph.edge(eid)}, target))
+            if found:
+                out[node_id] = found
+        return out
+
+
+class CompaniesHouseNeighbours:
+    # Officer and (optionally) PSC edges fetched from the Companies House API
+    # through fetch_json(path) -> dict or None. Calls within one BFS level run
+    # in parallel, and max_calls bounds the whole expansion.
+    def __init__(self, fetch_json: Callable[[str], Optional[dict]], officers: bool = True, psc: bool = False, max_calls: int = 200):
+        self.fetch_json = fetch_json
+        self.officers = officers
+        self.psc = psc
+        self.max_calls = max_calls
+        self.calls = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def _fetch(self, path: str) -> Optional[dict]:
+        with self._lock:
+            if self.calls >= self.max_calls:
+                self.skipped += 1
+                return None
+            self.calls += 1
+        try:
+            return self.fetch_json(path)
+        except Exception:
+            return None
+
+    def _company(self, node_id: str, number: str) -> List[Neighbour]:
+        found: List[Neighbour] = []
+        if self.officers:
+            data = self._fetch(f"/company/{number}/officers?items_per_page=100") or {}
+            for item in data.get("items") or []:
+                link = ((item.get("links") or {}).get("officer") or {}).get("appointments") or ""
+                match = OFFICER_ID_RE.search(link)
+                if not match:
+                    continue
+                officer = {"id": f"officer:{match.group(1)}", "kind": "officer", "label": item.get("name") or ""}
+                edge = {"from": officer["id"], "to": node_id, "kind": "officer"}
+                for field in ("officer_role", "appointed_on", "resigned_on"):
+                    if item.get(field):
+                        edge[field] = item[field]
+                found.append((edge, officer))
+        if self.psc:
+            data = self._fetch(f"/company/{number}/persons-with-significant-control?items_per_page=100") or {}
+            for item in data.get("items") or []:
+                key = person_key(number, item)
+                if key is None:
+                    continue
+                reg = normalize_company_number((item.get("identification") or {}).get("registration_number") or "")
+                if str(item.get("kind") or "").startswith("corporate") and COMPANY_NUMBER_RE.match(reg):
+                    owner = company_node(reg, item.get("name") or "")
+                else:
+                    owner = {"id": f"psc:{key}", "kind": "person", "label": item.get("name") or "", "psc_kind": item.get("kind")}
+                edge = {"from": owner["id"], "to": node_id, "kind": "psc"}
+                for field in ("natures_of_control", "notified_on", "ceased_on"):
+                    if item.get(field):
+                        edge[field] = item[field]
+                found.append((edge, owner))
+        return found
+
+    def _officer(self, node_id: str, officer_id: str) -> List[Neighbour]:
+        found: List[Neighbour] = []
+        data = self._fetch(f"/officers/{officer_id}/appointments?items_per_page=100") or {}
+        for item in data.get("items") or []:
+            appointed = item.get("appointed_to") or {}
+            number = appointed.get("company_number")
+            if not number:
+                continue
+            target = company_node(number, appointed.get("company_name") or "")
+            if appointed.get("company_status"):
+                target["company_status"] = appointed["company_status"]
+            edge = {"from": node_id, "to": target["id"], "kind": "officer"}
+            for field in ("officer_role", "appointed_on", "resigned_on"):
+                if item.get(field):
+                    edge[field] = item[field]
+            found.append((edge, target))
+        return found
+
+    def _one(self, node_id: str) -> List[Neighbour]:
+        kind, _, ident = node_id.partition(":")
+        if kind == "company":
+            return self._company(node_id, ident)
+        if kind == "officer" and self.officers:
+            return self._officer(node_id, ident)
+        return []
+
+    def __call__(self, node_ids: List[str]) -> Dict[str, List[Neighbour]]:
+        wanted = [n for n in node_ids if n.partition(":")[0] in ("company", "officer")]
+        if not wanted:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(API_WORKERS, len(wanted)), thread_name_prefix="cr-graph") as pool:
+            results = pool.map(self._one, wanted)
+            return {node_id: found for node_id, found in zip(wanted, results) if found}
+
+
+def combine(providers: Iterable[Callable[[List[str]], Dict[str, List[Neighbour]]]]):
+    providers = list(providers)
+
+    def neighbours(node_ids: List[str]) -> Dict[str, List[Neighbour]]:
+        out: Dict[str, List[Neighbour]] = {}
+        for provider in providers:
+            for node_id, found in provider(node_ids).items():
+                out.setdefault(node_id, []).extend(found)
+        return out
+
+    return neighbours
+
+
+def expand(seeds: List[dict], neighbours: Callable[[List[str]], Dict[str, List[Neighbour]]], limits: ExpandLimits) -> Iterator[dict]:
+    # Breadth-first, one level at a time so providers can batch their lookups.
+    # Every node is emitted once (cycle detection); edges back to nodes already
+    # seen are still emitted so cycles show up in the result.
+    started = time.perf_counter()
+    seen: Dict[str, int] = {}
+    edges_seen = set()
+    frontier: List[str] = []
+    for seed in seeds:
+        if seed["id"] not in seen:
+            seen[seed["id"]] = 0
+            frontier.append(seed["id"])
+            yield {"type": "node", "depth": 0, **seed}
+    stats = {"nodes": len(seen), "edges": 0, "omitted": 0, "truncated": False, "depth": 0}
+    depth = 0
+    while frontier and depth < limits.depth and not stats["truncated"]:
+        found = neighbours(frontier)
+        next_frontier: List[str] = []
+        for node_id in frontier:
+            items = _active_first(found.get(node_id) or [])
+            if len(items) > limits.fanout:
+                stats["omitted"] += len(items) - limits.fanout
+                yield {"type": "omitted", "id": node_id, "count": len(items) - limits.fanout}
+                items = items[:limits.fanout]
+            for edge, node in items:
+                if node["id"] not in seen:
+                    if len(seen) >= limits.max_nodes:
+                        stats["truncated"] = True
+                        break
+                    seen[node["id"]] = depth + 1
+                    next_frontier.append(node["id"])
+                    yield {"type": "node", "depth": depth + 1, **node}
+                key = (edge["from"], edge["to"], edge["kind"])
+                if key not in edges_seen:
+                    edges_seen.add(key)
+                    stats["edges"] += 1
+                    yield {"type": "edge", **edge}
+            if stats["truncated"]:
+                break
+        depth += 1
+        stats["depth"] = depth
+        stats["nodes"] = len(seen)
+        yield {"type": "level", "depth": depth, "nodes": len(seen), "edges": stats["edges"]}
+        frontier = next_frontier
+    stats["nodes"] = len(seen)
+    stats["took_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    yield {"type": "done", **stats}
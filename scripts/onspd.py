@@ -0,0 +1,467 @@
+import argparse
+import csv
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from postcode_index import KEY_SIZE, format_key, postcode_key
+from psc_graph import _tofile
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_ONSPD_SOURCE = Path("data/postcode_data")
+DEFAULT_ONSPD_TABLE = Path("data/onspd/onspd.bin")
+
+# Fixed 70-byte records sorted by postcode key (same 7-byte key as
+# postcode_index: outward code padded to 4 + inward code):
+#   7s  key
+#   B   flags (bit 0: terminated, bit 1: no grid reference; bits 4-7: osgrdind)
+#   i   latitude  * 1e6
+#   i   longitude * 1e6
+#   9s  LSOA, MSOA, local authority, ward, police force area, country (GSS codes)
+RECORD = struct.Struct("<7sBii9s9s9s9s9s9s")
+CODE_FIELDS = ("lsoa", "msoa", "local_authority", "ward", "police_force", "country")
+FLAG_TERMINATED = 1
+FLAG_NO_COORDS = 2
+RUN_RECORDS = 1_000_000
+
+# Reverse-geocoding grid over the postcode centroids: 0.01 degree cells
+# (about 1.1 km north-south, 0.6-0.7 km east-west over Great Britain) from
+# 49N 9W. grid_cells.bin holds the sorted non-empty cell ids, grid_starts.bin
+# the offset of each cell's run in grid_records.bin (record numbers in the
+# table). Points outside the box are clamped to the edge cells.
+GRID_CELL_DEG = 0.01
+GRID_LAT0 = 49.0
+GRID_LON0 = -9.0
+GRID_ROWS = 1300
+GRID_COLS = 1200
+GRID_FILES = ("grid_cells.bin", "grid_starts.bin", "grid_records.bin")
+# Nearest-postcode searches stop expanding after this many rings of cells.
+MAX_RING = 60
+MAX_NEAREST = 100
+EARTH_RADIUS_M = 6371008.8
+
+# ONSPD column names by release: older files use lower-case names without
+# a year suffix, newer ones upper-case GSS-style names ("LSOA21CD", "PFA23CD").
+COLUMNS = {
+    "postcode": ("pcds", "pcd", "pcd2"),
+    "lat": ("lat",),
+    "long": ("long", "lon"),
+    "doterm": ("doterm",),
+    "osgrdind": ("osgrdind",),
+    "lsoa": ("lsoa21", "lsoa21cd", "lsoa11", "lsoa11cd"),
+    "msoa": ("msoa21", "msoa21cd", "msoa11", "msoa11cd"),
+    "local_authority": ("oslaua", "lad", "lad25cd", "lad24cd", "lad23cd"),
+    "ward": ("osward", "wd", "wd25cd", "wd24cd", "wd23cd"),
+    "police_force": ("pfa", "pfa23cd", "pfa22cd", "pfa15cd"),
+    "country": ("ctry", "ctry25cd", "ctry12cd"),
+}
+# Name lookups shipped in the ONSPD "Documents" folder, matched by filename.
+NAME_FILES = {
+    "police_force": re.compile(r"^PFA.*names", re.I),
+    "local_authority": re.compile(r"^LA_UA names", re.I),
+    "country": re.compile(r"^Country names", re.I),
+    "lsoa": re.compile(r"^LSOA \(2021\) names|^LSOA.*names", re.I),
+}
+
+
+def _column(header: List[str], field: str) -> Optional[int]:
+    lowered = [h.strip().lower() for h in header]
+    for name in COLUMNS[field]:
+        if name in lowered:
+            return lowered.index(name)
+    return None
+
+
+def onspd_files(paths: Iterable[Path]) -> Iterator[Path]:
+    # The single-file release keeps ONSPD_*.csv under Data/, the split
+    # release one CSV per postcode area under Data/multi_csv/.
+    for path in paths:
+        if path.is_file():
+            yield path
+            continue
+        for csv_path in sorted(path.rglob("*.csv")):
+            if "documents" in (p.lower() for p in csv_path.parts) or "user guide" in csv_path.name.lower():
+                continue
+            yield csv_path
+
+
+def _code(value: str) -> bytes:
+    return value.strip().encode("ascii", "replace")[:9].ljust(9, b"\0")
+
+
+def iter_onspd_records(paths: Iterable[Path], log=print) -> Iterator[bytes]:
+    for path in onspd_files(paths):
+        with path.open("r", encoding="utf-8-sig", errors="replace", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                continue
+            cols = {field: _column(header, field) for field in COLUMNS}
+            if cols["postcode"] is None or cols["lat"] is None or cols["long"] is None:
+                log(f"skip {path.name}: not an ONSPD file")
+                continue
+            count = 0
+            for row in reader:
+                def value(field: str) -> str:
+                    i = cols[field]
+                    return row[i] if i is not None and i < len(row) else ""
+
+                key = postcode_key(value("postcode"))
+                if key is None:
+                    continue
+                flags = 0
+                if value("doterm").strip():
+                    flags |= FLAG_TERMINATED
+                try:
+                    lat, lon = float(value("lat")), float(value("long"))
+                except ValueError:
+                    lat, lon = 99.999999, 0.0
+                # ONSPD marks postcodes without a grid reference with lat 99.999999.
+                if lat > 90:
+                    flags |= FLAG_NO_COORDS
+                    lat, lon = 0.0, 0.0
+                grid = value("osgrdind").strip()
+                if grid.isdigit():
+                    flags |= min(int(grid), 15) << 4
+                count += 1
+                yield RECORD.pack(key, flags, round(lat * 1e6), round(lon * 1e6), *(_code(value(field)) for field in CODE_FIELDS))
+            log(f"onspd {path.name}: {count:,} postcodes")
+
+
+def load_names(documents: Optional[Path]) -> Dict[str, Dict[str, str]]:
+    names: Dict[str, Dict[str, str]] = {}
+    if documents is None or not documents.is_dir():
+        return names
+    for path in sorted(documents.rglob("*.csv")):
+        field = next((f for f, pattern in NAME_FILES.items() if pattern.search(path.name)), None)
+        if field is None or field in names:
+            continue
+        with path.open("r", encoding="utf-8-sig", errors="replace", newline="") as f:
+            reader = csv.reader(f)
+            header = [h.strip().upper() for h in next(reader, [])]
+            code_col = next((i for i, h in enumerate(header) if h.endswith("CD")), None)
+            name_col = next((i for i, h in enumerate(header) if h.endswith("NM")), None)
+            if code_col is None or name_col is None:
+                continue
+            names[field] = {row[code_col].strip(): row[name_col].strip() for row in reader if len(row) > max(code_col, name_col)}
+    return names
+
+
+def _flush_run(records: List[bytes], tmp_dir: Path, runs: List[Path]):
+    records.sort()
+    path = tmp_dir / f"run-{len(runs):04d}.bin"
+    with path.open("wb") as f:
+        f.write(b"".join(records))
+    runs.append(path)
+    records.clear()
+
+
+def _read_run(path: Path) -> Iterator[bytes]:
+    size = RECORD.size
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(size * 65536)
+            if not chunk:
+                return
+            for i in range(0, len(chunk), size):
+                yield chunk[i:i + size]
+
+
+def grid_cell(lat: float, lon: float) -> Tuple[int, int]:
+    row = min(GRID_ROWS - 1, max(0, int((lat - GRID_LAT0) // GRID_CELL_DEG)))
+    col = min(GRID_COLS - 1, max(0, int((lon - GRID_LON0) // GRID_CELL_DEG)))
+    return row, col
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _write_grid(table_path: Path, out_dir: Path, suffix: str) -> List[Path]:
+    # Counting sort of record numbers by cell: one pass to size each cell,
+    # one to place records, so memory stays at a few bytes per postcode.
+    size = table_path.stat().st_size
+    records = size // RECORD.size
+    cells = array("I", bytes(4 * records))
+    counts: Dict[int, int] = {}
+    head = struct.Struct("<7sBii")
+    with table_path.open("rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            for i in range(records):
+                _, flags, lat, lon = head.unpack_from(data, i * RECORD.size)
+                if flags & FLAG_NO_COORDS:
+                    cells[i] = 0xFFFFFFFF
+                    continue
+                row, col = grid_cell(lat / 1e6, lon / 1e6)
+                cell = row * GRID_COLS + col
+                cells[i] = cell
+                counts[cell] = counts.get(cell, 0) + 1
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+    cell_ids = array("I", sorted(counts))
+    starts = array("I", [0])
+    position: Dict[int, int] = {}
+    for cell in cell_ids:
+        position[cell] = starts[-1]
+        starts.append(starts[-1] + counts[cell])
+    placed = array("I", bytes(4 * starts[-1]))
+    for i, cell in enumerate(cells):
+        if cell != 0xFFFFFFFF:
+            placed[position[cell]] = i
+            position[cell] += 1
+    paths = []
+    for name, values in zip(GRID_FILES, (cell_ids, starts, placed)):
+        path = out_dir / (name + suffix)
+        _tofile(values, path)
+        paths.append(path)
+    return paths
+
+
+def build_onspd_table(records: Iterable[bytes], out_path: Path, names: Optional[Dict[str, Dict[str, str]]] = None, meta: Optional[dict] = None) -> dict:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    duplicates = 0
+    with tempfile.TemporaryDirectory(prefix="onspd-", dir=out_path.parent) as tmp:
+        tmp_dir = Path(tmp)
+        runs: List[Path] = []
+        buf: List[bytes] = []
+        for record in records:
+            buf.append(record)
+            if len(buf) >= RUN_RECORDS:
+                _flush_run(buf, tmp_dir, runs)
+        if buf:
+            _flush_run(buf, tmp_dir, runs)
+
+        tmp_out = out_path.with_name(out_path.name + f".{os.getpid()}.tmp")
+        with tmp_out.open("wb") as f:
+            pending: Optional[bytes] = None
+            for record in heapq.merge(*(_read_run(r) for r in runs)):
+                if pending is not None and record[:KEY_SIZE] == pending[:KEY_SIZE]:
+                    # A postcode listed twice: the live entry wins over a terminated one.
+                    duplicates += 1
+                    if pending[KEY_SIZE] & FLAG_TERMINATED and not record[KEY_SIZE] & FLAG_TERMINATED:
+                        pending = record
+                    continue
+                if pending is not None:
+                    f.write(pending)
+                    written += 1
+                pending = record
+            if pending is not None:
+                f.write(pending)
+                written += 1
+        # Grid first: a reader picking up the new table finds a matching grid.
+        suffix = f".{os.getpid()}.tmp"
+        for path, name in zip(_write_grid(tmp_out, out_path.parent, suffix), GRID_FILES):
+            os.replace(path, out_path.parent / name)
+        os.replace(tmp_out, out_path)
+
+    meta = dict(meta or {})
+    meta.update({"records": written, "duplicates": duplicates, "record_size": RECORD.size, "built": int(time.time()), "names": names or {}})
+    meta["grid"] = {"cell_deg": GRID_CELL_DEG, "lat0": GRID_LAT0, "lon0": GRID_LON0, "rows": GRID_ROWS, "cols": GRID_COLS}
+    meta_path = out_path.with_suffix(".json")
+    tmp_meta = meta_path.with_name(meta_path.name + ".tmp")
+    with tmp_meta.open("w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path)
+    return meta
+
+
+class ONSPDTable:
+    def __init__(self, path: Path):
+        self.path = path
+        meta_path = path.with_suffix(".json")
+        self.meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.is_file() else {}
+        self.names: Dict[str, Dict[str, str]] = self.meta.get("names") or {}
+        self._file = path.open("rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.records = size // RECORD.size
+        self._grid_files = []
+        self._grid_maps = []
+        self.has_grid = self.meta.get("grid") == {"cell_deg": GRID_CELL_DEG, "lat0": GRID_LAT0, "lon0": GRID_LON0, "rows": GRID_ROWS, "cols": GRID_COLS}
+        self.has_grid = self.has_grid and all((path.parent / name).is_file() for name in GRID_FILES)
+        if self.has_grid:
+            self._cells, self._starts, self._grid = (self._view(path.parent / name) for name in GRID_FILES)
+
+    def _view(self, path: Path):
+        f = path.open("rb")
+        self._grid_files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return array("I")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._grid_maps.append(mapped)
+        if sys.byteorder == "little":
+            return memoryview(mapped).cast("I")
+        values = array("I", bytes(mapped))
+        values.byteswap()
+        return values
+
+    def close(self):
+        self._cells = self._starts = self._grid = array("I")
+        for mapped in self._grid_maps:
+            mapped.close()
+        for f in self._grid_files:
+            f.close()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def _key(self, i: int) -> bytes:
+        return self._map[i * RECORD.size:i * RECORD.size + KEY_SIZE]
+
+    def find(self, key: bytes) -> Optional[int]:
+        lo, hi = 0, self.records
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.records and self._key(lo) == key else None
+
+    def coords(self, i: int) -> Optional[Tuple[float, float]]:
+        _, flags, lat, lon = struct.unpack_from("<7sBii", self._map, i * RECORD.size)
+        return None if flags & FLAG_NO_COORDS else (lat / 1e6, lon / 1e6)
+
+    def record(self, i: int) -> dict:
+        key, flags, lat, lon, *codes = RECORD.unpack_from(self._map, i * RECORD.size)
+        out = {
+            "postcode": format_key(key),
+            "latitude": None if flags & FLAG_NO_COORDS else lat / 1e6,
+            "longitude": None if flags & FLAG_NO_COORDS else lon / 1e6,
+            "terminated": bool(flags & FLAG_TERMINATED),
+            "quality": flags >> 4,
+        }
+        for field, raw in zip(CODE_FIELDS, codes):
+            code = raw.rstrip(b"\0").decode("ascii")
+            out[field] = code or None
+            name = self.names.get(field, {}).get(code)
+            if name:
+                out[f"{field}_name"] = name
+        return out
+
+    def lookup(self, postcode: str) -> Optional[dict]:
+        key = postcode_key(postcode)
+        i = self.find(key) if key else None
+        return self.record(i) if i is not None else None
+
+    def _cell_records(self, row: int, col: int) -> range:
+        cell = row * GRID_COLS + col
+        j = bisect_left(self._cells, cell)
+        if j == len(self._cells) or self._cells[j] != cell:
+            return range(0)
+        return range(self._starts[j], self._starts[j + 1])
+
+    def nearest(self, lat: float, lon: float, k: int = 1, radius_m: Optional[float] = None, terminated: bool = False) -> List[dict]:
+        # Walks square rings of grid cells outwards from the query cell.
+        # Every point outside ring r is at least r cells away, so once k
+        # candidates are closer than that bound (or the radius) the walk stops.
+        k = max(1, min(MAX_NEAREST, int(k)))
+        if not self.has_grid:
+            return []
+        row0, col0 = grid_cell(lat, lon)
+        cell_ns = math.radians(GRID_CELL_DEG) * EARTH_RADIUS_M
+        found: List[Tuple[float, int]] = []
+        for ring in range(MAX_RING + 1):
+            for row in range(row0 - ring, row0 + ring + 1):
+                if not 0 <= row < GRID_ROWS:
+                    continue
+                edge = row in (row0 - ring, row0 + ring)
+                cols = range(col0 - ring, col0 + ring + 1) if edge else (col0 - ring, col0 + ring)
+                for col in cols:
+                    if not 0 <= col < GRID_COLS:
+                        continue
+                    for n in self._cell_records(row, col):
+                        i = self._grid[n]
+                        flags = self._map[i * RECORD.size + KEY_SIZE]
+                        if flags & FLAG_TERMINATED and not terminated:
+                            continue
+                        plat, plon = self.coords(i)
+                        found.append((haversine_m(lat, lon, plat, plon), i))
+            # East-west cells narrow towards the pole: use the width at the
+            # far edge of the next ring so the bound stays a lower bound.
+            cell_ew = cell_ns * math.cos(math.radians(min(89.0, abs(lat) + (ring + 2) * GRID_CELL_DEG)))
+            bound = ring * min(cell_ns, cell_ew)
+            if radius_m is not None and bound > radius_m:
+                break
+            if len(found) >= k:
+                found.sort()
+                del found[k:]
+                if found[-1][0] <= bound:
+                    break
+        found.sort()
+        out = []
+        for distance, i in found[:k]:
+            if radius_m is not None and distance > radius_m:
+                break
+            item = self.record(i)
+            item["distance_m"] = round(distance, 1)
+            out.append(item)
+        return out
+
+
+# Reopens data/onspd/onspd.bin when a rebuild replaces it.
+class ONSPDTableCache:
+    def __init__(self, rel_path: Path = DEFAULT_ONSPD_TABLE):
+        self.rel_path = rel_path
+        self._lock = threading.Lock()
+        self._current: Dict[str, Tuple[Tuple[int, int], ONSPDTable]] = {}
+
+    def get(self, root: Path) -> Optional[ONSPDTable]:
+        path = root / self.rel_path
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = str(root)
+        current = self._current.get(key)
+        if current is not None and current[0] == version:
+            return current[1]
+        with self._lock:
+            current = self._current.get(key)
+            if current is None or current[0] != version:
+                current = (version, ONSPDTable(path))
+                self._current[key] = current
+        return current[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile ONSPD into the memory-mapped postcode table served at /local/postcode/<pc>.")
+    parser.add_argument("sources", nargs="*", type=Path, help=f"ONSPD CSV files or directories (default: {DEFAULT_ONSPD_SOURCE})")
+    parser.add_argument("--root", type=Path, default=ROOT, help="Repository root (default: %(default)s)")
+    parser.add_argument("--documents", type=Path, help="ONSPD Documents folder with code -> name lookups (default: first 'Documents' folder under the sources)")
+    parser.add_argument("--out", type=Path, default=DEFAULT_ONSPD_TABLE, help="Table file, relative to --root (default: %(default)s)")
+    args = parser.parse_args()
+    root = args.root.resolve()
+    sources = [p if p.is_absolute() else Path.cwd() / p for p in args.sources] or [root / DEFAULT_ONSPD_SOURCE]
+    missing = [p for p in sources if not p.exists()]
+    if missing:
+        parser.error(f"ONSPD source not found: {missing[0]}")
+    documents = args.documents
+    if documents is None:
+        documents = next((d for s in sources if s.is_dir() for d in s.rglob("*") if d.is_dir() and d.name.lower() == "documents"), None)
+    started = time.time()
+    meta = build_onspd_table(iter_onspd_records(sources), root / args.out, load_names(documents), {"sources": [str(p) for p in sources]})
+    print(f"Done: {meta['records']:,} postcodes in {time.time() - started:.1f}s -> {root / args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,526 @@
+import argparse
+import json
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ch_cache import DEFAULT_CH_DISK_CACHE
+from psc_graph import (
+    DEFAULT_PSC_SOURCES,
+    _heap_writer,
+    _json_objects,
+    _tofile,
+    iter_psc_records,
+    normalize_company_number,
+    normalize_person_name,
+    psc_files,
+    sorted_lines,
+)
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_OFFICER_SOURCES = (Path("data/officers_by_company"),)
+DEFAULT_PERSON_INDEX = Path("data/person_index")
+INDEX_FORMAT = 1
+MAX_QUERY_CLUSTERS = 200
+BLOCK_SCAN_LIMIT = 5000
+# Blocks larger than this (common surnames without a birth date) only merge
+# identical names and shared officer ids instead of comparing every pair.
+PAIRWISE_LIMIT = 1000
+
+NAME_SUFFIXES = frozenset({"JR", "JNR", "SR", "SNR", "II", "III", "IV", "OBE", "MBE", "CBE", "KBE", "DBE", "KC", "QC", "PHD", "FCA", "ACA"})
+OFFICER_ID_RE = re.compile(r"/officers/([^/]+)/appointments")
+CACHE_PATH_RE = re.compile(r"^/company/([^/?]+)/(officers|persons-with-significant-control)|^/officers/([^/?]+)/appointments")
+
+
+# --- names -------------------------------------------------------------------
+
+def name_parts(name: str, surname: str = "") -> Tuple[str, List[str]]:
+    # Returns (surname, tokens). Officer lists write "SURNAME, Forenames";
+    # otherwise the surname is the last token left after titles and suffixes.
+    # Tokens shorter than two characters are dropped, as on the client.
+    raw = str(name or "")
+    if not surname and "," in raw:
+        surname, _, rest = raw.partition(",")
+        raw = f"{rest} {surname}"
+    tokens = [t for t in normalize_person_name(raw).split() if t not in NAME_SUFFIXES]
+    last = normalize_person_name(surname).split()
+    surname = last[-1] if last else (tokens[-1] if tokens else "")
+    return surname, [t for t in tokens if len(t) >= 2]
+
+
+def birth_month(dob) -> str:
+    if not isinstance(dob, dict) or not dob.get("year"):
+        return ""
+    try:
+        return f"{int(dob['year']):04d}-{int(dob.get('month') or 0):02d}"
+    except (TypeError, ValueError):
+        return ""
+
+
+def names_likely_match(left: Set[str], right: Set[str], left_text: str = "", right_text: str = "") -> bool:
+    # Same rule as namesLikelyMatch in js/psc_api.js: equal or contained
+    # names, or at least two shared tokens.
+    if not left or not right:
+        return False
+    if left_text and right_text and (left_text == right_text or left_text in right_text or right_text in left_text):
+        return True
+    return len(left & right) >= 2
+
+
+def name_score(left: Set[str], right: Set[str]) -> float:
+    return len(left & right) / len(left | right) if left and right else 0.0
+
+
+# --- sources -----------------------------------------------------------------
+
+def _record(source: str, number: str, name: str, dob, surname: str = "", **extra) -> Optional[dict]:
+    surname, tokens = name_parts(name, surname)
+    if not surname or not tokens:
+        return None
+    record = {
+        "source": source,
+        "company_number": normalize_company_number(number) if number else "",
+        "name": str(name or "").strip(),
+        "tokens": tokens,
+        "surname": surname,
+        "born": birth_month(dob),
+    }
+    record.update({k: v for k, v in extra.items() if v})
+    return record
+
+
+def psc_record(number: str, data: dict) -> Optional[dict]:
+    if not str(data.get("kind") or "").startswith("individual"):
+        return None
+    elements = data.get("name_elements") if isinstance(data.get("name_elements"), dict) else {}
+    name = data.get("name") or " ".join(str(elements.get(k) or "") for k in ("forename", "middle_name", "surname"))
+    return _record(
+        "psc", number, name, data.get("date_of_birth"), elements.get("surname") or "",
+        natures_of_control=data.get("natures_of_control"),
+        notified_on=data.get("notified_on"),
+        ceased_on=data.get("ceased_on"),
+        nationality=data.get("nationality"),
+    )
+
+
+def officer_record(number: str, item: dict, officer_id: str = "", name: str = "", dob=None) -> Optional[dict]:
+    # Company officer list items, or appointment items whose officer name and
+    # date of birth sit on the enclosing appointments page.
+    if str(item.get("officer_role") or "").startswith("corporate"):
+        return None
+    link = ((item.get("links") or {}).get("officer") or {}).get("appointments") or ""
+    match = OFFICER_ID_RE.search(link)
+    appointed = item.get("appointed_to") if isinstance(item.get("appointed_to"), dict) else {}
+    return _record(
+        "officer", number or appointed.get("company_number") or "", item.get("name") or name, item.get("date_of_birth") or dob,
+        officer_id=match.group(1) if match else officer_id,
+        officer_role=item.get("officer_role"),
+        appointed_on=item.get("appointed_on"),
+        resigned_on=item.get("resigned_on"),
+        nationality=item.get("nationality"),
+        occupation=item.get("occupation"),
+    )
+
+
+def iter_officer_records(paths: Iterable[Path], log=print) -> Iterator[dict]:
+    # Officer list pages saved per company (named after the company number)
+    # or JSON lines carrying a company_number.
+    for path in psc_files(paths):
+        count = 0
+        stem = normalize_company_number(path.stem)
+        for item in _json_objects(path):
+            record = officer_record(item.get("company_number") or stem, item)
+            if record is not None:
+                count += 1
+                yield record
+        if count:
+            log(f"officers {path.name}: {count:,} records")
+
+
+def iter_cache_records(db_path: Path, log=print) -> Iterator[dict]:
+    # Officer, PSC and appointment pages the dev server has cached from the
+    # Companies House API (scripts/ch_cache.py).
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    count = 0
+    try:
+        for path, body in db.execute("SELECT path, body FROM responses WHERE status = 200 AND resource IN ('officers', 'psc', 'appointments')"):
+            match = CACHE_PATH_RE.match(path)
+            if not match:
+                continue
+            try:
+                page = json.loads(zlib.decompress(body))
+            except (ValueError, zlib.error):
+                continue
+            for item in page.get("items") or []:
+                if not isinstance(item, dict):
+                    continue
+                if match.group(3):
+                    record = officer_record("", item, match.group(3), page.get("name") or "", page.get("date_of_birth"))
+                elif match.group(2) == "officers":
+                    record = officer_record(match.group(1), item)
+                else:
+                    record = psc_record(match.group(1), item)
+                if record is not None:
+                    count += 1
+                    yield record
+    finally:
+        db.close()
+    log(f"ch cache {db_path.name}: {count:,} records")
+
+
+# --- builder -----------------------------------------------------------------
+
+def _cluster(records: List[dict]) -> List[List[dict]]:
+    # Union-find inside one block (surname + birth month): records join when
+    # their names likely match or they share a Companies House officer id.
+    parent = list(range(len(records)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    token_sets = [set(r["tokens"]) for r in records]
+    texts = [" ".join(r["tokens"]) for r in records]
+    pairwise = len(records) <= PAIRWISE_LIMIT
+    first: Dict[str, int] = {}
+    for i, record in enumerate(records):
+        for key in ("id:" + (record.get("officer_id") or ""), "name:" + texts[i]):
+            if key == "id:":
+                continue
+            if key in first:
+                parent[find(i)] = find(first[key])
+            else:
+                first[key] = i
+        if pairwise:
+            for j in range(i):
+                if find(i) != find(j) and names_likely_match(token_sets[i], token_sets[j], texts[i], texts[j]):
+                    parent[find(i)] = find(j)
+    groups: Dict[int, List[dict]] = {}
+    for i, record in enumerate(records):
+        groups.setdefault(find(i), []).append(record)
+    return list(groups.values())
+
+
+def build_person_index(psc_sources: Iterable[Path], officer_sources: Iterable[Path], cache_db: Optional[Path], out_dir: Path, log=print) -> dict:
+    psc_sources, officer_sources = list(psc_sources), list(officer_sources)
+    tmp_out = out_dir.with_name(out_dir.name + f".tmp-{os.getpid()}")
+    shutil.rmtree(tmp_out, ignore_errors=True)
+    tmp_out.mkdir(parents=True)
+    started = time.time()
+    counts = Counter()
+    try:
+        with tempfile.TemporaryDirectory(prefix="person-index-", dir=out_dir.parent) as tmp:
+            def records() -> Iterator[dict]:
+                for number, data in iter_psc_records(psc_sources, log=log):
+                    record = psc_record(number, data)
+                    if record is not None:
+                        yield record
+                yield from iter_officer_records(officer_sources, log=log)
+                if cache_db is not None:
+                    yield from iter_cache_records(cache_db, log=log)
+
+            def lines() -> Iterator[str]:
+                for record in records():
+                    block = f"{record['surname']}|{record['born']}"
+                    # The same appointment seen twice (a saved page and the
+                    # API cache, or officer and appointments pages) is kept once.
+                    same = "\x1f".join((
+                        record["source"], record["company_number"], record.get("officer_id") or " ".join(record["tokens"]),
+                        record.get("officer_role") or "", record.get("appointed_on") or record.get("notified_on") or "",
+                    ))
+                    yield f"{block}\t{same}\t{json.dumps(record, ensure_ascii=False)}\n"
+
+            key_file, key_offsets, _ = _heap_writer(tmp_out / "block_keys.heap")
+            record_file, record_offsets, add_record = _heap_writer(tmp_out / "records.heap")
+            # Distinct normalised names per cluster, one per line, so queries
+            # rank clusters without decoding their records.
+            names_file = (tmp_out / "cluster_names.heap").open("wb")
+            name_offsets = array("Q", [0])
+            block_clusters = array("I", [0])
+            cluster_records = array("I", [0])
+
+            def flush(block: str, group: List[dict]):
+                key_file.write(block.encode("utf-8"))
+                key_offsets.append(key_file.tell())
+                # Largest clusters first so a block's head is its best evidence.
+                for cluster in sorted(_cluster(group), key=len, reverse=True):
+                    for record in cluster:
+                        add_record(record)
+                    cluster_records.append(len(record_offsets) - 1)
+                    names_file.write("\n".join(sorted({" ".join(r["tokens"]) for r in cluster})).encode("utf-8"))
+                    name_offsets.append(names_file.tell())
+                block_clusters.append(len(cluster_records) - 1)
+
+            current, group, last_same = None, [], None
+            for line in sorted_lines(lines(), Path(tmp), "person"):
+                block, same, record = line.rstrip("\n").split("\t", 2)
+                if block != current:
+                    if group:
+                        flush(current, group)
+                    current, group, last_same = block, [], None
+                if same == last_same:
+                    counts["duplicates"] += 1
+                    continue
+                last_same = same
+                group.append(json.loads(record))
+                counts[group[-1]["source"]] += 1
+            if group:
+                flush(current, group)
+            for f in (key_file, record_file, names_file):
+                f.close()
+
+        _tofile(key_offsets, tmp_out / "block_keys.off")
+        _tofile(record_offsets, tmp_out / "records.off")
+        _tofile(name_offsets, tmp_out / "cluster_names.off")
+        _tofile(block_clusters, tmp_out / "block_clusters.off")
+        _tofile(cluster_records, tmp_out / "cluster_records.off")
+        meta = {
+            "format": INDEX_FORMAT,
+            "blocks": len(key_offsets) - 1,
+            "clusters": len(cluster_records) - 1,
+            "records": len(record_offsets) - 1,
+            "psc_records": counts["psc"],
+            "officer_records": counts["officer"],
+            "duplicates": counts["duplicates"],
+            "built": int(time.time()),
+            "seconds": round(time.time() - started, 1),
+            "sources": [str(p) for p in psc_sources + officer_sources] + ([str(cache_db)] if cache_db else []),
+        }
+        with (tmp_out / "meta.json").open("w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+    except BaseException:
+        shutil.rmtree(tmp_out, ignore_errors=True)
+        raise
+    old_dir = out_dir.with_name(out_dir.name + f".old-{os.getpid()}")
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_out, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+# --- reader ------------------------------------------------------------------
+
+class PersonIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        with (path / "meta.json").open("r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != INDEX_FORMAT:
+            raise ValueError(f"unsupported person index format {self.meta.get('format')!r}")
+        self.blocks = int(self.meta["blocks"])
+        self.clusters = int(self.meta["clusters"])
+        self._files = []
+        self._maps = []
+        self._keys = self._map("block_keys.heap")
+        self._key_off = self._view("block_keys.off", "Q")
+        self._records = self._map("records.heap")
+        self._record_off = self._view("records.off", "Q")
+        self._block_clusters = self._view("block_clusters.off", "I")
+        self._cluster_records = self._view("cluster_records.off", "I")
+        self._names = self._map("cluster_names.heap")
+        self._name_off = self._view("cluster_names.off", "Q")
+
+    def _map(self, name: str):
+        f = (self.path / name).open("rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def _view(self, name: str, typecode: str):
+        buf = self._map(name)
+        if not len(buf):
+            return array(typecode)
+        if sys.byteorder == "little":
+            return memoryview(buf).cast(typecode)
+        values = array(typecode, bytes(buf))
+        values.byteswap()
+        return values
+
+    def close(self):
+        for name in ("_key_off", "_record_off", "_block_clusters", "_cluster_records", "_name_off"):
+            setattr(self, name, array("I"))
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                pass
+        for f in self._files:
+            f.close()
+
+    def _block_key(self, b: int) -> bytes:
+        return self._keys[self._key_off[b]:self._key_off[b + 1]]
+
+    def _block_range(self, prefix: bytes) -> Tuple[int, int]:
+        lo, hi = 0, self.blocks
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._block_key(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo
+        hi = self.blocks
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._block_key(mid)[:len(prefix)] <= prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def record(self, rid: int) -> dict:
+        return json.loads(self._records[self._record_off[rid]:self._record_off[rid + 1]])
+
+    def cluster_names(self, cid: int) -> List[str]:
+        return self._names[self._name_off[cid]:self._name_off[cid + 1]].decode("utf-8").split("\n")
+
+    def cluster_records(self, cid: int) -> List[dict]:
+        return [self.record(rid) for rid in range(self._cluster_records[cid], self._cluster_records[cid + 1])]
+
+    def cluster(self, cid: int, records: Optional[List[dict]] = None) -> dict:
+        records = records if records is not None else self.cluster_records(cid)
+        names = Counter(r["name"] for r in records)
+        companies: Dict[str, dict] = {}
+        for r in records:
+            entry = companies.setdefault(r["company_number"], {"company_number": r["company_number"], "roles": []})
+            role = r.get("officer_role") or ("psc" if r["source"] == "psc" else "")
+            if role and role not in entry["roles"]:
+                entry["roles"].append(role)
+            if not (r.get("resigned_on") or r.get("ceased_on")):
+                entry["active"] = True
+        return {
+            "cluster_id": cid,
+            "name": names.most_common(1)[0][0],
+            "names": sorted(names),
+            "born": records[0]["born"],
+            "records": len(records),
+            "psc_records": sum(1 for r in records if r["source"] == "psc"),
+            "officer_records": sum(1 for r in records if r["source"] == "officer"),
+            "officer_ids": sorted({r["officer_id"] for r in records if r.get("officer_id")}),
+            "companies": sorted((c for c in companies.values() if c["company_number"]), key=lambda c: c["company_number"]),
+        }
+
+    def resolve(self, name: str, born: str = "", limit: int = 20, min_score: float = 0.34) -> Tuple[List[dict], bool]:
+        # Candidate clusters for a name: the surname (plus birth month when
+        # given) selects blocks by binary search, and clusters inside them are
+        # ranked by token overlap with the query. Without a comma the first
+        # token is tried as a surname too, for "SMITH John" style input.
+        surname, tokens = name_parts(name)
+        query = set(tokens)
+        if not surname or not query:
+            return [], False
+        surnames = [surname]
+        if "," not in name and tokens and tokens[0] != surname:
+            surnames.append(tokens[0])
+        text = " ".join(tokens)
+        scored = []
+        truncated = False
+        for candidate in surnames:
+            prefix = f"{candidate}|{born}".encode("utf-8")
+            start, end = self._block_range(prefix)
+            if not born:
+                # Every birth month under this surname ("SMITH|" cannot run
+                # into "SMITHSON|"), bounded for very common surnames.
+                end = min(end, start + BLOCK_SCAN_LIMIT)
+                truncated = truncated or end - start >= BLOCK_SCAN_LIMIT
+            for b in range(start, end):
+                for cid in range(self._block_clusters[b], self._block_clusters[b + 1]):
+                    best = 0.0
+                    for other_text in self.cluster_names(cid):
+                        other = set(other_text.split())
+                        if len(query) == 1:
+                            # A bare surname: every cluster in the block is a candidate.
+                            best = max(best, 0.5 if query <= other else 0.0)
+                        elif names_likely_match(query, other, text, other_text):
+                            best = max(best, name_score(query, other))
+                    if best >= min_score:
+                        size = self._cluster_records[cid + 1] - self._cluster_records[cid]
+                        scored.append((best, size, cid))
+                if len(scored) >= MAX_QUERY_CLUSTERS:
+                    truncated = True
+                    break
+        scored.sort(key=lambda s: (-s[0], -s[1], s[2]))
+        out = []
+        for score, _, cid in scored[:limit]:
+            item = self.cluster(cid)
+            item["score"] = round(score, 3)
+            out.append(item)
+        return out, truncated or len(scored) > limit
+
+
+# Reopens data/person_index when a rebuild replaces meta.json.
+class PersonIndexCache:
+    def __init__(self, index_dir: Path = DEFAULT_PERSON_INDEX):
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._current: Dict[str, Tuple[Tuple[int, int], PersonIndex]] = {}
+
+    def get(self, root: Path) -> Optional[PersonIndex]:
+        meta_path = root / self.index_dir / "meta.json"
+        try:
+            stat = meta_path.stat()
+        except OSError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = str(root)
+        current = self._current.get(key)
+        if current is not None and current[0] == version:
+            return current[1]
+        with self._lock:
+            current = self._current.get(key)
+            if current is None or current[0] != version:
+                current = (version, PersonIndex(root / self.index_dir))
+                self._current[key] = current
+        return current[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the officer/PSC person resolution index served under /local/people/.")
+    parser.add_argument("--root", type=Path, default=ROOT, help="Repository root (default: %(default)s)")
+    parser.add_argument("--psc", type=Path, action="append", help=f"PSC snapshot file or directory, repeatable (default: {', '.join(str(p) for p in DEFAULT_PSC_SOURCES)} if present)")
+    parser.add_argument("--officers", type=Path, action="append", help=f"Officer list file or directory, repeatable (default: {', '.join(str(p) for p in DEFAULT_OFFICER_SOURCES)} if present)")
+    parser.add_argument("--ch-cache", type=Path, default=DEFAULT_CH_DISK_CACHE, help="Dev server Companies House cache to mine for officer/PSC pages, relative to --root (default: %(default)s if present)")
+    parser.add_argument("--no-ch-cache", action="store_true", help="Ignore the dev server Companies House cache")
+    parser.add_argument("--out", type=Path, default=DEFAULT_PERSON_INDEX, help="Index directory, relative to --root (default: %(default)s)")
+    args = parser.parse_args()
+    root = args.root.resolve()
+
+    def sources(given: Optional[List[Path]], defaults: Tuple[Path, ...]) -> List[Path]:
+        if given:
+            return [p if p.is_absolute() else Path.cwd() / p for p in given]
+        return [root / p for p in defaults if (root / p).exists()]
+
+    psc = sources(args.psc, DEFAULT_PSC_SOURCES)
+    officers = sources(args.officers, DEFAULT_OFFICER_SOURCES)
+    cache_db = None if args.no_ch_cache else (args.ch_cache if args.ch_cache.is_absolute() else root / args.ch_cache)
+    if cache_db is not None and not cache_db.is_file():
+        cache_db = None
+    if not psc and not officers and cache_db is None:
+        parser.error("no PSC, officer or Companies House cache sources found")
+    meta = build_person_index(psc, officers, cache_db, root / args.out)
+    print(
+        f"Done: {meta['records']:,} records ({meta['psc_records']:,} PSC, {meta['officer_records']:,} officer) in "
+        f"{meta['clusters']:,} clusters over {meta['blocks']:,} blocks in {meta['seconds']}s -> {root / args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
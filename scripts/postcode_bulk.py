@@ -0,0 +1,112 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from postcode_index import format_key, postcode_key
+
+
+BULK_MAX_POSTCODES = 10000
+# postcodes.io accepts at most 100 postcodes per bulk lookup.
+POSTCODES_IO_BULK_SIZE = 100
+BULK_WORKERS = 4
+
+
+def plan_postcodes(raw: Iterable) -> Tuple[List[str], Dict[str, List[str]], List[str]]:
+    # Normalises raw strings ("sw1a1aa", " SW1A 1AA ") to the canonical
+    # "SW1A 1AA" form and drops duplicates. Returns the unique postcodes in
+    # request order, the raw inputs behind each one, and the inputs that are
+    # not UK postcodes.
+    postcodes: List[str] = []
+    inputs: Dict[str, List[str]] = {}
+    invalid: List[str] = []
+    for value in raw:
+        text = str(value or "").strip()
+        key = postcode_key(text)
+        if key is None:
+            invalid.append(text)
+            continue
+        postcode = format_key(key)
+        if postcode not in inputs:
+            inputs[postcode] = []
+            postcodes.append(postcode)
+        if text not in inputs[postcode]:
+            inputs[postcode].append(text)
+    return postcodes, inputs, invalid
+
+
+def _coords(result: Optional[dict]) -> Optional[Tuple[float, float]]:
+    try:
+        lat, lon = float(result["latitude"]), float(result["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return lat, lon
+
+
+def run_bulk(
+    postcodes: List[str],
+    inputs: Dict[str, List[str]],
+    local: Callable[[str], Optional[dict]],
+    cached: Callable[[str], Optional[dict]],
+    fetch_bulk: Callable[[List[str]], Dict[str, Optional[dict]]],
+    workers: int = BULK_WORKERS,
+) -> Iterator[dict]:
+    # Local ONSPD table first, then postcode results already in the proxy
+    # cache, then postcodes.io's bulk lookup in chunks of 100 fetched by a
+    # small pool. Results stream in completion order; closing the generator
+    # cancels chunks that have not started.
+    started = time.perf_counter()
+    counts = {"local": 0, "cache": 0, "upstream": 0, "not_found": 0, "errors": 0}
+
+    def result(postcode: str, source: str, data: Optional[dict], status: int = 200) -> dict:
+        coords = _coords(data)
+        if status == 200 and coords is None:
+            status = 404
+        out = {"type": "result", "postcode": postcode, "inputs": inputs.get(postcode, []), "status": status, "source": source}
+        if coords is not None:
+            out.update({"latitude": coords[0], "longitude": coords[1]})
+        if data is not None:
+            out["data"] = data
+        return out
+
+    resolved: List[dict] = []
+    misses: List[str] = []
+    for postcode in postcodes:
+        hit = local(postcode)
+        if _coords(hit) is not None:
+            resolved.append(result(postcode, "local", hit))
+            continue
+        hit = cached(postcode)
+        if hit is not None:
+            resolved.append(result(postcode, "cache", hit))
+            continue
+        misses.append(postcode)
+
+    chunks = [misses[i:i + POSTCODES_IO_BULK_SIZE] for i in range(0, len(misses), POSTCODES_IO_BULK_SIZE)]
+    yield {"type": "meta", "unique": len(postcodes), "resolved": len(resolved), "scheduled": len(misses), "chunks": len(chunks)}
+    for item in resolved:
+        counts[item["source"] if item["status"] == 200 else "not_found"] += 1
+        yield item
+
+    if chunks:
+        pool = ThreadPoolExecutor(max_workers=min(workers, len(chunks)), thread_name_prefix="cr-postcodes")
+        try:
+            pending = {pool.submit(fetch_bulk, chunk): chunk for chunk in chunks}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    try:
+                        found = future.result()
+                    except Exception as e:
+                        counts["errors"] += len(chunk)
+                        for postcode in chunk:
+                            yield {"type": "result", "postcode": postcode, "inputs": inputs.get(postcode, []), "status": 502, "source": "error", "error": str(e)}
+                        continue
+                    for postcode in chunk:
+                        item = result(postcode, "postcodes.io", found.get(postcode))
+                        counts["upstream" if item["status"] == 200 else "not_found"] += 1
+                        yield item
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    yield {"type": "done", **counts, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
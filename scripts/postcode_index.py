@@ -0,0 +1,297 @@
+import argparse
+import heapq
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ch_store import DEFAULT_SHARD_INDEX, iter_company_rows, shard_sources
+from psc_graph import iter_psc_records
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_POSTCODE_INDEX = Path("data/postcode_index/postcodes.bin")
+DEFAULT_PSC_DIR = Path("data/psc_by_company")
+
+# Fixed 16-byte entries sorted by key then company number:
+#   7 bytes  outward code padded to 4 + inward code ("M1  1AE", "EC1A1BB")
+#   8 bytes  company number, NUL padded
+#   1 byte   source flags
+# Padding the outward code makes "M1" a clean key prefix that cannot run on
+# into "M13", so outward and sector lookups are contiguous ranges.
+ENTRY_SIZE = 16
+KEY_SIZE = 7
+NUMBER_SIZE = 8
+SOURCE_REGISTERED_OFFICE = 1
+SOURCE_PSC = 2
+SOURCE_NAMES = {SOURCE_REGISTERED_OFFICE: "registered_office", SOURCE_PSC: "psc"}
+RUN_ENTRIES = 2_000_000
+
+POSTCODE_RE = re.compile(r"^([A-Z]{1,2}[0-9][A-Z0-9]?)([0-9][A-Z]{2})$")
+OUTWARD_RE = re.compile(r"^[A-Z]{1,2}[0-9][A-Z0-9]?$")
+SECTOR_RE = re.compile(r"^([A-Z]{1,2}[0-9][A-Z0-9]?)([0-9])$")
+AREA_RE = re.compile(r"^[A-Z]{1,2}$")
+
+
+def postcode_key(postcode: str) -> Optional[bytes]:
+    match = POSTCODE_RE.match(re.sub(r"[^A-Z0-9]", "", str(postcode or "").upper()))
+    if not match:
+        return None
+    return (match.group(1).ljust(4) + match.group(2)).encode("ascii")
+
+
+def format_key(key: bytes) -> str:
+    text = key.decode("ascii")
+    return f"{text[:4].rstrip()} {text[4:]}"
+
+
+def query_prefix(query: str) -> Tuple[str, bytes]:
+    compact = re.sub(r"[^A-Z0-9]", "", str(query or "").upper())
+    key = postcode_key(compact)
+    if key:
+        return "postcode", key
+    spaced = re.sub(r"\s+", " ", str(query or "").upper().strip())
+    # "M1 1" is a sector; "M11" alone is read as an outward code.
+    if " " in spaced:
+        match = SECTOR_RE.match(compact)
+        if match:
+            return "sector", (match.group(1).ljust(4) + match.group(2)).encode("ascii")
+    if OUTWARD_RE.match(compact):
+        return "outward", compact.ljust(4).encode("ascii")
+    if AREA_RE.match(compact):
+        return "area", compact.encode("ascii")
+    return "invalid", b""
+
+
+def _entry(key: bytes, number: str, flags: int) -> bytes:
+    return key + number.encode("ascii", "replace")[:NUMBER_SIZE].ljust(NUMBER_SIZE, b"\0") + bytes([flags])
+
+
+# --- sources -------------------------------------------------------------
+
+def _normalize_number(number) -> str:
+    value = re.sub(r"\s+", "", str(number or "")).upper()
+    return value.zfill(8) if value.isdigit() else value
+
+
+def iter_company_entries(sources: Iterable[Path], log=print) -> Iterator[bytes]:
+    for path in sources:
+        if not path.is_file():
+            log(f"skip {path}: not found")
+            continue
+        count = 0
+        for record in iter_company_rows(path):
+            key = postcode_key(record["RegAddress.PostCode"])
+            number = _normalize_number(record["CompanyNumber"])
+            if key and number:
+                count += 1
+                yield _entry(key, number, SOURCE_REGISTERED_OFFICE)
+        log(f"companies {path.name}: {count:,} postcoded")
+
+
+def iter_psc_entries(paths: Iterable[Path], log=print) -> Iterator[bytes]:
+    for number, data in iter_psc_records(paths, log=log):
+        address = data.get("address") if isinstance(data.get("address"), dict) else {}
+        key = postcode_key(address.get("postal_code") or "")
+        if key:
+            yield _entry(key, number, SOURCE_PSC)
+
+
+# --- builder ---------------------------------------------------------------
+
+def _flush_run(entries: List[bytes], tmp_dir: Path, runs: List[Path]):
+    entries.sort()
+    path = tmp_dir / f"run-{len(runs):04d}.bin"
+    with path.open("wb") as f:
+        f.write(b"".join(entries))
+    runs.append(path)
+    entries.clear()
+
+
+def _read_run(path: Path) -> Iterator[bytes]:
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(ENTRY_SIZE * 65536)
+            if not chunk:
+                return
+            for i in range(0, len(chunk), ENTRY_SIZE):
+                yield chunk[i:i + ENTRY_SIZE]
+
+
+def build_postcode_index(entries: Iterable[bytes], out_path: Path, meta: Optional[dict] = None) -> dict:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    postcodes = 0
+    with tempfile.TemporaryDirectory(prefix="pc-index-", dir=out_path.parent) as tmp:
+        tmp_dir = Path(tmp)
+        runs: List[Path] = []
+        buf: List[bytes] = []
+        for entry in entries:
+            buf.append(entry)
+            if len(buf) >= RUN_ENTRIES:
+                _flush_run(buf, tmp_dir, runs)
+        if buf:
+            _flush_run(buf, tmp_dir, runs)
+
+        tmp_out = out_path.with_name(out_path.name + f".{os.getpid()}.tmp")
+        with tmp_out.open("wb") as f:
+            pending: Optional[bytearray] = None
+            last_key = None
+            # Entries sort by key+number, so duplicates from both sources
+            # arrive together and their flags can be OR-ed into one entry.
+            for entry in heapq.merge(*(_read_run(r) for r in runs)):
+                if pending is not None and entry[:-1] == pending[:-1]:
+                    pending[-1] |= entry[-1]
+                    continue
+                if pending is not None:
+                    f.write(pending)
+                    written += 1
+                pending = bytearray(entry)
+                if entry[:KEY_SIZE] != last_key:
+                    last_key = entry[:KEY_SIZE]
+                    postcodes += 1
+            if pending is not None:
+                f.write(pending)
+                written += 1
+        os.replace(tmp_out, out_path)
+
+    meta = dict(meta or {})
+    meta.update({"entries": written, "postcodes": postcodes, "built": int(time.time()), "entry_size": ENTRY_SIZE})
+    meta_path = out_path.with_suffix(".json")
+    tmp_meta = meta_path.with_name(meta_path.name + ".tmp")
+    with tmp_meta.open("w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, meta_path)
+    return meta
+
+
+# --- reader ------------------------------------------------------------------
+
+class PostcodeIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = path.open("rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.entries = size // ENTRY_SIZE
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def _key(self, i: int) -> bytes:
+        return self._map[i * ENTRY_SIZE:i * ENTRY_SIZE + KEY_SIZE]
+
+    def _lower_bound(self, prefix: bytes, lo: int = 0) -> int:
+        hi = self.entries
+        n = len(prefix)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[:n] < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _upper_bound(self, prefix: bytes, lo: int = 0) -> int:
+        hi = self.entries
+        n = len(prefix)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[:n] <= prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, query: str, limit: int = 500) -> dict:
+        kind, prefix = query_prefix(query)
+        if kind == "invalid":
+            return {"kind": kind, "total": 0, "postcodes": 0, "results": []}
+        i = self._lower_bound(prefix)
+        end = self._upper_bound(prefix, i)
+        results = []
+        total = 0
+        postcodes = 0
+        # Walk one postcode at a time, jumping over each run with a binary
+        # search so counts stay cheap even for a whole outward code or area.
+        while i < end:
+            key = self._key(i)
+            run_end = self._upper_bound(key, i)
+            # An area such as "M" must not pick up "ME": the next char has to be a digit.
+            if kind != "area" or key[len(prefix):len(prefix) + 1].isdigit():
+                total += run_end - i
+                postcodes += 1
+                postcode = format_key(key)
+                for j in range(i, min(run_end, i + limit - len(results))):
+                    raw = self._map[j * ENTRY_SIZE:(j + 1) * ENTRY_SIZE]
+                    flags = raw[-1]
+                    results.append({
+                        "company_number": raw[KEY_SIZE:KEY_SIZE + NUMBER_SIZE].rstrip(b"\0").decode("ascii"),
+                        "postcode": postcode,
+                        "sources": [name for bit, name in SOURCE_NAMES.items() if flags & bit],
+                    })
+            i = run_end
+        return {"kind": kind, "total": total, "postcodes": postcodes, "results": results}
+
+
+class PostcodeIndexCache:
+    def __init__(self, rel_path: Path = DEFAULT_POSTCODE_INDEX):
+        self.rel_path = rel_path
+        self._lock = threading.Lock()
+        self._current: Dict[str, Tuple[Tuple[int, int], PostcodeIndex]] = {}
+
+    def get(self, root: Path) -> Optional[PostcodeIndex]:
+        path = root / self.rel_path
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = str(root)
+        current = self._current.get(key)
+        if current is not None and current[0] == version:
+            return current[1]
+        with self._lock:
+            current = self._current.get(key)
+            if current is None or current[0] != version:
+                current = (version, PostcodeIndex(path))
+                self._current[key] = current
+        return current[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the postcode -> company number index used by /local/companies/by-postcode.")
+    parser.add_argument("sources", nargs="*", type=Path, help="Company shard JSON or BasicCompanyData CSV files (default: every shard in --shard-index)")
+    parser.add_argument("--root", type=Path, default=ROOT, help="Repository root (default: %(default)s)")
+    parser.add_argument("--shard-index", type=Path, default=DEFAULT_SHARD_INDEX, help="Shard list used when no sources are given (default: %(default)s)")
+    parser.add_argument("--psc", type=Path, action="append", help=f"PSC snapshot file or directory, repeatable (default: {DEFAULT_PSC_DIR} if present)")
+    parser.add_argument("--out", type=Path, default=DEFAULT_POSTCODE_INDEX, help="Index file, relative to --root (default: %(default)s)")
+    args = parser.parse_args()
+    root = args.root.resolve()
+
+    def absolute(p: Path) -> Path:
+        return p if p.is_absolute() else Path.cwd() / p
+
+    sources = [absolute(p) for p in args.sources] or shard_sources(root, args.shard_index)
+    psc = [absolute(p) for p in args.psc or []] or ([root / DEFAULT_PSC_DIR] if (root / DEFAULT_PSC_DIR).exists() else [])
+
+    def entries() -> Iterator[bytes]:
+        yield from iter_company_entries(sources)
+        yield from iter_psc_entries(psc)
+
+    meta = build_postcode_index(entries(), root / args.out, {
+        "company_sources": [str(p) for p in sources],
+        "psc_sources": [str(p) for p in psc],
+    })
+    print(f"Done: {meta['entries']:,} entries over {meta['postcodes']:,} postcodes -> {root / args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import gzip
+import os
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ROOT = Path(__file__).resolve().parents[1]
+COMPRESSIBLE_SUFFIXES = {".js", ".mjs", ".css", ".html", ".json", ".geojson", ".svg", ".xml", ".txt", ".csv"}
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv"}
+
+
+def is_stale(source: Path, target: Path) -> bool:
+    try:
+        return target.stat().st_mtime < source.stat().st_mtime
+    except OSError:
+        return True
+
+
+def iter_candidates(root: Path, min_bytes: int):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for name in filenames:
+            path = Path(dirpath) / name
+            if path.suffix.lower() not in COMPRESSIBLE_SUFFIXES:
+                continue
+            try:
+                if path.stat().st_size < min_bytes:
+                    continue
+            except OSError:
+                continue
+            yield path
+
+
+def write_atomic(target: Path, payload: bytes):
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, target)
+
+
+def run(root: Path, min_bytes: int, force: bool, dry_run: bool, skip_brotli: bool):
+    built = 0
+    skipped = 0
+    for path in iter_candidates(root, min_bytes):
+        variants = [(".gz", lambda data: gzip.compress(data, compresslevel=9))]
+        if brotli is not None and not skip_brotli:
+            variants.append((".br", lambda data: brotli.compress(data, quality=11)))
+        data = None
+        for suffix, compress in variants:
+            target = path.with_name(path.name + suffix)
+            if not force and not is_stale(path, target):
+                skipped += 1
+                continue
+            rel = path.relative_to(root)
+            if dry_run:
+                print(f"would build {rel}{suffix}")
+                continue
+            if data is None:
+                data = path.read_bytes()
+            payload = compress(data)
+            if len(payload) >= len(data):
+                print(f"skip {rel}{suffix}: not smaller than source")
+                continue
+            write_atomic(target, payload)
+            built += 1
+            print(f"built {rel}{suffix}: {len(data):,} -> {len(payload):,} bytes")
+    print(f"Done: {built} built, {skipped} up to date" + ("" if brotli is not None or skip_brotli else " (install 'brotli' for .br output)"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build .gz/.br siblings for large static assets served by scripts/dev_server.py.")
+    parser.add_argument("--root", type=Path, default=ROOT, help="Web root to scan (default: repository root)")
+    parser.add_argument("--min-kb", type=int, default=256, help="Only precompress files at least this large (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="Rebuild siblings even if they are newer than the source")
+    parser.add_argument("--no-brotli", action="store_true", help="Only build .gz siblings")
+    parser.add_argument("--dry-run", action="store_true", help="List what would be built without writing")
+    args = parser.parse_args()
+    run(args.root.resolve(), max(0, args.min_kb) * 1024, args.force, args.dry_run, args.no_brotli)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+import argparse
+import heapq
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_PSC_SOURCES = (Path("data/psc_by_company"),)
+DEFAULT_GRAPH_DIR = Path("data/psc_graph")
+GRAPH_FORMAT = 2
+NUMBER_WIDTH = 8
+CORPORATE_ENTRY = struct.Struct("<8sI")  # registration number, person id
+SORT_CHUNK_LINES = 500_000
+NAME_SCAN_LIMIT = 20_000
+COMPANY_NUMBER_RE = re.compile(r"^(?:[A-Z]{2})?[0-9]{6,8}$")
+
+NAME_TITLES = frozenset({"MR", "MRS", "MS", "MISS", "MX", "DR", "SIR", "DAME", "LORD", "LADY", "PROF", "REV", "CAPT"})
+PERSON_FIELDS = ("name", "kind", "date_of_birth", "nationality", "country_of_residence", "identification")
+EDGE_FIELDS = ("natures_of_control", "notified_on", "ceased_on", "address")
+
+
+# --- PSC sources -----------------------------------------------------------
+
+def normalize_company_number(number) -> str:
+    value = re.sub(r"\s+", "", str(number or "")).upper()
+    return value.zfill(NUMBER_WIDTH) if value.isdigit() else value
+
+
+def _number_bytes(number: str) -> bytes:
+    return normalize_company_number(number).encode("ascii", "replace")[:NUMBER_WIDTH].ljust(NUMBER_WIDTH, b"\0")
+
+
+def normalize_person_name(name: str) -> str:
+    tokens = re.sub(r"[^A-Z0-9 ]+", " ", str(name or "").upper().replace("'", "")).split()
+    while tokens and tokens[0] in NAME_TITLES:
+        tokens = tokens[1:]
+    return " ".join(tokens)
+
+
+def psc_files(paths: Iterable[Path]) -> Iterator[Path]:
+    for path in paths:
+        if path.is_dir():
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if name.lower().endswith((".json", ".jsonl", ".txt")):
+                        yield Path(dirpath) / name
+        elif path.is_file():
+            yield path
+
+
+def _json_objects(path: Path) -> Iterator[dict]:
+    # Accepts the Companies House PSC snapshot (one JSON object per line) as
+    # well as per-company JSON files holding an object, a list or an API
+    # style {"items": [...]} page.
+    with path.open("r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[" or path.suffix.lower() == ".json":
+            try:
+                data = json.load(f)
+            except ValueError:
+                return
+            if isinstance(data, dict):
+                data = data.get("items") if isinstance(data.get("items"), list) else [data]
+            for item in data if isinstance(data, list) else []:
+                if isinstance(item, dict):
+                    yield item
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(item, dict):
+                yield item
+
+
+def iter_psc_records(paths: Iterable[Path], log=print) -> Iterator[Tuple[str, dict]]:
+    # Yields (company number, PSC data). Per-company files named after the
+    # company supply the number when the records themselves do not.
+    for path in psc_files(paths):
+        count = 0
+        stem = path.stem.upper()
+        fallback = normalize_company_number(stem) if COMPANY_NUMBER_RE.match(stem) else ""
+        for item in _json_objects(path):
+            data = item.get("data") if isinstance(item.get("data"), dict) else item
+            number = normalize_company_number(item.get("company_number") or data.get("company_number") or fallback)
+            if number:
+                count += 1
+                yield number, data
+        if count:
+            log(f"psc {path.name}: {count:,} records")
+
+
+def person_key(number: str, data: dict) -> Optional[str]:
+    # PSC records carry no cross-company person id, so people are merged on
+    # normalised name plus birth month, and legal entities on name plus
+    # registration number. The name leads so keys sort by name.
+    kind = str(data.get("kind") or "")
+    if kind.startswith("totals") or "statement" in kind or "exemption" in kind:
+        return None
+    if kind.startswith("super-secure"):
+        return f"SUPER SECURE PERSON|{number}|s"
+    elements = data.get("name_elements") if isinstance(data.get("name_elements"), dict) else {}
+    if elements.get("surname"):
+        raw_name = " ".join(str(elements.get(k) or "") for k in ("forename", "middle_name", "surname"))
+    else:
+        raw_name = data.get("name") or ""
+    name = normalize_person_name(raw_name)
+    if not name:
+        return None
+    if kind.startswith("individual"):
+        dob = data.get("date_of_birth") if isinstance(data.get("date_of_birth"), dict) else {}
+        born = f"{int(dob.get('year') or 0):04d}-{int(dob.get('month') or 0):02d}" if dob.get("year") else ""
+        return f"{name}|{born}|i"
+    ident = data.get("identification") if isinstance(data.get("identification"), dict) else {}
+    reg = re.sub(r"\s+", "", str(ident.get("registration_number") or "")).upper()
+    return f"{name}|{reg}|c"
+
+
+# --- external sort -----------------------------------------------------------
+
+def sorted_lines(lines: Iterable[str], tmp_dir: Path, prefix: str) -> Iterator[str]:
+    runs: List[Path] = []
+    buf: List[str] = []
+
+    def flush():
+        buf.sort()
+        path = tmp_dir / f"{prefix}-{len(runs):04d}.txt"
+        with path.open("w", encoding="utf-8") as f:
+            f.writelines(buf)
+        runs.append(path)
+        buf.clear()
+
+    for line in lines:
+        buf.append(line)
+        if len(buf) >= SORT_CHUNK_LINES:
+            flush()
+    if buf:
+        flush()
+
+    def read(path: Path) -> Iterator[str]:
+        with path.open("r", encoding="utf-8") as f:
+            yield from f
+
+    return heapq.merge(*(read(r) for r in runs))
+
+
+# --- writer ------------------------------------------------------------------
+
+def _tofile(values: array, path: Path):
+    if sys.byteorder != "little" and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    with path.open("wb") as f:
+        values.tofile(f)
+
+
+def _heap_writer(path: Path):
+    f = path.open("wb")
+    offsets = array("Q", [0])
+
+    def add(value: dict):
+        f.write(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        offsets.append(f.tell())
+
+    return f, offsets, add
+
+
+def build_graph(sources: Iterable[Path], out_dir: Path, log=print) -> dict:
+    sources = list(sources)
+    tmp_out = out_dir.with_name(out_dir.name + f".tmp-{os.getpid()}")
+    shutil.rmtree(tmp_out, ignore_errors=True)
+    tmp_out.mkdir(parents=True)
+    started = time.time()
+    try:
+        with tempfile.TemporaryDirectory(prefix="psc-graph-", dir=out_dir.parent) as tmp:
+            tmp_dir = Path(tmp)
+
+            def by_person() -> Iterator[str]:
+                for number, data in iter_psc_records(sources, log=log):
+                    key = person_key(number, data)
+                    if key is None:
+                        continue
+                    person = {k: data[k] for k in PERSON_FIELDS if data.get(k)}
+                    edge = {k: data[k] for k in EDGE_FIELDS if data.get(k)}
+                    yield f"{key}\t{number}\t{json.dumps(person)}\t{json.dumps(edge)}\n"
+
+            # Pass 1: people in key order get consecutive ids, so the key heap
+            # doubles as a sorted name index.
+            key_file, key_offsets, _ = _heap_writer(tmp_out / "person_keys.heap")
+            corporate: List[bytes] = []
+            data_file, data_offsets, add_person = _heap_writer(tmp_out / "person_data.heap")
+
+            def by_company() -> Iterator[str]:
+                current = None
+                pid = -1
+                for line in sorted_lines(by_person(), tmp_dir, "person"):
+                    key, number, person, edge = line.rstrip("\n").split("\t", 3)
+                    if key != current:
+                        current = key
+                        pid += 1
+                        key_file.write(key.encode("utf-8"))
+                        key_offsets.append(key_file.tell())
+                        add_person(json.loads(person))
+                        reg = key.rsplit("|", 2)[1] if key.endswith("|c") else ""
+                        if COMPANY_NUMBER_RE.match(reg):
+                            corporate.append(CORPORATE_ENTRY.pack(_number_bytes(reg), pid))
+                    yield f"{number}\t{pid:010d}\t{edge}\n"
+
+            # Pass 2: companies in number order; company -> person edges form
+            # a CSR adjacency whose positions double as edge ids.
+            numbers = (tmp_out / "companies.fixed").open("wb")
+            edge_file, edge_offsets, add_edge = _heap_writer(tmp_out / "edge_data.heap")
+            company_offsets = array("I", [0])
+            company_persons = array("I")
+            current, last_pid = None, -1
+            for line in sorted_lines(by_company(), tmp_dir, "company"):
+                number, pid_text, edge = line.rstrip("\n").split("\t", 2)
+                pid = int(pid_text)
+                if number != current:
+                    if current is not None:
+                        company_offsets.append(len(company_persons))
+                    current, last_pid = number, -1
+                    numbers.write(number.encode("ascii", "replace")[:NUMBER_WIDTH].ljust(NUMBER_WIDTH, b"\0"))
+                if pid == last_pid:
+                    continue  # the same person listed twice for one company
+                last_pid = pid
+                company_persons.append(pid)
+                add_edge(json.loads(edge))
+            if current is not None:
+                company_offsets.append(len(company_persons))
+            for f in (key_file, data_file, numbers, edge_file):
+                f.close()
+        persons = len(key_offsets) - 1
+        companies = len(company_offsets) - 1
+        edges = len(company_persons)
+
+        # Person -> company adjacency by counting sort over the edges.
+        person_offsets = array("I", [0]) * (persons + 1)
+        for pid in company_persons:
+            person_offsets[pid + 1] += 1
+        for i in range(persons):
+            person_offsets[i + 1] += person_offsets[i]
+        fill = array("I", person_offsets)
+        person_companies = array("I", [0]) * edges
+        person_edges = array("I", [0]) * edges
+        for cid in range(companies):
+            for eid in range(company_offsets[cid], company_offsets[cid + 1]):
+                pid = company_persons[eid]
+                slot = fill[pid]
+                person_companies[slot] = cid
+                person_edges[slot] = eid
+                fill[pid] = slot + 1
+
+        _tofile(key_offsets, tmp_out / "person_keys.off")
+        _tofile(data_offsets, tmp_out / "person_data.off")
+        _tofile(edge_offsets, tmp_out / "edge_data.off")
+        _tofile(company_offsets, tmp_out / "company_persons.off")
+        _tofile(company_persons, tmp_out / "company_persons.adj")
+        _tofile(person_offsets, tmp_out / "person_companies.off")
+        _tofile(person_companies, tmp_out / "person_companies.adj")
+        _tofile(person_edges, tmp_out / "person_edges.adj")
+        # Corporate PSCs registered as UK companies, by registration number,
+        # so ownership chains can hop from a PSC entity to its own company.
+        corporate.sort()
+        with (tmp_out / "corporate.fixed").open("wb") as f:
+            f.write(b"".join(corporate))
+        meta = {
+            "format": GRAPH_FORMAT,
+            "persons": persons,
+            "companies": companies,
+            "edges": edges,
+            "built": int(time.time()),
+            "seconds": round(time.time() - started, 1),
+            "sources": [str(p) for p in sources],
+        }
+        with (tmp_out / "meta.json").open("w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+    except BaseException:
+        shutil.rmtree(tmp_out, ignore_errors=True)
+        raise
+    old_dir = out_dir.with_name(out_dir.name + f".old-{os.getpid()}")
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_out, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+# --- reader ------------------------------------------------------------------
+
+class PSCGraph:
+    def __init__(self, path: Path):
+        self.path = path
+        with (path / "meta.json").open("r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != GRAPH_FORMAT:
+            raise ValueError(f"unsupported PSC graph format {self.meta.get('format')!r}")
+        self.persons = int(self.meta["persons"])
+        self.companies = int(self.meta["companies"])
+        self.edges = int(self.meta["edges"])
+        self._files = []
+        self._maps = []
+        self._keys = self._map("person_keys.heap")
+        self._key_off = self._view("person_keys.off", "Q")
+        self._data = self._map("person_data.heap")
+        self._data_off = self._view("person_data.off", "Q")
+        self._edge = self._map("edge_data.heap")
+        self._edge_off = self._view("edge_data.off", "Q")
+        self._numbers = self._map("companies.fixed")
+        self._company_off = self._view("company_persons.off", "I")
+        self._company_adj = self._view("company_persons.adj", "I")
+        self._person_off = self._view("person_companies.off", "I")
+        self._person_adj = self._view("person_companies.adj", "I")
+        self._person_edges = self._view("person_edges.adj", "I")
+        self._corporate = self._map("corporate.fixed")
+
+    def _map(self, name: str):
+        f = (self.path / name).open("rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def _view(self, name: str, typecode: str):
+        buf = self._map(name)
+        if not len(buf):
+            return array(typecode)
+        if sys.byteorder == "little":
+            return memoryview(buf).cast(typecode)
+        values = array(typecode, bytes(buf))
+        values.byteswap()
+        return values
+
+    def close(self):
+        for name in ("_key_off", "_data_off", "_edge_off", "_company_off", "_company_adj", "_person_off", "_person_adj", "_person_edges"):
+            setattr(self, name, array("I"))
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                pass
+        for f in self._files:
+            f.close()
+
+    # ids and raw adjacency, for traversal
+    def company_id(self, number: str) -> Optional[int]:
+        needle = _number_bytes(number)
+        lo, hi = 0, self.companies
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._numbers[mid * NUMBER_WIDTH:(mid + 1) * NUMBER_WIDTH] < needle:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.companies and self._numbers[lo * NUMBER_WIDTH:(lo + 1) * NUMBER_WIDTH] == needle:
+            return lo
+        return None
+
+    def company_number(self, cid: int) -> str:
+        return self._numbers[cid * NUMBER_WIDTH:(cid + 1) * NUMBER_WIDTH].rstrip(b"\0").decode("ascii")
+
+    def company_degree(self, cid: int) -> int:
+        return self._company_off[cid + 1] - self._company_off[cid]
+
+    def person_degree(self, pid: int) -> int:
+        return self._person_off[pid + 1] - self._person_off[pid]
+
+    def company_edges(self, cid: int) -> Iterator[Tuple[int, int]]:
+        for eid in range(self._company_off[cid], self._company_off[cid + 1]):
+            yield self._company_adj[eid], eid
+
+    def person_edges(self, pid: int) -> Iterator[Tuple[int, int]]:
+        for slot in range(self._person_off[pid], self._person_off[pid + 1]):
+            yield self._person_adj[slot], self._person_edges[slot]
+
+    def person_key(self, pid: int) -> str:
+        return self._keys[self._key_off[pid]:self._key_off[pid + 1]].decode("utf-8")
+
+    def person(self, pid: int) -> dict:
+        out = json.loads(self._data[self._data_off[pid]:self._data_off[pid + 1]])
+        out["person_id"] = pid
+        return out
+
+    def edge(self, eid: int) -> dict:
+        return json.loads(self._edge[self._edge_off[eid]:self._edge_off[eid + 1]])
+
+    # record-level lookups
+    def company_persons(self, number: str) -> Optional[List[dict]]:
+        cid = self.company_id(number)
+        if cid is None:
+            return None
+        items = []
+        for pid, eid in self.company_edges(cid):
+            item = self.person(pid)
+            item.update(self.edge(eid))
+            item["companies"] = self.person_degree(pid)
+            items.append(item)
+        return items
+
+    def corporate_persons(self, number: str) -> List[int]:
+        needle = _number_bytes(number)
+        size = CORPORATE_ENTRY.size
+        lo, hi = 0, len(self._corporate) // size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._corporate[mid * size:mid * size + NUMBER_WIDTH] < needle:
+                lo = mid + 1
+            else:
+                hi = mid
+        out = []
+        while (lo + 1) * size <= len(self._corporate):
+            reg, pid = CORPORATE_ENTRY.unpack_from(self._corporate, lo * size)
+            if reg != needle:
+                break
+            out.append(pid)
+            lo += 1
+        return out
+
+    def person_companies(self, pid: int) -> List[dict]:
+        items = []
+        for cid, eid in self.person_edges(pid):
+            item = {"company_number": self.company_number(cid)}
+            item.update(self.edge(eid))
+            items.append(item)
+        return items
+
+    def find_persons(self, name: str, limit: int = 50) -> Tuple[List[dict], bool]:
+        prefix = normalize_person_name(name).encode("utf-8")
+        if not prefix:
+            return [], False
+        lo, hi = 0, self.persons
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._keys[self._key_off[mid]:self._key_off[mid + 1]] < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        items = []
+        for pid in range(lo, min(self.persons, lo + NAME_SCAN_LIMIT)):
+            key = self._keys[self._key_off[pid]:self._key_off[pid + 1]]
+            if not key.startswith(prefix):
+                return items, False
+            # Whole words only: "JOHN SMITH" matches "JOHN SMITH JR" but not "JOHN SMITHSON".
+            if key[len(prefix):len(prefix) + 1] not in (b"|", b" "):
+                continue
+            if len(items) >= limit:
+                return items, True
+            item = self.person(pid)
+            item["companies"] = self.person_degree(pid)
+            items.append(item)
+        return items, lo + NAME_SCAN_LIMIT < self.persons
+
+
+# Reopens data/psc_graph when a rebuild replaces meta.json.
+class PSCGraphCache:
+    def __init__(self, graph_dir: Path = DEFAULT_GRAPH_DIR):
+        self.graph_dir = graph_dir
+        self._lock = threading.Lock()
+        self._current: Dict[str, Tuple[Tuple[int, int], PSCGraph]] = {}
+
+    def get(self, root: Path) -> Optional[PSCGraph]:
+        meta_path = root / self.graph_dir / "meta.json"
+        try:
+            stat = meta_path.stat()
+        except OSError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = str(root)
+        current = self._current.get(key)
+        if current is not None and current[0] == version:
+            return current[1]
+        with self._lock:
+            current = self._current.get(key)
+            if current is None or current[0] != version:
+                current = (version, PSCGraph(root / self.graph_dir))
+                self._current[key] = current
+        return current[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the PSC ownership graph served under /local/psc/ from Companies House PSC dumps.")
+    parser.add_argument("sources", nargs="*", type=Path, help=f"PSC snapshot files or directories (default: {', '.join(str(p) for p in DEFAULT_PSC_SOURCES)})")
+    parser.add_argument("--root", type=Path, default=ROOT, help="Repository root (default: %(default)s)")
+    parser.add_argument("--out", type=Path, default=DEFAULT_GRAPH_DIR, help="Graph directory, relative to --root (default: %(default)s)")
+    args = parser.parse_args()
+    root = args.root.resolve()
+    sources = [p if p.is_absolute() else Path.cwd() / p for p in args.sources] or [
+        root / p for p in DEFAULT_PSC_SOURCES if (root / p).exists()
+    ]
+    if not sources:
+        parser.error("no PSC sources found; pass snapshot files or directories")
+    meta = build_graph(sources, root / args.out)
+    print(f"Done: {meta['persons']:,} persons, {meta['companies']:,} companies, {meta['edges']:,} edges in {meta['seconds']}s -> {root / args.out}")
+
+
+if __name__ == "__main__":
+    main()
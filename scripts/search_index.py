@@ -0,0 +1,189 @@
+import json
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Scores match the original /nre/stations ranking: exact code 200, code
+# prefix 120, name prefix 80, and 40 whenever the query matches inside the
+# name (here: every query word prefixes a word of the name).
+SCORE_CODE_EXACT = 200
+SCORE_CODE_PREFIX = 120
+SCORE_NAME_PREFIX = 80
+SCORE_NAME_WORDS = 40
+# Results for queries this short are kept once computed: they cover the
+# widest ranges, and there are only ~1,300 distinct one- and two-character
+# queries.
+SHORT_QUERY = 2
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+UK_COUNTRIES = ("uk", "united kingdom", "england", "scotland", "wales", "northern ireland")
+
+DEFAULT_PLACE_SOURCES = (
+    ("airport", Path("data/airports.geojson")),
+    ("port", Path("data/sea_ports_simple.geojson")),
+)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(TOKEN_RE.findall(str(text or "").lower().replace("'", "")))
+
+
+class PrefixIndex:
+    # Sorted (term, doc) arrays for whole names, name words and codes, built
+    # once; a query is a bisect per array plus a scan of the matching range,
+    # so cost follows the number of matches rather than the catalog size.
+    # Documents carry a kind so several catalogs can share one index.
+    def __init__(self):
+        self._docs: List[Tuple[str, str, Any, int]] = []
+        self._pending: Dict[str, List[Tuple[str, int]]] = {"code": [], "name": [], "word": []}
+        self._keys: Dict[str, List[str]] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._short: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[int, int]]] = {}
+        self._kinds: set = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, item: Any, name: str, codes: Iterable[str] = (), kind: str = "", weight: int = 0):
+        doc = len(self._docs)
+        norm = normalize_query(name)
+        self._docs.append((kind, norm, item, weight))
+        self._kinds.add(kind)
+        if norm:
+            self._pending["name"].append((norm, doc))
+            for word in set(norm.split()):
+                self._pending["word"].append((word, doc))
+        for code in codes:
+            code = normalize_query(code).replace(" ", "")
+            if code:
+                self._pending["code"].append((code, doc))
+
+    def build(self) -> "PrefixIndex":
+        for field, entries in self._pending.items():
+            entries.sort()
+            self._keys[field] = [term for term, _ in entries]
+            self._postings[field] = [doc for _, doc in entries]
+        self._pending = {"code": [], "name": [], "word": []}
+        self._short.clear()
+        return self
+
+    def _range(self, field: str, prefix: str) -> Iterable[Tuple[str, int]]:
+        keys = self._keys.get(field) or []
+        lo = bisect_left(keys, prefix)
+        hi = bisect_right(keys, prefix + "\uffff", lo)
+        postings = self._postings[field]
+        return ((keys[i], postings[i]) for i in range(lo, hi))
+
+    def _score(self, query: str, kinds: Tuple[str, ...]) -> List[Tuple[int, int]]:
+        scores: Dict[int, int] = {}
+        for term, doc in self._range("code", query.replace(" ", "")):
+            scores[doc] = max(scores.get(doc, 0), SCORE_CODE_EXACT if term == query.replace(" ", "") else SCORE_CODE_PREFIX)
+        name_prefix = set(doc for _, doc in self._range("name", query))
+        for doc in name_prefix:
+            scores[doc] = scores.get(doc, 0) + SCORE_NAME_PREFIX + SCORE_NAME_WORDS
+        words = query.split()
+        matched: Optional[set] = None
+        for word in words:
+            docs = set(doc for _, doc in self._range("word", word))
+            matched = docs if matched is None else matched & docs
+            if not matched:
+                break
+        for doc in matched or ():
+            if doc not in name_prefix:
+                scores[doc] = scores.get(doc, 0) + SCORE_NAME_WORDS
+        ranked = [(score, doc) for doc, score in scores.items() if not kinds or self._docs[doc][0] in kinds]
+        ranked.sort(key=lambda pair: (-pair[0], -self._docs[pair[1]][3], self._docs[pair[1]][1]))
+        return ranked
+
+    def search(self, query: str, limit: int = 20, kinds: Iterable[str] = ()) -> List[Tuple[int, str, Any]]:
+        # (score, kind, item), best first, ties broken by weight then name.
+        query = normalize_query(query)
+        if not query:
+            return []
+        kinds = tuple(sorted(set(kinds)))
+        # Only kind filters made of the index's own kinds are memoised, so
+        # arbitrary caller-supplied kinds cannot grow the memo.
+        if len(query) <= SHORT_QUERY and self._kinds.issuperset(kinds):
+            ranked = self._short.get((query, kinds))
+            if ranked is None:
+                ranked = self._score(query, kinds)
+                with self._lock:
+                    self._short[(query, kinds)] = ranked
+        else:
+            ranked = self._score(query, kinds)
+        return [(score, self._docs[doc][0], self._docs[doc][2]) for score, doc in ranked[:max(0, limit)]]
+
+
+def station_index(stations: Iterable[dict]) -> PrefixIndex:
+    index = PrefixIndex()
+    for st in stations:
+        index.add(st, st["name"], (st["crs"],), kind="station")
+    return index.build()
+
+
+def _place(kind: str, feature: dict) -> Optional[Tuple[dict, List[str]]]:
+    props = feature.get("properties") or {}
+    coords = (feature.get("geometry") or {}).get("coordinates") or []
+    name = str(props.get("name:en") or props.get("name") or "").strip()
+    if not name or len(coords) < 2 or not all(isinstance(c, (int, float)) for c in coords[:2]):
+        return None
+    codes = [str(props.get(k) or "").strip() for k in ("iata", "icao", "locode")]
+    codes = [c for c in codes if c]
+    place = {"kind": kind, "name": name, "lat": coords[1], "lon": coords[0]}
+    if props.get("country"):
+        place["country"] = str(props["country"]).strip().lower()
+    if codes:
+        place["codes"] = codes
+    return place, codes
+
+
+class PlaceIndexCache:
+    # Prefix index over the local place catalogs (airports, ports), rebuilt
+    # when one of the files changes. Add a (kind, path) pair to
+    # DEFAULT_PLACE_SOURCES for any other point GeoJSON with "name" properties.
+    def __init__(self, sources=DEFAULT_PLACE_SOURCES):
+        self.sources = tuple(sources)
+        self._lock = threading.Lock()
+        self._current: Dict[str, Tuple[tuple, PrefixIndex]] = {}
+
+    @property
+    def kinds(self) -> frozenset:
+        return frozenset(kind for kind, _ in self.sources)
+
+    def get(self, root: Path) -> PrefixIndex:
+        version = []
+        for _, rel in self.sources:
+            try:
+                stat = (root / rel).stat()
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                version.append(None)
+        version = tuple(version)
+        key = str(root)
+        current = self._current.get(key)
+        if current is not None and current[0] == version:
+            return current[1]
+        with self._lock:
+            current = self._current.get(key)
+            if current is None or current[0] != version:
+                current = (version, self._build(root))
+                self._current[key] = current
+        return current[1]
+
+    def _build(self, root: Path) -> PrefixIndex:
+        index = PrefixIndex()
+        for kind, rel in self.sources:
+            try:
+                with (root / rel).open("r", encoding="utf-8") as f:
+                    features = json.load(f).get("features") or []
+            except (OSError, ValueError):
+                continue
+            for feature in features:
+                found = _place(kind, feature) if isinstance(feature, dict) else None
+                if found is not None:
+                    # UK entries first among equal scores.
+                    weight = 1 if found[0].get("country") in UK_COUNTRIES else 0
+                    index.add(found[0], found[0]["name"], found[1], kind=kind, weight=weight)
+        return index.build()
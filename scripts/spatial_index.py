@@ -0,0 +1,96 @@
+import math
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+# 0.1 degree cells: about 11 km north-south and 6-7 km east-west over the UK,
+# so a station-density catalog has a handful of points per cell.
+DEFAULT_CELL_DEG = 0.1
+# Nearest searches stop expanding after this many rings of cells (about
+# 1,100 km north-south at the default cell size).
+MAX_RING = 100
+
+
+def valid_point(lat: float, lon: float) -> bool:
+    return math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _coord(value) -> Optional[float]:
+    try:
+        out = float(value)
+    except (TypeError, ValueError):
+        return None
+    return out if math.isfinite(out) else None
+
+
+class PointGrid:
+    # In-memory grid of lat/lon buckets for catalogs that fit in memory
+    # (stations, airports, ports). Built once when the catalog loads; items
+    # without usable coordinates are left out. Coordinates are converted to
+    # float here so queries never touch the raw catalog values.
+    def __init__(self, items: Iterable[Any], coords: Callable[[Any], Tuple[Any, Any]], cell_deg: float = DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, Any]]] = {}
+        self.size = 0
+        for item in items:
+            lat, lon = (_coord(v) for v in coords(item))
+            if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                continue
+            self._cells.setdefault(self._cell(lat, lon), []).append((lat, lon, item))
+            self.size += 1
+        rows = [r for r, _ in self._cells] or [0]
+        cols = [c for _, c in self._cells] or [0]
+        self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 10,
+        radius_km: Optional[float] = None,
+        skip: Optional[Callable[[Any], bool]] = None,
+    ) -> List[Tuple[float, Any]]:
+        # (distance_km, item) pairs, closest first. Rings of cells are walked
+        # outwards from the query cell; anything beyond ring r is at least r
+        # cell widths away, so the walk stops once k hits (or the radius) are
+        # inside that bound, the rings have covered every occupied cell, or
+        # MAX_RING is reached. Invalid or non-finite points return nothing.
+        if k <= 0 or not self.size or not valid_point(lat, lon):
+            return []
+        row0, col0 = self._cell(lat, lon)
+        row_min, row_max, col_min, col_max = self._bounds
+        last_ring = min(MAX_RING, max(row0 - row_min, row_max - row0, col0 - col_min, col_max - col0, 0))
+        cell_ns = math.radians(self.cell_deg) * EARTH_RADIUS_KM
+        found: List[Tuple[float, Any]] = []
+        for ring in range(last_ring + 1):
+            for row in range(row0 - ring, row0 + ring + 1):
+                edge = row in (row0 - ring, row0 + ring)
+                cols = range(col0 - ring, col0 + ring + 1) if edge else (col0 - ring, col0 + ring)
+                for col in cols:
+                    for plat, plon, item in self._cells.get((row, col), ()):
+                        if skip is not None and skip(item):
+                            continue
+                        d = haversine_km(lat, lon, plat, plon)
+                        if radius_km is None or d <= radius_km:
+                            found.append((d, item))
+            # East-west cells narrow towards the poles: take the width at the
+            # far edge of the next ring so the bound never overshoots.
+            cell_ew = cell_ns * math.cos(math.radians(min(89.0, abs(lat) + (ring + 2) * self.cell_deg)))
+            bound = ring * min(cell_ns, cell_ew)
+            if radius_km is not None and bound > radius_km:
+                break
+            if len(found) >= k:
+                found.sort(key=lambda pair: pair[0])
+                del found[k:]
+                if found[-1][0] <= bound:
+                    break
+        found.sort(key=lambda pair: pair[0])
+        return found[:k]
@@ -0,0 +1,604 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[1]
+TILE_CACHE_DIR = Path("data/tiles")
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MAX_TILE_ZOOM = 18
+# Douglas-Peucker tolerance in tile units (16 units = one pixel on a 256px tile).
+SIMPLIFY_UNITS = 8
+# Features are bucketed by the tiles they touch at this zoom; anything wider
+# than WIDE_FEATURE_TILES buckets is checked against every request instead.
+INDEX_ZOOM = 8
+WIDE_FEATURE_TILES = 64
+
+TILE_LAYERS = {
+    "police_force_areas": {
+        "sources": ("data/police_force_areas_wgs84.geojson",),
+        "minzoom": 4,
+        "maxzoom": 12,
+    },
+    "service_stations": {
+        "sources": ("data/geojson/service_stations.geojson",),
+        "minzoom": 8,
+        "maxzoom": 14,
+    },
+    "airports": {
+        "sources": ("data/airports.geojson",),
+        "minzoom": 2,
+        "maxzoom": 12,
+    },
+    "sea_ports": {
+        "sources": ("data/sea_ports_simple.geojson",),
+        "minzoom": 5,
+        "maxzoom": 12,
+    },
+    "crime_grid": {
+        "sources": (
+            "data/processed/crime_grid.geojson",
+            "data/Processed/crime_grid.geojson",
+            "data/processed/crime_grid_lite.geojson",
+            "data/Processed/crime_grid_lite.geojson",
+        ),
+        "minzoom": 9,
+        "maxzoom": 14,
+        "drop": ("timeline",),
+    },
+}
+
+GEOM_POINT = 1
+GEOM_LINESTRING = 2
+GEOM_POLYGON = 3
+
+
+# --- projection / geometry -------------------------------------------------
+
+def project(lon: float, lat: float) -> Tuple[float, float]:
+    lat = max(-85.05112878, min(85.05112878, lat))
+    x = (lon + 180.0) / 360.0
+    s = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return x, y
+
+
+def _project_line(coords) -> List[Tuple[float, float]]:
+    out = []
+    for c in coords or []:
+        try:
+            out.append(project(float(c[0]), float(c[1])))
+        except (TypeError, ValueError, IndexError):
+            continue
+    return out
+
+
+def _project_geometry(geom: dict):
+    gtype = (geom or {}).get("type")
+    coords = (geom or {}).get("coordinates")
+    if gtype == "Point":
+        pts = _project_line([coords])
+        return (GEOM_POINT, pts) if pts else None
+    if gtype == "MultiPoint":
+        pts = _project_line(coords)
+        return (GEOM_POINT, pts) if pts else None
+    if gtype == "LineString":
+        line = _project_line(coords)
+        return (GEOM_LINESTRING, [line]) if len(line) >= 2 else None
+    if gtype == "MultiLineString":
+        lines = [ln for ln in (_project_line(c) for c in coords or []) if len(ln) >= 2]
+        return (GEOM_LINESTRING, lines) if lines else None
+    if gtype == "Polygon":
+        rings = [r for r in (_project_line(c) for c in coords or []) if len(r) >= 4]
+        return (GEOM_POLYGON, [rings]) if rings else None
+    if gtype == "MultiPolygon":
+        polys = []
+        for poly in coords or []:
+            rings = [r for r in (_project_line(c) for c in poly or []) if len(r) >= 4]
+            if rings:
+                polys.append(rings)
+        return (GEOM_POLYGON, polys) if polys else None
+    return None
+
+
+def _bbox(gtype: int, parts) -> Tuple[float, float, float, float]:
+    if gtype == GEOM_POINT:
+        points = parts
+    elif gtype == GEOM_LINESTRING:
+        points = [p for line in parts for p in line]
+    else:
+        points = [p for poly in parts for p in poly[0]]
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def simplify(points: List[Tuple[float, float]], tolerance: float) -> List[Tuple[float, float]]:
+    if len(points) <= 2 or tolerance <= 0:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    tol2 = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+        max_d2, index = 0.0, -1
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if seg2 == 0:
+                d2 = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg2))
+                d2 = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+            if d2 > max_d2:
+                max_d2, index = d2, i
+        if index >= 0 and max_d2 > tol2:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _clip_ring(ring, lo: float, hi: float):
+    # Sutherland-Hodgman against the four edges of the square [lo, hi].
+    edges = (
+        (lambda p: p[0] >= lo, lambda a, b: _cross_x(a, b, lo)),
+        (lambda p: p[0] <= hi, lambda a, b: _cross_x(a, b, hi)),
+        (lambda p: p[1] >= lo, lambda a, b: _cross_y(a, b, lo)),
+        (lambda p: p[1] <= hi, lambda a, b: _cross_y(a, b, hi)),
+    )
+    out = ring[:-1] if len(ring) > 1 and ring[0] == ring[-1] else list(ring)
+    for inside, cross in edges:
+        if not out:
+            break
+        src, out = out, []
+        prev = src[-1]
+        for cur in src:
+            if inside(cur):
+                if not inside(prev):
+                    out.append(cross(prev, cur))
+                out.append(cur)
+            elif inside(prev):
+                out.append(cross(prev, cur))
+            prev = cur
+    return out
+
+
+def _cross_x(a, b, x):
+    t = (x - a[0]) / (b[0] - a[0])
+    return (x, a[1] + t * (b[1] - a[1]))
+
+
+def _cross_y(a, b, y):
+    t = (y - a[1]) / (b[1] - a[1])
+    return (a[0] + t * (b[0] - a[0]), y)
+
+
+def _clip_line(line, lo: float, hi: float):
+    # Liang-Barsky per segment, joining consecutive visible pieces.
+    parts, current = [], []
+    for a, b in zip(line, line[1:]):
+        t0, t1 = 0.0, 1.0
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        visible = True
+        for p, q in ((-dx, a[0] - lo), (dx, hi - a[0]), (-dy, a[1] - lo), (dy, hi - a[1])):
+            if p == 0:
+                if q < 0:
+                    visible = False
+                    break
+                continue
+            r = q / p
+            if p < 0:
+                t0 = max(t0, r)
+            else:
+                t1 = min(t1, r)
+            if t0 > t1:
+                visible = False
+                break
+        if not visible:
+            if len(current) >= 2:
+                parts.append(current)
+            current = []
+            continue
+        start = (a[0] + t0 * dx, a[1] + t0 * dy)
+        end = (a[0] + t1 * dx, a[1] + t1 * dy)
+        if not current:
+            current = [start]
+        elif current[-1] != start:
+            if len(current) >= 2:
+                parts.append(current)
+            current = [start]
+        current.append(end)
+        if t1 < 1.0:
+            parts.append(current)
+            current = []
+    if len(current) >= 2:
+        parts.append(current)
+    return parts
+
+
+def _quantize(points) -> List[Tuple[int, int]]:
+    out = []
+    for x, y in points:
+        q = (int(round(x)), int(round(y)))
+        if not out or out[-1] != q:
+            out.append(q)
+    return out
+
+
+def _ring_area(ring) -> float:
+    area = 0
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        area += x1 * y2 - x2 * y1
+    return area / 2.0
+
+
+# --- protobuf / MVT encoding ----------------------------------------------
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number: int, wire_type: int) -> bytes:
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes_field(number: int, payload: bytes) -> bytes:
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values: List[int]) -> bytes:
+    return _bytes_field(number, b"".join(_varint(v) for v in values))
+
+
+def _encode_value(value) -> bytes:
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _field(5, 0) + _varint(value)
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack("<d", value)
+    return _bytes_field(1, str(value).encode("utf-8"))
+
+
+def _command(cmd: int, count: int) -> int:
+    return (cmd & 0x7) | (count << 3)
+
+
+def _encode_geometry(gtype: int, parts) -> List[int]:
+    out: List[int] = []
+    cx = cy = 0
+
+    def moves(points):
+        nonlocal cx, cy
+        for x, y in points:
+            out.append(_zigzag(x - cx))
+            out.append(_zigzag(y - cy))
+            cx, cy = x, y
+
+    if gtype == GEOM_POINT:
+        out.append(_command(1, len(parts)))
+        moves(parts)
+        return out
+    for path in parts:
+        out.append(_command(1, 1))
+        moves(path[:1])
+        out.append(_command(2, len(path) - 1))
+        moves(path[1:])
+        if gtype == GEOM_POLYGON:
+            out.append(_command(7, 1))
+    return out
+
+
+def encode_layer(name: str, features: List[dict], extent: int = TILE_EXTENT) -> bytes:
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[str, Any], int] = {}
+    encoded_values: List[bytes] = []
+    body = [_field(15, 0) + _varint(2), _bytes_field(1, name.encode("utf-8"))]
+    for feature in features:
+        tags: List[int] = []
+        for key, value in feature["properties"].items():
+            kidx = keys.setdefault(key, len(keys))
+            vkey = (type(value).__name__, value)
+            vidx = values.get(vkey)
+            if vidx is None:
+                vidx = values[vkey] = len(encoded_values)
+                encoded_values.append(_encode_value(value))
+            tags.extend((kidx, vidx))
+        msg = b""
+        if feature.get("id") is not None:
+            msg += _field(1, 0) + _varint(feature["id"])
+        if tags:
+            msg += _packed(2, tags)
+        msg += _field(3, 0) + _varint(feature["type"])
+        msg += _packed(4, _encode_geometry(feature["type"], feature["parts"]))
+        body.append(_bytes_field(2, msg))
+    body.extend(_bytes_field(3, k.encode("utf-8")) for k in keys)
+    body.extend(_bytes_field(4, v) for v in encoded_values)
+    body.append(_field(5, 0) + _varint(extent))
+    return _bytes_field(3, b"".join(body))
+
+
+# --- layer sources ----------------------------------------------------------
+
+def _tile_properties(props: dict, drop) -> dict:
+    out = {}
+    for key, value in (props or {}).items():
+        if value is None or key in drop:
+            continue
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, separators=(",", ":"))
+        elif not isinstance(value, (str, int, float, bool)):
+            value = str(value)
+        out[str(key)] = value
+    return out
+
+
+class TileSource:
+    def __init__(self, name: str, path: Path, spec: dict):
+        self.name = name
+        self.path = path
+        self.spec = spec
+        stat = path.stat()
+        self.version = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+        self._lock = threading.Lock()
+        self._simplified: Dict[int, list] = {}
+        self.features: List[tuple] = []
+        self.index: Dict[Tuple[int, int], List[int]] = {}
+        self.wide: List[int] = []
+
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        drop = set(spec.get("drop") or ())
+        scale = 1 << INDEX_ZOOM
+        for raw in data.get("features") or []:
+            if not isinstance(raw, dict):
+                continue
+            geom = _project_geometry(raw.get("geometry"))
+            if geom is None:
+                continue
+            gtype, parts = geom
+            bbox = _bbox(gtype, parts)
+            fid = raw.get("id")
+            fid = fid if isinstance(fid, int) and not isinstance(fid, bool) and fid >= 0 else None
+            idx = len(self.features)
+            self.features.append((gtype, parts, bbox, _tile_properties(raw.get("properties"), drop), fid))
+            x0, y0 = int(bbox[0] * scale), int(bbox[1] * scale)
+            x1, y1 = int(bbox[2] * scale), int(bbox[3] * scale)
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > WIDE_FEATURE_TILES:
+                self.wide.append(idx)
+                continue
+            for tx in range(x0, x1 + 1):
+                for ty in range(y0, y1 + 1):
+                    self.index.setdefault((tx, ty), []).append(idx)
+
+    def _parts_for_zoom(self, z: int) -> list:
+        cached = self._simplified.get(z)
+        if cached is not None:
+            return cached
+        with self._lock:
+            cached = self._simplified.get(z)
+            if cached is None:
+                tol = SIMPLIFY_UNITS / float(TILE_EXTENT * (1 << z))
+                cached = []
+                for gtype, parts, _, _, _ in self.features:
+                    if gtype == GEOM_LINESTRING:
+                        parts = [simplify(line, tol) for line in parts]
+                    elif gtype == GEOM_POLYGON:
+                        parts = [[simplify(ring, tol) for ring in poly] for poly in parts]
+                    cached.append(parts)
+                self._simplified[z] = cached
+        return cached
+
+    def _candidates(self, z: int, x: int, y: int, pad: float) -> List[int]:
+        size = 1.0 / (1 << z)
+        west, north = x * size - pad, y * size - pad
+        east, south = (x + 1) * size + pad, (y + 1) * size + pad
+        scale = 1 << INDEX_ZOOM
+        seen = set(self.wide)
+        for tx in range(max(0, int(west * scale)), min(scale - 1, int(east * scale)) + 1):
+            for ty in range(max(0, int(north * scale)), min(scale - 1, int(south * scale)) + 1):
+                seen.update(self.index.get((tx, ty), ()))
+        out = []
+        for idx in sorted(seen):
+            bx0, by0, bx1, by1 = self.features[idx][2]
+            if bx1 >= west and bx0 <= east and by1 >= north and by0 <= south:
+                out.append(idx)
+        return out
+
+    def covered_tiles(self, z: int):
+        scale = 1 << z
+        tiles = set()
+        for _, _, bbox, _, _ in self.features:
+            for tx in range(int(bbox[0] * scale), min(scale - 1, int(bbox[2] * scale)) + 1):
+                for ty in range(int(bbox[1] * scale), min(scale - 1, int(bbox[3] * scale)) + 1):
+                    tiles.add((tx, ty))
+        return sorted(tiles)
+
+    def render(self, z: int, x: int, y: int) -> bytes:
+        scale = float(1 << z) * TILE_EXTENT
+        pad = TILE_BUFFER / scale
+        lo, hi = -TILE_BUFFER, TILE_EXTENT + TILE_BUFFER
+        ox, oy = x * TILE_EXTENT, y * TILE_EXTENT
+        simplified = self._parts_for_zoom(z)
+
+        def local(points):
+            return [(px * scale - ox, py * scale - oy) for px, py in points]
+
+        out = []
+        for idx in self._candidates(z, x, y, pad):
+            gtype, parts, _, props, fid = self.features[idx]
+            parts = simplified[idx]
+            if gtype == GEOM_POINT:
+                pts = [p for p in _quantize(local(parts)) if 0 <= p[0] < TILE_EXTENT and 0 <= p[1] < TILE_EXTENT]
+                geom_parts = pts
+            elif gtype == GEOM_LINESTRING:
+                geom_parts = []
+                for line in parts:
+                    for piece in _clip_line(local(line), lo, hi):
+                        q = _quantize(piece)
+                        if len(q) >= 2:
+                            geom_parts.append(q)
+            else:
+                geom_parts = []
+                for poly in parts:
+                    for ring_no, ring in enumerate(poly):
+                        q = _quantize(_clip_ring(local(ring), lo, hi))
+                        if len(q) > 1 and q[0] == q[-1]:
+                            q.pop()
+                        if len(q) < 3 or _ring_area(q) == 0:
+                            if ring_no == 0:
+                                break
+                            continue
+                        # MVT wants exteriors with positive area (clockwise, y down).
+                        exterior = ring_no == 0
+                        if (_ring_area(q) > 0) != exterior:
+                            q.reverse()
+                        geom_parts.append(q)
+            if geom_parts:
+                out.append({"type": gtype, "parts": geom_parts, "properties": props, "id": fid})
+        return encode_layer(self.name, out) if out else b""
+
+
+# --- on-disk cache ---------------------------------------------------------
+
+# Tiles live under data/tiles/<layer>/<source version>/<z>/<x>/<y>.pbf, so a
+# changed source file starts a fresh cache and stale versions are pruned.
+class TileCache:
+    def __init__(self, layers: Optional[dict] = None):
+        self.layers = layers if layers is not None else TILE_LAYERS
+        self._lock = threading.Lock()
+        self._sources: Dict[Tuple[str, str], TileSource] = {}
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+        self.stats = {"hits": 0, "rendered": 0, "empty": 0, "sources_loaded": 0}
+
+    def find_source(self, root: Path, layer: str) -> Optional[Path]:
+        for rel in self.layers[layer]["sources"]:
+            path = root / rel
+            if path.is_file():
+                return path
+        return None
+
+    def source(self, root: Path, layer: str) -> TileSource:
+        path = self.find_source(root, layer)
+        if path is None:
+            raise FileNotFoundError(f"no source file for tile layer '{layer}'")
+        stat = path.stat()
+        version = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+        key = (str(root), layer)
+        current = self._sources.get(key)
+        if current is not None and current.version == version and current.path == path:
+            return current
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            current = self._sources.get(key)
+            if current is None or current.version != version or current.path != path:
+                current = TileSource(layer, path, self.layers[layer])
+                self._sources[key] = current
+                with self._lock:
+                    self.stats["sources_loaded"] += 1
+                self._prune(root, layer, current.version)
+        return current
+
+    @staticmethod
+    def _prune(root: Path, layer: str, keep: str):
+        layer_dir = root / TILE_CACHE_DIR / layer
+        if not layer_dir.is_dir():
+            return
+        for child in layer_dir.iterdir():
+            if child.is_dir() and child.name != keep:
+                shutil.rmtree(child, ignore_errors=True)
+
+    def tile_path(self, root: Path, layer: str, z: int, x: int, y: int) -> Path:
+        src = self.source(root, layer)
+        rel = TILE_CACHE_DIR / layer / src.version / str(z) / str(x) / f"{y}.pbf"
+        path = root / rel
+        if path.is_file():
+            with self._lock:
+                self.stats["hits"] += 1
+            return rel
+        spec = self.layers[layer]
+        data = src.render(z, x, y) if z >= spec.get("minzoom", 0) else b""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stats["rendered"] += 1
+            if not data:
+                self.stats["empty"] += 1
+        return rel
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+            out["layers_loaded"] = sorted(layer for _, layer in self._sources)
+        return out
+
+
+def run(root: Path, layers: List[str], minzoom: Optional[int], maxzoom: Optional[int]):
+    cache = TileCache()
+    for layer in layers:
+        spec = TILE_LAYERS[layer]
+        try:
+            src = cache.source(root, layer)
+        except FileNotFoundError as e:
+            print(f"skip {layer}: {e}")
+            continue
+        lo = spec["minzoom"] if minzoom is None else max(minzoom, spec["minzoom"])
+        hi = spec["maxzoom"] if maxzoom is None else min(maxzoom, spec["maxzoom"])
+        for z in range(lo, hi + 1):
+            tiles = src.covered_tiles(z)
+            before = dict(cache.stats)
+            for x, y in tiles:
+                cache.tile_path(root, layer, z, x, y)
+            print(
+                f"{layer} z{z}: {len(tiles)} tiles "
+                f"({cache.stats['rendered'] - before['rendered']} rendered, "
+                f"{cache.stats['hits'] - before['hits']} cached, "
+                f"{cache.stats['empty'] - before['empty']} empty)"
+            )
+    print(f"Done: tiles under {root / TILE_CACHE_DIR}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prebuild Mapbox Vector Tiles for large overlays served by scripts/dev_server.py.")
+    parser.add_argument("layers", nargs="*", help=f"Layers to build (default: all of {', '.join(TILE_LAYERS)})")
+    parser.add_argument("--root", type=Path, default=ROOT, help="Web root holding data/ (default: repository root)")
+    parser.add_argument("--minzoom", type=int, help="Lowest zoom to build (default: per-layer minzoom)")
+    parser.add_argument("--maxzoom", type=int, help="Highest zoom to build (default: per-layer maxzoom)")
+    args = parser.parse_args()
+    unknown = [name for name in args.layers if name not in TILE_LAYERS]
+    if unknown:
+        parser.error(f"unknown layer(s): {', '.join(unknown)}")
+    run(args.root.resolve(), args.layers or list(TILE_LAYERS), args.minzoom, args.maxzoom)
+
+
+if __name__ == "__main__":
+    main()